@@ -99,7 +99,11 @@ async def mediator_entrypoint(ctx: JobContext):
             from app.services.transcript_rag import TranscriptRAGSystem
             # This might involve network calls to Pinecone/OpenAI, so run in thread if blocking
             # But TranscriptRAGSystem init is mostly setting config, actual connections are lazy or fast
-            rag = TranscriptRAGSystem(k=5, include_profiles=True, include_calendar=False)
+            # Voice turns get a retrieval budget - slow sources are dropped rather than awaited
+            rag = TranscriptRAGSystem(k=5, include_profiles=True, include_calendar=False, latency_budget=1.2)
+            # Load the conflict transcript now so the first voice turn doesn't pay for it
+            from app.services.conflict_transcript_store import conflict_transcript_store
+            asyncio.create_task(conflict_transcript_store.warm(conflict_id))
             return rag, rel_id
         except ImportError:
             logger.warning("RAG system not available")
@@ -205,6 +209,10 @@ async def mediator_entrypoint(ctx: JobContext):
                 partner_b_name=partner_b_name
             )
             
+        # Start RAG retrieval on stable interim speech, before the turn ends
+        if rag_system:
+            session.on("user_input_transcribed", agent.rag_handler.on_user_input_transcribed)
+
         # Connect
         await session.start(
             room=ctx.room,
@@ -1,11 +1,36 @@
 import logging
+import math
 import time
 import asyncio
 from livekit.agents import llm
 from app.services.db_service import db_service
+from app.services.embedding_dispatcher import embedding_dispatcher
+from app.services.lexical_index import tokenize
 
 logger = logging.getLogger("luna-rag")
 
+# Speculative prefetch tuning
+SPECULATION_MIN_WORDS = 4  # Don't speculate on "um, so..."
+SPECULATION_STABLE_SECONDS = 0.15  # Interim text unchanged this long counts as stable
+REUSE_TOKEN_OVERLAP = 0.8  # Final turn this lexically close: reuse as-is
+REFINE_TOKEN_OVERLAP = 0.4  # Between the two: compare embeddings
+REUSE_COSINE = 0.9
+
+
+def _token_overlap(a: str, b: str) -> float:
+    """Share of the final text's content words already covered by the speculative text."""
+    final_tokens = set(tokenize(a))
+    if not final_tokens:
+        return 0.0
+    return len(final_tokens & set(tokenize(b))) / len(final_tokens)
+
+
+def _cosine(a, b) -> float:
+    dot = sum(x * y for x, y in zip(a, b))
+    norm = math.sqrt(sum(x * x for x in a)) * math.sqrt(sum(y * y for y in b))
+    return dot / norm if norm else 0.0
+
+
 class RAGHandler:
     """Handles RAG lookups and context injection"""
     
@@ -14,6 +39,103 @@ class RAGHandler:
         self.conflict_id = conflict_id
         self.relationship_id = relationship_id
         self.session_id = session_id
+        # Speculative prefetch state for the current user turn
+        self._final_segments = []
+        self._interim = ""
+        self._stable_timer = None
+        self._speculation = None  # {"text": str, "task": asyncio.Task}
+        self.speculation_stats = {"started": 0, "reused": 0, "refined": 0, "discarded": 0}
+
+    # --- Speculative prefetch on interim transcripts ---
+
+    def on_transcript(self, transcript: str, is_final: bool):
+        """
+        Feed STT transcripts (interim and final) for the turn in progress.
+
+        Retrieval starts as soon as the running transcript is stable - on each
+        final segment, or when interim text stops changing - so it overlaps
+        with the user still talking instead of starting after they stop.
+        """
+        if is_final:
+            if transcript.strip():
+                self._final_segments.append(transcript.strip())
+            self._interim = ""
+        else:
+            self._interim = transcript.strip()
+
+        text = " ".join(self._final_segments + ([self._interim] if self._interim else []))
+        if self._stable_timer:
+            self._stable_timer.cancel()
+            self._stable_timer = None
+        if len(text.split()) < SPECULATION_MIN_WORDS:
+            return
+        if is_final:
+            self._speculate(text)
+        else:
+            loop = asyncio.get_running_loop()
+            self._stable_timer = loop.call_later(SPECULATION_STABLE_SECONDS, self._speculate, text)
+
+    def on_user_input_transcribed(self, event):
+        """AgentSession "user_input_transcribed" listener."""
+        try:
+            self.on_transcript(event.transcript, event.is_final)
+        except Exception as e:
+            logger.warning(f"Speculative RAG prefetch skipped: {e}")
+
+    def _speculate(self, text: str):
+        self._stable_timer = None
+        if self._speculation and _token_overlap(text, self._speculation["text"]) >= REUSE_TOKEN_OVERLAP:
+            return  # Already covered by the in-flight lookup
+        task = asyncio.ensure_future(self.rag_system.rag_lookup(
+            query=text,
+            conflict_id=self.conflict_id,
+            relationship_id=self.relationship_id,
+            session_id=self.session_id,
+        ))
+        # A superseded speculation still runs to completion and warms the caches
+        task.add_done_callback(lambda t: None if t.cancelled() else t.exception())
+        self._speculation = {"text": text, "task": task}
+        self.speculation_stats["started"] += 1
+        logger.info(f"🔮 Speculative RAG prefetch: '{text[:40]}...'")
+
+    def _reset_turn(self):
+        if self._stable_timer:
+            self._stable_timer.cancel()
+        self._stable_timer = None
+        self._final_segments = []
+        self._interim = ""
+        self._speculation = None
+
+    async def _speculative_context(self, query: str):
+        """Context from the speculative lookup if it answers the final query, else None."""
+        speculation = self._speculation
+        if not speculation:
+            return None
+        overlap = _token_overlap(query, speculation["text"])
+        if overlap < REFINE_TOKEN_OVERLAP:
+            self.speculation_stats["discarded"] += 1
+            return None
+        if overlap < REUSE_TOKEN_OVERLAP:
+            # Cheap semantic check - the speculative query's embedding is already cached
+            try:
+                final_vec, spec_vec = await asyncio.gather(
+                    embedding_dispatcher.embed_query(query),
+                    embedding_dispatcher.embed_query(speculation["text"]),
+                )
+            except Exception as e:
+                logger.warning(f"Speculation similarity check failed: {e}")
+                return None
+            if _cosine(final_vec, spec_vec) < REUSE_COSINE:
+                self.speculation_stats["discarded"] += 1
+                return None
+            self.speculation_stats["refined"] += 1
+        else:
+            self.speculation_stats["reused"] += 1
+        try:
+            return await speculation["task"]
+        except Exception as e:
+            logger.warning(f"Speculative RAG lookup failed: {e}")
+            return None
 
     async def handle_user_turn(self, turn_ctx: llm.ChatContext, new_message: llm.ChatMessage):
         """
@@ -26,6 +148,7 @@ class RAGHandler:
             
             if not user_query or not user_query.strip():
                 logger.warning("Empty user query, skipping RAG lookup")
+                self._reset_turn()
                 return
             
             # Log user message
@@ -36,12 +159,19 @@ class RAGHandler:
             
             turn_start = time.perf_counter()
             
-            # Perform RAG lookup (ASYNC)
-            rag_context = await self.rag_system.rag_lookup(
-                query=user_query,
-                conflict_id=self.conflict_id,
-                relationship_id=self.relationship_id,
-            )
+            # Reuse the lookup started on interim speech when it matches what was said
+            rag_context = await self._speculative_context(user_query)
+            self._reset_turn()
+            if rag_context is None:
+                # Perform RAG lookup (ASYNC)
+                rag_context = await self.rag_system.rag_lookup(
+                    query=user_query,
+                    conflict_id=self.conflict_id,
+                    relationship_id=self.relationship_id,
+                    session_id=self.session_id,
+                )
+            else:
+                logger.info("🔮 Using speculative RAG result")
             
             rag_time = time.perf_counter() - turn_start
             logger.info(f"⏱️ RAG Lookup Complete: {rag_time:.3f}s")
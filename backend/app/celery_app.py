@@ -6,11 +6,26 @@ Result backend: redis://localhost:6380/2
 
 Usage:
     celery -A app.celery_app worker --loglevel=info --beat
+
+Async tasks run on one persistent event loop per worker process
+(see app/tasks/worker_loop.py).
+
+Queues are priority lanes - interactive > scheduled > backfill - consumed in
+that order. Per-relationship work is submitted through app/tasks/lanes.py,
+which enforces per-relationship caps and fair ordering before a job reaches
+its queue (see app/services/fair_scheduler.py).
 """
+import logging
+
 from celery import Celery
 from celery.schedules import crontab
+from celery.signals import task_postrun, task_prerun, worker_process_init, worker_process_shutdown, worker_shutdown
+from kombu import Queue
 
 from app.config import settings
+from app.services.fair_scheduler import LANES
+
+logger = logging.getLogger(__name__)
 
 
 celery_app = Celery(
@@ -28,12 +43,26 @@ celery_app.conf.update(
     task_track_started=True,
     task_acks_late=True,
     worker_prefetch_multiplier=1,
-    # Route tasks to different queues
+    # Priority lanes, highest first; workers consume them in this order
+    task_queues=[Queue(lane, routing_key=lane) for lane in LANES],
+    task_default_queue="scheduled",
+    broker_transport_options={"queue_order_strategy": "priority"},
+    # Route tasks to lanes
     task_routes={
-        "app.tasks.analysis_tasks.*": {"queue": "analysis"},
-        "app.tasks.digest_tasks.*": {"queue": "digest"},
-        "app.tasks.alert_tasks.*": {"queue": "alerts"},
+        "app.tasks.analysis_tasks.*": {"queue": "interactive"},
+        "app.tasks.lanes.*": {"queue": "interactive"},
+        "app.tasks.digest_tasks.*": {"queue": "scheduled"},
+        "app.tasks.alert_tasks.*": {"queue": "scheduled"},
+        "app.tasks.backfill_tasks.*": {"queue": "backfill"},
     },
+    # Task modules a worker registers at startup
+    imports=[
+        "app.tasks.analysis_tasks",
+        "app.tasks.digest_tasks",
+        "app.tasks.alert_tasks",
+        "app.tasks.backfill_tasks",
+        "app.tasks.lanes",
+    ],
     # Celery Beat schedule
     beat_schedule={
         "weekly-digest": {
@@ -48,8 +77,47 @@ celery_app.conf.update(
             "task": "app.tasks.alert_tasks.check_periodic_checkins",
             "schedule": crontab(hour=18, minute=0),  # Daily at 6 PM UTC
         },
+        "dispatch-task-lanes": {
+            "task": "app.tasks.lanes.dispatch_lanes",
+            "schedule": 60.0,  # Picks up slots freed by expired leases
+        },
     },
 )
 
 # Auto-discover tasks from these modules
 celery_app.autodiscover_tasks(["app.tasks"])
+
+
+@worker_process_init.connect
+def install_offline_backends(**kwargs):
+    """Use local stand-ins for external backends when SERENE_BACKENDS is not live."""
+    from app.services.offline_backends import install_from_settings
+    install_from_settings()
+
+
+@worker_process_shutdown.connect
+@worker_shutdown.connect
+def stop_worker_loop(**kwargs):
+    """Let queued async work (e.g. vector writes) finish before the process exits."""
+    from app.tasks.worker_loop import worker_loop
+    worker_loop.shutdown(timeout=settings.WORKER_LOOP_SHUTDOWN_TIMEOUT)
+
+
+@task_prerun.connect
+def record_lane_wait(task_id=None, **kwargs):
+    """Record how long a lane-submitted job waited before starting."""
+    from app.tasks.lanes import on_task_start
+    try:
+        on_task_start(task_id)
+    except Exception as e:
+        logger.warning(f"⚠️ Failed to record lane wait for {task_id}: {e}")
+
+
+@task_postrun.connect
+def release_lane_slot(task_id=None, state=None, **kwargs):
+    """Free the job's relationship/lane slot and dispatch the next job."""
+    from app.tasks.lanes import on_task_finish
+    try:
+        on_task_finish(task_id, state)
+    except Exception as e:
+        logger.warning(f"⚠️ Failed to release lane slot for {task_id}: {e}")
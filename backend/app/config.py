@@ -29,6 +29,14 @@ class Settings(BaseSettings):
     AWS_SECRET_ACCESS_KEY: str
     AWS_REGION: str = "us-east-1"
     S3_BUCKET_NAME: str = "serene-relationship-mediator"  # S3 bucket name
+    S3_MAX_POOL_CONNECTIONS: int = 32  # Shared by sync calls and the async object store's worker threads
+
+    # Streaming document storage (see app/services/object_storage.py)
+    # s3: the S3 bucket above | local: files under LOCAL_STORAGE_DIR (dev/test stand-in)
+    STORAGE_BACKEND: str = "s3"
+    LOCAL_STORAGE_DIR: str = ".cache/object_storage"
+    STORAGE_PART_SIZE_MB: int = 8  # Multipart part size; S3 requires >= 5 MB for all but the last part
+    STORAGE_MAX_CONCURRENCY: int = 4  # Parts in flight per upload (bounds upload memory to ~part size x this)
 
     # Auth0 Configuration
     AUTH0_DOMAIN: str = ""
@@ -45,6 +53,15 @@ class Settings(BaseSettings):
     REDIS_URL: str = "redis://localhost:6380/0"
     CELERY_BROKER_URL: str = "redis://localhost:6380/1"
     CELERY_RESULT_BACKEND: str = "redis://localhost:6380/2"
+    WORKER_FANOUT_CONCURRENCY: int = 8  # Concurrent sub-jobs per task on the worker loop (see app/tasks/worker_loop.py)
+    WORKER_LOOP_SHUTDOWN_TIMEOUT: float = 10.0  # Seconds pending loop tasks get when a worker process exits
+
+    # Background task lanes (see app/services/fair_scheduler.py): jobs in flight per relationship
+    INTERACTIVE_TENANT_CONCURRENCY: int = 2
+    SCHEDULED_TENANT_CONCURRENCY: int = 1
+    BACKFILL_TENANT_CONCURRENCY: int = 2
+    BACKFILL_MAX_IN_FLIGHT: int = 4  # Across all relationships, so backfills leave worker slots free
+    TASK_LEASE_SECONDS: int = 900  # A dispatched job's slot frees after this even if its worker never reports back
 
     # CORS
     ALLOWED_ORIGINS: str = "http://localhost:8101"
@@ -52,6 +69,54 @@ class Settings(BaseSettings):
     # S3 Signed URLs
     S3_SIGNED_URL_EXPIRY: int = 3600  # 1 hour
 
+    # Shared Voyage rate limits (see app/services/rate_limiter.py) - set to your account tier
+    VOYAGE_RPM: int = 2000
+    VOYAGE_TPM: int = 3000000
+    VOYAGE_BULK_RESERVE: float = 0.3  # Share of each bucket bulk ingestion must leave for interactive calls
+
+    # Voyage rerank latency budget before falling back to the local reranker
+    RERANK_TIMEOUT_SECONDS: float = 2.0
+
+    # Persistent embedding cache (see app/services/embedding_cache.py)
+    EMBEDDING_CACHE_ENABLED: bool = True
+    EMBEDDING_CACHE_PATH: str = ".cache/embedding_cache.sqlite3"
+    EMBEDDING_CACHE_MAX_ENTRIES: int = 200000
+    EMBEDDING_CACHE_DTYPE: str = "float32"  # float32 | float16 (half the size, ~3 significant digits)
+
+    # pinecone: hosted index | local: embedded on-disk index for single-node/test deployments
+    # (see app/services/local_vector_index.py)
+    VECTOR_BACKEND: str = "pinecone"
+    LOCAL_VECTOR_INDEX_DIR: str = ".cache/vector_index"
+    LOCAL_VECTOR_ANN_THRESHOLD: int = 20000  # Namespaces at least this large use the IVF index
+
+    # shared: tenant namespaces filtered by relationship_id | per_relationship: one namespace per couple
+    # (run scripts/migrate_namespaces.py before switching; see app/services/namespace_router.py)
+    PINECONE_NAMESPACE_LAYOUT: str = "shared"
+
+    # Transcript/analysis/repair plan bodies referenced from slim Pinecone metadata (see app/services/payload_store.py)
+    PAYLOAD_STORE_PATH: str = ".cache/vector_payloads.sqlite3"
+
+    # Uploaded documents by SHA-256 -> extracted text, chunks, embeddings (see app/services/document_registry.py)
+    DOCUMENT_REGISTRY_PATH: str = ".cache/document_registry.sqlite3"
+
+    # Document ingestion (see app/routes/pdf_upload.py and app/services/ocr_service.py)
+    OCR_PAGES_PER_REQUEST: int = 8  # Pages per Mistral OCR call
+    OCR_MAX_CONCURRENCY: int = 4  # OCR calls in flight per document
+    PROGRESS_MAX_EVENTS: int = 200  # Progress events kept per job (see app/services/progress_store.py)
+    PROGRESS_TTL_SECONDS: int = 3600  # Progress expires this long after a job's last event
+
+    # Post-fight stage checkpoints (see app/services/stage_graph.py)
+    PIPELINE_CHECKPOINT_TTL_SECONDS: int = 7 * 24 * 3600  # Saved stage outputs a retry or re-run can resume from
+
+    # Cross-fight debrief reads (see app/services/debrief_repository.py)
+    DEBRIEF_CACHE_DIR: str = ".cache/debriefs"  # Parsed debriefs keyed by S3 ETag; empty = memory only
+    DEBRIEF_FETCH_CONCURRENCY: int = 16
+
+    # Offline backends for benchmarking (see app/services/offline_backends.py)
+    SERENE_BACKENDS: str = "live"  # live | fake | record | replay
+    SERENE_CASSETTE_DIR: str = "cassettes"
+    SERENE_FAKE_LATENCY: str = ""  # e.g. "llm=lognormal:900:0.4,embeddings=normal:120:30"
+
 
     class Config:
         env_file = "../.env"  # Load from root directory
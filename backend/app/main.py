@@ -4,6 +4,7 @@ from livekit import api
 from livekit.protocol.room import RoomConfiguration
 from .config import settings
 from .routes import transcription
+import asyncio
 import json
 import logging
 import os
@@ -83,6 +84,11 @@ app.include_router(digest_routes.router)
 from .routes import alert_routes
 app.include_router(alert_routes.router)
 
+# Swap external AI/vector/storage clients for local stand-ins when
+# SERENE_BACKENDS is fake/record/replay (no-op in live mode)
+from .services.offline_backends import install_from_settings
+install_from_settings()
+
 @app.get("/")
 async def root():
     return {"message": "HeartSync API is running"}
@@ -107,6 +113,37 @@ async def db_health_check():
             "error": str(e)
         }
 
+@app.get("/api/health/rate-limits")
+async def rate_limit_metrics():
+    """Queue depth and wait-time metrics for the shared Voyage rate limiter (this process)"""
+    from app.services.embeddings_service import embeddings_service
+    return {"voyage": embeddings_service.rate_limiter.get_metrics()}
+
+@app.get("/api/health/retrieval")
+async def retrieval_metrics():
+    """Per-source RAG retrieval latency histograms and deadline misses (this process)"""
+    from app.services.retrieval_scheduler import retrieval_scheduler
+    from app.services.reranker_service import reranker_service
+    return {**retrieval_scheduler.get_metrics(), "reranker": reranker_service.stats}
+
+@app.get("/api/health/vector-writes")
+async def vector_write_metrics():
+    """Pinecone upsert throughput, batching and retry counters (this process)"""
+    from app.services.pinecone_service import pinecone_service
+    return pinecone_service.writer.get_metrics()
+
+@app.get("/api/health/pipelines")
+async def pipeline_metrics():
+    """Per-stage latency histograms and failures for the post-fight pipeline (this process)"""
+    from app.routes.post_fight import post_fight_pipeline
+    return {"post_fight": post_fight_pipeline.get_metrics()}
+
+@app.get("/api/health/queues")
+async def queue_metrics():
+    """Per-lane queue depth, in-flight jobs and queue-wait histograms (shared across workers)"""
+    from app.services.fair_scheduler import fair_scheduler
+    return await asyncio.to_thread(fair_scheduler.get_metrics)
+
 @app.post("/api/token")
 async def get_token(room_name: str, participant_name: str):
     token = api.AccessToken(
@@ -0,0 +1,29 @@
+-- Migration 013: Fight Debrief Catalog
+-- Indexes FightDebrief JSON documents stored in S3 so cross-fight analysis can
+-- list a relationship's debriefs by date without scanning Pinecone.
+
+CREATE TABLE IF NOT EXISTS fight_debriefs (
+    conflict_id UUID PRIMARY KEY,
+    relationship_id UUID NOT NULL,
+    s3_path TEXT NOT NULL,
+    etag TEXT,
+    topic TEXT,
+    resolution_status VARCHAR(30),
+    intensity_peak VARCHAR(20),
+    analyzed_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    updated_at TIMESTAMPTZ DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS idx_fight_debriefs_relationship_date
+    ON fight_debriefs(relationship_id, analyzed_at DESC);
+
+-- ============================================
+-- ROW LEVEL SECURITY
+-- ============================================
+
+ALTER TABLE fight_debriefs ENABLE ROW LEVEL SECURITY;
+
+-- Open policy for MVP (will be tightened with multi-tenancy)
+DROP POLICY IF EXISTS "Allow public access to fight_debriefs" ON fight_debriefs;
+CREATE POLICY "Allow public access to fight_debriefs"
+    ON fight_debriefs FOR ALL USING (true);
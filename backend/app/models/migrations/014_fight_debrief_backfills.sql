@@ -0,0 +1,21 @@
+-- Migration 014: Fight Debrief Catalog Backfill Markers
+-- Debriefs saved before migration 013 are only listed by the Pinecone scan.
+-- A relationship gets a row here once every debrief the scan finds has been
+-- catalogued; until then listings merge the scan with the catalog.
+-- Backfill existing relationships with: python scripts/backfill_debrief_catalog.py
+
+CREATE TABLE IF NOT EXISTS fight_debrief_backfills (
+    relationship_id UUID PRIMARY KEY,
+    backfilled_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+-- ============================================
+-- ROW LEVEL SECURITY
+-- ============================================
+
+ALTER TABLE fight_debrief_backfills ENABLE ROW LEVEL SECURITY;
+
+-- Open policy for MVP (will be tightened with multi-tenancy)
+DROP POLICY IF EXISTS "Allow public access to fight_debrief_backfills" ON fight_debrief_backfills;
+CREATE POLICY "Allow public access to fight_debrief_backfills"
+    ON fight_debrief_backfills FOR ALL USING (true);
@@ -401,29 +401,40 @@ async def analyze_conflict_gottman(
 @router.post("/gottman/backfill")
 async def backfill_gottman_analysis(
     relationship_id: str = Query(default="00000000-0000-0000-0000-000000000000"),
-    batch_size: int = Query(default=10, ge=1, le=20, description="Number of conflicts to process in parallel"),
+    batch_size: int = Query(default=10, ge=1, le=20, description="Number of conflicts to process in parallel (foreground only)"),
     include_enrichment: bool = Query(default=True, description="Also backfill trigger phrases and unmet needs"),
     run_in_background: bool = Query(default=False, description="Run in background and return immediately")
 ):
     """
     Backfill Gottman analysis + trigger phrases + unmet needs for all conflicts.
     Runs in parallel batches for efficiency.
-    Set run_in_background=true to return immediately while processing continues.
+    Set run_in_background=true to queue one job per conflict on the backfill lane and return immediately.
     """
     try:
         logger.info(f"🔄 Starting Gottman backfill for {relationship_id} (batch_size={batch_size}, background={run_in_background})")
 
         if run_in_background:
-            # Fire and forget - run in background
-            asyncio.create_task(gottman_service.backfill_async_background(
-                relationship_id=relationship_id,
-                batch_size=batch_size
-            ))
+            # One job per conflict on the backfill lane (capped per relationship, fair across relationships)
+            from app.tasks.lanes import submit
+
+            def queue_backfill():
+                return [
+                    submit(
+                        "app.tasks.backfill_tasks.backfill_conflict",
+                        "backfill",
+                        relationship_id,
+                        {"relationship_id": relationship_id, "conflict_id": str(c["id"]), "include_enrichment": include_enrichment},
+                    )
+                    for c in db_service.get_all_conflicts(relationship_id)
+                ]
+
+            job_ids = await asyncio.to_thread(queue_backfill)
             return {
                 "success": True,
                 "relationship_id": relationship_id,
-                "message": "Backfill started in background. Check logs for progress.",
-                "status": "running"
+                "message": f"Queued {len(job_ids)} conflicts on the backfill lane. Check /api/health/queues for progress.",
+                "status": "queued",
+                "task_ids": job_ids,
             }
         else:
             # Wait for completion
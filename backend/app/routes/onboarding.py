@@ -7,6 +7,8 @@ import logging
 from datetime import datetime
 
 from app.services.pinecone_service import pinecone_service
+from app.services.lexical_index import lexical_index_service
+from app.services.semantic_query_cache import semantic_query_cache
 from app.services.embeddings_service import embeddings_service
 from app.services.s3_service import s3_service
 from app.services.db_service import db_service
@@ -256,10 +258,8 @@ async def process_onboarding_task(data: OnboardingSubmission, pdf_id: str):
             
             # Batch upsert
             if vectors:
-                pinecone_service.index.upsert(
-                    vectors=vectors,
-                    namespace="profiles"
-                )
+                await pinecone_service.writer.aupsert(vectors, "profiles")
+                semantic_query_cache.invalidate(data.relationship_id)
                 logger.info(f"✅ Upserted {len(vectors)} chunks to Pinecone (profiles namespace)")
 
         async def upload_s3_and_update_db():
@@ -530,7 +530,9 @@ async def reset_partner_profile(
             if query_result.matches:
                 vector_ids = [match.id for match in query_result.matches]
                 if vector_ids:
-                    pinecone_service.index.delete(ids=vector_ids, namespace="profiles")
+                    pinecone_service.index.delete(ids=vector_ids, namespace=pinecone_service.namespace_for("profiles", relationship_id))
+                    lexical_index_service.remove("profiles", vector_ids, relationship_id)
+                    semantic_query_cache.invalidate(relationship_id)
                     deleted_vectors = len(vector_ids)
                     logger.info(f"🗑️ Deleted {deleted_vectors} vectors for {partner_id}")
         except Exception as e:
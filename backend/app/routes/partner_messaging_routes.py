@@ -183,9 +183,10 @@ async def send_message(
                 sent_at=message["sent_at"]
             )
 
-            # Queue Phase 4 async analysis (sentiment, emotions, gottman markers)
+            # Queue Phase 4 async analysis (sentiment, emotions, gottman markers).
+            # Bursts of messages are micro-batched into one LLM call per relationship.
             background_tasks.add_task(
-                message_analysis_service.analyze_message,
+                message_analysis_service.enqueue_message,
                 message_id=message["id"],
                 content=request.content,
                 conversation_id=request.conversation_id,
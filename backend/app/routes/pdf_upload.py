@@ -2,53 +2,310 @@
 PDF upload and OCR endpoints
 """
 import logging
-from fastapi import APIRouter, HTTPException, UploadFile, File, Form, BackgroundTasks
-from typing import Optional, List, Dict
+from fastapi import APIRouter, HTTPException, UploadFile, File, Form, BackgroundTasks, Request
+from fastapi.responses import StreamingResponse
+from typing import Any, AsyncIterator, Callable, Optional, List, Dict, Tuple
 from app.services.ocr_service import ocr_service
 from app.services.embeddings_service import embeddings_service
 from app.services.pinecone_service import pinecone_service
 from app.services.db_service import db_service
-from app.services.s3_service import s3_service
+from app.services.object_storage import StoredObject, object_store
+from app.services.document_registry import document_registry
+from app.services.book_parser import BookChunk, BookParser
+from app.services.progress_store import progress_store
 from app.config import settings
 import uuid
 import asyncio
-from datetime import datetime
+import hashlib
+import json
+import os
+import time
 import traceback
-import re
 
 logger = logging.getLogger(__name__)
 
-# Store logs for active uploads: {pdf_id: [log_messages]}
-upload_logs: Dict[str, List[str]] = {}
-
 router = APIRouter(prefix="/api/pdfs", tags=["pdfs"])
 
+UPLOAD_READ_SIZE = 1024 * 1024  # Bytes read from the request body per chunk
+
+
+def storage_location(pdf_type: str, relationship_id: str, pdf_id: str, filename: str) -> Tuple[str, str]:
+    """Return the (storage key, content type) for an uploaded document."""
+    folder = "books" if pdf_type == "reference_book" else "handbooks"
+    _, ext = os.path.splitext(filename)
+    ext = ext.lower()
+    content_type = "application/pdf"
+    if ext == ".docx":
+        content_type = "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+    elif ext == ".txt":
+        content_type = "text/plain"
+    return f"{folder}/{relationship_id}/{pdf_id}{ext}", content_type
+
+
+async def _read_upload(file: UploadFile) -> AsyncIterator[bytes]:
+    while True:
+        chunk = await file.read(UPLOAD_READ_SIZE)
+        if not chunk:
+            return
+        yield chunk
+
+
+EMBED_BATCH_SIZE = 128  # Voyage batch limit
+
+def book_chunk_record(chunk: BookChunk) -> Dict[str, Any]:
+    """Content chunk ({"suffix", "text", "metadata"}) for a parsed book chunk."""
+    metadata = {
+        'chapter_number': chunk.chapter_number,
+        'chapter_title': chunk.chapter_title,
+        'chunk_index': chunk.chunk_index,
+        'chapter_chunk_index': chunk.chapter_chunk_index,
+        'char_start': chunk.start,
+        'char_end': chunk.end,
+        'text': chunk.text,
+        'text_length': len(chunk.text),
+    }
+    if chunk.section_title:
+        metadata['section_title'] = chunk.section_title
+    return {"suffix": f"_chunk_{chunk.chunk_index}", "text": chunk.text, "metadata": metadata}
+
+
+def build_book_chunks(extracted_text: str, log: Callable[[str], None]) -> List[Dict[str, Any]]:
+    """
+    Chapter-aware chunking for reference books (single pass, see app/services/book_parser.py).
+
+    Returns content chunks without per-upload fields, so the document
+    registry can reuse them across uploads.
+    """
+    parser = BookParser(chunk_size=1000, chunk_overlap=200)
+    chunks = [book_chunk_record(chunk) for chunk in parser.parse(extracted_text)]
+    log(f"   📚 Detected {parser.chapters} chapters")
+    if parser.skipped_chunks:
+        log(f"   🗑️ Skipped {len(parser.skipped_chunks)} front/back matter chunks")
+    log(f"   📖 Collected {len(chunks)} chapter-aware chunks for batch embedding")
+    return chunks
+
+
+def build_handbook_chunks(extracted_text: str) -> List[Dict[str, Any]]:
+    """One whole-document vector, plus 10k-character chunks for large documents."""
+    chunks = [{"suffix": "", "text": extracted_text, "metadata": {}}]
+    if len(extracted_text) > 40000:
+        chunk_size = 10000
+        pieces = [extracted_text[i:i+chunk_size] for i in range(0, len(extracted_text), chunk_size)]
+        for i, piece in enumerate(pieces):
+            chunks.append({"suffix": f"_chunk_{i}", "text": piece, "metadata": {
+                "chunk_index": i,
+                "total_chunks": len(pieces),
+                "extracted_text": piece,
+            }})
+    return chunks
+
+
+def _vectors(
+    chunks: List[Dict[str, Any]],
+    embeddings: List[List[float]],
+    upload_metadata: Dict[str, Any],
+    id_prefix: str,
+) -> List[Dict[str, Any]]:
+    return [
+        {'id': f"{id_prefix}{chunk['suffix']}", 'values': embedding,
+         'metadata': {**upload_metadata, **chunk['metadata']}}
+        for chunk, embedding in zip(chunks, embeddings)
+    ]
+
+
+def index_chunks(
+    chunks: List[Dict[str, Any]],
+    upload_metadata: Dict[str, Any],
+    id_prefix: str,
+    namespace: str,
+    log: Callable[[str], None],
+    embeddings: Optional[List[List[float]]] = None,
+) -> List[List[float]]:
+    """
+    Write content chunks as vectors for one upload, embedding them unless embeddings are given.
+
+    Blocking (rate-limited embedding calls and uploads): call it from a
+    worker thread, not the event loop.
+
+    Returns:
+        The embeddings, in chunk order
+    """
+    if embeddings is not None:
+        pinecone_service.writer.upsert(_vectors(chunks, embeddings, upload_metadata, id_prefix), namespace)
+        return embeddings
+
+    # Batch-embed all chunks (Voyage supports batches natively). Each
+    # embedded batch goes straight into the write buffer, so Pinecone
+    # uploads overlap the remaining embedding calls.
+    embeddings = []
+    total_embed_batches = (len(chunks) + EMBED_BATCH_SIZE - 1) // EMBED_BATCH_SIZE
+    with pinecone_service.writer.buffer() as write_buffer:
+        for i in range(0, len(chunks), EMBED_BATCH_SIZE):
+            batch = chunks[i:i + EMBED_BATCH_SIZE]
+            log(f"   🧠 Embedding batch {i // EMBED_BATCH_SIZE + 1}/{total_embed_batches} ({len(batch)} chunks)...")
+            batch_embeddings = embeddings_service.embed_batch([c["text"] for c in batch], priority="bulk")
+            embeddings.extend(batch_embeddings)
+            write_buffer.add(namespace, _vectors(batch, batch_embeddings, upload_metadata, id_prefix))
+    return embeddings
+
+
+EMBED_QUEUE_DEPTH = 2  # Chunk batches waiting for the embedder before page intake pauses
+PAGE_PROGRESS_INTERVAL = 0.5  # Seconds between "page ready" progress events
+
+
+async def ingest_book_pages(
+    pages: AsyncIterator[str],
+    upload_metadata: Dict[str, Any],
+    id_prefix: str,
+    namespace: str,
+    log: Callable[..., None],
+) -> Tuple[str, List[Dict[str, Any]], List[List[float]]]:
+    """
+    Chunk, embed and index a book while its pages are still being OCR'd.
+
+    Pages feed the BookParser as they arrive; every EMBED_BATCH_SIZE chunks
+    go to an embedding task whose results go straight into the vector write
+    buffer. A full queue pauses page intake, so memory stays bounded.
+
+    Returns:
+        (extracted text, content chunks, embeddings in chunk order)
+    """
+    parser = BookParser(chunk_size=1000, chunk_overlap=200)
+    pieces: List[str] = []
+    chunks: List[Dict[str, Any]] = []
+    embeddings: List[List[float]] = []
+    ready: List[Dict[str, Any]] = []
+    batches: asyncio.Queue = asyncio.Queue(maxsize=EMBED_QUEUE_DEPTH)
+    write_buffer = pinecone_service.writer.buffer()
+
+    async def embed_batches():
+        while True:
+            batch = await batches.get()
+            if batch is None:
+                return
+            batch_embeddings = await asyncio.to_thread(
+                embeddings_service.embed_batch, [c["text"] for c in batch], priority="bulk"
+            )
+            write_buffer.add(namespace, _vectors(batch, batch_embeddings, upload_metadata, id_prefix))
+            embeddings.extend(batch_embeddings)
+            log(f"   🧠 Embedded {len(embeddings)} chunks", stage="embed", embedded=len(embeddings))
+
+    async def submit(batch):
+        # Wait for queue space, unless the embedder has died
+        put = asyncio.ensure_future(batches.put(batch))
+        await asyncio.wait({put, embedder}, return_when=asyncio.FIRST_COMPLETED)
+        if not put.done():
+            put.cancel()
+            embedder.result()
+
+    embedder = asyncio.create_task(embed_batches())
+    last_report = 0.0
+    failed = True
+    try:
+        async for page in pages:
+            # Same separators extract_text uses, so offsets match the full text
+            piece = f"\n\n{page}" if pieces else page
+            pieces.append(piece)
+            ready.extend(book_chunk_record(chunk) for chunk in parser.feed(piece))
+            if time.monotonic() - last_report >= PAGE_PROGRESS_INTERVAL:
+                last_report = time.monotonic()
+                log(f"   📄 {len(pieces)} pages read", stage="ocr", pages=len(pieces))
+            while len(ready) >= EMBED_BATCH_SIZE:
+                batch, ready = ready[:EMBED_BATCH_SIZE], ready[EMBED_BATCH_SIZE:]
+                chunks.extend(batch)
+                await submit(batch)
+        ready.extend(book_chunk_record(chunk) for chunk in parser.close())
+        for i in range(0, len(ready), EMBED_BATCH_SIZE):
+            chunks.extend(ready[i:i + EMBED_BATCH_SIZE])
+            await submit(ready[i:i + EMBED_BATCH_SIZE])
+        await submit(None)
+        await embedder
+        failed = False
+    finally:
+        if failed:
+            embedder.cancel()
+            await asyncio.gather(embedder, return_exceptions=True)
+        # Send what's still buffered and wait for in-flight batches, also when
+        # ingestion failed, so embedded chunks aren't dropped silently
+        try:
+            await asyncio.to_thread(write_buffer.close)
+        except Exception as e:
+            if not failed:
+                raise
+            logger.error(f"❌ Failed to flush book vectors after an ingestion error: {e}")
+
+    log(f"   📚 Detected {parser.chapters} chapters in {len(pieces)} pages", stage="chunk", pages=len(pieces), chunks=len(chunks))
+    if parser.skipped_chunks:
+        log(f"   🗑️ Skipped {len(parser.skipped_chunks)} front/back matter chunks")
+    return "".join(pieces), chunks, embeddings
+
+
+async def _canonical_url(known: Dict[str, Any]) -> Optional[str]:
+    """Storage URL of the first upload of this content, if that object still exists."""
+    if not known.get("storage_key"):
+        return None
+    try:
+        await object_store.head(known["storage_key"])
+    except Exception:
+        return None
+    return known.get("storage_url")
+
+
+def _upload_metadata(
+    pdf_type: str,
+    pdf_id: str,
+    relationship_id: str,
+    filename: str,
+    partner_id: Optional[str],
+    text_length: int,
+) -> Dict[str, Any]:
+    """Per-upload vector metadata, merged over each content chunk's own."""
+    if pdf_type == "reference_book":
+        return {
+            'pdf_id': pdf_id,
+            'relationship_id': relationship_id,
+            'pdf_type': pdf_type,
+            'filename': filename,
+            'book_title': filename.replace('.pdf', ''),
+        }
+    # Other types (handbook): whole-document vector plus basic chunking if large
+    metadata = {
+        "pdf_id": pdf_id,
+        "relationship_id": relationship_id,
+        "pdf_type": pdf_type,
+        "filename": filename,
+        "text_length": text_length,
+    }
+    if partner_id:
+        metadata["partner_id"] = partner_id
+    return metadata
+
+
 async def process_pdf_task(
-    pdf_bytes: bytes,
+    pdf_bytes: Optional[bytes],
     filename: str,
     relationship_id: str,
     pdf_type: str,
     partner_id: Optional[str],
     pdf_id: str,
-    profile_id: Optional[str]
+    profile_id: Optional[str],
+    stored: Optional[StoredObject] = None
 ):
-    def log(msg):
+    """
+    Extract, chunk, embed and index an uploaded document.
+
+    Either pdf_bytes is given (and stored here, alongside OCR), or the
+    upload was already streamed to object storage and `stored` points at
+    it. Books are chunked, embedded and indexed page by page while OCR is
+    still running. Content seen before (same SHA-256) reuses the registered
+    text, chunks and embeddings. Progress goes to progress_store under pdf_id.
+    """
+    def log(msg, stage=None, status="processing", **fields):
         logger.info(msg)
-        if pdf_id not in upload_logs:
-            upload_logs[pdf_id] = []
-        upload_logs[pdf_id].append(f"{datetime.now().strftime('%H:%M:%S')} - {msg}")
+        progress_store.append(pdf_id, msg, stage=stage, status=status, **fields)
     
     try:
-        log(f"🚀 Starting background processing for {filename}...")
-        
-        # Extract text using generic extraction (PDF, DOCX, TXT)
-        log(f"🔍 Extracting text from file using OCR/Text Extraction...")
-        extracted_text = await ocr_service.extract_text(pdf_bytes, filename=filename)
-        log(f"✅ Extracted {len(extracted_text)} characters from file")
-        
-        # Generate embedding
-        log("🧠 Generating embeddings...")
-        embedding = embeddings_service.embed_text(extracted_text)
+        log(f"🚀 Starting background processing for {filename}...", stage="start")
         
         # Determine namespace based on PDF type
         namespace_map = {
@@ -59,235 +316,100 @@ async def process_pdf_task(
         namespace = namespace_map.get(pdf_type)
         
         if not namespace:
-            log(f"❌ Invalid pdf_type: {pdf_type}")
+            log(f"❌ Invalid pdf_type: {pdf_type}", status="failed")
             return
 
-        # 1. Upload PDF to AWS S3
-        file_path = None
-        s3_url = None
-        try:
-            if pdf_type == "reference_book":
-                folder = "books"
-            else:
-                folder = "handbooks"
-            # Determine extension and content type
-            import os
-            _, ext = os.path.splitext(filename)
-            ext = ext.lower()
-            content_type = "application/pdf"
-            if ext == ".docx":
-                content_type = "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
-            elif ext == ".txt":
-                content_type = "text/plain"
-            
-            file_path = f"{folder}/{relationship_id}/{pdf_id}{ext}"
-            
-            log(f"☁️ Uploading to S3: {file_path}")
-            s3_url = s3_service.upload_file(
-                file_path=file_path,
-                file_content=pdf_bytes,
-                content_type=content_type
-            )
-            if s3_url:
-                log(f"✅ Stored PDF in S3: {s3_url}")
+        content_hash = stored.sha256 if stored else hashlib.sha256(pdf_bytes).hexdigest()
+        known = await asyncio.to_thread(document_registry.get_document, content_hash)
+        file_path, content_type = storage_location(pdf_type, relationship_id, pdf_id, filename)
+        s3_url = stored.url if stored else None
+        id_prefix = f"book_{pdf_id}" if pdf_type == "reference_book" else f"{pdf_type}_{pdf_id}"
+        chunks = embeddings = None
+
+        if known:
+            # 1. Identical content was processed before: link to its artifacts
+            log(f"♻️ Already processed this file ({content_hash[:12]}), reusing extracted text")
+            extracted_text = known["text"]
+            canonical_url = await _canonical_url(known)
+            if canonical_url and stored and stored.key != known["storage_key"]:
+                try:
+                    await object_store.delete(stored.key)
+                except Exception as e:
+                    log(f"⚠️ Could not remove duplicate upload {stored.key}: {e}")
+            if canonical_url:
+                s3_url = canonical_url
+            elif stored is None:
+                stored = await object_store.put(file_path, pdf_bytes, content_type)
+                s3_url = stored.url
+            pdf_bytes = None
+            upload_metadata = _upload_metadata(pdf_type, pdf_id, relationship_id, filename, partner_id, len(extracted_text))
+        else:
+            # 1. Upload to storage (overlapping OCR), unless the request already streamed it there
+            upload_task = None
+            if stored is None:
+                log(f"☁️ Uploading to storage: {file_path}", stage="upload")
+                upload_task = asyncio.create_task(object_store.put(file_path, pdf_bytes, content_type))
             else:
-                log(f"❌ Failed to upload PDF to S3")
-        except Exception as e:
-            log(f"❌ Error storing PDF in S3: {e}")
-            logger.error(traceback.format_exc())
-        
-        # 2. Store in Pinecone
-        metadata = {
-            "pdf_id": pdf_id,
-            "relationship_id": relationship_id,
-            "pdf_type": pdf_type,
-            "filename": filename,
-            "text_length": len(extracted_text),
-        }
-        
-        if partner_id:
-            metadata["partner_id"] = partner_id
-        
-        # Handle chunking based on PDF type
-        chunk_vectors = []
-        
-        if pdf_type == "reference_book":
-            # SMART CHUNKING for reference books (with chapter detection)
-            from langchain_text_splitters import RecursiveCharacterTextSplitter
-            
-            log("📖 Using chapter-aware chunking for reference book...")
-            
-            # Detect chapters using regex patterns
-            chapter_patterns = [
-                r'^Chapter\s+(\d+|[IVXLCDM]+)[\s:.-]+(.+?)$',
-                r'^CHAPTER\s+(\d+|[IVXLCDM]+)[\s:.-]+(.+?)$',
-                r'^(\d+)\.\s+(.+?)$',
-            ]
-            
-            chapters = []
-            lines = extracted_text.split('\n')
-            for i, line in enumerate(lines):
-                line_stripped = line.strip()
-                if not line_stripped:
-                    continue
-                for pattern in chapter_patterns:
-                    match = re.match(pattern, line_stripped)
-                    if match:
-                        chapter_num = match.group(1)
-                        chapter_title = match.group(2).strip()
-                        try:
-                            chapter_num_int = int(chapter_num)
-                        except ValueError:
-                            chapter_num_int = 0  # Unknown chapter
-                        text_pos = extracted_text.find('\n'.join(lines[:i]))
-                        chapters.append({
-                            'number': chapter_num_int,
-                            'title': chapter_title,
-                            'start_pos': text_pos,
-                        })
-                        break
-            
-            # Set end positions for chapters
-            for i in range(len(chapters)):
-                if i < len(chapters) - 1:
-                    chapters[i]['end_pos'] = chapters[i + 1]['start_pos']
-                else:
-                    chapters[i]['end_pos'] = len(extracted_text)
-            
-            log(f"   📚 Detected {len(chapters)} chapters")
-            
-            # Create text splitter (smart chunking)
-            splitter = RecursiveCharacterTextSplitter(
-                chunk_size=1000,
-                chunk_overlap=200,
-                separators=["\n\n", "\n", ". ", " ", ""]
-            )
-            
-            # Helper to filter junk chunks
-            junk_keywords = [
-                "copyright", "all rights reserved", "isbn", "library of congress",
-                "printed in", "publication data", "cover design", "simon & schuster",
-                "acknowledgments", "dedication", "table of contents", "index",
-                "thisiscrave.com", "atria books"
-            ]
-            def is_junk(text):
-                text_lower = text.lower()
-                junk_score = sum(1 for kw in junk_keywords if kw in text_lower)
-                if junk_score >= 2 or (len(text) < 500 and junk_score >= 1):
-                    return True
-                if "thank you" in text_lower and len(text_lower.split('\n')) > 10:
-                    return True
-                return False
-
-            # Collect all chunk texts + metadata first, then batch-embed
-            pending_chunks = []  # list of (chunk_text, metadata_dict, vector_id)
-            chunk_global_index = 0
-
-            if chapters:
-                for chapter in chapters:
-                    chapter_text = extracted_text[chapter['start_pos']:chapter['end_pos']]
-                    chapter_chunks = splitter.split_text(chapter_text)
-
-                    for local_idx, chunk_text in enumerate(chapter_chunks):
-                        if is_junk(chunk_text):
-                            log(f"   🗑️ Skipping junk chunk: {chunk_text[:50]}...")
-                            continue
-                        pending_chunks.append((chunk_text, {
-                            'pdf_id': pdf_id,
-                            'relationship_id': relationship_id,
-                            'pdf_type': pdf_type,
-                            'filename': filename,
-                            'book_title': filename.replace('.pdf', ''),
-                            'chapter_number': chapter['number'],
-                            'chapter_title': chapter['title'],
-                            'chunk_index': chunk_global_index,
-                            'chapter_chunk_index': local_idx,
-                            'total_chapter_chunks': len(chapter_chunks),
-                            'text': chunk_text,
-                            'text_length': len(chunk_text),
-                        }, f"book_{pdf_id}_chunk_{chunk_global_index}"))
-                        chunk_global_index += 1
-                log(f"   📖 Collected {len(pending_chunks)} chapter-aware chunks for batch embedding")
+                log(f"📥 Reading {stored.size} bytes back from storage: {stored.key}", stage="upload")
+                pdf_bytes = await object_store.download(stored.key)
+
+            # Extract text page by page (PDF OCR runs several page windows at once)
+            log(f"🔍 Extracting text from file using OCR/Text Extraction...", stage="ocr")
+            pages = ocr_service.iter_pages(pdf_bytes, filename)
+            if pdf_type == "reference_book":
+                # Chunk, embed and index while later pages are still being OCR'd
+                log("📖 Using chapter-aware chunking for reference book...", stage="chunk")
+                upload_metadata = _upload_metadata(pdf_type, pdf_id, relationship_id, filename, partner_id, 0)
+                extracted_text, chunks, embeddings = await ingest_book_pages(pages, upload_metadata, id_prefix, namespace, log)
+                log(f"   📤 Embedded and uploaded {len(chunks)} chunks to Pinecone", stage="index", chunks=len(chunks))
             else:
-                log("   ⚠️ No chapters detected, using standard chunking")
-                all_chunks = splitter.split_text(extracted_text)
-                for idx, chunk_text in enumerate(all_chunks):
-                    if is_junk(chunk_text):
-                        log(f"   🗑️ Skipping junk chunk: {chunk_text[:50]}...")
-                        continue
-                    pending_chunks.append((chunk_text, {
-                        'pdf_id': pdf_id,
-                        'relationship_id': relationship_id,
-                        'pdf_type': pdf_type,
-                        'filename': filename,
-                        'book_title': filename.replace('.pdf', ''),
-                        'chapter_number': 0,
-                        'chapter_title': 'Unknown Section',
-                        'chunk_index': idx,
-                        'text': chunk_text,
-                        'text_length': len(chunk_text),
-                    }, f"book_{pdf_id}_chunk_{idx}"))
-                log(f"   📖 Collected {len(pending_chunks)} standard chunks for batch embedding")
-
-            # Batch-embed all chunks (Voyage supports batches natively)
-            if pending_chunks:
-                EMBED_BATCH_SIZE = 128  # Voyage batch limit
-                all_texts = [c[0] for c in pending_chunks]
-                all_embeddings = []
-                for i in range(0, len(all_texts), EMBED_BATCH_SIZE):
-                    batch_texts = all_texts[i:i + EMBED_BATCH_SIZE]
-                    log(f"   🧠 Embedding batch {i // EMBED_BATCH_SIZE + 1}/{(len(all_texts) + EMBED_BATCH_SIZE - 1) // EMBED_BATCH_SIZE} ({len(batch_texts)} chunks)...")
-                    batch_embeddings = embeddings_service.embed_batch(batch_texts)
-                    all_embeddings.extend(batch_embeddings)
-
-                for idx, (chunk_text, metadata, vector_id) in enumerate(pending_chunks):
-                    chunk_vectors.append({
-                        'id': vector_id,
-                        'values': all_embeddings[idx],
-                        'metadata': metadata
-                    })
-                log(f"   ✅ Created {len(chunk_vectors)} chunks with batch embeddings")
-            
-            # Upload chunks in batches
-            batch_size = 100
-            total_batches = (len(chunk_vectors) + batch_size - 1) // batch_size
-            for i in range(0, len(chunk_vectors), batch_size):
-                batch = chunk_vectors[i:i + batch_size]
-                pinecone_service.index.upsert(vectors=batch, namespace=namespace)
-                log(f"   📤 Uploaded batch {i//batch_size + 1}/{total_batches} to Pinecone")
-            
+                extracted_text = "\n\n".join([page async for page in pages])
+                upload_metadata = _upload_metadata(pdf_type, pdf_id, relationship_id, filename, partner_id, len(extracted_text))
+            pdf_bytes = None  # Only the extracted text is needed from here on
+            log(f"✅ Extracted {len(extracted_text)} characters from file", stage="ocr")
 
+            if upload_task:
+                try:
+                    stored = await upload_task
+                    s3_url = stored.url
+                    log(f"✅ Stored PDF in storage: {s3_url}", stage="upload")
+                except Exception as e:
+                    log(f"❌ Error storing PDF in storage: {e}", stage="upload")
+                    logger.error(traceback.format_exc())
+
+            if extracted_text:
+                await asyncio.to_thread(
+                    document_registry.put_document,
+                    content_hash,
+                    extracted_text,
+                    storage_key=stored.key if stored else None,
+                    storage_url=s3_url,
+                    filename=filename,
+                )
         
-        else:
-            # Other types (handbook): simple upload with basic chunking if large
-            pinecone_service.index.upsert(
-                vectors=[{
-                    "id": f"{pdf_type}_{pdf_id}",
-                    "values": embedding,
-                    "metadata": metadata
-                }],
-                namespace=namespace
-            )
-            
-            if len(extracted_text) > 40000:
-                chunk_size = 10000
-                chunks = [extracted_text[i:i+chunk_size] for i in range(0, len(extracted_text), chunk_size)]
-                chunk_embeddings = embeddings_service.embed_batch(chunks)
-                for i, (chunk, chunk_embedding) in enumerate(zip(chunks, chunk_embeddings)):
-                    chunk_metadata = metadata.copy()
-                    chunk_metadata["chunk_index"] = i
-                    chunk_metadata["total_chunks"] = len(chunks)
-                    chunk_metadata["extracted_text"] = chunk
-                    chunk_vectors.append({
-                        "id": f"{pdf_type}_{pdf_id}_chunk_{i}",
-                        "values": chunk_embedding,
-                        "metadata": chunk_metadata
-                    })
-                if chunk_vectors:
-                    pinecone_service.index.upsert(vectors=chunk_vectors, namespace=namespace)
-                    log(f"   ✅ Created and uploaded {len(chunk_vectors)} chunks (batch embedded)")
+        # 2. Store in Pinecone (streamed books are already indexed)
+        reused = False
+        if chunks is None and known:
+            cached = await asyncio.to_thread(document_registry.get_chunks, content_hash, pdf_type)
+            if cached:
+                chunks, embeddings = cached
+                await asyncio.to_thread(index_chunks, chunks, upload_metadata, id_prefix, namespace, log, embeddings=embeddings)
+                log(f"   ♻️ Linked {len(chunks)} previously embedded chunks", stage="index", chunks=len(chunks))
+                reused = True
+        if chunks is None:
+            if pdf_type == "reference_book":
+                log("📖 Using chapter-aware chunking for reference book...", stage="chunk")
+                chunks = build_book_chunks(extracted_text, log)
+            else:
+                chunks = build_handbook_chunks(extracted_text)
+            log("🧠 Generating embeddings...", stage="embed")
+            # Embedding waits on the rate limiter and uploads block, so keep them off the event loop
+            embeddings = await asyncio.to_thread(index_chunks, chunks, upload_metadata, id_prefix, namespace, log)
+            log(f"   📤 Embedded and uploaded {len(chunks)} chunks to Pinecone", stage="index", chunks=len(chunks))
+        if not reused and chunks and extracted_text:
+            await asyncio.to_thread(document_registry.put_chunks, content_hash, pdf_type, chunks, embeddings)
         
-        log(f"✅ Stored PDF in Pinecone: {pdf_id}, namespace: {namespace}")
+        log(f"✅ Stored PDF in Pinecone: {pdf_id}, namespace: {namespace}", stage="index")
         
         # 3. Update DB record with success status
         if db_service:
@@ -303,12 +425,14 @@ async def process_pdf_task(
                     pdf_id=pdf_id,
                     updates=updates
                 )
-                log("✅ Updated database record")
+                log("✅ Updated database record", stage="db")
             except Exception as e:
-                log(f"❌ Error updating database: {e}")
+                log(f"❌ Error updating database: {e}", stage="db")
+
+        log("✅ Processing complete!", stage="done", status="done")
         
     except Exception as e:
-        log(f"❌ Error in background processing: {e}")
+        log(f"❌ Error in background processing: {e}", status="failed")
         logger.error(traceback.format_exc())
 
 @router.post("/upload")
@@ -320,17 +444,20 @@ async def upload_pdf(
     partner_id: Optional[str] = Form(None)
 ):
     """
-    Upload PDF, extract text via OCR, and store in Pinecone (Background Task)
+    Stream a PDF into storage, then extract text via OCR and store in Pinecone (Background Task)
     """
     try:
-        # Read file
-        pdf_bytes = await file.read()
         filename = file.filename
-        logger.info(f"📄 Received file: {filename}, size: {len(pdf_bytes)} bytes, type: {pdf_type}")
         
         # Create unique ID
         pdf_id = str(uuid.uuid4())
         
+        # Stream the body into storage in bounded parts instead of reading it whole
+        file_path, content_type = storage_location(pdf_type, relationship_id, pdf_id, filename)
+        stored = await object_store.upload_stream(file_path, _read_upload(file), content_type)
+        logger.info(f"📄 Received file: {filename}, size: {stored.size} bytes, type: {pdf_type}")
+        progress_store.append(pdf_id, f"📄 Received {filename} ({stored.size} bytes)", stage="upload")
+        
         # Create DB record immediately (status=processing via length=0)
         profile_id = None
         if db_service:
@@ -352,13 +479,14 @@ async def upload_pdf(
         # Start background task
         background_tasks.add_task(
             process_pdf_task,
-            pdf_bytes,
+            None,
             filename,
             relationship_id,
             pdf_type,
             partner_id,
             pdf_id,
-            profile_id
+            profile_id,
+            stored
         )
         
         return {
@@ -403,5 +531,32 @@ async def get_upload_logs(pdf_id: str):
     """
     Get real-time logs for a PDF upload
     """
-    logs = upload_logs.get(pdf_id, [])
+    logs = await asyncio.to_thread(progress_store.messages, pdf_id)
     return {"logs": logs}
+
+
+@router.get("/progress/{pdf_id}")
+async def stream_upload_progress(pdf_id: str, request: Request):
+    """
+    Stream processing progress for a PDF upload as Server-Sent Events
+
+    Each event carries its sequence number as the SSE id, so a reconnecting
+    EventSource resumes after Last-Event-ID. The stream ends after the
+    job's "done" or "failed" event.
+    """
+    try:
+        after = int(request.headers.get("last-event-id") or 0)
+    except ValueError:
+        after = 0
+
+    async def event_stream():
+        async for event in progress_store.stream(pdf_id, after=after):
+            if await request.is_disconnected():
+                return
+            yield f"id: {event['seq']}\ndata: {json.dumps(event)}\n\n"
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
@@ -5,6 +5,7 @@ import logging
 import json
 import os
 import asyncio
+import hashlib
 import time
 from fastapi import APIRouter, HTTPException, Body, BackgroundTasks
 from typing import Optional, List
@@ -13,18 +14,23 @@ from app.services.pinecone_service import pinecone_service
 from app.services.embeddings_service import embeddings_service
 from app.services.reranker_service import reranker_service
 from app.services.s3_service import s3_service
+from app.services.debrief_repository import debrief_repository
 
 from app.services.llm_service import llm_service
-from app.services.transcript_chunker import TranscriptChunker
+from app.services.transcript_chunker import TranscriptChunker, chunk_id_prefix
 from app.services.conflict_enrichment_service import conflict_enrichment_service
 from app.services.gottman_analysis_service import gottman_service
 from app.services.profile_service import profile_service
 from app.services.cross_fight_intelligence_service import cross_fight_intelligence_service
 from app.tools.conflict_analysis import analyze_conflict_transcript
 from app.tools.repair_coaching import generate_repair_plan
-from app.models.schemas import ConflictAnalysis, RepairPlan, ConflictTranscript, SpeakerSegment, FightDebrief, PersonalizedRepairPlan
+from app.models.schemas import ConflictAnalysis, RepairPlan, ConflictTranscript, SpeakerSegment, FightDebrief, PersonalizedRepairPlan, ConflictEnrichment
 from app.config import settings
 from app.services.db_service import db_service
+from app.services.conflict_transcript_store import conflict_transcript_store
+from app.services.semantic_query_cache import semantic_query_cache
+from app.services.cache_service import cache_service
+from app.services.stage_graph import JSON_CHECKPOINT, StageCheckpoints, StageGraph, model_checkpoint
 
 logger = logging.getLogger(__name__)
 
@@ -48,302 +54,577 @@ async def generate_title_background(conflict_id: str, transcript_text: str):
 
 
 
-async def generate_analysis_and_repair_plan_background(
-    conflict_id: str,
-    transcript_text: str,
-    relationship_id: str,
-    partner_a_id: str,
-    partner_b_id: str,
-    speaker_labels: dict,
-    duration: float,
-    timestamp: datetime
-):
-    """Background task to generate analysis and repair plan in parallel"""
-    try:
-        logger.info(f"🚀 Starting background generation for conflict {conflict_id}")
-        logger.info(f"📝 Full transcript length: {len(transcript_text)} characters")
-
-        # ========================================================================
-        # Phase 1: Enrich conflict with trigger phrases and unmet needs
-        # ========================================================================
-        try:
-            logger.info(f"🔗 Starting conflict enrichment for {conflict_id}")
-
-            # Get previous conflicts for context
-            previous_conflicts = db_service.get_previous_conflicts(relationship_id, limit=5)
+# ============================================================================
+# Post-fight pipeline stages (see app/services/stage_graph.py)
+# ============================================================================
+# Each stage starts as soon as the values it requires exist: enrichment,
+# Gottman, profiles, the debrief and cross-fight intelligence overlap, and
+# the analysis and repair plans only wait for the profiles. Context (partner
+# names, previous conflicts) is fetched once and shared.
+#
+# The LLM stages and the store stages are checkpointed per conflict and
+# transcript (see run_post_fight_pipeline), so a retry after a late failure
+# resumes instead of paying for every LLM call again. The run timestamp and
+# previous conflicts (which enrichment itself adds to) don't invalidate them.
+
+post_fight_pipeline = StageGraph(
+    "post_fight",
+    inputs=(
+        "conflict_id", "transcript_text", "relationship_id", "partner_a_id",
+        "partner_b_id", "speaker_labels", "duration", "timestamp",
+    ),
+    checkpoints=StageCheckpoints(cache_service, ttl=settings.PIPELINE_CHECKPOINT_TTL_SECONDS),
+    unkeyed=("timestamp", "previous_conflicts"),
+)
+
+DEFAULT_PARTNER_NAMES = {"partner_a": "Partner A", "partner_b": "Partner B"}
+
+
+@post_fight_pipeline.stage("previous_conflicts", requires=("relationship_id",), fallback=[])
+async def _load_previous_conflicts(relationship_id: str):
+    return await asyncio.to_thread(db_service.get_previous_conflicts, relationship_id, limit=5)
+
+
+@post_fight_pipeline.stage("partner_names", requires=("relationship_id",), fallback=DEFAULT_PARTNER_NAMES)
+async def _load_partner_names(relationship_id: str):
+    return await asyncio.to_thread(db_service.get_partner_names, relationship_id)
+
+
+@post_fight_pipeline.stage(
+    "enrichment",
+    requires=("conflict_id", "transcript_text", "relationship_id", "previous_conflicts"),
+    fallback=None,
+    checkpoint=model_checkpoint(ConflictEnrichment),
+)
+async def _enrich_conflict(conflict_id: str, transcript_text: str, relationship_id: str, previous_conflicts: list):
+    """Enrich conflict with trigger phrases and unmet needs"""
+    logger.info(f"🔗 Starting conflict enrichment for {conflict_id}")
+
+    # Extract relationships, triggers, and unmet needs
+    enrichment = await conflict_enrichment_service.extract_conflict_relationships(
+        conflict_id=conflict_id,
+        transcript=transcript_text,
+        relationship_id=relationship_id,
+        previous_conflicts=previous_conflicts
+    )
+
+    # Save trigger phrases
+    await conflict_enrichment_service.save_trigger_phrases(
+        conflict_id=conflict_id,
+        relationship_id=relationship_id,
+        phrases=enrichment.trigger_phrases
+    )
+
+    # Save unmet needs
+    await conflict_enrichment_service.save_unmet_needs(
+        conflict_id=conflict_id,
+        relationship_id=relationship_id,
+        needs=enrichment.unmet_needs
+    )
+
+    # Update conflict with enrichment data
+    await conflict_enrichment_service.update_conflict_enrichment(
+        conflict_id=conflict_id,
+        enrichment=enrichment
+    )
+
+    logger.info(f"✅ Conflict enrichment complete: {len(enrichment.trigger_phrases)} phrases, "
+               f"{len(enrichment.unmet_needs)} needs, resentment: {enrichment.resentment_level}/10")
+    return enrichment
+
+
+@post_fight_pipeline.stage(
+    "gottman",
+    requires=("conflict_id", "transcript_text", "relationship_id", "partner_names"),
+    fallback=None,
+    checkpoint=JSON_CHECKPOINT,
+)
+async def _analyze_gottman(conflict_id: str, transcript_text: str, relationship_id: str, partner_names: dict):
+    """Gottman Analysis (Four Horsemen, Repair Attempts, etc.)"""
+    logger.info(f"🔬 Starting Gottman analysis for {conflict_id}")
+
+    gottman_result = await gottman_service.analyze_conflict(
+        conflict_id=conflict_id,
+        transcript=transcript_text,
+        relationship_id=relationship_id,
+        partner_a_name=partner_names.get("partner_a", "Partner A"),
+        partner_b_name=partner_names.get("partner_b", "Partner B")
+    )
+
+    # Calculate horsemen total for logging
+    fh = gottman_result.get("four_horsemen", {})
+    horsemen_total = sum([
+        fh.get("criticism", {}).get("score", 0),
+        fh.get("contempt", {}).get("score", 0),
+        fh.get("defensiveness", {}).get("score", 0),
+        fh.get("stonewalling", {}).get("score", 0)
+    ])
+    repairs = len(gottman_result.get("repair_attempts", []))
+
+    logger.info(f"✅ Gottman analysis complete: Horsemen={horsemen_total}/40, Repairs={repairs}")
+    return gottman_result
+
+
+def _rag_partner_profile(query_embedding, transcript_text: str, relationship_id: str, role: str) -> Optional[str]:
+    """Top reranked profile chunks for one partner (fallback when full profiles are unavailable)."""
+    results = pinecone_service.query(
+        query_embedding=query_embedding,
+        top_k=5,
+        namespace="profiles",
+        filter={
+            "relationship_id": {"$eq": relationship_id},
+            "role": {"$eq": role}
+        }
+    )
+
+    chunks = []
+    if results and results.matches:
+        for match in results.matches:
+            chunk_text = match.metadata.get("extracted_text", "")
+            if chunk_text:
+                chunks.append(chunk_text)
+
+    if not chunks:
+        return None
+    reranked = reranker_service.rerank(
+        query=transcript_text[:500],
+        documents=chunks,
+        top_k=3
+    )
+    label = "Partner A" if role == "partner_a" else "Partner B"
+    logger.info(f"✅ RAG fallback: Retrieved {len(reranked)} {label} chunks")
+    return "\n\n".join([chunk for chunk, score in reranked])
+
+
+@post_fight_pipeline.stage("profiles", requires=("transcript_text", "relationship_id"), fallback=(None, None))
+async def _load_profiles(transcript_text: str, relationship_id: str):
+    """
+    Fetch FULL profiles for personalized repair plans.
 
-            # Extract relationships, triggers, and unmet needs
-            enrichment = await conflict_enrichment_service.extract_conflict_relationships(
-                conflict_id=conflict_id,
-                transcript=transcript_text,
-                relationship_id=relationship_id,
-                previous_conflicts=previous_conflicts
-            )
+    Returns:
+        (boyfriend_profile, girlfriend_profile) formatted for the LLM
+    """
+    boyfriend_profile = None
+    girlfriend_profile = None
+    try:
+        logger.info(f"📋 Fetching full partner profiles for relationship {relationship_id}")
+
+        # Fetch complete profiles for both partners
+        profiles = await profile_service.get_both_partner_profiles(relationship_id)
+        partner_a_profile_data = profiles.get("partner_a")
+        partner_b_profile_data = profiles.get("partner_b")
+
+        # Format profiles for LLM consumption
+        if partner_a_profile_data:
+            boyfriend_profile = profile_service.format_profile_for_llm(partner_a_profile_data)
+            logger.info(f"✅ Retrieved full Partner A profile: {len(boyfriend_profile)} chars")
+
+        if partner_b_profile_data:
+            girlfriend_profile = profile_service.format_profile_for_llm(partner_b_profile_data)
+            logger.info(f"✅ Retrieved full Partner B profile: {len(girlfriend_profile)} chars")
+
+        # Check if profiles have repair-specific fields
+        profile_check = profile_service.check_profiles_complete(partner_a_profile_data, partner_b_profile_data)
+        if not profile_check["complete"]:
+            logger.warning(f"⚠️ Incomplete profiles detected: {profile_check}")
+        else:
+            logger.info("✅ Both profiles complete with repair-specific fields")
 
-            # Save trigger phrases
-            await conflict_enrichment_service.save_trigger_phrases(
-                conflict_id=conflict_id,
-                relationship_id=relationship_id,
-                phrases=enrichment.trigger_phrases
-            )
+    except Exception as e:
+        logger.warning(f"⚠️ Full profile retrieval failed, falling back to RAG: {e}")
+        import traceback
+        logger.error(traceback.format_exc())
 
-            # Save unmet needs
-            await conflict_enrichment_service.save_unmet_needs(
-                conflict_id=conflict_id,
-                relationship_id=relationship_id,
-                needs=enrichment.unmet_needs
+        # Fallback to RAG-based profile retrieval
+        try:
+            query_embedding = await asyncio.to_thread(embeddings_service.embed_query, transcript_text)
+            boyfriend_profile, girlfriend_profile = await asyncio.gather(
+                asyncio.to_thread(_rag_partner_profile, query_embedding, transcript_text, relationship_id, "partner_a"),
+                asyncio.to_thread(_rag_partner_profile, query_embedding, transcript_text, relationship_id, "partner_b"),
             )
+        except Exception as rag_e:
+            logger.warning(f"⚠️ RAG fallback also failed: {rag_e}")
 
-            # Update conflict with enrichment data
-            await conflict_enrichment_service.update_conflict_enrichment(
-                conflict_id=conflict_id,
-                enrichment=enrichment
-            )
+    return boyfriend_profile, girlfriend_profile
 
-            logger.info(f"✅ Conflict enrichment complete: {len(enrichment.trigger_phrases)} phrases, "
-                       f"{len(enrichment.unmet_needs)} needs, resentment: {enrichment.resentment_level}/10")
-        except Exception as e:
-            logger.error(f"⚠️ Conflict enrichment failed (non-blocking): {str(e)}")
-            import traceback
-            logger.error(traceback.format_exc())
 
-        # ========================================================================
-        # Phase 1b: Gottman Analysis (Four Horsemen, Repair Attempts, etc.)
-        # ========================================================================
+@post_fight_pipeline.stage(
+    "debrief",
+    requires=("conflict_id", "transcript_text", "relationship_id", "partner_names", "previous_conflicts"),
+    fallback=None,
+    checkpoint=model_checkpoint(FightDebrief),
+)
+async def _generate_debrief(
+    conflict_id: str,
+    transcript_text: str,
+    relationship_id: str,
+    partner_names: dict,
+    previous_conflicts: list,
+):
+    """Generate Fight Debrief (comprehensive post-fight analysis)"""
+    logger.info(f"📊 Generating Fight Debrief for conflict {conflict_id}")
+
+    # Past fights summary for pattern detection
+    past_fights_summary = None
+    summaries = []
+    for pc in previous_conflicts or []:
+        if pc.get("title") or pc.get("topic"):
+            summaries.append(f"- {pc.get('title') or pc.get('topic')} ({pc.get('created_at', 'unknown date')})")
+    if summaries:
+        past_fights_summary = "Previous conflicts:\n" + "\n".join(summaries)
+
+    # Generate FightDebrief using LLM
+    fight_debrief = await asyncio.to_thread(
+        llm_service.generate_fight_debrief,
+        transcript_text,
+        conflict_id,
+        relationship_id,
+        FightDebrief,
+        partner_names.get("partner_a", "Partner A"),
+        partner_names.get("partner_b", "Partner B"),
+        past_fights_summary
+    )
+    if fight_debrief:
+        logger.info(f"✅ Fight Debrief generated: {fight_debrief.topic}, {fight_debrief.resolution_status}")
+    return fight_debrief
+
+
+@post_fight_pipeline.stage("similar_fights", requires=("relationship_id", "debrief"), fallback=[])
+async def _find_similar_fights(relationship_id: str, debrief):
+    """Similar past fights for context (needs this fight's debrief topic)"""
+    if not debrief:
+        return []
+    similar_fights = await cross_fight_intelligence_service.find_similar_past_fights(
+        relationship_id=relationship_id,
+        current_topic=debrief.topic,
+        current_summary=debrief.summary,
+        top_k=3
+    )
+    if similar_fights:
+        logger.info(f"✅ Found {len(similar_fights)} similar past fights")
+    return similar_fights
+
+
+@post_fight_pipeline.stage("cross_fight_intel", requires=("relationship_id",), fallback=None)
+async def _gather_cross_fight_intelligence(relationship_id: str):
+    """Cross-Fight Intelligence (pattern aggregation over past debriefs)"""
+    logger.info(f"🧠 Gathering Cross-Fight Intelligence for relationship {relationship_id}")
+    return await cross_fight_intelligence_service.generate_cross_fight_intelligence(
+        relationship_id=relationship_id,
+        days_back=90
+    )
+
+
+@post_fight_pipeline.stage("past_fights_intelligence", requires=("cross_fight_intel", "similar_fights"), fallback=None)
+async def _format_past_fights_intelligence(cross_fight_intel, similar_fights: list):
+    # Format intelligence for repair plan context (only if we have enough history)
+    if cross_fight_intel and cross_fight_intel.total_fights_analyzed >= 3:
+        logger.info(f"✅ Cross-Fight Intelligence ready: {cross_fight_intel.total_fights_analyzed} fights analyzed")
+        return cross_fight_intelligence_service.format_intelligence_for_repair_plan(
+            cross_fight_intel,
+            similar_fights
+        )
+    logger.info(f"ℹ️ Not enough fight history for full pattern analysis ({cross_fight_intel.total_fights_analyzed if cross_fight_intel else 0} fights)")
+    return None
+
+
+# Analysis and both repair plans only need the transcript and profiles, so
+# the three LLM calls run in parallel. Repair plans work without analysis.
+
+@post_fight_pipeline.stage(
+    "analysis",
+    requires=("conflict_id", "transcript_text", "relationship_id", "partner_a_id", "partner_b_id",
+              "speaker_labels", "duration", "timestamp", "profiles"),
+    checkpoint=model_checkpoint(ConflictAnalysis),
+)
+async def _generate_analysis(
+    conflict_id, transcript_text, relationship_id, partner_a_id, partner_b_id,
+    speaker_labels, duration, timestamp, profiles,
+):
+    boyfriend_profile, girlfriend_profile = profiles
+    return await analyze_conflict_transcript(
+        conflict_id=conflict_id,
+        transcript_text=transcript_text,
+        relationship_id=relationship_id,
+        partner_a_id=partner_a_id,
+        partner_b_id=partner_b_id,
+        speaker_labels=speaker_labels,
+        duration=duration,
+        timestamp=timestamp,
+        partner_id=None,
+        boyfriend_profile=boyfriend_profile,
+        girlfriend_profile=girlfriend_profile
+    )
+
+
+def _repair_plan_stage(partner_requesting_id: str):
+    async def generate(conflict_id, transcript_text, relationship_id, partner_a_id, partner_b_id, profiles):
+        boyfriend_profile, girlfriend_profile = profiles
+        return await generate_repair_plan(
+            conflict_id=conflict_id,
+            transcript_text=transcript_text,
+            partner_requesting_id=partner_requesting_id,
+            relationship_id=relationship_id,
+            partner_a_id=partner_a_id,
+            partner_b_id=partner_b_id,
+            analysis=None,  # Generated in parallel, repair plan works without it
+            boyfriend_profile=boyfriend_profile,
+            girlfriend_profile=girlfriend_profile
+        )
+    return generate
+
+
+for _partner in ("partner_a", "partner_b"):
+    post_fight_pipeline.add(
+        f"repair_plan_{_partner}",
+        _repair_plan_stage(_partner),
+        requires=("conflict_id", "transcript_text", "relationship_id", "partner_a_id", "partner_b_id", "profiles"),
+        checkpoint=model_checkpoint(RepairPlan),
+    )
+
+
+@post_fight_pipeline.stage(
+    "store_analysis",
+    requires=("conflict_id", "relationship_id", "analysis"),
+    fallback=None,
+    checkpoint=JSON_CHECKPOINT,
+)
+async def _store_analysis(conflict_id: str, relationship_id: str, analysis):
+    """Store analysis in AWS S3 and Database"""
+    analysis_path = f"analysis/{relationship_id}/{conflict_id}_analysis.json"
+    analysis_json = json.dumps(analysis.model_dump(), default=str, indent=2)
+
+    # Store in S3
+    s3_url = await asyncio.to_thread(
+        s3_service.upload_file,
+        file_path=analysis_path,
+        file_content=analysis_json.encode('utf-8'),
+        content_type="application/json"
+    )
+    if not s3_url:
+        # Raised rather than returned, so a re-run retries the upload
+        raise RuntimeError(f"Failed to upload analysis to S3: {analysis_path}")
+    logger.info(f"✅ Stored analysis in S3: {analysis_path} (URL: {s3_url})")
+
+    # Store metadata in database (with S3 URL/path)
+    if db_service:
+        await asyncio.to_thread(
+            db_service.create_conflict_analysis,
+            conflict_id=conflict_id,
+            relationship_id=relationship_id,
+            analysis_path=s3_url or analysis_path  # Store S3 URL or path
+        )
+        logger.info(f"✅ Stored analysis metadata in database")
+    return s3_url
+
+
+def _index_debrief(conflict_id: str, relationship_id: str, fight_debrief):
+    """Store the debrief in Pinecone for semantic search of past fight patterns"""
+    debrief_text = f"{fight_debrief.topic} {fight_debrief.summary} {' '.join(fight_debrief.phrases_to_avoid)} {' '.join(fight_debrief.phrases_that_helped)}"
+    debrief_embedding = embeddings_service.embed_text(debrief_text)
+
+    pinecone_service.writer.upsert(
+        [{
+            "id": f"debrief_{conflict_id}",
+            "values": debrief_embedding,
+            "metadata": {
+                "conflict_id": conflict_id,
+                "relationship_id": relationship_id,
+                "topic": fight_debrief.topic,
+                "summary": fight_debrief.summary[:500],
+                "resolution_status": fight_debrief.resolution_status,
+                "intensity_peak": fight_debrief.intensity_peak,
+                "successful_repairs": fight_debrief.successful_repairs,
+                "total_repairs": fight_debrief.total_repair_attempts,
+                "phrases_to_avoid": str(fight_debrief.phrases_to_avoid[:5]),
+                "phrases_that_helped": str(fight_debrief.phrases_that_helped[:5]),
+                "analyzed_at": str(fight_debrief.analyzed_at)
+            }
+        }],
+        "debriefs"
+    )
+
+
+@post_fight_pipeline.stage(
+    "store_debrief",
+    requires=("conflict_id", "relationship_id", "debrief"),
+    fallback=None,
+    checkpoint=JSON_CHECKPOINT,
+)
+async def _store_debrief(conflict_id: str, relationship_id: str, debrief):
+    """Store Fight Debrief in S3 and Pinecone"""
+    if not debrief:
+        return None
+    # Uploads, records the catalog row and warms the cross-fight cache
+    debrief_s3_url = await asyncio.to_thread(debrief_repository.save, debrief)
+    if debrief_s3_url:
+        logger.info(f"✅ Stored Fight Debrief in S3: {debrief_s3_url}")
         try:
-            logger.info(f"🔬 Starting Gottman analysis for {conflict_id}")
+            await asyncio.to_thread(_index_debrief, conflict_id, relationship_id, debrief)
+            logger.info(f"✅ Stored Fight Debrief in Pinecone for pattern matching")
+        except Exception as pinecone_e:
+            logger.warning(f"⚠️ Failed to store debrief in Pinecone: {pinecone_e}")
+    return debrief_s3_url
 
-            # Get partner names for the analysis
-            partner_names = db_service.get_partner_names(relationship_id)
 
-            gottman_result = await gottman_service.analyze_conflict(
+def _index_repair_plan(conflict_id: str, label: str, repair_plan):
+    repair_plan_text = f"{repair_plan.apology_script} {' '.join(repair_plan.steps)}"
+    try:
+        repair_plan_embedding = embeddings_service.embed_text(repair_plan_text)
+        repair_plan_dict = repair_plan.model_dump()
+        repair_plan_dict["generated_at"] = datetime.now()
+        pinecone_service.upsert_repair_plan(
+            conflict_id=f"{conflict_id}_{label}",
+            embedding=repair_plan_embedding,
+            repair_plan_data=repair_plan_dict,
+            namespace="repair_plans"
+        )
+    except Exception as e:
+        logger.warning(f"⚠️ Failed to store {label} repair plan embedding (rate limit?): {e}")
+
+
+@post_fight_pipeline.stage(
+    "index_repair_plans",
+    requires=("conflict_id", "repair_plan_partner_a", "repair_plan_partner_b"),
+    fallback=None,
+    checkpoint=JSON_CHECKPOINT,
+)
+async def _index_repair_plans(conflict_id: str, repair_plan_partner_a, repair_plan_partner_b):
+    """Store repair plans in Pinecone (with error handling for rate limits)"""
+    await asyncio.gather(
+        asyncio.to_thread(_index_repair_plan, conflict_id, "boyfriend", repair_plan_partner_a),
+        asyncio.to_thread(_index_repair_plan, conflict_id, "girlfriend", repair_plan_partner_b),
+    )
+    logger.info(f"✅ Repair plans stored in Pinecone for {conflict_id} (both partners)")
+
+
+def _archive_repair_plan(conflict_id: str, relationship_id: str, partner_requesting: str, repair_plan) -> Optional[str]:
+    plan_path = f"repair_plans/{relationship_id}/{conflict_id}_repair_{partner_requesting}.json"
+    plan_json = json.dumps(repair_plan.model_dump(), default=str, indent=2)
+    s3_url = s3_service.upload_file(
+        file_path=plan_path,
+        file_content=plan_json.encode('utf-8'),
+        content_type="application/json"
+    )
+    if s3_url:
+        logger.info(f"✅ Stored {partner_requesting} repair plan in S3: {plan_path} (URL: {s3_url})")
+    return s3_url or plan_path  # Store S3 URL or path
+
+
+@post_fight_pipeline.stage(
+    "store_repair_plans",
+    requires=("conflict_id", "relationship_id", "repair_plan_partner_a", "repair_plan_partner_b"),
+    fallback=None,
+    checkpoint=JSON_CHECKPOINT,
+)
+async def _store_repair_plans(conflict_id: str, relationship_id: str, repair_plan_partner_a, repair_plan_partner_b):
+    """Store repair plans in AWS S3 and Database"""
+    plan_paths = await asyncio.gather(
+        asyncio.to_thread(_archive_repair_plan, conflict_id, relationship_id, "partner_a", repair_plan_partner_a),
+        asyncio.to_thread(_archive_repair_plan, conflict_id, relationship_id, "partner_b", repair_plan_partner_b),
+    )
+
+    # Store metadata in database (with S3 URLs/paths)
+    if db_service:
+        for partner_requesting, plan_path in zip(("partner_a", "partner_b"), plan_paths):
+            await asyncio.to_thread(
+                db_service.create_repair_plan,
                 conflict_id=conflict_id,
-                transcript=transcript_text,
                 relationship_id=relationship_id,
-                partner_a_name=partner_names.get("partner_a", "Partner A"),
-                partner_b_name=partner_names.get("partner_b", "Partner B")
+                partner_requesting=partner_requesting,
+                plan_path=plan_path
             )
+        logger.info(f"✅ Stored repair plan metadata in database")
+    return plan_paths
+
+
+@post_fight_pipeline.stage(
+    "refresh_insights",
+    requires=("conflict_id", "relationship_id"),
+    after=("enrichment", "gottman", "store_analysis", "store_debrief", "index_repair_plans", "store_repair_plans"),
+    fallback=None,
+)
+async def _refresh_insights(conflict_id: str, relationship_id: str):
+    """Invalidate analytics caches and check for recurring trigger alerts once everything is stored"""
+    try:
+        from app.services.cache_service import cache_service
+        cache_service.invalidate_pattern(f"serene:analytics:*:{relationship_id}*")
+        logger.info(f"Cache invalidated for relationship {relationship_id}")
+    except Exception as cache_e:
+        logger.warning(f"Cache invalidation failed (non-blocking): {cache_e}")
 
-            # Calculate horsemen total for logging
-            fh = gottman_result.get("four_horsemen", {})
-            horsemen_total = sum([
-                fh.get("criticism", {}).get("score", 0),
-                fh.get("contempt", {}).get("score", 0),
-                fh.get("defensiveness", {}).get("score", 0),
-                fh.get("stonewalling", {}).get("score", 0)
-            ])
-            repairs = len(gottman_result.get("repair_attempts", []))
-
-            logger.info(f"✅ Gottman analysis complete: Horsemen={horsemen_total}/40, Repairs={repairs}")
-        except Exception as e:
-            logger.error(f"⚠️ Gottman analysis failed (non-blocking): {str(e)}")
-            import traceback
-            logger.error(traceback.format_exc())
-
-        # ========================================================================
-        # Phase 2: Fetch FULL profiles for personalized repair plans
-        # ========================================================================
-        # NEW: Use profile_service for complete profile retrieval (not just RAG chunks)
-        boyfriend_profile = None
-        girlfriend_profile = None
-        partner_a_profile_data = None
-        partner_b_profile_data = None
-        try:
-            logger.info(f"📋 Fetching full partner profiles for relationship {relationship_id}")
-
-            # Fetch complete profiles for both partners
-            profiles = await profile_service.get_both_partner_profiles(relationship_id)
-            partner_a_profile_data = profiles.get("partner_a")
-            partner_b_profile_data = profiles.get("partner_b")
-
-            # Format profiles for LLM consumption
-            if partner_a_profile_data:
-                boyfriend_profile = profile_service.format_profile_for_llm(partner_a_profile_data)
-                logger.info(f"✅ Retrieved full Partner A profile: {len(boyfriend_profile)} chars")
-
-            if partner_b_profile_data:
-                girlfriend_profile = profile_service.format_profile_for_llm(partner_b_profile_data)
-                logger.info(f"✅ Retrieved full Partner B profile: {len(girlfriend_profile)} chars")
-
-            # Check if profiles have repair-specific fields
-            profile_check = profile_service.check_profiles_complete(partner_a_profile_data, partner_b_profile_data)
-            if not profile_check["complete"]:
-                logger.warning(f"⚠️ Incomplete profiles detected: {profile_check}")
-            else:
-                logger.info("✅ Both profiles complete with repair-specific fields")
-
-        except Exception as e:
-            logger.warning(f"⚠️ Full profile retrieval failed, falling back to RAG: {e}")
-            import traceback
-            logger.error(traceback.format_exc())
-
-            # Fallback to RAG-based profile retrieval
-            try:
-                query_embedding = embeddings_service.embed_query(transcript_text)
-
-                # Search for partner profiles using onboarding_profile type
-                partner_a_results = pinecone_service.query(
-                    query_embedding=query_embedding,
-                    top_k=5,
-                    namespace="profiles",
-                    filter={
-                        "relationship_id": {"$eq": relationship_id},
-                        "role": {"$eq": "partner_a"}
-                    }
-                )
-
-                partner_a_chunks = []
-                if partner_a_results and partner_a_results.matches:
-                    for match in partner_a_results.matches:
-                        chunk_text = match.metadata.get("extracted_text", "")
-                        if chunk_text:
-                            partner_a_chunks.append(chunk_text)
-
-                if partner_a_chunks:
-                    reranked_a = reranker_service.rerank(
-                        query=transcript_text[:500],
-                        documents=partner_a_chunks,
-                        top_k=3
-                    )
-                    boyfriend_profile = "\n\n".join([chunk for chunk, score in reranked_a])
-                    logger.info(f"✅ RAG fallback: Retrieved {len(reranked_a)} Partner A chunks")
-
-                partner_b_results = pinecone_service.query(
-                    query_embedding=query_embedding,
-                    top_k=5,
-                    namespace="profiles",
-                    filter={
-                        "relationship_id": {"$eq": relationship_id},
-                        "role": {"$eq": "partner_b"}
-                    }
-                )
-
-                partner_b_chunks = []
-                if partner_b_results and partner_b_results.matches:
-                    for match in partner_b_results.matches:
-                        chunk_text = match.metadata.get("extracted_text", "")
-                        if chunk_text:
-                            partner_b_chunks.append(chunk_text)
-
-                if partner_b_chunks:
-                    reranked_b = reranker_service.rerank(
-                        query=transcript_text[:500],
-                        documents=partner_b_chunks,
-                        top_k=3
-                    )
-                    girlfriend_profile = "\n\n".join([chunk for chunk, score in reranked_b])
-                    logger.info(f"✅ RAG fallback: Retrieved {len(reranked_b)} Partner B chunks")
-
-            except Exception as rag_e:
-                logger.warning(f"⚠️ RAG fallback also failed: {rag_e}")
+    try:
+        from app.services.alert_service import alert_service
+        alerts = await alert_service.check_for_alerts(
+            relationship_id,
+            trigger_context={"type": "post_fight_analysis", "conflict_id": conflict_id}
+        )
+        if alerts:
+            logger.info(f"Created {len(alerts)} prevention alert(s) after analysis")
+    except Exception as alert_e:
+        logger.warning(f"Alert check failed (non-blocking): {alert_e}")
 
-        # ========================================================================
-        # Phase 3: Generate Fight Debrief (comprehensive post-fight analysis)
-        # ========================================================================
-        fight_debrief = None
-        fight_debrief_summary = None
-        try:
-            logger.info(f"📊 Generating Fight Debrief for conflict {conflict_id}")
 
-            # Get partner names for debrief
-            partner_names = db_service.get_partner_names(relationship_id)
-            partner_a_name = partner_names.get("partner_a", "Partner A")
-            partner_b_name = partner_names.get("partner_b", "Partner B")
+def post_fight_checkpoint_scope(conflict_id: str, transcript_text: str) -> str:
+    """Checkpoint scope for a conflict: a changed transcript starts from scratch."""
+    digest = hashlib.sha256(transcript_text.encode("utf-8")).hexdigest()[:16]
+    return f"{conflict_id}:{digest}"
 
-            # Get past fights summary for pattern detection
-            past_fights_summary = None
-            try:
-                previous_conflicts = db_service.get_previous_conflicts(relationship_id, limit=5)
-                if previous_conflicts:
-                    summaries = []
-                    for pc in previous_conflicts:
-                        if pc.get("title") or pc.get("topic"):
-                            summaries.append(f"- {pc.get('title') or pc.get('topic')} ({pc.get('created_at', 'unknown date')})")
-                    if summaries:
-                        past_fights_summary = "Previous conflicts:\n" + "\n".join(summaries)
-            except Exception as e:
-                logger.warning(f"⚠️ Could not fetch past fights for pattern detection: {e}")
-
-            # Generate FightDebrief using LLM
-            fight_debrief = await asyncio.to_thread(
-                llm_service.generate_fight_debrief,
-                transcript_text,
-                conflict_id,
-                relationship_id,
-                FightDebrief,
-                partner_a_name,
-                partner_b_name,
-                past_fights_summary
-            )
 
-            # Create summary for repair plan context
-            if fight_debrief:
-                fight_debrief_summary = f"""
-Topic: {fight_debrief.topic}
-Summary: {fight_debrief.summary}
-Intensity: {fight_debrief.intensity_peak}
-Resolution: {fight_debrief.resolution_status}
-Most effective moment: {fight_debrief.most_effective_moment or 'None identified'}
-Most damaging moment: {fight_debrief.most_damaging_moment or 'None identified'}
-Successful repairs: {fight_debrief.successful_repairs}/{fight_debrief.total_repair_attempts}
-Phrases that helped: {', '.join(fight_debrief.phrases_that_helped[:3]) if fight_debrief.phrases_that_helped else 'None'}
-Phrases to avoid: {', '.join(fight_debrief.phrases_to_avoid[:3]) if fight_debrief.phrases_to_avoid else 'None'}
-"""
-                logger.info(f"✅ Fight Debrief generated: {fight_debrief.topic}, {fight_debrief.resolution_status}")
-
-        except Exception as e:
-            logger.warning(f"⚠️ Fight Debrief generation failed (non-blocking): {e}")
-            import traceback
-            logger.error(traceback.format_exc())
-
-        # ========================================================================
-        # Phase 4: Cross-Fight Intelligence (pattern aggregation)
-        # ========================================================================
-        cross_fight_intel = None
-        similar_fights = []
-        past_fights_intelligence = None
-        try:
-            logger.info(f"🧠 Gathering Cross-Fight Intelligence for relationship {relationship_id}")
-
-            # Find similar past fights for context
-            if fight_debrief:
-                similar_fights = await cross_fight_intelligence_service.find_similar_past_fights(
-                    relationship_id=relationship_id,
-                    current_topic=fight_debrief.topic,
-                    current_summary=fight_debrief.summary,
-                    top_k=3
-                )
-                if similar_fights:
-                    logger.info(f"✅ Found {len(similar_fights)} similar past fights")
+async def run_post_fight_pipeline(
+    conflict_id: str,
+    transcript_text: str,
+    relationship_id: str,
+    partner_a_id: str,
+    partner_b_id: str,
+    speaker_labels: dict,
+    duration: float,
+    timestamp: datetime,
+    on_progress=None,
+):
+    """
+    Run post_fight_pipeline, resuming from this conflict's checkpoints.
 
-            # Generate full cross-fight intelligence (only if we have enough history)
-            cross_fight_intel = await cross_fight_intelligence_service.generate_cross_fight_intelligence(
-                relationship_id=relationship_id,
-                days_back=90
-            )
+    Args:
+        on_progress: Called with per-stage status whenever a stage starts or finishes
 
-            # Format intelligence for repair plan context
-            if cross_fight_intel and cross_fight_intel.total_fights_analyzed >= 3:
-                past_fights_intelligence = cross_fight_intelligence_service.format_intelligence_for_repair_plan(
-                    cross_fight_intel,
-                    similar_fights
-                )
-                logger.info(f"✅ Cross-Fight Intelligence ready: {cross_fight_intel.total_fights_analyzed} fights analyzed")
-            else:
-                logger.info(f"ℹ️ Not enough fight history for full pattern analysis ({cross_fight_intel.total_fights_analyzed if cross_fight_intel else 0} fights)")
+    Raises:
+        Exception: if analysis or a repair plan fails (after saving every finished stage)
+    """
+    logger.info(f"🚀 Starting background generation for conflict {conflict_id}")
+    logger.info(f"📝 Full transcript length: {len(transcript_text)} characters")
+
+    run = await post_fight_pipeline.run(
+        checkpoint_scope=post_fight_checkpoint_scope(conflict_id, transcript_text),
+        on_progress=on_progress,
+        conflict_id=conflict_id,
+        transcript_text=transcript_text,
+        relationship_id=relationship_id,
+        partner_a_id=partner_a_id,
+        partner_b_id=partner_b_id,
+        speaker_labels=speaker_labels,
+        duration=duration,
+        timestamp=timestamp,
+    )
+
+    cached = sum(1 for t in run.timings.values() if t["status"] == "cached")
+    logger.info(f"✅ Background generation complete for conflict {conflict_id} ({run.seconds:.2f}s, {cached} stages from checkpoints)")
+    return run
 
-        except Exception as e:
-            logger.warning(f"⚠️ Cross-Fight Intelligence failed (non-blocking): {e}")
-            import traceback
-            logger.error(traceback.format_exc())
 
-        # Generate ALL LLM calls in parallel: analysis + both repair plans
-        # Repair plans can work without analysis (they use transcript + profiles)
-        # This maximizes parallelism and reduces total generation time
-        logger.info(f"🚀 Starting parallel LLM generation: analysis + 2 repair plans")
-        analysis, repair_plan_boyfriend, repair_plan_girlfriend = await asyncio.gather(
-            # Analysis generation
-            analyze_conflict_transcript(
+async def generate_analysis_and_repair_plan_background(
+    conflict_id: str,
+    transcript_text: str,
+    relationship_id: str,
+    partner_a_id: str,
+    partner_b_id: str,
+    speaker_labels: dict,
+    duration: float,
+    timestamp: datetime
+):
+    """Background task to generate analysis and repair plan (post_fight_pipeline stages, run concurrently)"""
+    try:
+        await run_post_fight_pipeline(
             conflict_id=conflict_id,
             transcript_text=transcript_text,
             relationship_id=relationship_id,
@@ -352,219 +633,7 @@ Phrases to avoid: {', '.join(fight_debrief.phrases_to_avoid[:3]) if fight_debrie
             speaker_labels=speaker_labels,
             duration=duration,
             timestamp=timestamp,
-            partner_id=None,
-            boyfriend_profile=boyfriend_profile,
-            girlfriend_profile=girlfriend_profile
-            ),
-            # Boyfriend repair plan (works with transcript + profile, analysis optional)
-            generate_repair_plan(
-                conflict_id=conflict_id,
-                transcript_text=transcript_text,
-                partner_requesting_id="partner_a",
-                relationship_id=relationship_id,
-                partner_a_id=partner_a_id,
-                partner_b_id=partner_b_id,
-                analysis=None,  # Generated in parallel, repair plan works without it
-                boyfriend_profile=boyfriend_profile,
-                girlfriend_profile=girlfriend_profile
-            ),
-            # Girlfriend repair plan (works with transcript + profile, analysis optional)
-            generate_repair_plan(
-                conflict_id=conflict_id,
-                transcript_text=transcript_text,
-                partner_requesting_id="partner_b",
-                relationship_id=relationship_id,
-                partner_a_id=partner_a_id,
-                partner_b_id=partner_b_id,
-                analysis=None,  # Generated in parallel, repair plan works without it
-                boyfriend_profile=boyfriend_profile,
-                girlfriend_profile=girlfriend_profile
-            )
         )
-        logger.info(f"✅ All LLM calls completed in parallel: analysis + 2 repair plans")
-        
-        # Store analysis in AWS S3 and Database
-        try:
-            import json
-            
-            analysis_path = f"analysis/{relationship_id}/{conflict_id}_analysis.json"
-            analysis_json = json.dumps(analysis.model_dump(), default=str, indent=2)
-            
-            # Store in S3
-            s3_url = s3_service.upload_file(
-                file_path=analysis_path,
-                file_content=analysis_json.encode('utf-8'),
-                content_type="application/json"
-            )
-            if s3_url:
-                logger.info(f"✅ Stored analysis in S3: {analysis_path} (URL: {s3_url})")
-                
-                # Store metadata in database (with S3 URL/path)
-                if db_service:
-                    db_service.create_conflict_analysis(
-                        conflict_id=conflict_id,
-                        relationship_id=relationship_id,
-                        analysis_path=s3_url or analysis_path  # Store S3 URL or path
-                    )
-                    logger.info(f"✅ Stored analysis metadata in database")
-            else:
-                logger.error(f"❌ Failed to upload analysis to S3: {analysis_path}")
-        except Exception as e:
-            logger.error(f"❌ Error storing analysis in S3: {e}")
-            import traceback
-            logger.error(traceback.format_exc())
-            # Continue even if S3 fails
-
-        # Store Fight Debrief in S3 (Phase 3)
-        if fight_debrief:
-            try:
-                debrief_path = f"debriefs/{relationship_id}/{conflict_id}_debrief.json"
-                debrief_json = json.dumps(fight_debrief.model_dump(), default=str, indent=2)
-
-                debrief_s3_url = s3_service.upload_file(
-                    file_path=debrief_path,
-                    file_content=debrief_json.encode('utf-8'),
-                    content_type="application/json"
-                )
-                if debrief_s3_url:
-                    logger.info(f"✅ Stored Fight Debrief in S3: {debrief_path}")
-
-                    # Also store in Pinecone for semantic search of past fight patterns
-                    try:
-                        debrief_text = f"{fight_debrief.topic} {fight_debrief.summary} {' '.join(fight_debrief.phrases_to_avoid)} {' '.join(fight_debrief.phrases_that_helped)}"
-                        debrief_embedding = embeddings_service.embed_text(debrief_text)
-
-                        pinecone_service.index.upsert(
-                            vectors=[{
-                                "id": f"debrief_{conflict_id}",
-                                "values": debrief_embedding,
-                                "metadata": {
-                                    "conflict_id": conflict_id,
-                                    "relationship_id": relationship_id,
-                                    "topic": fight_debrief.topic,
-                                    "summary": fight_debrief.summary[:500],
-                                    "resolution_status": fight_debrief.resolution_status,
-                                    "intensity_peak": fight_debrief.intensity_peak,
-                                    "successful_repairs": fight_debrief.successful_repairs,
-                                    "total_repairs": fight_debrief.total_repair_attempts,
-                                    "phrases_to_avoid": str(fight_debrief.phrases_to_avoid[:5]),
-                                    "phrases_that_helped": str(fight_debrief.phrases_that_helped[:5]),
-                                    "analyzed_at": str(fight_debrief.analyzed_at)
-                                }
-                            }],
-                            namespace="debriefs"
-                        )
-                        logger.info(f"✅ Stored Fight Debrief in Pinecone for pattern matching")
-                    except Exception as pinecone_e:
-                        logger.warning(f"⚠️ Failed to store debrief in Pinecone: {pinecone_e}")
-
-            except Exception as e:
-                logger.warning(f"⚠️ Failed to store Fight Debrief in S3: {e}")
-
-        # Store repair plans in Pinecone (with error handling for rate limits)
-        try:
-            repair_plan_text_bf = f"{repair_plan_boyfriend.apology_script} {' '.join(repair_plan_boyfriend.steps)}"
-            try:
-                repair_plan_embedding_bf = embeddings_service.embed_text(repair_plan_text_bf)
-                repair_plan_dict_bf = repair_plan_boyfriend.model_dump()
-                repair_plan_dict_bf["generated_at"] = datetime.now()
-                pinecone_service.upsert_repair_plan(
-                    conflict_id=f"{conflict_id}_boyfriend",
-                    embedding=repair_plan_embedding_bf,
-                    repair_plan_data=repair_plan_dict_bf,
-                    namespace="repair_plans"
-                )
-            except Exception as e:
-                logger.warning(f"⚠️ Failed to store boyfriend repair plan embedding (rate limit?): {e}")
-            
-            repair_plan_text_gf = f"{repair_plan_girlfriend.apology_script} {' '.join(repair_plan_girlfriend.steps)}"
-            try:
-                repair_plan_embedding_gf = embeddings_service.embed_text(repair_plan_text_gf)
-                repair_plan_dict_gf = repair_plan_girlfriend.model_dump()
-                repair_plan_dict_gf["generated_at"] = datetime.now()
-                pinecone_service.upsert_repair_plan(
-                    conflict_id=f"{conflict_id}_girlfriend",
-                    embedding=repair_plan_embedding_gf,
-                    repair_plan_data=repair_plan_dict_gf,
-                    namespace="repair_plans"
-                )
-            except Exception as e:
-                logger.warning(f"⚠️ Failed to store girlfriend repair plan embedding (rate limit?): {e}")
-            
-            logger.info(f"✅ Repair plans stored in Pinecone for {conflict_id} (both partners)")
-        except Exception as e:
-            logger.error(f"❌ Error storing repair plans in Pinecone: {e}")
-            import traceback
-            logger.error(traceback.format_exc())
-        
-        # Store repair plans in AWS S3 and Database
-        try:
-            import json
-            
-            # Store boyfriend repair plan in S3
-            plan_path_bf = f"repair_plans/{relationship_id}/{conflict_id}_repair_partner_a.json"
-            plan_json_bf = json.dumps(repair_plan_boyfriend.model_dump(), default=str, indent=2)
-            s3_url_bf = s3_service.upload_file(
-                file_path=plan_path_bf,
-                file_content=plan_json_bf.encode('utf-8'),
-                content_type="application/json"
-            )
-            if s3_url_bf:
-                logger.info(f"✅ Stored boyfriend repair plan in S3: {plan_path_bf} (URL: {s3_url_bf})")
-            
-            # Store girlfriend repair plan in S3
-            plan_path_gf = f"repair_plans/{relationship_id}/{conflict_id}_repair_partner_b.json"
-            plan_json_gf = json.dumps(repair_plan_girlfriend.model_dump(), default=str, indent=2)
-            s3_url_gf = s3_service.upload_file(
-                file_path=plan_path_gf,
-                file_content=plan_json_gf.encode('utf-8'),
-                content_type="application/json"
-            )
-            if s3_url_gf:
-                logger.info(f"✅ Stored girlfriend repair plan in S3: {plan_path_gf} (URL: {s3_url_gf})")
-            
-            # Store metadata in database (with S3 URLs/paths)
-            if db_service:
-                db_service.create_repair_plan(
-                    conflict_id=conflict_id,
-                    relationship_id=relationship_id,
-                    partner_requesting="partner_a",
-                    plan_path=s3_url_bf or plan_path_bf  # Store S3 URL or path
-                )
-                db_service.create_repair_plan(
-                    conflict_id=conflict_id,
-                    relationship_id=relationship_id,
-                    partner_requesting="partner_b",
-                    plan_path=s3_url_gf or plan_path_gf  # Store S3 URL or path
-                )
-                logger.info(f"✅ Stored repair plan metadata in database")
-        except Exception as e:
-            logger.error(f"❌ Error storing repair plans in S3: {e}")
-            import traceback
-            logger.error(traceback.format_exc())
-            # Continue even if S3 fails
-        
-        # Invalidate analytics caches after new analysis
-        try:
-            from app.services.cache_service import cache_service
-            cache_service.invalidate_pattern(f"serene:analytics:*:{relationship_id}*")
-            logger.info(f"Cache invalidated for relationship {relationship_id}")
-        except Exception as cache_e:
-            logger.warning(f"Cache invalidation failed (non-blocking): {cache_e}")
-
-        # Check for recurring trigger alerts
-        try:
-            from app.services.alert_service import alert_service
-            alerts = await alert_service.check_for_alerts(
-                relationship_id,
-                trigger_context={"type": "post_fight_analysis", "conflict_id": conflict_id}
-            )
-            if alerts:
-                logger.info(f"Created {len(alerts)} prevention alert(s) after analysis")
-        except Exception as alert_e:
-            logger.warning(f"Alert check failed (non-blocking): {alert_e}")
-
-        logger.info(f"✅ Background generation complete for conflict {conflict_id}")
 
     except Exception as e:
         logger.error(f"❌ Error in background generation: {e}")
@@ -1394,6 +1463,31 @@ async def update_conflict_title(
         logger.error(f"❌ Error updating conflict title: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+
+def _store_transcript_chunks(chunker: TranscriptChunker, chunks: List[dict], conflict_id: str, relationship_id: str):
+    """Embed and store a conflict's chunks, replacing whatever an earlier version of the transcript left."""
+    # Only embed chunks that aren't already stored (content-hash ids)
+    existing_ids = pinecone_service.list_ids("transcript_chunks", chunk_id_prefix(conflict_id), relationship_id)
+    if existing_ids is None:
+        # The index can't list ids (pod-based), so stale hashes can't be found: start over
+        pinecone_service.delete_conflict_chunks(conflict_id, relationship_id)
+        existing_ids = []
+    new_chunks, stale_ids = chunker.delta(chunks, existing_ids)
+
+    if new_chunks:
+        chunk_embeddings = embeddings_service.embed_batch([chunk["content"] for chunk in new_chunks])
+        pinecone_service.upsert_transcript_chunks(
+            chunks=new_chunks,
+            embeddings=chunk_embeddings,
+            namespace="transcript_chunks"
+        )
+    pinecone_service.delete_transcript_chunks(stale_ids, relationship_id)
+    logger.info(
+        f"✅ Transcript chunks for conflict {conflict_id}: {len(new_chunks)} embedded, "
+        f"{len(chunks) - len(new_chunks)} unchanged, {len(stale_ids)} removed"
+    )
+
+
 @router.post("/conflicts/{conflict_id}/store-transcript")
 async def store_transcript(
     conflict_id: str,
@@ -1517,6 +1611,8 @@ async def store_transcript(
         if db_messages:
             try:
                 db_service.save_transcript_messages(conflict_id, db_messages)
+                conflict_transcript_store.invalidate(conflict_id)
+                semantic_query_cache.invalidate(relationship_id)
                 logger.info(f"✅ Saved {len(db_messages)} transcript messages to rant_messages table")
             except Exception as e:
                 logger.error(f"❌ Error saving transcript messages to DB: {e}")
@@ -1560,7 +1656,7 @@ async def store_transcript(
         
         # 1b. Chunk transcript and store chunks in Pinecone for RAG
         try:
-            chunker = TranscriptChunker(chunk_size=1000, chunk_overlap=200)
+            chunker = TranscriptChunker()
             chunks = chunker.chunk_transcript(
                 transcript_text=transcript_text,
                 conflict_id=conflict_id,
@@ -1569,17 +1665,7 @@ async def store_transcript(
             )
             
             if chunks:
-                # Generate embeddings for all chunks
-                chunk_texts = [chunk["content"] for chunk in chunks]
-                chunk_embeddings = embeddings_service.embed_batch(chunk_texts)
-                
-                # Store chunks in Pinecone
-                pinecone_service.upsert_transcript_chunks(
-                    chunks=chunks,
-                    embeddings=chunk_embeddings,
-                    namespace="transcript_chunks"
-                )
-                logger.info(f"✅ Stored {len(chunks)} transcript chunks for conflict {conflict_id} in Pinecone")
+                _store_transcript_chunks(chunker, chunks, conflict_id, relationship_id)
             else:
                 logger.warning(f"⚠️ No chunks created for conflict {conflict_id}")
         except Exception as e:
@@ -2296,22 +2382,28 @@ async def generate_all_async(
         duration = transcript_data.get("duration", 0.0)
         speaker_labels = transcript_data.get("speaker_labels", {})
 
-        # Dispatch Celery task
-        from app.tasks.analysis_tasks import run_post_fight_analysis
-        task = run_post_fight_analysis.delay(
-            conflict_id=conflict_id,
-            transcript_text=transcript_text,
-            relationship_id=relationship_id,
-            partner_a_id=partner_a_id,
-            partner_b_id=partner_b_id,
-            speaker_labels=speaker_labels,
-            duration=duration,
+        # Interactive lane: ahead of scheduled and backfill work, capped per relationship
+        from app.tasks.lanes import submit
+        task_id = await asyncio.to_thread(
+            submit,
+            "app.tasks.analysis_tasks.run_post_fight_analysis",
+            "interactive",
+            relationship_id,
+            {
+                "conflict_id": conflict_id,
+                "transcript_text": transcript_text,
+                "relationship_id": relationship_id,
+                "partner_a_id": partner_a_id,
+                "partner_b_id": partner_b_id,
+                "speaker_labels": speaker_labels,
+                "duration": duration,
+            },
         )
 
-        logger.info(f"Dispatched Celery task {task.id} for conflict {conflict_id}")
+        logger.info(f"Submitted Celery task {task_id} for conflict {conflict_id}")
 
         return {
-            "task_id": task.id,
+            "task_id": task_id,
             "conflict_id": conflict_id,
             "status": "pending",
         }
@@ -2347,11 +2439,13 @@ async def get_task_status(task_id: str):
             "SUCCESS": "completed",
             "FAILURE": "failed",
             "RETRY": "processing",
+            "PROGRESS": "processing",
         }
         return {
             "task_id": task_id,
             "status": status_map.get(result.status, result.status),
             "result": result.result if result.ready() and result.successful() else None,
+            "progress": result.info if result.status == "PROGRESS" else None,
             "error_message": str(result.result) if result.failed() else None,
         }
     except Exception as e:
@@ -10,6 +10,7 @@ Alert types:
 - cool_down_reminder: Post-conflict timer reminder
 - check_in_prompt: Periodic check-in when no positive interaction
 """
+import asyncio
 import logging
 from datetime import datetime, timedelta
 from typing import Optional, List, Dict, Any
@@ -171,7 +172,8 @@ class AlertService:
         """Create a cool-down reminder 2 hours after a conflict ends."""
         from app.services.db_service import db_service
 
-        alert_id = db_service.create_alert(
+        alert_id = await asyncio.to_thread(
+            db_service.create_alert,
             relationship_id=relationship_id,
             alert_type="cool_down_reminder",
             severity="low",
@@ -186,7 +188,8 @@ class AlertService:
         """Create a check-in prompt when no positive interaction for several days."""
         from app.services.db_service import db_service
 
-        alert_id = db_service.create_alert(
+        alert_id = await asyncio.to_thread(
+            db_service.create_alert,
             relationship_id=relationship_id,
             alert_type="check_in_prompt",
             severity="low",
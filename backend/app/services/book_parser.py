@@ -0,0 +1,273 @@
+"""
+Single-pass structural parser and chunker for reference books
+
+Chapter detection used to rebuild and search the growing text prefix for
+every heading, which is quadratic in book length, and then ran a second
+splitter over each chapter. BookParser instead streams the text once:
+
+- feed() takes text as it arrives (a page at a time from OCR, or a whole
+  document) and tracks absolute character offsets line by line.
+- Chapter headings ("Chapter 3: ...", "CHAPTER IV - ...", "3. Title",
+  optionally as markdown headings) start a new chapter. Other markdown
+  headings and "3.2 Title" lines name the current section.
+- Table-of-contents lines (headings ending in a page number) and front or
+  back matter sections (copyright, dedication, contents, index, ...) are
+  dropped, and remaining chunks still go through the junk filter.
+- Chunks are cut from a bounded buffer at the last paragraph, line,
+  sentence or word boundary under chunk_size, with chunk_overlap
+  characters carried into the next chunk. They never cross a chapter and
+  are yielded as soon as they're cut, so embedding can start on the first
+  pages while later ones are still being parsed.
+
+Each chunk's text is exactly the source slice [start:end], trimmed.
+"""
+import re
+from typing import Iterable, Iterator, List, NamedTuple, Optional
+
+_CHAPTER_PATTERNS = [
+    re.compile(r'^Chapter\s+(\d+|[IVXLCDM]+)[\s:.-]+(.+?)$'),
+    re.compile(r'^CHAPTER\s+(\d+|[IVXLCDM]+)[\s:.-]+(.+?)$'),
+    re.compile(r'^(\d+)\.\s+(.{1,80}?)$'),
+]
+_MARKDOWN_HEADING = re.compile(r'^#{1,6}\s+(.+?)\s*#*$')
+_NUMBERED_SECTION = re.compile(r'^(\d+\.\d+(?:\.\d+)*)\s+(.{1,80})$')
+_TOC_ENTRY = re.compile(r'(?:\.{2,}|\s{2,}|\t)\s*\d{1,4}$')  # Dot leaders or a gap before a page number
+_TRAILING_PAGE = re.compile(r'\s\d{1,4}$')
+_CONTENTS_HEADINGS = {"contents", "table of contents"}
+
+# Boundaries tried when cutting a chunk, best first
+_SEPARATORS = ["\n\n", "\n", ". ", " "]
+
+JUNK_KEYWORDS = [
+    "copyright", "all rights reserved", "isbn", "library of congress",
+    "printed in", "publication data", "cover design", "simon & schuster",
+    "acknowledgments", "dedication", "table of contents", "index",
+    "thisiscrave.com", "atria books"
+]
+
+# Section headings whose whole body is skipped
+MATTER_HEADINGS = {
+    "contents", "table of contents", "copyright", "dedication", "acknowledgments",
+    "acknowledgements", "index", "about the author", "also by", "praise for",
+    "notes", "bibliography",
+}
+
+
+def is_junk(text: str) -> bool:
+    """Front/back matter heuristics, applied per chunk."""
+    text_lower = text.lower()
+    junk_score = sum(1 for kw in JUNK_KEYWORDS if kw in text_lower)
+    if junk_score >= 2 or (len(text) < 500 and junk_score >= 1):
+        return True
+    if "thank you" in text_lower and len(text_lower.split('\n')) > 10:
+        return True
+    return False
+
+
+def _chapter_number(raw: str) -> int:
+    try:
+        return int(raw)
+    except ValueError:
+        return 0  # Unknown chapter (roman numerals)
+
+
+class BookChunk(NamedTuple):
+    text: str
+    start: int
+    end: int
+    chunk_index: int
+    chapter_number: int
+    chapter_title: str
+    chapter_chunk_index: int
+    section_title: Optional[str]
+
+
+class BookParser:
+    """Streaming chapter/section detection and chunking with absolute offsets."""
+
+    def __init__(self, chunk_size: int = 1000, chunk_overlap: int = 200):
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+        self.chapters = 0
+        self.skipped_chunks: List[str] = []
+
+        self._offset = 0  # Absolute offset of the next unread character
+        self._pending = ""  # Partial line carried between feed() calls
+        self._buffer = ""  # Chapter text not yet fully chunked
+        self._buffer_start = 0  # Absolute offset of _buffer[0]
+        self._chunk_index = 0
+        self._chapter_number = 0
+        self._chapter_title = "Unknown Section"
+        self._chapter_chunk_index = 0
+        self._section: Optional[str] = None
+        self._skipping = False  # Inside a front/back matter section
+        self._in_contents = False  # Inside a contents section, where "Chapter 2: Title 17" is an entry
+        self._has_body = False  # Current chapter has text beyond its heading
+
+    # ------------------------------------------------------------------
+    # Heading detection
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _heading_text(line: str) -> tuple:
+        match = _MARKDOWN_HEADING.match(line)
+        return (match.group(1).strip(), True) if match else (line, False)
+
+    def _match_chapter(self, text: str) -> Optional[tuple]:
+        for pattern in _CHAPTER_PATTERNS:
+            match = pattern.match(text)
+            if match:
+                title = match.group(2).strip()
+                if pattern is _CHAPTER_PATTERNS[2] and title.endswith((".", ",", ";", ":")):
+                    return None  # A numbered list item, not a heading
+                return _chapter_number(match.group(1)), title
+        return None
+
+    # ------------------------------------------------------------------
+    # Chunk cutting
+    # ------------------------------------------------------------------
+
+    def _emit(self, start: int, end: int) -> Optional[BookChunk]:
+        raw = self._buffer[start:end]
+        text = raw.strip()
+        if not text:
+            return None
+        if is_junk(text):
+            self.skipped_chunks.append(text[:50])
+            return None
+        lead = len(raw) - len(raw.lstrip())
+        abs_start = self._buffer_start + start + lead
+        chunk = BookChunk(
+            text=text,
+            start=abs_start,
+            end=abs_start + len(text),
+            chunk_index=self._chunk_index,
+            chapter_number=self._chapter_number,
+            chapter_title=self._chapter_title,
+            chapter_chunk_index=self._chapter_chunk_index,
+            section_title=self._section,
+        )
+        self._chunk_index += 1
+        self._chapter_chunk_index += 1
+        return chunk
+
+    def _cut_point(self, start: int) -> int:
+        limit = start + self.chunk_size
+        # Only boundaries in the back half count, so chunks never come out tiny
+        floor = start + self.chunk_size // 2
+        for separator in _SEPARATORS:
+            pos = self._buffer.rfind(separator, floor, limit)
+            if pos != -1:
+                return pos + len(separator)
+        return limit
+
+    def _overlap_start(self, start: int, cut: int) -> int:
+        target = max(start + 1, cut - self.chunk_overlap)
+        if target >= cut:
+            return cut
+        # Start the overlap on a word boundary
+        pos = self._buffer.find(" ", target, cut)
+        return pos + 1 if pos != -1 else cut
+
+    def _drain(self, final: bool) -> Iterator[BookChunk]:
+        """Cut full chunks off the buffer (and the remainder if final)."""
+        start = 0
+        while len(self._buffer) - start > self.chunk_size:
+            cut = self._cut_point(start)
+            chunk = self._emit(start, cut)
+            if chunk:
+                yield chunk
+            start = self._overlap_start(start, cut) if self.chunk_overlap else cut
+        if final:
+            chunk = self._emit(start, len(self._buffer))
+            if chunk:
+                yield chunk
+            start = len(self._buffer)
+        if start:
+            self._buffer = self._buffer[start:]
+            self._buffer_start += start
+
+    def _flush(self) -> Iterator[BookChunk]:
+        """Chunk out the whole buffer, leaving it empty at the current offset."""
+        if self._has_body:
+            yield from self._drain(final=True)
+        # A heading with no body (e.g. an un-numbered contents list) isn't worth a chunk
+        self._buffer = ""
+        self._buffer_start = self._offset
+
+    def _skip(self, line: str) -> Iterator[BookChunk]:
+        yield from self._flush()
+        self._offset += len(line)
+        self._buffer_start = self._offset
+
+    # ------------------------------------------------------------------
+    # Streaming
+    # ------------------------------------------------------------------
+
+    def _line(self, line: str) -> Iterator[BookChunk]:
+        """Process one line (including its newline) starting at self._offset."""
+        stripped = line.strip()
+        if stripped:
+            text, is_markdown = self._heading_text(stripped)
+            chapter = self._match_chapter(text)
+            numbered = None if chapter or is_markdown else _NUMBERED_SECTION.match(text)
+            if chapter and (_TOC_ENTRY.search(text) or (self._in_contents and not is_markdown and _TRAILING_PAGE.search(text))):
+                # Table-of-contents entry ("Chapter 3: Title ..... 45")
+                yield from self._skip(line)
+                return
+            if chapter:
+                yield from self._flush()
+                self._chapter_number, self._chapter_title = chapter
+                self._chapter_chunk_index = 0
+                self._section = None
+                self._skipping = False
+                self._in_contents = False
+                self._has_body = False
+                self.chapters += 1
+            elif is_markdown or numbered:
+                title = (numbered.group(2) if numbered else text).strip()
+                if title.lower().rstrip(":") in MATTER_HEADINGS:
+                    self._skipping = True
+                    self._in_contents = title.lower().rstrip(":") in _CONTENTS_HEADINGS
+                    yield from self._skip(line)
+                    return
+                self._skipping = False
+                self._in_contents = False
+                self._section = title
+            elif self._skipping:
+                self._offset += len(line)
+                return
+            else:
+                self._has_body = True
+        elif self._skipping:
+            self._offset += len(line)
+            return
+
+        if not self._buffer:
+            self._buffer_start = self._offset
+        self._buffer += line
+        self._offset += len(line)
+        yield from self._drain(final=False)
+
+    def feed(self, text: str) -> Iterator[BookChunk]:
+        """Consume the next piece of text, yielding every chunk completed by it."""
+        data = self._pending + text
+        lines = data.split("\n")
+        self._pending = lines.pop()
+        for line in lines:
+            yield from self._line(line + "\n")
+
+    def close(self) -> Iterator[BookChunk]:
+        """Flush the last partial line and chapter."""
+        if self._pending:
+            pending, self._pending = self._pending, ""
+            yield from self._line(pending)
+        yield from self._flush()
+
+    def parse(self, pieces: Iterable[str]) -> Iterator[BookChunk]:
+        """Chunk a whole document given as one string or an iterable of pieces."""
+        if isinstance(pieces, str):
+            pieces = [pieces]
+        for piece in pieces:
+            yield from self.feed(piece)
+        yield from self.close()
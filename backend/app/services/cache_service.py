@@ -9,10 +9,13 @@ Key namespace convention: serene:{domain}:{relationship_id}:{identifier}
 import json
 import logging
 import time
+from collections import deque
 from typing import Any, Optional, Dict
 
 logger = logging.getLogger(__name__)
 
+FALLBACK_MAX_KEYS = 10000  # In-memory fallback prunes expired (then oldest) keys past this
+
 
 class RedisCache:
     """Redis-backed cache with in-memory fallback."""
@@ -21,6 +24,7 @@ class RedisCache:
         self._redis = None
         self._redis_url = redis_url
         self._fallback: Dict[str, tuple] = {}  # key -> (value_json, expire_at)
+        self._fallback_lists: Dict[str, tuple] = {}  # key -> (deque of values, expire_at)
         self._using_fallback = False
         self._connect()
 
@@ -129,6 +133,32 @@ class RedisCache:
             logger.warning(f"Redis INCR error: {e}")
             return 1  # Allow on error
 
+    def list_append(self, key: str, value: Any, max_len: int, ttl: int = 300) -> bool:
+        """Append to a list capped at its last max_len items, refreshing its TTL."""
+        serialized = json.dumps(value, default=str)
+        if self._using_fallback:
+            return self._fallback_list_append(key, serialized, max_len, ttl)
+        try:
+            pipe = self._redis.pipeline()
+            pipe.rpush(key, serialized)
+            pipe.ltrim(key, -max_len, -1)
+            pipe.expire(key, ttl)
+            pipe.execute()
+            return True
+        except Exception as e:
+            logger.warning(f"Redis RPUSH error: {e}")
+            return self._fallback_list_append(key, serialized, max_len, ttl)
+
+    def list_range(self, key: str) -> list:
+        """Return every item of a list (oldest first); empty on miss."""
+        if self._using_fallback:
+            return self._fallback_list_range(key)
+        try:
+            return [json.loads(item) for item in self._redis.lrange(key, 0, -1)]
+        except Exception as e:
+            logger.warning(f"Redis LRANGE error: {e}")
+            return self._fallback_list_range(key)
+
     # --- Fallback methods ---
 
     def _fallback_get(self, key: str) -> Optional[Any]:
@@ -142,9 +172,43 @@ class RedisCache:
         return json.loads(value_json)
 
     def _fallback_set(self, key: str, serialized: str, ttl: int) -> bool:
+        if key not in self._fallback and len(self._fallback) >= FALLBACK_MAX_KEYS:
+            self._fallback_prune()
         self._fallback[key] = (serialized, time.time() + ttl)
         return True
 
+    def _fallback_list_append(self, key: str, serialized: str, max_len: int, ttl: int) -> bool:
+        entry = self._fallback_lists.get(key)
+        if entry is None or time.time() >= entry[1]:
+            if len(self._fallback_lists) >= FALLBACK_MAX_KEYS:
+                self._fallback_prune()
+            items = deque(maxlen=max_len)
+        else:
+            items = entry[0]
+        items.append(json.loads(serialized))
+        self._fallback_lists[key] = (items, time.time() + ttl)
+        return True
+
+    def _fallback_list_range(self, key: str) -> list:
+        entry = self._fallback_lists.get(key)
+        if entry is None:
+            return []
+        if time.time() >= entry[1]:
+            del self._fallback_lists[key]
+            return []
+        return list(entry[0])
+
+    def _fallback_prune(self):
+        now = time.time()
+        for store in (self._fallback, self._fallback_lists):
+            for k in [k for k, (_, expire_at) in store.items() if now >= expire_at]:
+                del store[k]
+            overflow = len(store) - FALLBACK_MAX_KEYS + 1
+            if overflow > 0:
+                # Still full of live keys: drop the ones closest to expiry
+                for k in sorted(store, key=lambda k: store[k][1])[:overflow]:
+                    del store[k]
+
 
 # --- Singleton instance ---
 _cache_instance: Optional[RedisCache] = None
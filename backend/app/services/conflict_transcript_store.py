@@ -0,0 +1,147 @@
+"""
+In-process store of the current conflict's transcript, as ordered chunks
+
+rag_lookup used to rebuild the current conflict's transcript by running a
+filtered Pinecone query (top_k=20) and re-sorting the matches by
+chunk_index - a network hop on every voice turn that silently dropped
+everything past the 20th chunk of a long fight.
+
+The transcript is already in Postgres (rant_messages, ordered by
+sequence_number), so we load it once per conflict, chunk it by speaker
+turns and keep it warm in memory for the Luna session. Entries expire
+after a TTL so transcripts written by another process are picked up, and
+invalidate() drops an entry immediately after a same-process write.
+"""
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+from app.services.db_service import db_service
+
+logger = logging.getLogger(__name__)
+
+
+class ConflictTranscriptStore:
+    """LRU + TTL cache of per-conflict transcript chunks loaded from rant_messages."""
+
+    def __init__(self, max_conflicts: int = 256, ttl_seconds: float = 600.0, max_chunk_chars: int = 1000):
+        self.max_conflicts = max_conflicts
+        self.ttl_seconds = ttl_seconds
+        self.max_chunk_chars = max_chunk_chars
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._loading: Dict[str, asyncio.Future] = {}
+        # Stats
+        self.hits = 0
+        self.loads = 0
+
+    def build_chunks(self, conflict_id: str, messages: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Group consecutive messages into ordered chunks of up to max_chunk_chars.
+
+        A chunk never splits a message, so every line keeps its speaker label.
+        """
+        chunks = []
+        lines: List[str] = []
+        speakers: List[str] = []
+        size = 0
+
+        def flush():
+            if lines:
+                distinct = list(dict.fromkeys(speakers))
+                chunks.append({
+                    'text': "\n".join(lines),
+                    'type': 'transcript',
+                    'is_current_conflict': True,
+                    'conflict_id': conflict_id,
+                    'speaker': distinct[0] if len(distinct) == 1 else "Both",
+                    'chunk_index': len(chunks),
+                })
+
+        for msg in messages:
+            content = (msg.get("content") or "").strip()
+            if not content:
+                continue
+            speaker = msg.get("speaker") or msg.get("partner_id") or "Speaker"
+            line = f"{speaker}: {content}"
+            if lines and size + len(line) > self.max_chunk_chars:
+                flush()
+                lines, speakers, size = [], [], 0
+            lines.append(line)
+            speakers.append(speaker)
+            size += len(line) + 1
+        flush()
+        return chunks
+
+    def _get_fresh(self, conflict_id: str) -> Optional[List[Dict[str, Any]]]:
+        entry = self._entries.get(conflict_id)
+        if entry is None:
+            return None
+        if time.monotonic() - entry["loaded_at"] > self.ttl_seconds:
+            del self._entries[conflict_id]
+            return None
+        self._entries.move_to_end(conflict_id)
+        return entry["chunks"]
+
+    def _put(self, conflict_id: str, chunks: List[Dict[str, Any]]):
+        self._entries[conflict_id] = {"chunks": chunks, "loaded_at": time.monotonic()}
+        self._entries.move_to_end(conflict_id)
+        while len(self._entries) > self.max_conflicts:
+            self._entries.popitem(last=False)
+
+    async def _load(self, conflict_id: str) -> List[Dict[str, Any]]:
+        t_start = time.perf_counter()
+        transcript = await asyncio.to_thread(db_service.get_conflict_transcript, conflict_id)
+        chunks = self.build_chunks(conflict_id, (transcript or {}).get("messages", []))
+        self.loads += 1
+        logger.info(
+            f"📥 Loaded transcript for conflict {conflict_id}: {len(chunks)} chunks "
+            f"({time.perf_counter() - t_start:.3f}s)"
+        )
+        return chunks
+
+    async def get_chunks(self, conflict_id: str) -> List[Dict[str, Any]]:
+        """
+        Ordered transcript chunks for a conflict (empty list if it has no messages).
+
+        Concurrent callers for the same cold conflict share a single DB load.
+        """
+        chunks = self._get_fresh(conflict_id)
+        if chunks is not None:
+            self.hits += 1
+            return chunks
+
+        pending = self._loading.get(conflict_id)
+        if pending is not None:
+            return await asyncio.shield(pending)
+
+        future = asyncio.get_running_loop().create_future()
+        self._loading[conflict_id] = future
+        try:
+            chunks = await self._load(conflict_id)
+            self._put(conflict_id, chunks)
+            future.set_result(chunks)
+            return chunks
+        except Exception as e:
+            future.set_exception(e)
+            # Mark retrieved so a lone loader doesn't trigger "exception never retrieved"
+            future.exception()
+            raise
+        finally:
+            self._loading.pop(conflict_id, None)
+
+    async def warm(self, conflict_id: str):
+        """Preload a conflict (e.g. when a Luna session starts). Errors are logged, not raised."""
+        try:
+            await self.get_chunks(conflict_id)
+        except Exception as e:
+            logger.warning(f"⚠️ Could not warm transcript for conflict {conflict_id}: {e}")
+
+    def invalidate(self, conflict_id: str):
+        """Drop a conflict after its rant_messages change."""
+        self._entries.pop(conflict_id, None)
+
+
+# Singleton instance
+conflict_transcript_store = ConflictTranscriptStore()
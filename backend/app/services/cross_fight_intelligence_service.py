@@ -7,15 +7,15 @@ Aggregates learnings across ALL past fights without requiring user feedback:
 3. Repair Outcome Inference - infers if past repair plans worked
 """
 import logging
-from datetime import datetime, timedelta
+from datetime import datetime
 from typing import List, Dict, Any, Optional, Tuple
 from collections import defaultdict
-import json
 
 from app.services.pinecone_service import pinecone_service
 from app.services.embeddings_service import embeddings_service
 from app.services.db_service import db_service
 from app.services.s3_service import s3_service
+from app.services.debrief_repository import debrief_path, debrief_repository
 from app.models.schemas import (
     CrossFightIntelligence,
     EscalationTriggerPattern,
@@ -37,6 +37,7 @@ class CrossFightIntelligenceService:
         self.embeddings = embeddings_service
         self.db = db_service
         self.s3 = s3_service
+        self.debriefs = debrief_repository
         logger.info("✅ Initialized Cross-Fight Intelligence Service")
 
     async def get_all_debriefs(
@@ -45,7 +46,7 @@ class CrossFightIntelligenceService:
         days_back: int = 90
     ) -> List[FightDebrief]:
         """
-        Fetch all FightDebriefs for a relationship from S3/Pinecone.
+        Fetch all FightDebriefs for a relationship via the debrief repository.
 
         Args:
             relationship_id: The relationship UUID
@@ -54,53 +55,13 @@ class CrossFightIntelligenceService:
         Returns:
             List of FightDebrief objects
         """
-        debriefs = []
-
         try:
-            # Query Pinecone for all debriefs in this relationship
-            # Use a generic query to get all debriefs
-            dummy_embedding = [0.0] * 1024
-
-            results = self.pinecone.index.query(
-                vector=dummy_embedding,
-                top_k=100,  # Get up to 100 past fights
-                namespace="debriefs",
-                include_metadata=True,
-                filter={"relationship_id": {"$eq": relationship_id}}
-            )
-
-            if not results or not results.matches:
+            # Catalog listing (date-filtered) + concurrent, ETag-cached S3 reads
+            debriefs = await self.debriefs.list_debriefs(relationship_id, days_back=days_back)
+            if not debriefs:
                 logger.info(f"No debriefs found for relationship {relationship_id}")
                 return []
 
-            # Fetch full debrief from S3 for each match
-            for match in results.matches:
-                try:
-                    conflict_id = match.metadata.get("conflict_id")
-                    if not conflict_id:
-                        continue
-
-                    # Try to get from S3
-                    debrief_path = f"debriefs/{relationship_id}/{conflict_id}_debrief.json"
-                    content = self.s3.download_file(debrief_path)
-
-                    if content:
-                        debrief_data = json.loads(content)
-                        debrief = FightDebrief(**debrief_data)
-
-                        # Check if within date range
-                        analyzed_at = debrief.analyzed_at
-                        if isinstance(analyzed_at, str):
-                            analyzed_at = datetime.fromisoformat(analyzed_at.replace('Z', '+00:00'))
-
-                        cutoff = datetime.now() - timedelta(days=days_back)
-                        if analyzed_at.replace(tzinfo=None) >= cutoff:
-                            debriefs.append(debrief)
-
-                except Exception as e:
-                    logger.warning(f"Could not load debrief for conflict: {e}")
-                    continue
-
             logger.info(f"✅ Retrieved {len(debriefs)} debriefs for relationship {relationship_id}")
             return debriefs
 
@@ -617,28 +578,30 @@ class CrossFightIntelligenceService:
             similar_fights = []
 
             if results and results.matches:
+                # Load the full debriefs concurrently for more details
+                entries = [
+                    {"conflict_id": cid, "s3_path": debrief_path(relationship_id, cid)}
+                    for cid in dict.fromkeys(m.metadata.get("conflict_id", "") for m in results.matches)
+                    if cid
+                ]
+                full_debriefs = await self.debriefs.get_many(entries)
+
                 for match in results.matches:
                     metadata = match.metadata
                     conflict_id = metadata.get("conflict_id", "")
 
-                    # Try to get full debrief from S3 for more details
                     what_worked = None
                     what_failed = None
                     key_lesson = ""
 
-                    try:
-                        debrief_path = f"debriefs/{relationship_id}/{conflict_id}_debrief.json"
-                        content = self.s3.download_file(debrief_path)
-                        if content:
-                            debrief_data = json.loads(content)
-                            if debrief_data.get("phrases_that_helped"):
-                                what_worked = debrief_data["phrases_that_helped"][0]
-                            if debrief_data.get("phrases_to_avoid"):
-                                what_failed = debrief_data["phrases_to_avoid"][0]
-                            if debrief_data.get("what_would_have_helped"):
-                                key_lesson = debrief_data["what_would_have_helped"]
-                    except Exception:
-                        pass
+                    debrief = full_debriefs.get(conflict_id)
+                    if debrief:
+                        if debrief.phrases_that_helped:
+                            what_worked = debrief.phrases_that_helped[0]
+                        if debrief.phrases_to_avoid:
+                            what_failed = debrief.phrases_to_avoid[0]
+                        if debrief.what_would_have_helped:
+                            key_lesson = debrief.what_would_have_helped
 
                     similar_fights.append(SimilarFightResult(
                         conflict_id=conflict_id,
@@ -528,6 +528,105 @@ class DatabaseService:
                     return None
             raise e
     
+    def upsert_fight_debrief(
+        self,
+        conflict_id: str,
+        relationship_id: str,
+        s3_path: str,
+        etag: Optional[str],
+        analyzed_at: datetime,
+        topic: Optional[str] = None,
+        resolution_status: Optional[str] = None,
+        intensity_peak: Optional[str] = None
+    ) -> bool:
+        """Record (or refresh) a debrief document in the fight_debriefs catalog"""
+        with self.get_db_context() as conn:
+            with conn.cursor() as cursor:
+                cursor.execute("""
+                    INSERT INTO fight_debriefs (
+                        conflict_id, relationship_id, s3_path, etag, topic,
+                        resolution_status, intensity_peak, analyzed_at, updated_at
+                    )
+                    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, NOW())
+                    ON CONFLICT (conflict_id)
+                    DO UPDATE SET
+                        s3_path = EXCLUDED.s3_path,
+                        etag = EXCLUDED.etag,
+                        topic = EXCLUDED.topic,
+                        resolution_status = EXCLUDED.resolution_status,
+                        intensity_peak = EXCLUDED.intensity_peak,
+                        analyzed_at = EXCLUDED.analyzed_at,
+                        updated_at = NOW();
+                """, (conflict_id, relationship_id, s3_path, etag, topic,
+                      resolution_status, intensity_peak, analyzed_at))
+                conn.commit()
+                return True
+
+    def update_fight_debrief_etag(self, conflict_id: str, etag: str) -> bool:
+        """Refresh the cached ETag of a catalogued debrief"""
+        with self.get_db_context() as conn:
+            with conn.cursor() as cursor:
+                cursor.execute("""
+                    UPDATE fight_debriefs SET etag = %s, updated_at = NOW()
+                    WHERE conflict_id = %s;
+                """, (etag, conflict_id))
+                conn.commit()
+                return cursor.rowcount > 0
+
+    def list_fight_debriefs(
+        self,
+        relationship_id: str,
+        since: Optional[datetime] = None,
+        limit: int = 100
+    ) -> List[Dict[str, Any]]:
+        """List catalogued debriefs for a relationship, newest first"""
+        with self.get_db_context() as conn:
+            with conn.cursor(cursor_factory=RealDictCursor) as cursor:
+                cursor.execute("""
+                    SELECT conflict_id, relationship_id, s3_path, etag, topic,
+                           resolution_status, intensity_peak, analyzed_at
+                    FROM fight_debriefs
+                    WHERE relationship_id = %s
+                      AND (%s::timestamptz IS NULL OR analyzed_at >= %s)
+                    ORDER BY analyzed_at DESC
+                    LIMIT %s;
+                """, (relationship_id, since, since, limit))
+                return [
+                    {**dict(row), "conflict_id": str(row["conflict_id"]), "relationship_id": str(row["relationship_id"])}
+                    for row in cursor.fetchall()
+                ]
+
+    def is_debrief_catalog_backfilled(self, relationship_id: str) -> bool:
+        """Whether every pre-catalog debrief of a relationship is in fight_debriefs"""
+        with self.get_db_context() as conn:
+            with conn.cursor() as cursor:
+                cursor.execute("""
+                    SELECT 1 FROM fight_debrief_backfills WHERE relationship_id = %s;
+                """, (relationship_id,))
+                return cursor.fetchone() is not None
+
+    def mark_debrief_catalog_backfilled(self, relationship_id: str) -> bool:
+        """Record that a relationship's debriefs have all been catalogued"""
+        with self.get_db_context() as conn:
+            with conn.cursor() as cursor:
+                cursor.execute("""
+                    INSERT INTO fight_debrief_backfills (relationship_id, backfilled_at)
+                    VALUES (%s, NOW())
+                    ON CONFLICT (relationship_id) DO NOTHING;
+                """, (relationship_id,))
+                conn.commit()
+                return True
+
+    def list_debrief_backfill_pending(self) -> List[str]:
+        """Relationship ids whose debriefs haven't been back-filled into the catalog"""
+        with self.get_db_context() as conn:
+            with conn.cursor() as cursor:
+                cursor.execute("""
+                    SELECT id FROM relationships
+                    WHERE id NOT IN (SELECT relationship_id FROM fight_debrief_backfills);
+                """)
+                return [str(row[0]) for row in cursor.fetchall()]
+
     def create_repair_plan(
         self,
         conflict_id: str,
@@ -0,0 +1,424 @@
+"""
+Debrief repository for cross-fight intelligence
+
+FightDebriefs are JSON documents in S3 (debriefs/<relationship>/<conflict>_debrief.json).
+Cross-fight analysis used to list them with a zero-vector Pinecone scan and
+then download each one serially inside the event loop. The repository
+replaces that with:
+
+- a Postgres catalog (fight_debriefs, migration 013) listing a relationship's
+  debriefs newest-first, with the date filter applied before any download;
+- concurrent S3 fetches bounded by a semaphore, so 100 debriefs cost one
+  round of parallel I/O instead of 100 sequential GETs;
+- a two-level cache of parsed FightDebriefs (in-memory LRU over JSON files on
+  disk) validated by ETag. A catalog row carries the ETag, so a cache hit
+  needs no S3 request at all; without one, a HEAD revalidates the copy.
+
+When the catalog is unavailable (no DATABASE_URL, migration not applied)
+listing falls back to the Pinecone scan. Debriefs saved before the catalog
+existed are only found by that scan, so until a relationship is marked
+back-filled (fight_debrief_backfills, migration 014) its listing merges the
+scan with the catalog and catalogues whatever was missing. Existing
+relationships can be back-filled up front with
+scripts/backfill_debrief_catalog.py.
+"""
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from app.config import settings
+from app.models.schemas import FightDebrief
+
+logger = logging.getLogger(__name__)
+
+
+def debrief_path(relationship_id: str, conflict_id: str) -> str:
+    """S3 key of a relationship's debrief document."""
+    return f"debriefs/{relationship_id}/{conflict_id}_debrief.json"
+
+
+def _naive(value: Any) -> Optional[datetime]:
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    return value.replace(tzinfo=None) if isinstance(value, datetime) else None
+
+
+class DebriefCache:
+    """In-memory LRU of parsed debriefs backed by per-document JSON files, keyed by S3 path + ETag."""
+
+    def __init__(self, directory: Optional[str], max_entries: int = 512):
+        self.directory = directory
+        self.max_entries = max_entries
+        self._memory: "OrderedDict[str, Tuple[str, FightDebrief]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _file(self, path: str) -> Optional[str]:
+        if not self.directory:
+            return None
+        return os.path.join(self.directory, hashlib.sha256(path.encode("utf-8")).hexdigest()[:32] + ".json")
+
+    def _remember(self, path: str, etag: str, debrief: FightDebrief):
+        with self._lock:
+            self._memory[path] = (etag, debrief)
+            self._memory.move_to_end(path)
+            while len(self._memory) > self.max_entries:
+                self._memory.popitem(last=False)
+
+    def peek(self, path: str) -> Optional[Tuple[str, FightDebrief]]:
+        """Return the cached (etag, debrief) for a path regardless of freshness."""
+        with self._lock:
+            entry = self._memory.get(path)
+            if entry:
+                self._memory.move_to_end(path)
+                return entry
+        file_path = self._file(path)
+        if not file_path or not os.path.exists(file_path):
+            return None
+        try:
+            with open(file_path, "r", encoding="utf-8") as f:
+                stored = json.load(f)
+            if stored.get("path") != path:
+                return None
+            entry = (stored["etag"], FightDebrief(**stored["debrief"]))
+        except Exception as e:
+            logger.warning(f"⚠️ Ignoring unreadable debrief cache file {file_path}: {e}")
+            return None
+        self._remember(path, *entry)
+        return entry
+
+    def get(self, path: str, etag: str) -> Optional[FightDebrief]:
+        """Return the cached debrief only if it matches the given ETag."""
+        entry = self.peek(path)
+        return entry[1] if entry and entry[0] == etag else None
+
+    def put(self, path: str, etag: str, debrief: FightDebrief):
+        self._remember(path, etag, debrief)
+        file_path = self._file(path)
+        if not file_path:
+            return
+        try:
+            # Created on first write, so importing the module leaves no directory behind
+            os.makedirs(self.directory, exist_ok=True)
+            tmp_path = f"{file_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({"path": path, "etag": etag, "debrief": debrief.model_dump(mode="json")}, f)
+            os.replace(tmp_path, file_path)
+        except Exception as e:
+            logger.warning(f"⚠️ Failed to write debrief cache file: {e}")
+
+
+class DebriefRepository:
+    """Catalogued, concurrently fetched and ETag-cached FightDebrief storage."""
+
+    def __init__(
+        self,
+        s3=None,
+        db=None,
+        index_getter: Optional[Callable[[], Any]] = None,
+        cache_dir: Optional[str] = None,
+        max_concurrency: int = 16,
+        memory_entries: int = 512,
+    ):
+        """
+        Initialize the repository.
+
+        Args:
+            s3: S3Service (defaults to the app singleton)
+            db: DatabaseService holding the fight_debriefs catalog (defaults to the app singleton)
+            index_getter: Returns the vector index used for the fallback listing
+            cache_dir: Directory for cached debrief files (None keeps the cache in memory only)
+            max_concurrency: Maximum S3 requests in flight per batch
+            memory_entries: Parsed debriefs kept in the in-memory LRU
+        """
+        self._s3 = s3
+        self._db = db
+        self._index_getter = index_getter
+        self.cache = DebriefCache(cache_dir, memory_entries)
+        self.max_concurrency = max_concurrency
+        self._metrics_lock = threading.Lock()
+        self.metrics = {"cache_hits": 0, "revalidated": 0, "downloads": 0, "missing": 0, "catalog_fallbacks": 0}
+
+    # Resolved lazily so the module imports without AWS/DB configuration
+    @property
+    def s3(self):
+        if self._s3 is None:
+            from app.services.s3_service import s3_service
+            self._s3 = s3_service
+        return self._s3
+
+    @property
+    def db(self):
+        if self._db is None:
+            from app.services.db_service import db_service
+            self._db = db_service
+        return self._db
+
+    def _index(self):
+        if self._index_getter:
+            return self._index_getter()
+        from app.services.pinecone_service import pinecone_service
+        return pinecone_service.index
+
+    def _count(self, key: str):
+        with self._metrics_lock:
+            self.metrics[key] += 1
+
+    def get_metrics(self) -> Dict[str, int]:
+        with self._metrics_lock:
+            return dict(self.metrics)
+
+    # ------------------------------------------------------------------
+    # Writes
+    # ------------------------------------------------------------------
+
+    def save(self, debrief: FightDebrief) -> Optional[str]:
+        """
+        Upload a debrief, record it in the catalog and warm the cache.
+
+        Returns:
+            S3 URL if the upload succeeded, None otherwise
+        """
+        path = debrief_path(debrief.relationship_id, debrief.conflict_id)
+        body = json.dumps(debrief.model_dump(), default=str, indent=2).encode("utf-8")
+        uploaded = self.s3.upload_file_with_etag(path, body, "application/json")
+        if not uploaded:
+            return None
+        s3_url, etag = uploaded
+        self.cache.put(path, etag, debrief)
+        self._catalog(debrief, path, etag)
+        return s3_url
+
+    def _catalog(self, debrief: FightDebrief, path: str, etag: str) -> bool:
+        if not self.db:
+            return False
+        try:
+            self.db.upsert_fight_debrief(
+                conflict_id=debrief.conflict_id,
+                relationship_id=debrief.relationship_id,
+                s3_path=path,
+                etag=etag,
+                analyzed_at=debrief.analyzed_at,
+                topic=debrief.topic,
+                resolution_status=debrief.resolution_status,
+                intensity_peak=debrief.intensity_peak,
+            )
+            return True
+        except Exception as e:
+            logger.warning(f"⚠️ Failed to catalog debrief {debrief.conflict_id}: {e}")
+            return False
+
+    def _is_backfilled(self, relationship_id: str) -> bool:
+        try:
+            return self.db.is_debrief_catalog_backfilled(relationship_id)
+        except Exception as e:
+            logger.warning(f"⚠️ Debrief backfill marker unavailable for {relationship_id}: {e}")
+            return False
+
+    def _mark_backfilled(self, relationship_id: str):
+        try:
+            self.db.mark_debrief_catalog_backfilled(relationship_id)
+        except Exception as e:
+            logger.warning(f"⚠️ Failed to mark debriefs of {relationship_id} back-filled: {e}")
+
+    # ------------------------------------------------------------------
+    # Listing
+    # ------------------------------------------------------------------
+
+    def _catalog_entries(self, relationship_id: str, since: Optional[datetime], limit: int) -> Optional[List[Dict[str, Any]]]:
+        if not self.db:
+            return None
+        try:
+            return self.db.list_fight_debriefs(relationship_id, since=since, limit=limit)
+        except Exception as e:
+            logger.warning(f"⚠️ Debrief catalog unavailable, falling back to vector listing: {e}")
+            return None
+
+    def _vector_entries(self, relationship_id: str, limit: int) -> List[Dict[str, Any]]:
+        # Vector ids are debrief_{conflict_id}, so the scan doesn't need metadata
+        results = self._index().query(
+            vector=[0.0] * 1024,
+            top_k=limit,
+            namespace="debriefs",
+            include_metadata=False,
+            filter={"relationship_id": {"$eq": relationship_id}}
+        )
+        entries = []
+        for match in (results.matches if results else None) or []:
+            if match.id.startswith("debrief_"):
+                conflict_id = match.id[len("debrief_"):]
+                entries.append({
+                    "conflict_id": conflict_id,
+                    "s3_path": debrief_path(relationship_id, conflict_id),
+                    "uncatalogued": True,
+                })
+        return entries
+
+    async def list_entries(
+        self,
+        relationship_id: str,
+        since: Optional[datetime] = None,
+        limit: int = 100,
+    ) -> Tuple[List[Dict[str, Any]], Optional[bool]]:
+        """
+        List debrief locations for a relationship.
+
+        Returns:
+            (entries with conflict_id, s3_path and, from the catalog, etag/analyzed_at;
+             None if there's nothing to back-fill, else whether the vector scan
+             saw all of the relationship's debriefs)
+        """
+        entries = await asyncio.to_thread(self._catalog_entries, relationship_id, since, limit)
+        if entries is not None and await asyncio.to_thread(self._is_backfilled, relationship_id):
+            return entries, None
+        self._count("catalog_fallbacks")
+        if entries is None:
+            return await asyncio.to_thread(self._vector_entries, relationship_id, limit), None
+        try:
+            scanned = await asyncio.to_thread(self._vector_entries, relationship_id, limit)
+        except Exception as e:
+            logger.warning(f"⚠️ Vector listing of pre-catalog debriefs failed for {relationship_id}: {e}")
+            return entries, None
+        # Catalogued debriefs plus older ones only the vector index knows about
+        known = {entry["conflict_id"] for entry in entries}
+        merged = entries + [entry for entry in scanned if entry["conflict_id"] not in known]
+        return merged, len(scanned) < limit
+
+    # ------------------------------------------------------------------
+    # Reads
+    # ------------------------------------------------------------------
+
+    def _load(self, entry: Dict[str, Any]) -> Optional[Tuple[FightDebrief, str]]:
+        """Resolve one entry from cache or S3. Returns (debrief, current etag)."""
+        path = entry["s3_path"]
+        etag = entry.get("etag")
+        if etag:
+            cached = self.cache.get(path, etag)
+            if cached:
+                self._count("cache_hits")
+                return cached, etag
+        else:
+            cached = self.cache.peek(path)
+            if cached:
+                current = self.s3.get_etag(path)
+                if current is None:
+                    self._count("missing")
+                    return None
+                if current == cached[0]:
+                    self._count("revalidated")
+                    return cached[1], current
+
+        downloaded = self.s3.download_file_with_etag(path)
+        if not downloaded:
+            self._count("missing")
+            return None
+        content, current = downloaded
+        self._count("downloads")
+        debrief = FightDebrief(**json.loads(content))
+        self.cache.put(path, current, debrief)
+        if etag and etag != current and self.db:
+            try:
+                self.db.update_fight_debrief_etag(entry["conflict_id"], current)
+            except Exception as e:
+                logger.warning(f"⚠️ Failed to refresh catalog ETag for {entry['conflict_id']}: {e}")
+        return debrief, current
+
+    async def get_many(self, entries: List[Dict[str, Any]]) -> Dict[str, FightDebrief]:
+        """
+        Fetch debriefs for the given entries concurrently.
+
+        Cached debrief objects are shared between callers and must be treated as read-only.
+
+        Returns:
+            Dict of conflict_id -> FightDebrief for the entries that could be loaded
+        """
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        async def load(entry: Dict[str, Any]):
+            async with semaphore:
+                try:
+                    return await asyncio.to_thread(self._load, entry)
+                except Exception as e:
+                    logger.warning(f"⚠️ Could not load debrief for conflict {entry.get('conflict_id')}: {e}")
+                    return None
+
+        results = await asyncio.gather(*(load(entry) for entry in entries))
+        return {
+            entry["conflict_id"]: result[0]
+            for entry, result in zip(entries, results)
+            if result
+        }
+
+    async def _backfill(
+        self,
+        relationship_id: str,
+        entries: List[Dict[str, Any]],
+        loaded: Dict[str, FightDebrief],
+        complete: bool,
+    ) -> int:
+        """Catalog loaded uncatalogued entries; mark the relationship once complete and all succeeded."""
+        catalogued, failed = 0, False
+        for entry in entries:
+            debrief = loaded.get(entry["conflict_id"])
+            cached = self.cache.peek(entry["s3_path"]) if debrief else None
+            if not entry.get("uncatalogued") or not cached:
+                continue
+            if await asyncio.to_thread(self._catalog, debrief, entry["s3_path"], cached[0]):
+                catalogued += 1
+            else:
+                failed = True
+        if complete and not failed:
+            await asyncio.to_thread(self._mark_backfilled, relationship_id)
+        return catalogued
+
+    async def backfill(self, relationship_id: str, limit: int = 10000) -> int:
+        """
+        Catalog every debrief the vector index has for a relationship and mark it back-filled.
+
+        Returns:
+            Number of debriefs added to the catalog
+        """
+        entries = await asyncio.to_thread(self._vector_entries, relationship_id, limit)
+        catalogued = await asyncio.to_thread(self._catalog_entries, relationship_id, None, limit)
+        known = {entry["conflict_id"] for entry in catalogued or []}
+        missing = [entry for entry in entries if entry["conflict_id"] not in known]
+        loaded = await self.get_many(missing)
+        return await self._backfill(relationship_id, missing, loaded, complete=len(entries) < limit)
+
+    async def list_debriefs(
+        self,
+        relationship_id: str,
+        days_back: int = 90,
+        limit: int = 100,
+    ) -> List[FightDebrief]:
+        """Fetch a relationship's debriefs from the last days_back days, newest first."""
+        cutoff = datetime.now() - timedelta(days=days_back)
+        entries, scan_complete = await self.list_entries(relationship_id, since=cutoff, limit=limit)
+        if not entries:
+            if scan_complete:
+                await asyncio.to_thread(self._mark_backfilled, relationship_id)
+            return []
+        loaded = await self.get_many(entries)
+
+        if scan_complete is not None:
+            # Back-fill the catalog so later listings can skip the vector scan
+            await self._backfill(relationship_id, entries, loaded, complete=scan_complete)
+
+        debriefs = [
+            debrief for debrief in loaded.values()
+            if (_naive(debrief.analyzed_at) or datetime.min) >= cutoff
+        ]
+        debriefs.sort(key=lambda d: _naive(d.analyzed_at) or datetime.min, reverse=True)
+        return debriefs
+
+
+# Singleton instance
+debrief_repository = DebriefRepository(
+    cache_dir=settings.DEBRIEF_CACHE_DIR or None,
+    max_concurrency=settings.DEBRIEF_FETCH_CONCURRENCY,
+)
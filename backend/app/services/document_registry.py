@@ -0,0 +1,99 @@
+"""
+Content-addressed registry of processed documents
+
+Uploads are fingerprinted by the SHA-256 of their bytes (computed while
+streaming them into object storage). The registry maps that hash to what
+process_pdf_task derived from the content:
+
+- the extracted text (so OCR is skipped),
+- the canonical storage location of the original file,
+- per pipeline, the chunk set and its embeddings.
+
+Only content-derived data is kept. Per-upload fields (pdf_id,
+relationship_id, filename, ...) are merged in when the vectors are
+written, so a book shared between couples, or a retried upload, reuses
+everything and only pays for the vector upsert.
+
+Entries live in a PayloadStore (zlib-compressed SQLite), with embeddings
+packed as base64 float32.
+"""
+import base64
+import json
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from app.config import settings
+from app.services.payload_store import PayloadStore
+
+logger = logging.getLogger(__name__)
+
+# Bump when chunking changes so stale chunk sets are re-derived instead of reused
+CHUNK_PIPELINE_VERSION = 2
+
+
+def _pack(embeddings: List[List[float]]) -> str:
+    return base64.b64encode(np.asarray(embeddings, dtype=np.float32).tobytes()).decode("ascii")
+
+
+def _unpack(packed: str, count: int) -> List[List[float]]:
+    if not count:
+        return []
+    matrix = np.frombuffer(base64.b64decode(packed), dtype=np.float32).reshape(count, -1)
+    return matrix.tolist()
+
+
+class DocumentRegistry:
+    """SHA-256 -> extracted text, storage location and chunk sets."""
+
+    def __init__(self, store: PayloadStore):
+        self.store = store
+
+    @staticmethod
+    def _document_ref(content_hash: str) -> str:
+        return f"doc/{content_hash}"
+
+    @staticmethod
+    def _chunks_ref(content_hash: str, pipeline: str) -> str:
+        return f"doc/{content_hash}/chunks/{pipeline}/v{CHUNK_PIPELINE_VERSION}"
+
+    def get_document(self, content_hash: str) -> Optional[Dict[str, Any]]:
+        """Return {"text", "storage_key", "storage_url", "filename"} for a known hash, or None."""
+        body = self.store.get(self._document_ref(content_hash))
+        return json.loads(body) if body else None
+
+    def put_document(
+        self,
+        content_hash: str,
+        text: str,
+        storage_key: Optional[str] = None,
+        storage_url: Optional[str] = None,
+        filename: Optional[str] = None,
+    ):
+        self.store.put(self._document_ref(content_hash), json.dumps({
+            "text": text,
+            "storage_key": storage_key,
+            "storage_url": storage_url,
+            "filename": filename,
+        }))
+
+    def get_chunks(self, content_hash: str, pipeline: str) -> Optional[Tuple[List[Dict[str, Any]], List[List[float]]]]:
+        """Return (content chunks, embeddings) derived by a pipeline, or None."""
+        body = self.store.get(self._chunks_ref(content_hash, pipeline))
+        if not body:
+            return None
+        entry = json.loads(body)
+        return entry["chunks"], _unpack(entry["embeddings"], len(entry["chunks"]))
+
+    def put_chunks(self, content_hash: str, pipeline: str, chunks: List[Dict[str, Any]], embeddings: List[List[float]]):
+        if len(chunks) != len(embeddings):
+            raise ValueError("Each chunk needs exactly one embedding")
+        self.store.put(self._chunks_ref(content_hash, pipeline), json.dumps({
+            "chunks": chunks,
+            "embeddings": _pack(embeddings),
+        }))
+
+
+# Singleton instance
+document_registry = DocumentRegistry(PayloadStore(settings.DOCUMENT_REGISTRY_PATH))
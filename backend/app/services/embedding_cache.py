@@ -0,0 +1,163 @@
+"""
+Persistent content-hash cache for embeddings
+
+Embeddings are keyed by (backend, model, input_type, sha256(text)) and stored as
+packed float32 or float16 blobs in a local SQLite file, so identical texts
+(re-uploaded profiles, regenerated onboarding chunks, repeated Luna
+queries, backfills) never hit Voyage twice.
+
+Eviction is least-recently-used once the cache exceeds max_entries.
+SQLite runs in WAL mode so API workers and Celery processes on the same
+host can share one cache file. The backend is the SERENE_BACKENDS mode the
+vectors came from, so fake or replayed embeddings never answer a live lookup.
+"""
+import hashlib
+import logging
+import os
+import sqlite3
+import struct
+import threading
+import time
+from typing import List, Optional, Sequence
+
+logger = logging.getLogger(__name__)
+
+_DTYPE_FORMATS = {"float32": "f", "float16": "e"}
+_SQLITE_MAX_PARAMS = 900  # Stay under SQLite's bound-parameter limit
+
+
+def content_hash(text: str) -> str:
+    """sha256 hex digest of the text."""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    """SQLite-backed LRU cache of embedding vectors."""
+
+    def __init__(self, path: str, max_entries: int = 200_000, dtype: str = "float32", backend: str = "live"):
+        if dtype not in _DTYPE_FORMATS:
+            raise ValueError(f"Unsupported embedding cache dtype: {dtype}")
+        self.path = path
+        self.max_entries = max_entries
+        self.dtype = dtype
+        self.backend = backend
+        self._format = _DTYPE_FORMATS[dtype]
+        self._local = threading.local()
+        self._write_lock = threading.Lock()
+        self._writes_since_evict = 0
+        self.hits = 0
+        self.misses = 0
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=10)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS embeddings (
+                    key TEXT PRIMARY KEY,
+                    dtype TEXT NOT NULL,
+                    vector BLOB NOT NULL,
+                    last_used REAL NOT NULL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_embeddings_last_used ON embeddings(last_used)")
+            conn.commit()
+            self._local.conn = conn
+        return conn
+
+    def make_key(self, model: str, input_type: str, text: str) -> str:
+        return f"{self.backend}:{model}:{input_type}:{content_hash(text)}"
+
+    def _pack(self, vector: Sequence[float]) -> bytes:
+        return struct.pack(f"<{len(vector)}{self._format}", *vector)
+
+    @staticmethod
+    def _unpack(blob: bytes, dtype: str) -> List[float]:
+        fmt = _DTYPE_FORMATS[dtype]
+        count = len(blob) // struct.calcsize(fmt)
+        return list(struct.unpack(f"<{count}{fmt}", blob))
+
+    def get_many(self, model: str, input_type: str, texts: Sequence[str]) -> List[Optional[List[float]]]:
+        """
+        Batch lookup.
+
+        Returns:
+            One entry per text: the cached vector, or None on a miss
+        """
+        keys = [self.make_key(model, input_type, t) for t in texts]
+        found = {}
+        conn = self._conn()
+        unique_keys = list(dict.fromkeys(keys))
+        for i in range(0, len(unique_keys), _SQLITE_MAX_PARAMS):
+            batch = unique_keys[i:i + _SQLITE_MAX_PARAMS]
+            placeholders = ",".join("?" * len(batch))
+            rows = conn.execute(
+                f"SELECT key, dtype, vector FROM embeddings WHERE key IN ({placeholders})",
+                batch,
+            ).fetchall()
+            for key, dtype, blob in rows:
+                found[key] = self._unpack(blob, dtype)
+
+        if found:
+            now = time.time()
+            with self._write_lock:
+                conn.executemany(
+                    "UPDATE embeddings SET last_used = ? WHERE key = ?",
+                    [(now, key) for key in found],
+                )
+                conn.commit()
+
+        results = [found.get(key) for key in keys]
+        hits = sum(1 for r in results if r is not None)
+        self.hits += hits
+        self.misses += len(results) - hits
+        return results
+
+    def put_many(self, model: str, input_type: str, texts: Sequence[str], vectors: Sequence[Sequence[float]]):
+        """Store vectors for texts, evicting least-recently-used entries if over capacity."""
+        if not texts:
+            return
+        now = time.time()
+        rows = [
+            (self.make_key(model, input_type, text), self.dtype, self._pack(vector), now)
+            for text, vector in zip(texts, vectors)
+        ]
+        conn = self._conn()
+        with self._write_lock:
+            conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, dtype, vector, last_used) VALUES (?, ?, ?, ?)",
+                rows,
+            )
+            conn.commit()
+            self._writes_since_evict += len(rows)
+            # Counting rows is cheap but not free - only check periodically
+            if self._writes_since_evict >= max(1, self.max_entries // 100):
+                self._writes_since_evict = 0
+                self._evict(conn)
+
+    def _evict(self, conn: sqlite3.Connection):
+        (count,) = conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()
+        excess = count - self.max_entries
+        if excess <= 0:
+            return
+        # Evict a little extra so we don't evict on every write
+        excess += self.max_entries // 20
+        conn.execute(
+            "DELETE FROM embeddings WHERE key IN (SELECT key FROM embeddings ORDER BY last_used ASC LIMIT ?)",
+            (excess,),
+        )
+        conn.commit()
+        logger.info(f"🧹 Evicted {excess} least-recently-used embeddings from cache")
+
+    def clear(self):
+        conn = self._conn()
+        with self._write_lock:
+            conn.execute("DELETE FROM embeddings")
+            conn.commit()
+
+    def __len__(self) -> int:
+        (count,) = self._conn().execute("SELECT COUNT(*) FROM embeddings").fetchone()
+        return count
@@ -0,0 +1,126 @@
+"""
+Cross-request micro-batching for single-text embeddings
+
+Partner messages and Luna queries are embedded one text at a time, from
+many concurrent requests. The dispatcher holds each call for a few
+milliseconds, coalesces everything that arrives into one Voyage request
+per input_type (up to the provider's batch limits) and resolves each
+caller's future with its own vector.
+
+Batches go through EmbeddingsService.aembed_batch, so the persistent
+cache, shared rate limiter and retries still apply. In-flight batches are capped so a burst
+cannot fan out into more concurrent Voyage requests than the rate limit
+tolerates.
+"""
+import asyncio
+import logging
+import time
+from typing import Dict, List, Optional, Tuple
+
+from app.services.embeddings_service import embeddings_service
+
+logger = logging.getLogger(__name__)
+
+# Voyage limits: 128 texts per request keeps us far below the per-request
+# token cap for voyage-3; the char budget guards against very long texts.
+MAX_BATCH_TEXTS = 128
+MAX_BATCH_CHARS = 300_000  # ~75K tokens at ~4 chars/token (limit is 120K)
+
+
+class EmbeddingDispatcher:
+    """Coalesces concurrent embed_text / embed_query calls into batched requests."""
+
+    def __init__(
+        self,
+        service=None,
+        window_ms: float = 5.0,
+        max_batch_texts: int = MAX_BATCH_TEXTS,
+        max_batch_chars: int = MAX_BATCH_CHARS,
+        max_concurrent_batches: int = 4,
+    ):
+        self.service = service or embeddings_service
+        self.window = window_ms / 1000.0
+        self.max_batch_texts = max_batch_texts
+        self.max_batch_chars = max_batch_chars
+        self.max_concurrent_batches = max_concurrent_batches
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._reset()
+        # Stats
+        self.requests = 0
+        self.batches = 0
+
+    def _reset(self):
+        """(Re)create loop-bound state - used from more than one event loop (API, Celery worker loop, tests)."""
+        self._pending: Dict[str, List[Tuple[str, asyncio.Future]]] = {}
+        self._pending_chars: Dict[str, int] = {}
+        self._timers: Dict[str, asyncio.TimerHandle] = {}
+        self._semaphore = asyncio.Semaphore(self.max_concurrent_batches)
+
+    def _bind_loop(self):
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            self._loop = loop
+            self._reset()
+        return loop
+
+    async def embed_text(self, text: str) -> List[float]:
+        """Embed a document text, batched with concurrent callers."""
+        return await self._submit(text, "document")
+
+    async def embed_query(self, text: str) -> List[float]:
+        """Embed a search query, batched with concurrent callers."""
+        return await self._submit(text, "query")
+
+    async def _submit(self, text: str, input_type: str) -> List[float]:
+        loop = self._bind_loop()
+        future = loop.create_future()
+        self.requests += 1
+
+        # Flush first if this text would push the batch over the char budget
+        if self._pending_chars.get(input_type, 0) + len(text) > self.max_batch_chars:
+            self._flush(input_type)
+
+        self._pending.setdefault(input_type, []).append((text, future))
+        self._pending_chars[input_type] = self._pending_chars.get(input_type, 0) + len(text)
+
+        if len(self._pending[input_type]) >= self.max_batch_texts:
+            self._flush(input_type)
+        elif input_type not in self._timers:
+            self._timers[input_type] = loop.call_later(self.window, self._flush, input_type)
+
+        return await future
+
+    def _flush(self, input_type: str):
+        timer = self._timers.pop(input_type, None)
+        if timer:
+            timer.cancel()
+        batch = self._pending.pop(input_type, [])
+        self._pending_chars.pop(input_type, None)
+        if batch:
+            asyncio.get_running_loop().create_task(self._run_batch(batch, input_type))
+
+    async def _run_batch(self, batch: List[Tuple[str, asyncio.Future]], input_type: str):
+        texts = [text for text, _ in batch]
+        async with self._semaphore:
+            start = time.perf_counter()
+            try:
+                vectors = await self.service.aembed_batch(texts, input_type)
+            except Exception as e:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                return
+
+        self.batches += 1
+        if len(batch) > 1:
+            logger.debug(
+                f"Coalesced {len(batch)} {input_type} embeddings into one request "
+                f"({time.perf_counter() - start:.3f}s)"
+            )
+        for (_, future), vector in zip(batch, vectors):
+            if not future.done():
+                future.set_result(vector)
+
+
+# Singleton instance
+embedding_dispatcher = EmbeddingDispatcher()
@@ -1,12 +1,15 @@
 """
 Voyage AI embeddings service for generating 1024-dimensional vectors
 """
+import asyncio
 import logging
-import time
+import random
 from voyageai import Client as VoyageClient
 from voyageai.error import RateLimitError
-from typing import List
+from typing import List, Optional
 from app.config import settings
+from app.services.embedding_cache import EmbeddingCache
+from app.services.rate_limiter import SharedRateLimiter
 
 logger = logging.getLogger(__name__)
 
@@ -16,12 +19,55 @@ class EmbeddingsService:
     def __init__(self):
         self.client = VoyageClient(api_key=settings.VOYAGE_API_KEY)
         self.model = "voyage-3"  # 1024 dimensions
+        self.cache: Optional[EmbeddingCache] = None
+        if settings.EMBEDDING_CACHE_ENABLED:
+            self.cache = EmbeddingCache(
+                settings.EMBEDDING_CACHE_PATH,
+                max_entries=settings.EMBEDDING_CACHE_MAX_ENTRIES,
+                dtype=settings.EMBEDDING_CACHE_DTYPE,
+            )
+        # Shared across every API worker and Celery process via Redis
+        self.rate_limiter = SharedRateLimiter(
+            "voyage",
+            {
+                "requests": (settings.VOYAGE_RPM, settings.VOYAGE_RPM / 60.0),
+                "tokens": (settings.VOYAGE_TPM, settings.VOYAGE_TPM / 60.0),
+            },
+            redis_url=settings.REDIS_URL,
+            reserve_fraction=settings.VOYAGE_BULK_RESERVE,
+        )
         logger.info("✅ Initialized Voyage embeddings service")
     
-    def _embed_with_retry(self, texts: List[str], input_type: str = "document", max_retries: int = 3, initial_delay: float = 1.0):
-        """Embed with exponential backoff retry for rate limits"""
-        delay = initial_delay
+    @staticmethod
+    def estimate_tokens(texts: List[str]) -> int:
+        """Rough token count for rate limiting (~4 chars/token)"""
+        return sum(len(t) for t in texts) // 4 + len(texts)
+
+    def _costs(self, texts: List[str]) -> dict:
+        return {"requests": 1, "tokens": self.estimate_tokens(texts)}
+
+    @staticmethod
+    def _retry_delay(error: RateLimitError, fallback: float) -> float:
+        """Honour the provider's Retry-After header, else exponential backoff, plus jitter"""
+        retry_after = None
+        try:
+            retry_after = float((getattr(error, "headers", None) or {}).get("retry-after"))
+        except (TypeError, ValueError):
+            pass
+        delay = retry_after if retry_after is not None else fallback
+        return delay + random.uniform(0, delay * 0.25)
+
+    def _embed_with_retry(
+        self,
+        texts: List[str],
+        input_type: str = "document",
+        max_retries: int = 3,
+        initial_delay: float = 1.0,
+        priority: str = "interactive",
+    ):
+        """Embed with shared rate limiting and Retry-After aware backoff (blocking; run off the event loop)"""
         for attempt in range(max_retries):
+            self.rate_limiter.acquire_blocking(self._costs(texts), priority=priority)
             try:
                 result = self.client.embed(
                     texts=texts,
@@ -31,29 +77,106 @@ class EmbeddingsService:
                 return result.embeddings
             except RateLimitError as e:
                 if attempt < max_retries - 1:
-                    wait_time = delay * (2 ** attempt)  # Exponential backoff
+                    wait_time = self._retry_delay(e, initial_delay * (2 ** attempt))
                     logger.warning(f"⚠️ Rate limit hit (attempt {attempt + 1}/{max_retries}). Waiting {wait_time:.1f}s before retry...")
-                    time.sleep(wait_time)
+                    # Blocks every worker, not just this one - the next acquire waits it out
+                    self.rate_limiter.penalize(wait_time)
                 else:
                     logger.error(f"❌ Rate limit exceeded after {max_retries} attempts: {e}")
                     raise
             except Exception as e:
                 logger.error(f"❌ Error generating embedding: {e}")
                 raise
-    
+
+    async def _aembed_with_retry(
+        self,
+        texts: List[str],
+        input_type: str = "document",
+        max_retries: int = 3,
+        initial_delay: float = 1.0,
+        priority: str = "interactive",
+    ):
+        """Async _embed_with_retry: rate-limit waits and backoff never block the event loop"""
+        for attempt in range(max_retries):
+            await self.rate_limiter.acquire(self._costs(texts), priority=priority)
+            try:
+                result = await asyncio.to_thread(
+                    self.client.embed, texts=texts, model=self.model, input_type=input_type
+                )
+                return result.embeddings
+            except RateLimitError as e:
+                if attempt < max_retries - 1:
+                    wait_time = self._retry_delay(e, initial_delay * (2 ** attempt))
+                    logger.warning(f"⚠️ Rate limit hit (attempt {attempt + 1}/{max_retries}). Waiting {wait_time:.1f}s before retry...")
+                    await self.rate_limiter.apenalize(wait_time)
+                else:
+                    logger.error(f"❌ Rate limit exceeded after {max_retries} attempts: {e}")
+                    raise
+            except Exception as e:
+                logger.error(f"❌ Error generating embedding: {e}")
+                raise
+
+    def _cache_lookup(self, texts: List[str], input_type: str) -> List[Optional[List[float]]]:
+        try:
+            return self.cache.get_many(self.model, input_type, texts)
+        except Exception as e:
+            logger.warning(f"⚠️ Embedding cache lookup failed: {e}")
+            return [None] * len(texts)
+
+    def _cache_store(self, texts: List[str], input_type: str, vectors: List[List[float]]):
+        try:
+            self.cache.put_many(self.model, input_type, texts, vectors)
+        except Exception as e:
+            logger.warning(f"⚠️ Embedding cache write failed: {e}")
+
+    def _embed_cached(self, texts: List[str], input_type: str, priority: str = "interactive") -> List[List[float]]:
+        """Serve texts from the embedding cache, embedding only the misses"""
+        if self.cache is None:
+            return self._embed_with_retry(texts, input_type=input_type, priority=priority)
+
+        cached = self._cache_lookup(texts, input_type)
+
+        # Embed each distinct missing text once
+        missing = list(dict.fromkeys(t for t, v in zip(texts, cached) if v is None))
+        if missing:
+            fresh = dict(zip(missing, self._embed_with_retry(missing, input_type=input_type, priority=priority)))
+            self._cache_store(missing, input_type, [fresh[t] for t in missing])
+            cached = [v if v is not None else fresh[t] for t, v in zip(texts, cached)]
+        else:
+            logger.debug(f"Embedding cache hit for all {len(texts)} texts")
+        return cached
+
+    async def _aembed_cached(self, texts: List[str], input_type: str, priority: str = "interactive") -> List[List[float]]:
+        """Async _embed_cached"""
+        if self.cache is None:
+            return await self._aembed_with_retry(texts, input_type=input_type, priority=priority)
+
+        cached = await asyncio.to_thread(self._cache_lookup, texts, input_type)
+        missing = list(dict.fromkeys(t for t, v in zip(texts, cached) if v is None))
+        if missing:
+            fresh = dict(zip(missing, await self._aembed_with_retry(missing, input_type=input_type, priority=priority)))
+            await asyncio.to_thread(self._cache_store, missing, input_type, [fresh[t] for t in missing])
+            cached = [v if v is not None else fresh[t] for t, v in zip(texts, cached)]
+        return cached
+
     def embed_text(self, text: str) -> List[float]:
         """Generate embedding for a single text"""
         try:
-            embeddings = self._embed_with_retry([text], input_type="document")
+            embeddings = self._embed_cached([text], input_type="document")
             return embeddings[0]
         except Exception as e:
             logger.error(f"❌ Error generating embedding: {e}")
             raise
     
-    def embed_batch(self, texts: List[str]) -> List[List[float]]:
-        """Generate embeddings for multiple texts"""
+    def embed_batch(self, texts: List[str], input_type: str = "document", priority: str = "interactive") -> List[List[float]]:
+        """
+        Generate embeddings for multiple texts (input_type="query" for search queries).
+
+        Pass priority="bulk" for ingestion/backfills so they leave rate-limit
+        headroom for interactive callers.
+        """
         try:
-            return self._embed_with_retry(texts, input_type="document")
+            return self._embed_cached(texts, input_type=input_type, priority=priority)
         except Exception as e:
             logger.error(f"❌ Error generating batch embeddings: {e}")
             raise
@@ -61,12 +184,25 @@ class EmbeddingsService:
     def embed_query(self, text: str) -> List[float]:
         """Generate embedding for a query (optimized for search)"""
         try:
-            embeddings = self._embed_with_retry([text], input_type="query")
+            embeddings = self._embed_cached([text], input_type="query")
             return embeddings[0]
         except Exception as e:
             logger.error(f"❌ Error generating query embedding: {e}")
             raise
 
+    async def aembed_batch(self, texts: List[str], input_type: str = "document", priority: str = "interactive") -> List[List[float]]:
+        """Async embed_batch - waits for rate-limit capacity without blocking the event loop"""
+        try:
+            return await self._aembed_cached(texts, input_type=input_type, priority=priority)
+        except Exception as e:
+            logger.error(f"❌ Error generating batch embeddings: {e}")
+            raise
+
+    async def aembed_query(self, text: str) -> List[float]:
+        """Async embed_query"""
+        embeddings = await self.aembed_batch([text], input_type="query")
+        return embeddings[0]
+
 # Singleton instance
 embeddings_service = EmbeddingsService()
 
@@ -0,0 +1,455 @@
+"""
+Priority lanes and per-relationship fair scheduling for background tasks
+
+Post-fight analysis, digest fan-out and Gottman backfills used to go
+straight into FIFO Celery queues, so one couple's 200-conflict backfill
+could hold every worker slot while another couple's just-finished fight
+waited behind it. Jobs are now submitted here first and only handed to
+Celery when they may run:
+
+- Lanes: "interactive" > "scheduled" > "backfill". Each lane is its own
+  Celery queue, and workers consume them in that order (see celery_app).
+- Per-relationship caps: a relationship never has more than per_tenant
+  jobs in flight in a lane. A lane can also cap its total in-flight jobs
+  (max_in_flight), so backfills can't take every worker slot.
+- Weighted fair queuing across relationships: each relationship with
+  queued work has a virtual start tag; claim() hands out the job of the
+  lowest-tagged relationship that is under its cap and advances that tag by
+  1/weight. A relationship arriving with new work starts at the current
+  virtual time, so idle time doesn't build up credit.
+- In-flight slots are leases (lease_seconds), so a worker that dies
+  without reporting back can't hold a slot forever.
+- Queue wait (submit to task start) is recorded per lane as a histogram,
+  alongside queue depth, for GET /api/health/queues.
+
+State lives in Redis, shared by the API and every worker. Without a
+redis_url (local dev, tests) it's kept in-process instead. When a configured
+Redis is unreachable, calls raise SchedulerUnavailable rather than parking
+jobs in one process's memory, where the workers that run and release them
+could never see them; lanes.submit() then sends the job straight to its
+Celery queue.
+
+Key namespace: serene:sched:{lane}:... and serene:sched:job:{job_id}
+"""
+import json
+import logging
+import threading
+import time
+import uuid
+from collections import deque
+from typing import Any, Dict, List, NamedTuple, Optional
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+LANES = ("interactive", "scheduled", "backfill")  # Highest priority first
+REDIS_RETRY_SECONDS = 30.0
+JOB_TTL_SECONDS = 24 * 3600
+
+# Queue-wait histogram bucket upper bounds, in seconds
+WAIT_BUCKETS_SECONDS = (1, 5, 15, 60, 300, 900, 3600)
+WAIT_LABELS = [f"<={b}s" for b in WAIT_BUCKETS_SECONDS] + [f">{WAIT_BUCKETS_SECONDS[-1]}s"]
+
+# KEYS: tenants zset, tenant queue, vclock, job key
+# ARGV: tenant, job json, job ttl
+_ENQUEUE_SCRIPT = """
+redis.call('RPUSH', KEYS[2], ARGV[2])
+redis.call('SET', KEYS[4], ARGV[2], 'EX', tonumber(ARGV[3]))
+if not redis.call('ZSCORE', KEYS[1], ARGV[1]) then
+    redis.call('ZADD', KEYS[1], tonumber(redis.call('GET', KEYS[3]) or '0'), ARGV[1])
+end
+return redis.call('LLEN', KEYS[2])
+"""
+
+# KEYS: tenants zset, vclock, lane in-flight zset
+# ARGV: now, lease seconds, per-tenant cap, lane cap (0 = none), lane key prefix
+# Returns the claimed job json, or false when nothing may run
+_CLAIM_SCRIPT = """
+local now = tonumber(ARGV[1])
+local lease = tonumber(ARGV[2])
+local cap = tonumber(ARGV[3])
+local limit = tonumber(ARGV[4])
+local prefix = ARGV[5]
+redis.call('ZREMRANGEBYSCORE', KEYS[3], '-inf', now)
+if limit > 0 and redis.call('ZCARD', KEYS[3]) >= limit then
+    return false
+end
+local tenants = redis.call('ZRANGE', KEYS[1], 0, -1, 'WITHSCORES')
+for i = 1, #tenants, 2 do
+    local tenant = tenants[i]
+    local tag = tonumber(tenants[i + 1])
+    local running = prefix .. ':running:' .. tenant
+    local queue = prefix .. ':q:' .. tenant
+    redis.call('ZREMRANGEBYSCORE', running, '-inf', now)
+    if redis.call('ZCARD', running) < cap then
+        local job = redis.call('LPOP', queue)
+        if job then
+            local decoded = cjson.decode(job)
+            redis.call('ZADD', running, now + lease, decoded['id'])
+            redis.call('EXPIRE', running, math.ceil(lease) + 60)
+            redis.call('ZADD', KEYS[3], now + lease, decoded['id'])
+            redis.call('SET', KEYS[2], tag)
+            if redis.call('LLEN', queue) > 0 then
+                redis.call('ZADD', KEYS[1], tag + 1 / (tonumber(decoded['weight']) or 1), tenant)
+            else
+                redis.call('ZREM', KEYS[1], tenant)
+            end
+            return job
+        end
+        redis.call('ZREM', KEYS[1], tenant)
+    end
+end
+return false
+"""
+
+
+class SchedulerUnavailable(RuntimeError):
+    """The scheduler's Redis is configured but unreachable."""
+
+
+class LaneLimits(NamedTuple):
+    per_tenant: int  # Jobs in flight per relationship
+    max_in_flight: int = 0  # Jobs in flight across the lane (0 = no cap)
+
+
+class _LocalLane:
+    """In-process equivalent of one lane's Redis keys."""
+
+    def __init__(self):
+        self.tenants: Dict[str, float] = {}
+        self.queues: Dict[str, deque] = {}
+        self.vclock = 0.0
+        self.running: Dict[str, Dict[str, float]] = {}
+        self.in_flight: Dict[str, float] = {}
+
+
+class FairScheduler:
+    """
+    Lane-aware, per-relationship fair job queue shared across processes via Redis.
+
+    Args:
+        lanes: {lane: LaneLimits}
+        redis_url: Redis URL, or None for in-process state only
+        lease_seconds: How long a claimed job holds its slot without finishing
+    """
+
+    def __init__(
+        self,
+        lanes: Dict[str, LaneLimits],
+        redis_url: Optional[str] = None,
+        lease_seconds: float = 900.0,
+        prefix: str = "serene:sched",
+    ):
+        self.lanes = lanes
+        self.redis_url = redis_url
+        self.lease_seconds = lease_seconds
+        self.prefix = prefix
+        self._redis_retry_at = 0.0
+        self._redis = None
+        # In-process fallback state
+        self._lock = threading.Lock()
+        self._local = {lane: _LocalLane() for lane in lanes}
+        self._local_jobs: Dict[str, dict] = {}
+        self._local_waits = {lane: self._empty_waits() for lane in lanes}
+
+    # --- Keys and helpers ---
+
+    def _lane_key(self, lane: str) -> str:
+        return f"{self.prefix}:{lane}"
+
+    def _job_key(self, job_id: str) -> str:
+        return f"{self.prefix}:job:{job_id}"
+
+    @staticmethod
+    def _empty_waits() -> dict:
+        return {"count": 0, "sum_seconds": 0.0, **{label: 0 for label in WAIT_LABELS}}
+
+    @staticmethod
+    def _wait_label(seconds: float) -> str:
+        for bound, label in zip(WAIT_BUCKETS_SECONDS, WAIT_LABELS):
+            if seconds <= bound:
+                return label
+        return WAIT_LABELS[-1]
+
+    def _check_lane(self, lane: str):
+        if lane not in self.lanes:
+            raise ValueError(f"Unknown lane {lane!r} (expected one of {list(self.lanes)})")
+
+    def _on_redis_error(self, e: Exception) -> SchedulerUnavailable:
+        logger.warning(f"⚠️ Fair scheduler Redis unavailable ({e}), retrying in {REDIS_RETRY_SECONDS:.0f}s")
+        self._redis = None
+        self._redis_retry_at = time.monotonic() + REDIS_RETRY_SECONDS
+        return SchedulerUnavailable(f"Fair scheduler Redis unavailable: {e}")
+
+    def _client(self):
+        """
+        Redis client, or None when the scheduler runs on in-process state.
+
+        Raises:
+            SchedulerUnavailable: Redis failed within the last REDIS_RETRY_SECONDS
+        """
+        if self.redis_url is None:
+            return None
+        if time.monotonic() < self._redis_retry_at:
+            raise SchedulerUnavailable("Fair scheduler Redis unavailable")
+        if self._redis is None:
+            import redis
+            self._redis = redis.Redis.from_url(self.redis_url, socket_connect_timeout=2, socket_timeout=2)
+        return self._redis
+
+    # --- In-process equivalents of the scripts ---
+
+    def _enqueue_local(self, lane: str, tenant: str, job: dict):
+        state = self._local[lane]
+        with self._lock:
+            state.queues.setdefault(tenant, deque()).append(job)
+            state.tenants.setdefault(tenant, state.vclock)
+            self._local_jobs[job["id"]] = job
+
+    def _claim_local(self, lane: str, now: float) -> Optional[dict]:
+        state, limits = self._local[lane], self.lanes[lane]
+        with self._lock:
+            state.in_flight = {j: exp for j, exp in state.in_flight.items() if exp > now}
+            if limits.max_in_flight and len(state.in_flight) >= limits.max_in_flight:
+                return None
+            for tenant, tag in sorted(state.tenants.items(), key=lambda item: item[1]):
+                running = {j: exp for j, exp in state.running.get(tenant, {}).items() if exp > now}
+                state.running[tenant] = running
+                if len(running) >= limits.per_tenant:
+                    continue
+                queue = state.queues.get(tenant)
+                if not queue:
+                    del state.tenants[tenant]
+                    continue
+                job = queue.popleft()
+                running[job["id"]] = now + self.lease_seconds
+                state.in_flight[job["id"]] = now + self.lease_seconds
+                state.vclock = tag
+                if queue:
+                    state.tenants[tenant] = tag + 1 / job.get("weight", 1.0)
+                else:
+                    del state.tenants[tenant]
+                    del state.queues[tenant]
+                return job
+        return None
+
+    def _release_local(self, lane: str, tenant: str, job_id: str):
+        state = self._local[lane]
+        with self._lock:
+            state.running.get(tenant, {}).pop(job_id, None)
+            state.in_flight.pop(job_id, None)
+            self._local_jobs.pop(job_id, None)
+
+    # --- Public API ---
+
+    def enqueue(
+        self,
+        lane: str,
+        tenant: str,
+        task: str,
+        kwargs: Dict[str, Any],
+        weight: float = 1.0,
+        job_id: Optional[str] = None,
+    ) -> dict:
+        """
+        Queue a job for a relationship in a lane.
+
+        Args:
+            lane: "interactive", "scheduled" or "backfill"
+            tenant: Relationship the job belongs to (caps and fairness are per tenant)
+            task: Celery task name
+            kwargs: Task keyword arguments (JSON-serializable)
+            weight: Relative share of the lane for this tenant's jobs
+            job_id: Id to use (becomes the Celery task id), generated if omitted
+
+        Returns:
+            The queued job
+        """
+        self._check_lane(lane)
+        job = {
+            "id": job_id or str(uuid.uuid4()),
+            "lane": lane,
+            "tenant": tenant,
+            "task": task,
+            "kwargs": kwargs,
+            "weight": weight,
+            "enqueued_at": time.time(),
+        }
+        client = self._client()
+        if client is not None:
+            try:
+                base = self._lane_key(lane)
+                client.eval(
+                    _ENQUEUE_SCRIPT, 4, f"{base}:tenants", f"{base}:q:{tenant}", f"{base}:vclock",
+                    self._job_key(job["id"]), tenant, json.dumps(job, default=str), JOB_TTL_SECONDS,
+                )
+                return job
+            except Exception as e:
+                raise self._on_redis_error(e) from e
+        self._enqueue_local(lane, tenant, job)
+        return job
+
+    def claim(self, lane: str) -> Optional[dict]:
+        """Take the next job allowed to run in a lane (holding its slot), or None."""
+        self._check_lane(lane)
+        limits = self.lanes[lane]
+        now = time.time()
+        client = self._client()
+        if client is not None:
+            try:
+                base = self._lane_key(lane)
+                raw = client.eval(
+                    _CLAIM_SCRIPT, 3, f"{base}:tenants", f"{base}:vclock", f"{base}:in_flight",
+                    now, self.lease_seconds, limits.per_tenant, limits.max_in_flight, base,
+                )
+                return json.loads(raw) if raw else None
+            except Exception as e:
+                raise self._on_redis_error(e) from e
+        return self._claim_local(lane, now)
+
+    def claim_all(self, lane: str) -> List[dict]:
+        """Every job currently allowed to run in a lane, in fair order."""
+        jobs = []
+        while True:
+            job = self.claim(lane)
+            if job is None:
+                return jobs
+            jobs.append(job)
+
+    def job(self, job_id: str) -> Optional[dict]:
+        client = self._client()
+        if client is not None:
+            try:
+                raw = client.get(self._job_key(job_id))
+                return json.loads(raw) if raw else None
+            except Exception as e:
+                raise self._on_redis_error(e) from e
+        return self._local_jobs.get(job_id)
+
+    def started(self, job_id: str) -> Optional[float]:
+        """
+        Record that a job's task started.
+
+        Returns:
+            Seconds the job waited since enqueue (None for jobs not scheduled
+            here, or retries of a job that already started)
+        """
+        job = self.job(job_id)
+        if not job or job.get("started_at"):
+            return None
+        job["started_at"] = time.time()
+        waited = max(0.0, job["started_at"] - job["enqueued_at"])
+        label = self._wait_label(waited)
+        client = self._client()
+        if client is not None:
+            try:
+                waits = f"{self._lane_key(job['lane'])}:waits"
+                pipe = client.pipeline()
+                pipe.set(self._job_key(job_id), json.dumps(job), ex=JOB_TTL_SECONDS)
+                pipe.hincrby(waits, label, 1)
+                pipe.hincrby(waits, "count", 1)
+                pipe.hincrbyfloat(waits, "sum_seconds", waited)
+                pipe.execute()
+                return waited
+            except Exception as e:
+                raise self._on_redis_error(e) from e
+        with self._lock:
+            self._local_jobs[job_id] = job
+            waits = self._local_waits[job["lane"]]
+            waits[label] += 1
+            waits["count"] += 1
+            waits["sum_seconds"] += waited
+        return waited
+
+    def finish(self, job_id: str) -> Optional[str]:
+        """
+        Release a finished job's slot.
+
+        Returns:
+            The job's lane (so the caller can dispatch more), or None if unknown
+
+        Raises:
+            SchedulerUnavailable: Redis is down (the slot frees when its lease expires)
+        """
+        job = self.job(job_id)
+        if not job:
+            return None
+        lane, tenant = job["lane"], job["tenant"]
+        client = self._client()
+        if client is not None:
+            try:
+                base = self._lane_key(lane)
+                pipe = client.pipeline()
+                pipe.zrem(f"{base}:running:{tenant}", job_id)
+                pipe.zrem(f"{base}:in_flight", job_id)
+                pipe.delete(self._job_key(job_id))
+                pipe.execute()
+                return lane
+            except Exception as e:
+                raise self._on_redis_error(e) from e
+        self._release_local(lane, tenant, job_id)
+        return lane
+
+    def get_metrics(self) -> dict:
+        """Per-lane queue depth, in-flight jobs and queue-wait histograms."""
+        now = time.time()
+        lanes = {}
+        try:
+            client = self._client()
+        except SchedulerUnavailable:
+            return {"backend": "unavailable", "lanes": lanes}
+        for lane, limits in self.lanes.items():
+            if client is not None:
+                try:
+                    base = self._lane_key(lane)
+                    tenants = [t.decode() if isinstance(t, bytes) else t for t in client.zrange(f"{base}:tenants", 0, -1)]
+                    pipe = client.pipeline()
+                    for tenant in tenants:
+                        pipe.llen(f"{base}:q:{tenant}")
+                    pipe.zcount(f"{base}:in_flight", now, "+inf")
+                    pipe.hgetall(f"{base}:waits")
+                    *depths, in_flight, raw_waits = pipe.execute()
+                    waits = self._empty_waits()
+                    for key, value in raw_waits.items():
+                        key = key.decode() if isinstance(key, bytes) else key
+                        waits[key] = float(value) if key == "sum_seconds" else int(value)
+                    metrics = {"queued": sum(depths), "queued_tenants": len(tenants), "in_flight": in_flight, "waits": waits}
+                except Exception as e:
+                    self._on_redis_error(e)
+                    return {"backend": "unavailable", "lanes": lanes}
+            else:
+                state = self._local[lane]
+                with self._lock:
+                    metrics = {
+                        "queued": sum(len(q) for q in state.queues.values()),
+                        "queued_tenants": len(state.tenants),
+                        "in_flight": sum(1 for exp in state.in_flight.values() if exp > now),
+                        "waits": dict(self._local_waits[lane]),
+                    }
+            waits = metrics.pop("waits")
+            count = waits.pop("count")
+            total = waits.pop("sum_seconds")
+            lanes[lane] = {
+                **metrics,
+                "per_tenant_limit": limits.per_tenant,
+                "max_in_flight": limits.max_in_flight or None,
+                "queue_wait": {
+                    "count": count,
+                    "avg_seconds": round(total / count, 2) if count else None,
+                    "buckets": {label: waits.get(label, 0) for label in WAIT_LABELS},
+                },
+            }
+        return {"backend": "redis" if client is not None else "local", "lanes": lanes}
+
+
+# Singleton instance
+fair_scheduler = FairScheduler(
+    lanes={
+        "interactive": LaneLimits(settings.INTERACTIVE_TENANT_CONCURRENCY),
+        "scheduled": LaneLimits(settings.SCHEDULED_TENANT_CONCURRENCY),
+        "backfill": LaneLimits(settings.BACKFILL_TENANT_CONCURRENCY, settings.BACKFILL_MAX_IN_FLIGHT),
+    },
+    redis_url=settings.REDIS_URL,
+    lease_seconds=settings.TASK_LEASE_SECONDS,
+)
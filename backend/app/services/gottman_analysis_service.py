@@ -742,6 +742,23 @@ Return your analysis:"""
             logger.error(f"❌ Backfill failed: {str(e)}")
             raise
 
+    async def backfill_conflict(
+        self,
+        relationship_id: str,
+        conflict_id: str,
+        include_enrichment: bool = True
+    ) -> Dict[str, Any]:
+        """
+        Backfill one conflict (a job on the backfill lane, see app/tasks/backfill_tasks.py).
+        """
+        partner_names = db_service.get_partner_names(relationship_id)
+        return await self._analyze_single_conflict(
+            conflict={"id": conflict_id},
+            relationship_id=relationship_id,
+            partner_names=partner_names,
+            include_enrichment=include_enrichment
+        )
+
     async def backfill_async_background(
         self,
         relationship_id: str,
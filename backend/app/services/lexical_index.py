@@ -0,0 +1,256 @@
+"""
+Local BM25 index over transcript, profile and book chunks
+
+Dense retrieval misses exact-term matches ("the dishes", a friend's name,
+a restaurant), which Luna queries are full of. This module keeps an
+in-memory inverted index per relationship (plus one shared index for
+books), updated incrementally whenever vectors are upserted to Pinecone,
+and reciprocal_rank_fusion() merges its results with the vector results.
+
+Indexes are per process. A relationship that hasn't been seen yet is
+bootstrapped once from Pinecone metadata in the background (see
+TranscriptRAGSystem); until then lexical retrieval simply contributes
+nothing.
+"""
+import heapq
+import logging
+import math
+import re
+import threading
+from collections import Counter, OrderedDict
+from typing import Any, Callable, Dict, Hashable, Iterable, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Namespaces with a lexical index, and the metadata field holding their text
+INDEXED_NAMESPACES = {
+    "transcript_chunks": "text",
+    "profiles": "extracted_text",
+    "books": "text",
+}
+# Books are shared reference material, not per-relationship data
+SHARED_NAMESPACES = {"books"}
+SHARED_SCOPE = "__shared__"
+
+_TOKEN_RE = re.compile(r"[a-z0-9']+")
+_STOPWORDS = frozenset("""
+a about after again all am an and any are as at be because been before being but by can could did do
+does doing don't for from had has have having he her here hers him his how i i'm if in into is it it's
+its just me more most my no not of off on once only or other our out over own same she should so some
+such than that the their them then there these they this those through to too under until up very was
+we were what when where which while who why will with would you your yours
+""".split())
+
+
+def _singular(token: str) -> str:
+    if len(token) <= 3:
+        return token
+    if token.endswith("ies"):
+        return token[:-3] + "y"
+    if token.endswith(("shes", "ches", "xes", "sses")):
+        return token[:-2]
+    if token.endswith("s") and not token.endswith("ss"):
+        return token[:-1]
+    return token
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase word tokens without stopwords, possessives or plurals."""
+    tokens = []
+    for token in _TOKEN_RE.findall(text.lower()):
+        if token.endswith("'s"):
+            token = token[:-2]
+        token = token.strip("'")
+        if not token or token in _STOPWORDS:
+            continue
+        tokens.append(_singular(token))
+    return tokens
+
+
+class BM25Index:
+    """Incrementally updatable Okapi BM25 index."""
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self._postings: Dict[str, Dict[str, int]] = {}
+        self._doc_lengths: Dict[str, int] = {}
+        self._doc_terms: Dict[str, Counter] = {}
+        self.metadata: Dict[str, Dict[str, Any]] = {}
+        self._total_length = 0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._doc_lengths)
+
+    def __contains__(self, doc_id: str) -> bool:
+        return doc_id in self._doc_lengths
+
+    def _remove_locked(self, doc_id: str):
+        terms = self._doc_terms.pop(doc_id, None)
+        if terms is None:
+            return
+        for term in terms:
+            postings = self._postings.get(term)
+            if postings is not None:
+                postings.pop(doc_id, None)
+                if not postings:
+                    del self._postings[term]
+        self._total_length -= self._doc_lengths.pop(doc_id)
+        self.metadata.pop(doc_id, None)
+
+    def add(self, doc_id: str, text: str, metadata: Optional[Dict[str, Any]] = None):
+        """Index a document, replacing any previous version with the same id."""
+        terms = Counter(tokenize(text))
+        with self._lock:
+            self._remove_locked(doc_id)
+            self._doc_terms[doc_id] = terms
+            self._doc_lengths[doc_id] = sum(terms.values())
+            self._total_length += self._doc_lengths[doc_id]
+            self.metadata[doc_id] = metadata or {}
+            for term, tf in terms.items():
+                self._postings.setdefault(term, {})[doc_id] = tf
+
+    def remove(self, doc_id: str):
+        with self._lock:
+            self._remove_locked(doc_id)
+
+    def search(
+        self,
+        query: str,
+        top_k: int = 10,
+        predicate: Optional[Callable[[Dict[str, Any]], bool]] = None,
+    ) -> List[Tuple[str, float]]:
+        """
+        Score documents against the query.
+
+        Args:
+            query: Free-text query
+            top_k: Maximum results
+            predicate: Optional metadata filter (e.g. exclude the current conflict)
+
+        Returns:
+            [(doc_id, score)] best first
+        """
+        query_terms = set(tokenize(query))
+        with self._lock:
+            n_docs = len(self._doc_lengths)
+            if not n_docs or not query_terms:
+                return []
+            avg_length = self._total_length / n_docs or 1.0
+            scores: Dict[str, float] = {}
+            for term in query_terms:
+                postings = self._postings.get(term)
+                if not postings:
+                    continue
+                idf = math.log(1 + (n_docs - len(postings) + 0.5) / (len(postings) + 0.5))
+                for doc_id, tf in postings.items():
+                    norm = self.k1 * (1 - self.b + self.b * self._doc_lengths[doc_id] / avg_length)
+                    scores[doc_id] = scores.get(doc_id, 0.0) + idf * tf * (self.k1 + 1) / (tf + norm)
+            if predicate is not None:
+                scores = {d: s for d, s in scores.items() if predicate(self.metadata[d])}
+        return heapq.nlargest(top_k, scores.items(), key=lambda item: item[1])
+
+
+class LexicalIndexService:
+    """Per-relationship BM25 indexes, kept in sync with Pinecone upserts."""
+
+    def __init__(self, max_scopes: int = 512):
+        self.max_scopes = max_scopes
+        self._indexes: "OrderedDict[Tuple[str, str], BM25Index]" = OrderedDict()
+        self._bootstrapped: set = set()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _scope(namespace: str, relationship_id: Optional[str]) -> str:
+        return SHARED_SCOPE if namespace in SHARED_NAMESPACES else (relationship_id or "")
+
+    def get_index(self, namespace: str, relationship_id: Optional[str] = None, create: bool = False) -> Optional[BM25Index]:
+        key = (namespace, self._scope(namespace, relationship_id))
+        with self._lock:
+            index = self._indexes.get(key)
+            if index is None and create:
+                index = self._indexes[key] = BM25Index()
+                while len(self._indexes) > self.max_scopes:
+                    evicted, _ = self._indexes.popitem(last=False)
+                    self._bootstrapped.discard(evicted)
+            if index is not None:
+                self._indexes.move_to_end(key)
+            return index
+
+    def index_vectors(self, namespace: str, vectors: Iterable[Dict[str, Any]]) -> int:
+        """
+        Index the text of vectors being upserted to Pinecone.
+
+        Call alongside every index.upsert() into an indexed namespace.
+
+        Returns:
+            Number of documents indexed
+        """
+        text_field = INDEXED_NAMESPACES.get(namespace)
+        if text_field is None:
+            return 0
+        count = 0
+        try:
+            for vector in vectors:
+                metadata = vector.get("metadata") or {}
+                text = metadata.get(text_field) or metadata.get("text") or ""
+                if not text:
+                    continue
+                index = self.get_index(namespace, metadata.get("relationship_id"), create=True)
+                index.add(vector["id"], text, metadata)
+                count += 1
+        except Exception as e:
+            # Lexical retrieval is best-effort - never fail an upsert over it
+            logger.warning(f"⚠️ Lexical indexing failed for {namespace}: {e}")
+        return count
+
+    def remove(self, namespace: str, ids: Sequence[str], relationship_id: Optional[str] = None):
+        index = self.get_index(namespace, relationship_id)
+        if index is not None:
+            for doc_id in ids:
+                index.remove(doc_id)
+
+    def search(
+        self,
+        namespace: str,
+        query: str,
+        relationship_id: Optional[str] = None,
+        top_k: int = 10,
+        predicate: Optional[Callable[[Dict[str, Any]], bool]] = None,
+    ) -> List[Tuple[str, float, Dict[str, Any]]]:
+        """BM25 search within one namespace/relationship. Returns [(doc_id, score, metadata)]."""
+        index = self.get_index(namespace, relationship_id)
+        if index is None:
+            return []
+        return [(doc_id, score, index.metadata.get(doc_id, {})) for doc_id, score in index.search(query, top_k, predicate)]
+
+    def needs_bootstrap(self, namespace: str, relationship_id: Optional[str] = None) -> bool:
+        return (namespace, self._scope(namespace, relationship_id)) not in self._bootstrapped
+
+    def mark_bootstrapped(self, namespace: str, relationship_id: Optional[str] = None):
+        self._bootstrapped.add((namespace, self._scope(namespace, relationship_id)))
+
+
+def reciprocal_rank_fusion(
+    ranked_lists: Sequence[Sequence[Hashable]],
+    k: int = 60,
+) -> List[Tuple[Hashable, float, int]]:
+    """
+    Fuse ranked lists of ids with reciprocal rank fusion.
+
+    Returns:
+        [(id, rrf_score, number_of_lists_containing_id)] best first
+    """
+    scores: Dict[Hashable, float] = {}
+    votes: Dict[Hashable, int] = {}
+    for ranked in ranked_lists:
+        for rank, item in enumerate(ranked):
+            scores[item] = scores.get(item, 0.0) + 1.0 / (k + rank + 1)
+            votes[item] = votes.get(item, 0) + 1
+    fused = sorted(scores, key=lambda item: scores[item], reverse=True)
+    return [(item, scores[item], votes[item]) for item in fused]
+
+
+# Singleton instance
+lexical_index_service = LexicalIndexService()
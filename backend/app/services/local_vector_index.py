@@ -0,0 +1,470 @@
+"""
+Embedded vector index for single-node deployments
+
+A drop-in replacement for the Pinecone Index client (VECTOR_BACKEND=local):
+upsert / query / fetch / delete / list_paginated / describe_index_stats
+with the same arguments, Pinecone-style metadata filters and response
+objects. Retrieval runs in-process with no network round trip.
+
+Storage, per namespace under LOCAL_VECTOR_INDEX_DIR:
+- vectors-<generation>.f32: a memory-mapped float32 matrix of
+  unit-normalised rows (cosine similarity, as the "serene" Pinecone index
+  uses)
+- log.jsonl: an append-only log of id -> (row, metadata) writes and deletes,
+  replayed on open. Once it is mostly garbage, both files are rewritten to
+  a new generation and the log swapped in atomically.
+- lock: flock()ed so the API and Celery worker processes can share a
+  namespace. Writes (and compaction) hold it exclusively and reads hold it
+  shared; each first replays the log lines other processes appended since
+  its last look (or reloads everything after another process compacted),
+  so row numbers are never handed out twice. Without fcntl (Windows) only a
+  single process may write.
+
+Search is NumPy brute force (one matrix-vector product) until a namespace
+holds ann_threshold vectors. Past that, an IVF index (k-means coarse
+quantiser, nprobe nearest lists scanned) answers unfiltered and loosely
+filtered queries; selective filters still scan their matching rows exactly.
+"""
+import json
+import logging
+import os
+import threading
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from app.services.offline_backends import Record, matches_filter
+
+try:
+    import fcntl
+except ImportError:  # Windows: no cross-process locking
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+_INITIAL_CAPACITY = 1024
+
+
+class _IVF:
+    """Inverted-file index: vectors bucketed by their nearest k-means centroid."""
+
+    def __init__(self, vectors: np.ndarray, rows: np.ndarray, n_lists: int, iterations: int = 8, seed: int = 0):
+        rng = np.random.default_rng(seed)
+        sample = vectors[rng.choice(len(vectors), size=min(len(vectors), n_lists * 64), replace=False)]
+        centroids = sample[rng.choice(len(sample), size=n_lists, replace=False)].copy()
+        for _ in range(iterations):
+            assign = np.argmax(sample @ centroids.T, axis=1)
+            for c in range(n_lists):
+                members = sample[assign == c]
+                if len(members):
+                    centroid = members.mean(axis=0)
+                    centroids[c] = centroid / (np.linalg.norm(centroid) or 1.0)
+        self.centroids = centroids
+        self.lists: List[List[int]] = [[] for _ in range(n_lists)]
+        self.size = 0
+        self.add(vectors, rows)
+
+    def add(self, vectors: np.ndarray, rows: np.ndarray):
+        for row, c in zip(rows.tolist(), np.argmax(vectors @ self.centroids.T, axis=1).tolist()):
+            self.lists[c].append(row)
+        self.size += len(rows)
+
+    def candidates(self, query: np.ndarray, nprobe: int) -> np.ndarray:
+        probes = np.argsort(-(self.centroids @ query))[:nprobe]
+        return np.fromiter((row for c in probes for row in self.lists[c]), dtype=np.int64)
+
+
+class LocalNamespace:
+    """One namespace: memory-mapped vectors plus id/metadata log."""
+
+    def __init__(self, path: str, ann_threshold: int, nprobe: int):
+        self.path = path
+        self.ann_threshold = ann_threshold
+        self.nprobe = nprobe
+        self.lock = threading.RLock()
+        self._flock_depth = 0  # Nested holds by the thread holding self.lock
+        self._log_id = None  # (device, inode) of the log replayed so far
+        self._log_offset = 0  # Bytes of it replayed
+        self._reset()
+        os.makedirs(path, exist_ok=True)
+        with self.reading():
+            pass
+
+    def _reset(self):
+        self.dimension: Optional[int] = None
+        self._vectors: Optional[np.memmap] = None
+        self._vectors_file = "vectors-0.f32"
+        self.rows: Dict[str, int] = {}           # id -> row
+        self.ids: List[Optional[str]] = []       # row -> id (None once deleted)
+        self.metadata: List[Optional[dict]] = []
+        self._log_entries = 0
+        self._ivf: Optional[_IVF] = None
+
+    # --- Persistence ---
+
+    @property
+    def _vectors_path(self) -> str:
+        return os.path.join(self.path, self._vectors_file)
+
+    @property
+    def _log_path(self) -> str:
+        return os.path.join(self.path, "log.jsonl")
+
+    @contextmanager
+    def _file_lock(self, exclusive: bool):
+        # flock() on a second descriptor would block on our own lock, so nested holds reuse the outer one
+        if fcntl is None or self._flock_depth:
+            self._flock_depth += 1
+            try:
+                yield
+            finally:
+                self._flock_depth -= 1
+            return
+        with open(os.path.join(self.path, "lock"), "a") as f:
+            fcntl.flock(f, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            self._flock_depth += 1
+            try:
+                yield
+            finally:
+                self._flock_depth -= 1
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    @contextmanager
+    def reading(self):
+        """Hold the namespace for reading, up to date with other processes' writes."""
+        with self.lock, self._file_lock(exclusive=False):
+            self._refresh()
+            yield
+
+    @contextmanager
+    def writing(self):
+        """Hold the namespace exclusively, up to date with other processes' writes."""
+        with self.lock, self._file_lock(exclusive=True):
+            self._refresh()
+            yield
+
+    def _open_vectors(self, capacity: int):
+        mode = "r+" if os.path.exists(self._vectors_path) else "w+"
+        if mode == "r+" and os.path.getsize(self._vectors_path) < capacity * self.dimension * 4:
+            with open(self._vectors_path, "r+b") as f:
+                f.truncate(capacity * self.dimension * 4)
+        self._vectors = np.memmap(self._vectors_path, dtype=np.float32, mode=mode, shape=(capacity, self.dimension))
+
+    def _refresh(self):
+        """Replay log lines appended since the last look; start over if the log was compacted."""
+        try:
+            stat = os.stat(self._log_path)
+        except FileNotFoundError:
+            return
+        log_id = (stat.st_dev, stat.st_ino)
+        if log_id != self._log_id or stat.st_size < self._log_offset:
+            self._reset()
+            self._log_id, self._log_offset = log_id, 0
+        if stat.st_size == self._log_offset:
+            return
+        with open(self._log_path, "rb") as f:
+            f.seek(self._log_offset)
+            data = f.read()
+        complete = data.rfind(b"\n") + 1
+        for line in data[:complete].splitlines():
+            if not line.strip():
+                continue
+            entry = json.loads(line)
+            self._log_entries += 1
+            if entry["op"] == "dim":
+                self.dimension = entry["dimension"]
+                self._vectors_file = entry["file"]
+            elif entry["op"] == "put":
+                self._set_row(entry["id"], entry["row"], entry["metadata"])
+            elif entry["op"] == "del":
+                self._clear_row(entry["id"])
+        self._log_offset += complete
+        self._ivf = None
+        if self.dimension is not None:
+            on_disk = os.path.getsize(self._vectors_path) // (self.dimension * 4) if os.path.exists(self._vectors_path) else 0
+            capacity = max(_INITIAL_CAPACITY, len(self.ids), on_disk)
+            if (self._vectors is None or self._vectors.filename != os.path.abspath(self._vectors_path)
+                    or capacity > self._vectors.shape[0]):
+                self._open_vectors(capacity)
+
+    def _append_log(self, entries: List[dict]):
+        with open(self._log_path, "a") as f:
+            for entry in entries:
+                f.write(json.dumps(entry, default=str) + "\n")
+            offset = f.tell()
+        if self._log_id is None:
+            stat = os.stat(self._log_path)
+            self._log_id = (stat.st_dev, stat.st_ino)
+        self._log_offset = offset
+        self._log_entries += len(entries)
+
+    def _set_row(self, vector_id: str, row: int, metadata: dict):
+        old = self.rows.get(vector_id)
+        if old is not None and old != row:
+            self.ids[old] = None
+            self.metadata[old] = None
+        while len(self.ids) <= row:
+            self.ids.append(None)
+            self.metadata.append(None)
+        self.rows[vector_id] = row
+        self.ids[row] = vector_id
+        self.metadata[row] = metadata
+
+    def _clear_row(self, vector_id: str):
+        row = self.rows.pop(vector_id, None)
+        if row is not None:
+            self.ids[row] = None
+            self.metadata[row] = None
+
+    def _maybe_compact(self):
+        """Rewrite vectors and log once most rows/log lines are garbage."""
+        live = len(self.rows)
+        if self._log_entries < 1000 or self._log_entries < 3 * live:
+            return
+        order = [row for row, vector_id in enumerate(self.ids) if vector_id is not None]
+        ids = [self.ids[row] for row in order]
+        metadata = [self.metadata[row] for row in order]
+        old_path = self._vectors_path
+        generation = int(self._vectors_file.split("-")[1].split(".")[0]) + 1
+
+        # Write the new generation alongside the old one...
+        self._vectors_file = f"vectors-{generation}.f32"
+        compacted = np.memmap(self._vectors_path, dtype=np.float32, mode="w+",
+                              shape=(max(_INITIAL_CAPACITY, len(ids)), self.dimension))
+        if order:
+            compacted[:len(ids)] = self._vectors[order]
+        compacted.flush()
+        tmp_log = f"{self._log_path}.tmp"
+        with open(tmp_log, "w") as f:
+            f.write(json.dumps({"op": "dim", "dimension": self.dimension, "file": self._vectors_file}) + "\n")
+            for new_row, (vector_id, meta) in enumerate(zip(ids, metadata)):
+                f.write(json.dumps({"op": "put", "id": vector_id, "row": new_row, "metadata": meta}, default=str) + "\n")
+        # ...then switch over: the log names the vectors file, so this is atomic.
+        # Other processes reload from the new log before their next read.
+        os.replace(tmp_log, self._log_path)
+        del self._vectors
+        os.remove(old_path)
+        stat = os.stat(self._log_path)
+        self._log_id, self._log_offset = (stat.st_dev, stat.st_ino), stat.st_size
+
+        self._vectors = compacted
+        self.rows = {vector_id: row for row, vector_id in enumerate(ids)}
+        self.ids, self.metadata, self._log_entries, self._ivf = ids, metadata, len(ids) + 1, None
+        logger.info(f"🧹 Compacted local vector namespace {os.path.basename(self.path)} to {len(ids)} vectors")
+
+    # --- Writes ---
+
+    def upsert(self, vectors: List[Dict[str, Any]]) -> int:
+        if not vectors:
+            return 0
+        with self.writing():
+            if self.dimension is None:
+                self.dimension = len(vectors[0]["values"])
+                self._append_log([{"op": "dim", "dimension": self.dimension, "file": self._vectors_file}])
+                self._open_vectors(_INITIAL_CAPACITY)
+            matrix = np.asarray([v["values"] for v in vectors], dtype=np.float32)
+            if matrix.shape[1] != self.dimension:
+                raise ValueError(f"Vector dimension {matrix.shape[1]} does not match namespace dimension {self.dimension}")
+            norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+            matrix /= np.where(norms == 0, 1.0, norms)
+
+            # Existing ids are rewritten in place; new ids are appended
+            rows = []
+            assigned: Dict[str, int] = {}
+            next_row = len(self.ids)
+            for vector in vectors:
+                row = self.rows.get(vector["id"], assigned.get(vector["id"]))
+                if row is None:
+                    row, next_row = next_row, next_row + 1
+                    assigned[vector["id"]] = row
+                rows.append(row)
+            if next_row > self._vectors.shape[0]:
+                self._vectors.flush()
+                self._open_vectors(max(next_row, 2 * self._vectors.shape[0]))
+            self._vectors[rows] = matrix
+            self._vectors.flush()
+
+            entries = []
+            for vector, row in zip(vectors, rows):
+                metadata = dict(vector.get("metadata") or {})
+                self._set_row(vector["id"], row, metadata)
+                entries.append({"op": "put", "id": vector["id"], "row": row, "metadata": metadata})
+            self._append_log(entries)
+            if self._ivf is not None:
+                self._ivf.add(matrix, np.asarray(rows, dtype=np.int64))
+            self._maybe_compact()
+            return len(vectors)
+
+    def delete(self, ids: List[str]):
+        with self.writing():
+            present = [vector_id for vector_id in ids if vector_id in self.rows]
+            for vector_id in present:
+                self._clear_row(vector_id)
+            if present:
+                self._append_log([{"op": "del", "id": vector_id} for vector_id in present])
+                self._maybe_compact()
+
+    # --- Reads ---
+
+    def _ann(self) -> Optional[_IVF]:
+        live = len(self.rows)
+        if live < self.ann_threshold:
+            return None
+        # Rebuild when the index has drifted far from the data it was trained on
+        if self._ivf is None or self._ivf.size > 2 * live or live > 2 * self._ivf.size:
+            rows = np.fromiter(self.rows.values(), dtype=np.int64)
+            self._ivf = _IVF(np.asarray(self._vectors[rows]), rows, n_lists=max(8, int(np.sqrt(live))))
+            logger.info(f"🧭 Built IVF index over {live} vectors ({len(self._ivf.lists)} lists)")
+        return self._ivf
+
+    def search(self, query: List[float], top_k: int, filter: Optional[dict]) -> List[tuple]:
+        """[(row, score)] best first."""
+        with self.reading():
+            if self.dimension is None or not self.rows:
+                return []
+            q = np.asarray(query, dtype=np.float32)
+            if q.shape[0] != self.dimension:
+                raise ValueError(f"Query dimension {q.shape[0]} does not match namespace dimension {self.dimension}")
+            norm = np.linalg.norm(q)
+            q = q / norm if norm else q
+
+            if filter:
+                candidates = np.fromiter(
+                    (row for row in self.rows.values() if matches_filter(self.metadata[row], filter)), dtype=np.int64
+                )
+                ivf = self._ann() if len(candidates) >= self.ann_threshold else None
+            else:
+                candidates = None
+                ivf = self._ann()
+
+            if ivf is not None:
+                probed = np.unique(ivf.candidates(q, self.nprobe))
+                probed = probed[np.fromiter((self.ids[row] is not None for row in probed), dtype=bool, count=len(probed))]
+                if candidates is not None:
+                    probed = np.intersect1d(probed, candidates)
+                candidates = probed
+            elif candidates is None:
+                candidates = np.fromiter(self.rows.values(), dtype=np.int64)
+
+            if not len(candidates):
+                return []
+            candidates = np.sort(candidates)
+            scores = np.asarray(self._vectors[candidates]) @ q
+            k = min(top_k, len(candidates))
+            top = np.argpartition(-scores, k - 1)[:k]
+            top = top[np.lexsort((candidates[top], -scores[top]))]
+            return [(int(candidates[i]), float(scores[i])) for i in top]
+
+    def vector(self, row: int) -> List[float]:
+        return np.asarray(self._vectors[row]).tolist()
+
+
+class LocalVectorIndex:
+    """In-process, disk-persisted stand-in for a Pinecone Index."""
+
+    def __init__(self, path: str, ann_threshold: int = 20000, nprobe: int = 8):
+        self.path = path
+        self.ann_threshold = ann_threshold
+        self.nprobe = nprobe
+        self._namespaces: Dict[str, LocalNamespace] = {}
+        self._lock = threading.Lock()
+        os.makedirs(path, exist_ok=True)
+        for name in sorted(os.listdir(path)):
+            if os.path.isdir(os.path.join(path, name)):
+                self._namespace("" if name == "__default__" else name)
+        logger.info(f"✅ Opened local vector index at {path} ({len(self._namespaces)} namespaces)")
+
+    def _namespace(self, namespace: str, create: bool = True) -> Optional[LocalNamespace]:
+        with self._lock:
+            ns = self._namespaces.get(namespace)
+            if ns is None:
+                # Namespaces become directory names
+                safe = namespace or "__default__"
+                if "/" in safe or safe.startswith("."):
+                    raise ValueError(f"Invalid namespace: {namespace!r}")
+                path = os.path.join(self.path, safe)
+                # Another process may have created it since we opened the index
+                if create or os.path.isdir(path):
+                    ns = self._namespaces[namespace] = LocalNamespace(path, self.ann_threshold, self.nprobe)
+            return ns
+
+    def upsert(self, vectors: list, namespace: str = "", **kwargs) -> Record:
+        normalized = [
+            {"id": v[0], "values": v[1], "metadata": v[2] if len(v) > 2 else {}} if isinstance(v, (tuple, list)) else v
+            for v in vectors
+        ]
+        return Record(upserted_count=self._namespace(namespace).upsert(normalized))
+
+    def query(self, vector: List[float] = None, top_k: int = 10, namespace: str = "",
+              filter: Optional[dict] = None, include_metadata: bool = False,
+              include_values: bool = False, **kwargs) -> Record:
+        ns = self._namespace(namespace, create=False)
+        matches = []
+        if ns is not None:
+            with ns.reading():
+                for row, score in ns.search(vector, top_k, filter):
+                    match = Record(id=ns.ids[row], score=score)
+                    match["metadata"] = Record(ns.metadata[row]) if include_metadata else None
+                    match["values"] = ns.vector(row) if include_values else []
+                    matches.append(match)
+        return Record(matches=matches, namespace=namespace)
+
+    def fetch(self, ids: List[str], namespace: str = "", **kwargs) -> Record:
+        ns = self._namespace(namespace, create=False)
+        found = {}
+        if ns is not None:
+            with ns.reading():
+                for vector_id in ids:
+                    row = ns.rows.get(vector_id)
+                    if row is not None:
+                        found[vector_id] = Record(id=vector_id, values=ns.vector(row), metadata=Record(ns.metadata[row]))
+        return Record(vectors=found, namespace=namespace)
+
+    def delete(self, ids: Optional[List[str]] = None, delete_all: bool = False,
+               namespace: str = "", filter: Optional[dict] = None, **kwargs) -> Record:
+        ns = self._namespace(namespace, create=False)
+        if ns is None:
+            return Record()
+        with ns.writing():
+            if delete_all:
+                ids = list(ns.rows)
+            elif not ids and filter:
+                ids = [vector_id for vector_id, row in ns.rows.items() if matches_filter(ns.metadata[row], filter)]
+            ns.delete(ids or [])
+        return Record()
+
+    def list_paginated(self, namespace: str = "", limit: int = 100, pagination_token: Optional[str] = None,
+                       prefix: Optional[str] = None, **kwargs) -> Record:
+        ns = self._namespace(namespace, create=False)
+        ids = []
+        if ns is not None:
+            with ns.reading():
+                ids = sorted(
+                    i for i in ns.rows
+                    if (not prefix or i.startswith(prefix)) and (pagination_token is None or i > pagination_token)
+                )
+        page = ids[:limit]
+        return Record(
+            vectors=[Record(id=i) for i in page],
+            pagination=Record(next=page[-1]) if len(ids) > limit else None,
+            namespace=namespace,
+        )
+
+    def describe_index_stats(self, **kwargs) -> Record:
+        for name in sorted(os.listdir(self.path)):
+            if os.path.isdir(os.path.join(self.path, name)):
+                self._namespace("" if name == "__default__" else name)
+        with self._lock:
+            opened = list(self._namespaces.items())
+        namespaces, dimension = {}, None
+        for name, ns in opened:
+            with ns.reading():
+                if ns.rows:
+                    namespaces[name] = Record(vector_count=len(ns.rows))
+                dimension = dimension or ns.dimension
+        return Record(
+            dimension=dimension,
+            namespaces=namespaces,
+            total_vector_count=sum(n.vector_count for n in namespaces.values()),
+        )
@@ -90,14 +90,42 @@ class MessageAnalysisResult(BaseModel):
     )
 
 
+class BatchedMessageAnalysis(MessageAnalysisResult):
+    """Analysis of one message inside a batch, tagged with its position."""
+
+    message_index: int = Field(
+        ...,
+        description="The [index] of the message this analysis belongs to"
+    )
+
+
+class MessageBatchAnalysisResult(BaseModel):
+    """LLM's analysis of several messages sent between partners, one entry per message."""
+
+    results: List[BatchedMessageAnalysis] = Field(
+        default=[],
+        description="One analysis per message, each tagged with the message_index it refers to"
+    )
+
+
 class MessageAnalysisService:
     """
     Analyzes sent messages asynchronously.
     Called as a background task after message is stored.
+
+    Messages can be analyzed one at a time (analyze_message) or queued via
+    enqueue_message, which groups messages from the same relationship that
+    arrive within a short window and analyzes them in a single LLM call.
+    Batches never mix relationships so one couple's context never leaks
+    into another couple's prompt.
     """
 
-    def __init__(self):
+    def __init__(self, batch_window: float = 0.75, max_batch_size: int = 8):
         self.llm = llm_service
+        self.batch_window = batch_window  # Seconds to wait for more messages
+        self.max_batch_size = max_batch_size
+        self._pending: Dict[str, List[Dict[str, Any]]] = {}  # relationship_id -> queued messages
+        self._flush_tasks: Dict[str, asyncio.Task] = {}
 
     async def analyze_message(
         self,
@@ -131,36 +159,10 @@ class MessageAnalysisService:
             start_time = time.time()
             logger.info(f"Starting enhanced analysis for message {message_id}")
 
-            # Fetch all context in parallel for speed
-            (
-                recent_messages,
-                triggers,
-                patterns
-            ) = await asyncio.gather(
-                asyncio.to_thread(
-                    db_service.get_partner_messages,
-                    conversation_id,
-                    5  # limit
-                ),
-                asyncio.to_thread(
-                    self._get_relationship_triggers,
-                    relationship_id
-                ),
-                self._get_relationship_patterns(relationship_id),
-                return_exceptions=True
+            recent_messages, triggers, patterns = await self._fetch_context(
+                conversation_id, relationship_id
             )
 
-            # Handle any exceptions
-            if isinstance(recent_messages, Exception):
-                logger.warning(f"Recent messages fetch error: {recent_messages}")
-                recent_messages = []
-            if isinstance(triggers, Exception):
-                logger.warning(f"Triggers fetch error: {triggers}")
-                triggers = []
-            if isinstance(patterns, Exception):
-                logger.warning(f"Patterns fetch error: {patterns}")
-                patterns = {}
-
             fetch_time = time.time() - start_time
             logger.debug(f"Context fetch took {fetch_time:.2f}s")
 
@@ -173,27 +175,14 @@ class MessageAnalysisService:
                 patterns=patterns
             )
 
-            # Update message record (run in thread)
-            await asyncio.to_thread(
-                db_service.update_partner_message_analysis,
-                message_id,
-                result.sentiment_score,
-                result.sentiment_label,
-                result.emotions,
-                result.detected_triggers,
-                result.escalation_risk,
-                result.gottman_markers
+            await self._store_result(
+                message_id=message_id,
+                relationship_id=relationship_id,
+                sender_id=sender_id,
+                content=content,
+                result=result
             )
 
-            # If high escalation or triggers detected, update relationship intelligence
-            if result.escalation_risk in ['high', 'critical'] or result.detected_triggers:
-                await self._update_relationship_intelligence(
-                    relationship_id=relationship_id,
-                    sender_id=sender_id,
-                    result=result,
-                    message_content=content
-                )
-
             total_time = time.time() - start_time
             logger.info(f"Analyzed message {message_id}: sentiment={result.sentiment_label}, risk={result.escalation_risk} ({total_time:.2f}s)")
 
@@ -203,6 +192,296 @@ class MessageAnalysisService:
             logger.error(f"Error analyzing message {message_id}: {e}")
             return None
 
+    async def _fetch_context(self, conversation_id: str, relationship_id: str):
+        """Fetch recent messages, trigger phrases and patterns in parallel."""
+        (
+            recent_messages,
+            triggers,
+            patterns
+        ) = await asyncio.gather(
+            asyncio.to_thread(
+                db_service.get_partner_messages,
+                conversation_id,
+                5  # limit
+            ),
+            asyncio.to_thread(
+                self._get_relationship_triggers,
+                relationship_id
+            ),
+            self._get_relationship_patterns(relationship_id),
+            return_exceptions=True
+        )
+
+        # Handle any exceptions
+        if isinstance(recent_messages, Exception):
+            logger.warning(f"Recent messages fetch error: {recent_messages}")
+            recent_messages = []
+        if isinstance(triggers, Exception):
+            logger.warning(f"Triggers fetch error: {triggers}")
+            triggers = []
+        if isinstance(patterns, Exception):
+            logger.warning(f"Patterns fetch error: {patterns}")
+            patterns = {}
+
+        return recent_messages, triggers, patterns
+
+    async def _store_result(
+        self,
+        message_id: str,
+        relationship_id: str,
+        sender_id: str,
+        content: str,
+        result: MessageAnalysisResult
+    ):
+        """Write analysis onto the message record and feed relationship intelligence."""
+        # Update message record (run in thread)
+        await asyncio.to_thread(
+            db_service.update_partner_message_analysis,
+            message_id,
+            result.sentiment_score,
+            result.sentiment_label,
+            result.emotions,
+            result.detected_triggers,
+            result.escalation_risk,
+            result.gottman_markers
+        )
+
+        # If high escalation or triggers detected, update relationship intelligence
+        if result.escalation_risk in ['high', 'critical'] or result.detected_triggers:
+            await self._update_relationship_intelligence(
+                relationship_id=relationship_id,
+                sender_id=sender_id,
+                result=result,
+                message_content=content
+            )
+
+    # ============================================
+    # MICRO-BATCHED ANALYSIS
+    # ============================================
+
+    async def enqueue_message(
+        self,
+        message_id: str,
+        content: str,
+        conversation_id: str,
+        relationship_id: str,
+        sender_id: str
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Queue a message for batched analysis.
+
+        Messages for the same relationship arriving within batch_window
+        seconds are analyzed together. The batch flushes early once it
+        reaches max_batch_size. Resolves to the same result analyze_message
+        would return for this message.
+        """
+        future = asyncio.get_running_loop().create_future()
+        queue = self._pending.setdefault(relationship_id, [])
+        queue.append({
+            "message_id": message_id,
+            "content": content,
+            "conversation_id": conversation_id,
+            "relationship_id": relationship_id,
+            "sender_id": sender_id,
+            "future": future,
+        })
+
+        if len(queue) >= self.max_batch_size:
+            task = self._flush_tasks.pop(relationship_id, None)
+            if task:
+                task.cancel()
+            self._start_flush(relationship_id, delay=0)
+        elif relationship_id not in self._flush_tasks:
+            self._start_flush(relationship_id, delay=self.batch_window)
+
+        return await future
+
+    def _start_flush(self, relationship_id: str, delay: float):
+        """Detach the pending queue after delay seconds and analyze it."""
+        async def _flush():
+            if delay:
+                await asyncio.sleep(delay)
+            self._flush_tasks.pop(relationship_id, None)
+            batch = self._pending.pop(relationship_id, [])
+            if batch:
+                await self._run_batch(batch)
+
+        if delay:
+            self._flush_tasks[relationship_id] = asyncio.create_task(_flush())
+        else:
+            # Take the batch now so later arrivals start a fresh window
+            batch = self._pending.pop(relationship_id, [])
+            asyncio.create_task(self._run_batch(batch))
+
+    async def _run_batch(self, batch: List[Dict[str, Any]]):
+        """Analyze a batch and resolve every caller's future."""
+        try:
+            results = await self.analyze_batch(batch)
+        except Exception as e:
+            logger.error(f"Error analyzing message batch: {e}")
+            results = [None] * len(batch)
+
+        for item, result in zip(batch, results):
+            if not item["future"].done():
+                item["future"].set_result(result)
+
+    async def analyze_batch(self, batch: List[Dict[str, Any]]) -> List[Optional[Dict[str, Any]]]:
+        """
+        Analyze several messages from one relationship with one LLM call.
+
+        Context (recent messages, triggers, patterns) is fetched once per
+        conversation. Messages the LLM skipped fall back to single-message
+        analysis. Results are fanned out to update_partner_message_analysis.
+
+        Args:
+            batch: Dicts with message_id, content, conversation_id,
+                relationship_id and sender_id, all sharing one relationship_id
+
+        Returns:
+            Analysis result dicts in batch order (None where analysis failed)
+        """
+        if not batch:
+            return []
+        if len(batch) == 1:
+            item = batch[0]
+            return [await self.analyze_message(
+                message_id=item["message_id"],
+                content=item["content"],
+                conversation_id=item["conversation_id"],
+                relationship_id=item["relationship_id"],
+                sender_id=item["sender_id"]
+            )]
+
+        start_time = time.time()
+        relationship_id = batch[0]["relationship_id"]
+
+        # Most batches share a conversation - fetch its context only once
+        contexts: Dict[str, tuple] = {}
+        for item in batch:
+            if item["conversation_id"] not in contexts:
+                contexts[item["conversation_id"]] = await self._fetch_context(
+                    item["conversation_id"], relationship_id
+                )
+        recent_messages = []
+        for context in contexts.values():
+            recent_messages.extend(context[0])
+        _, triggers, patterns = next(iter(contexts.values()))
+
+        batch_results = await self._analyze_batch_with_llm(
+            batch=batch,
+            recent_messages=recent_messages,
+            triggers=triggers,
+            patterns=patterns
+        )
+
+        async def _finish(index: int, item: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+            result = batch_results.get(index)
+            try:
+                if result is None:
+                    # LLM skipped this message - analyze it on its own
+                    result = await self._analyze_with_llm_enhanced(
+                        content=item["content"],
+                        recent_messages=recent_messages,
+                        triggers=triggers,
+                        sender_id=item["sender_id"],
+                        patterns=patterns
+                    )
+                await self._store_result(
+                    message_id=item["message_id"],
+                    relationship_id=relationship_id,
+                    sender_id=item["sender_id"],
+                    content=item["content"],
+                    result=result
+                )
+                return result.model_dump()
+            except Exception as e:
+                logger.error(f"Error storing analysis for message {item['message_id']}: {e}")
+                return None
+
+        results = await asyncio.gather(*[
+            _finish(index, item) for index, item in enumerate(batch, 1)
+        ])
+
+        total_time = time.time() - start_time
+        logger.info(f"Analyzed batch of {len(batch)} messages for relationship {relationship_id} in one call ({total_time:.2f}s)")
+        return list(results)
+
+    async def _analyze_batch_with_llm(
+        self,
+        batch: List[Dict[str, Any]],
+        recent_messages: List[dict],
+        triggers: List[dict],
+        patterns: Dict[str, Any]
+    ) -> Dict[int, MessageAnalysisResult]:
+        """
+        Analyze all messages in a batch with a single structured-output call.
+
+        Returns:
+            Map of 1-based batch position -> analysis. Positions the LLM
+            did not return (or the whole batch on error) are missing.
+        """
+        batch_contents = {item["content"] for item in batch}
+        context_msgs = [m for m in recent_messages if m.get('content') not in batch_contents][-3:]
+        conversation_context = ""
+        if context_msgs:
+            conversation_context = "Recent conversation:\n" + "\n".join([
+                f"{msg['sender_id']}: {msg['content']}"
+                for msg in context_msgs
+            ])
+
+        trigger_context, chronic_needs_context, risk_context = self._build_relationship_context(triggers, patterns)
+
+        messages_block = "\n".join([
+            f"[{index}] {item['sender_id']}: \"{item['content']}\""
+            for index, item in enumerate(batch, 1)
+        ])
+
+        prompt = f"""Analyze each of these messages sent between partners in a relationship.
+The messages are in the order they were sent.
+
+{conversation_context}
+
+MESSAGES TO ANALYZE:
+{messages_block}
+
+=== RELATIONSHIP CONTEXT ===
+{trigger_context}
+{chronic_needs_context}
+{risk_context}
+=== END CONTEXT ===
+
+For EACH message, return one entry in "results" with its message_index and:
+1. Sentiment: Overall tone from -1 (very negative) to 1 (very positive)
+2. Emotions: Choose from: happy, sad, angry, frustrated, anxious, hurt, hopeful, loving, grateful, worried, confused, tired
+3. Triggers: Any known trigger phrases or potentially triggering language
+4. Escalation Risk: Could this message escalate conflict given the current risk level and the messages before it? (low, medium, high, critical)
+5. Gottman's Four Horsemen: criticism, contempt, defensiveness, stonewalling
+6. Repair Attempt: Is this trying to de-escalate or repair the connection?
+7. Bid for Connection: Is this reaching out for attention, affection, or engagement?
+
+Analyze every message on its own merits - an angry message does not make the next one angry.
+Short messages like "ok" or "sure" are typically neutral with low risk.
+"""
+
+        try:
+            result = await asyncio.to_thread(
+                self.llm.structured_output,
+                [{"role": "user", "content": prompt}],
+                MessageBatchAnalysisResult,
+                0.3
+            )
+        except Exception as e:
+            logger.error(f"Batch LLM analysis error: {e}")
+            return {}
+
+        analyses = {}
+        for entry in result.results:
+            if 1 <= entry.message_index <= len(batch) and entry.message_index not in analyses:
+                analyses[entry.message_index] = MessageAnalysisResult(
+                    **entry.model_dump(exclude={"message_index"})
+                )
+        return analyses
+
     async def _get_relationship_patterns(self, relationship_id: str) -> Dict[str, Any]:
         """Get chronic needs and escalation risk for richer analysis."""
         patterns = {
@@ -239,6 +518,27 @@ class MessageAnalysisService:
 
         return patterns
 
+    def _build_relationship_context(self, triggers: List[dict], patterns: Dict[str, Any]):
+        """Build the trigger, chronic-need and risk lines shared by all prompts."""
+        # Build trigger context
+        trigger_phrases = [t.get('phrase', t) if isinstance(t, dict) else str(t) for t in triggers[:20]] if triggers else []
+        trigger_context = ""
+        if trigger_phrases:
+            trigger_context = f"Known trigger phrases: {', '.join(trigger_phrases[:10])}"
+
+        # Build pattern context
+        chronic_needs = patterns.get("chronic_needs", [])
+        chronic_needs_context = ""
+        if chronic_needs:
+            chronic_needs_context = f"Chronic unmet needs in this relationship: {', '.join(chronic_needs[:5])}"
+
+        escalation_risk = patterns.get("escalation_risk", {})
+        risk_score = escalation_risk.get("score", 0.5)
+        risk_level = "HIGH" if risk_score > 0.7 else "MODERATE" if risk_score > 0.4 else "LOW"
+        risk_context = f"Current relationship escalation risk: {risk_level}"
+
+        return trigger_context, chronic_needs_context, risk_context
+
     async def _analyze_with_llm_enhanced(
         self,
         content: str,
@@ -266,22 +566,7 @@ class MessageAnalysisService:
                     for msg in context_msgs
                 ])
 
-        # Build trigger context
-        trigger_phrases = [t.get('phrase', t) if isinstance(t, dict) else str(t) for t in triggers[:20]] if triggers else []
-        trigger_context = ""
-        if trigger_phrases:
-            trigger_context = f"Known trigger phrases: {', '.join(trigger_phrases[:10])}"
-
-        # Build pattern context
-        chronic_needs = patterns.get("chronic_needs", [])
-        chronic_needs_context = ""
-        if chronic_needs:
-            chronic_needs_context = f"Chronic unmet needs in this relationship: {', '.join(chronic_needs[:5])}"
-
-        escalation_risk = patterns.get("escalation_risk", {})
-        risk_score = escalation_risk.get("score", 0.5)
-        risk_level = "HIGH" if risk_score > 0.7 else "MODERATE" if risk_score > 0.4 else "LOW"
-        risk_context = f"Current relationship escalation risk: {risk_level}"
+        trigger_context, chronic_needs_context, risk_context = self._build_relationship_context(triggers, patterns)
 
         prompt = f"""Analyze this message sent between partners in a relationship.
 
@@ -24,6 +24,7 @@ from app.config import settings
 from app.services.db_service import db_service
 from app.services.pinecone_service import pinecone_service
 from app.services.embeddings_service import embeddings_service
+from app.services.embedding_dispatcher import embedding_dispatcher
 from app.services.profile_service import profile_service
 
 logger = logging.getLogger(__name__)
@@ -113,6 +114,7 @@ class MessageSuggestionService:
         self.model = "google/gemini-2.5-flash"
         self.pinecone = pinecone_service
         self.embeddings = embeddings_service
+        self.embedding_dispatcher = embedding_dispatcher
         self.namespace = "partner_messages"
         logger.info("✅ Initialized Message Suggestion Service (Gemini 2.5 Flash)")
 
@@ -751,10 +753,8 @@ Rules:
             if not self.pinecone.index:
                 return False
 
-            embedding = await asyncio.to_thread(
-                self.embeddings.embed_text,
-                content
-            )
+            # Coalesced with other messages being embedded concurrently
+            embedding = await self.embedding_dispatcher.embed_text(content)
 
             metadata = {
                 "message_id": message_id,
@@ -768,15 +768,12 @@ Rules:
                 "text": content[:1000]
             }
 
-            await asyncio.to_thread(
-                self.pinecone.index.upsert,
-                vectors=[{
-                    "id": f"msg_{message_id}",
-                    "values": embedding,
-                    "metadata": metadata
-                }],
-                namespace=self.namespace
-            )
+            # Coalesced with other messages being stored concurrently
+            await self.pinecone.writer.enqueue(self.namespace, {
+                "id": f"msg_{message_id}",
+                "values": embedding,
+                "metadata": metadata
+            })
 
             return True
         except Exception as e:
@@ -0,0 +1,207 @@
+"""
+Per-relationship Pinecone namespaces
+
+Tenant data (transcript chunks, profiles, debriefs, partner messages)
+lives in shared namespaces, and every query narrows it with a
+relationship_id metadata filter. Filtered search slows down as the
+namespace grows with every couple. With PINECONE_NAMESPACE_LAYOUT set to
+"per_relationship", each relationship gets its own namespace
+("profiles__<relationship_id>"), so a query only searches that couple's
+vectors.
+
+NamespaceRouter wraps the Pinecone index, so call sites keep using base
+namespace names and relationship filters:
+
+- query() with a relationship_id filter goes to the relationship's
+  namespace, and the now-redundant filter clause is dropped.
+- upsert() groups vectors by their relationship_id metadata.
+- delete()/fetch() by id need the namespace from
+  shard_namespace(namespace, relationship_id).
+
+Anything without a relationship id stays in the base namespace.
+NamespaceMigrator re-homes existing vectors from the shared namespaces in
+resumable batches (see scripts/migrate_namespaces.py).
+"""
+import json
+import logging
+import os
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.services.vector_writer import VectorWriter
+
+logger = logging.getLogger(__name__)
+
+SHARDED_NAMESPACES = ("transcript_chunks", "profiles", "debriefs", "partner_messages")
+LAYOUTS = ("shared", "per_relationship")
+_SEPARATOR = "__"
+
+
+def shard_namespace(namespace: str, relationship_id: Optional[str]) -> str:
+    """The namespace holding a relationship's vectors (the base namespace if not sharded)."""
+    if namespace in SHARDED_NAMESPACES and relationship_id:
+        return f"{namespace}{_SEPARATOR}{relationship_id}"
+    return namespace
+
+
+def split_relationship_filter(filter: Optional[Dict[str, Any]]) -> Tuple[Optional[str], Optional[Dict[str, Any]]]:
+    """
+    Pull an exact relationship_id match out of a metadata filter.
+
+    Handles {"relationship_id": x}, {"relationship_id": {"$eq": x}} and the
+    same inside a top-level "$and".
+
+    Returns:
+        (relationship_id or None, the filter without that clause or None if empty)
+    """
+    if not filter:
+        return None, filter
+
+    def exact(condition):
+        if isinstance(condition, dict):
+            return condition.get("$eq") if set(condition) == {"$eq"} else None
+        return condition if isinstance(condition, str) else None
+
+    if "relationship_id" in filter:
+        relationship_id = exact(filter["relationship_id"])
+        if relationship_id:
+            rest = {k: v for k, v in filter.items() if k != "relationship_id"}
+            return relationship_id, rest or None
+
+    clauses = filter.get("$and")
+    if isinstance(clauses, list):
+        for i, clause in enumerate(clauses):
+            relationship_id, rest = split_relationship_filter(clause) if isinstance(clause, dict) else (None, None)
+            if relationship_id:
+                remaining = clauses[:i] + ([rest] if rest else []) + clauses[i + 1:]
+                others = {k: v for k, v in filter.items() if k != "$and"}
+                if len(remaining) == 1 and not others:
+                    return relationship_id, remaining[0]
+                if remaining:
+                    others["$and"] = remaining
+                return relationship_id, others or None
+    return None, filter
+
+
+class NamespaceRouter:
+    """Pinecone index wrapper that maps base namespaces onto per-relationship ones."""
+
+    def __init__(self, index):
+        self._index = index
+
+    def __getattr__(self, name):
+        return getattr(self._index, name)
+
+    def query(self, *args, namespace: str = "", filter: Optional[Dict[str, Any]] = None, **kwargs):
+        if namespace in SHARDED_NAMESPACES:
+            relationship_id, rest = split_relationship_filter(filter)
+            if relationship_id:
+                namespace, filter = shard_namespace(namespace, relationship_id), rest
+        return self._index.query(*args, namespace=namespace, filter=filter, **kwargs)
+
+    def upsert(self, vectors: List[Dict[str, Any]], namespace: str = "", **kwargs):
+        if namespace not in SHARDED_NAMESPACES:
+            return self._index.upsert(vectors=vectors, namespace=namespace, **kwargs)
+        groups: Dict[str, List[Dict[str, Any]]] = {}
+        for vector in vectors:
+            relationship_id = (vector.get("metadata") or {}).get("relationship_id")
+            groups.setdefault(shard_namespace(namespace, relationship_id), []).append(vector)
+        result = None
+        for target, group in groups.items():
+            result = self._index.upsert(vectors=group, namespace=target, **kwargs)
+        return result
+
+    def delete(self, *args, namespace: str = "", filter: Optional[Dict[str, Any]] = None, **kwargs):
+        if namespace in SHARDED_NAMESPACES and filter:
+            relationship_id, rest = split_relationship_filter(filter)
+            if relationship_id:
+                target = shard_namespace(namespace, relationship_id)
+                if rest is None:
+                    return self._index.delete(delete_all=True, namespace=target)
+                return self._index.delete(*args, namespace=target, filter=rest, **kwargs)
+        return self._index.delete(*args, namespace=namespace, filter=filter, **kwargs)
+
+
+class NamespaceMigrator:
+    """
+    Copies vectors from shared namespaces into per-relationship ones.
+
+    Pages through the source with list_paginated(), fetches each page,
+    upserts it into the relationship namespaces and (optionally) deletes
+    the originals. The pagination token is checkpointed to state_path
+    after every page, so an interrupted run resumes where it stopped.
+    Re-running is safe: ids are unchanged, so copies overwrite.
+    """
+
+    def __init__(self, index, state_path: str, batch_size: int = 100, delete_source: bool = False):
+        self.index = index
+        self.state_path = state_path
+        self.batch_size = batch_size
+        self.delete_source = delete_source
+        self.writer = VectorWriter(lambda: self.index)
+        self.state = self._load_state()
+
+    def _load_state(self) -> Dict[str, Dict[str, Any]]:
+        if os.path.exists(self.state_path):
+            with open(self.state_path) as f:
+                return json.load(f)
+        return {}
+
+    def _save_state(self):
+        tmp_path = f"{self.state_path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self.state, f, indent=2)
+        os.replace(tmp_path, self.state_path)
+
+    def migrate(self, namespace: str, max_pages: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Migrate one shared namespace.
+
+        Args:
+            namespace: One of SHARDED_NAMESPACES
+            max_pages: Stop after this many pages (the run can be resumed)
+
+        Returns:
+            This namespace's progress record
+        """
+        if namespace not in SHARDED_NAMESPACES:
+            raise ValueError(f"{namespace} is not a per-relationship namespace")
+        progress = self.state.setdefault(namespace, {"token": None, "copied": 0, "skipped": 0, "done": False})
+        pages = 0
+        started = time.perf_counter()
+        while not progress["done"] and (max_pages is None or pages < max_pages):
+            page = self.index.list_paginated(
+                namespace=namespace, limit=self.batch_size, pagination_token=progress["token"]
+            )
+            ids = [v.id if hasattr(v, "id") else v["id"] for v in (page.vectors or [])]
+            if ids:
+                self._migrate_page(namespace, ids, progress)
+            pagination = getattr(page, "pagination", None)
+            progress["token"] = getattr(pagination, "next", None) if pagination else None
+            progress["done"] = not progress["token"]
+            pages += 1
+            self._save_state()
+        logger.info(
+            f"📦 {namespace}: {progress['copied']} vectors re-homed, {progress['skipped']} without relationship "
+            f"({'done' if progress['done'] else 'paused'}, {time.perf_counter() - started:.1f}s)"
+        )
+        return progress
+
+    def _migrate_page(self, namespace: str, ids: List[str], progress: Dict[str, Any]):
+        fetched = self.index.fetch(ids=ids, namespace=namespace).vectors
+        groups: Dict[str, List[Dict[str, Any]]] = {}
+        for vector_id, vector in fetched.items():
+            metadata = dict(vector.get("metadata") or {}) if isinstance(vector, dict) else dict(vector.metadata or {})
+            values = vector.get("values") if isinstance(vector, dict) else vector.values
+            relationship_id = metadata.get("relationship_id")
+            if not relationship_id:
+                progress["skipped"] += 1
+                continue
+            groups.setdefault(shard_namespace(namespace, relationship_id), []).append(
+                {"id": vector_id, "values": list(values), "metadata": metadata}
+            )
+        for target, vectors in groups.items():
+            self.writer.upsert(vectors, target)
+            progress["copied"] += len(vectors)
+            if self.delete_source:
+                self.index.delete(ids=[v["id"] for v in vectors], namespace=namespace)
@@ -0,0 +1,316 @@
+"""
+Async object storage with streaming multipart uploads and range reads
+
+S3Service is a synchronous client that takes and returns whole files as
+bytes, which is fine for the small JSON documents it mostly stores but
+means a book upload sits in memory (and blocks the event loop) end to end.
+AsyncObjectStore is the streaming path for documents:
+
+- upload_stream() consumes an async iterator of chunks and cuts it into
+  fixed-size parts for a multipart upload. At most max_concurrency parts
+  are in flight, so memory stays around part_size x (max_concurrency + 1)
+  however large the file is. Small bodies go up in a single PUT. The
+  SHA-256 and size of the stream are computed on the way through.
+- read_range() and iter_chunks() read byte ranges, so callers can stream a
+  large object back without loading it whole.
+
+Blocking SDK calls run in worker threads against the pooled boto3 client
+of s3_service (S3_MAX_POOL_CONNECTIONS), so offline stand-ins installed on
+s3_service apply here too. LocalStorageBackend keeps objects as files
+under a directory for development and tests (STORAGE_BACKEND=local).
+"""
+import asyncio
+import hashlib
+import logging
+import os
+import shutil
+import uuid
+from typing import Any, AsyncIterable, AsyncIterator, Callable, Dict, List, NamedTuple, Optional
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class StoredObject(NamedTuple):
+    """Result of an upload."""
+    key: str
+    url: str
+    size: int
+    etag: str
+    sha256: str
+
+
+class S3StorageBackend:
+    """Blocking S3 primitives on the shared boto3 client."""
+
+    def __init__(self, client_getter: Callable[[], Any], bucket: str):
+        self._client_getter = client_getter
+        self.bucket = bucket
+
+    @property
+    def client(self):
+        return self._client_getter()
+
+    def url(self, key: str) -> str:
+        return f"s3://{self.bucket}/{key}"
+
+    def put(self, key: str, data: bytes, content_type: str) -> str:
+        response = self.client.put_object(Bucket=self.bucket, Key=key, Body=data, ContentType=content_type)
+        return response.get("ETag", "")
+
+    def create_multipart(self, key: str, content_type: str) -> str:
+        response = self.client.create_multipart_upload(Bucket=self.bucket, Key=key, ContentType=content_type)
+        return response["UploadId"]
+
+    def upload_part(self, key: str, upload_id: str, part_number: int, data: bytes) -> str:
+        response = self.client.upload_part(
+            Bucket=self.bucket, Key=key, UploadId=upload_id, PartNumber=part_number, Body=data
+        )
+        return response["ETag"]
+
+    def complete_multipart(self, key: str, upload_id: str, parts: List[Dict[str, Any]]) -> str:
+        response = self.client.complete_multipart_upload(
+            Bucket=self.bucket, Key=key, UploadId=upload_id, MultipartUpload={"Parts": parts}
+        )
+        return response.get("ETag", "")
+
+    def abort_multipart(self, key: str, upload_id: str):
+        self.client.abort_multipart_upload(Bucket=self.bucket, Key=key, UploadId=upload_id)
+
+    def head(self, key: str) -> Dict[str, Any]:
+        response = self.client.head_object(Bucket=self.bucket, Key=key)
+        return {"size": response["ContentLength"], "etag": response.get("ETag", "")}
+
+    def read_range(self, key: str, start: int, end: int) -> bytes:
+        response = self.client.get_object(Bucket=self.bucket, Key=key, Range=f"bytes={start}-{end}")
+        return response["Body"].read()
+
+    def delete(self, key: str):
+        self.client.delete_object(Bucket=self.bucket, Key=key)
+
+
+class LocalStorageBackend:
+    """Objects as files under a root directory; multipart parts are staged beside them."""
+
+    def __init__(self, root: str):
+        self.root = os.path.abspath(root)
+        self._staging = os.path.join(self.root, ".multipart")
+        os.makedirs(self._staging, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        path = os.path.abspath(os.path.join(self.root, key))
+        if not path.startswith(self.root + os.sep):
+            raise ValueError(f"Invalid object key: {key}")
+        return path
+
+    @staticmethod
+    def _etag(path: str) -> str:
+        stat = os.stat(path)
+        return f'"{stat.st_size:x}-{stat.st_mtime_ns:x}"'
+
+    def url(self, key: str) -> str:
+        return f"local://{key}"
+
+    def _publish(self, key: str, write: Callable[[Any], None]) -> str:
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        with open(tmp_path, "wb") as f:
+            write(f)
+        os.replace(tmp_path, path)
+        return self._etag(path)
+
+    def put(self, key: str, data: bytes, content_type: str) -> str:
+        return self._publish(key, lambda f: f.write(data))
+
+    def create_multipart(self, key: str, content_type: str) -> str:
+        upload_id = uuid.uuid4().hex
+        os.makedirs(os.path.join(self._staging, upload_id))
+        return upload_id
+
+    def upload_part(self, key: str, upload_id: str, part_number: int, data: bytes) -> str:
+        part_path = os.path.join(self._staging, upload_id, f"{part_number:05d}")
+        with open(part_path, "wb") as f:
+            f.write(data)
+        return f'"{hashlib.md5(data).hexdigest()}"'
+
+    def complete_multipart(self, key: str, upload_id: str, parts: List[Dict[str, Any]]) -> str:
+        staging = os.path.join(self._staging, upload_id)
+
+        def write(f):
+            for part in parts:
+                with open(os.path.join(staging, f"{part['PartNumber']:05d}"), "rb") as src:
+                    shutil.copyfileobj(src, f)
+
+        etag = self._publish(key, write)
+        shutil.rmtree(staging, ignore_errors=True)
+        return etag
+
+    def abort_multipart(self, key: str, upload_id: str):
+        shutil.rmtree(os.path.join(self._staging, upload_id), ignore_errors=True)
+
+    def head(self, key: str) -> Dict[str, Any]:
+        path = self._path(key)
+        return {"size": os.path.getsize(path), "etag": self._etag(path)}
+
+    def read_range(self, key: str, start: int, end: int) -> bytes:
+        with open(self._path(key), "rb") as f:
+            f.seek(start)
+            return f.read(end - start + 1)
+
+    def delete(self, key: str):
+        try:
+            os.remove(self._path(key))
+        except FileNotFoundError:
+            pass
+
+
+class AsyncObjectStore:
+    """Async, streaming facade over a blocking storage backend."""
+
+    def __init__(self, backend, part_size: int = 8 * 1024 * 1024, max_concurrency: int = 4):
+        """
+        Initialize the store.
+
+        Args:
+            backend: S3StorageBackend or LocalStorageBackend
+            part_size: Multipart part size in bytes (also the single-PUT threshold)
+            max_concurrency: Parts uploaded in parallel per upload
+        """
+        self.backend = backend
+        self.part_size = part_size
+        self.max_concurrency = max_concurrency
+
+    def url(self, key: str) -> str:
+        return self.backend.url(key)
+
+    async def put(self, key: str, data: bytes, content_type: str = "application/octet-stream") -> StoredObject:
+        """Upload an in-memory body with a single request."""
+        etag = await asyncio.to_thread(self.backend.put, key, data, content_type)
+        return StoredObject(key, self.backend.url(key), len(data), etag, hashlib.sha256(data).hexdigest())
+
+    async def upload_stream(
+        self,
+        key: str,
+        chunks: AsyncIterable[bytes],
+        content_type: str = "application/octet-stream",
+    ) -> StoredObject:
+        """
+        Upload a stream of chunks, switching to a multipart upload once a part fills up.
+
+        The multipart upload is aborted if reading the stream or any part fails.
+        """
+        digest = hashlib.sha256()
+        size = 0
+        buffer = bytearray()
+        upload_id: Optional[str] = None
+        parts: List[Dict[str, Any]] = []
+        tasks: List[asyncio.Task] = []
+        slots = asyncio.Semaphore(self.max_concurrency)
+
+        async def send(part_number: int, data: bytes):
+            try:
+                etag = await asyncio.to_thread(self.backend.upload_part, key, upload_id, part_number, data)
+                parts.append({"PartNumber": part_number, "ETag": etag})
+            finally:
+                slots.release()
+
+        async def flush(data: bytes):
+            nonlocal upload_id
+            if upload_id is None:
+                upload_id = await asyncio.to_thread(self.backend.create_multipart, key, content_type)
+            # Waits while max_concurrency parts are already in flight
+            await slots.acquire()
+            tasks.append(asyncio.create_task(send(len(tasks) + 1, data)))
+            # Surface a failed part before reading further
+            for task in tasks:
+                if task.done():
+                    task.result()
+
+        try:
+            async for chunk in chunks:
+                if not chunk:
+                    continue
+                digest.update(chunk)
+                size += len(chunk)
+                buffer += chunk
+                while len(buffer) >= self.part_size:
+                    part = bytes(buffer[:self.part_size])
+                    del buffer[:self.part_size]
+                    await flush(part)
+
+            if upload_id is None:
+                etag = await asyncio.to_thread(self.backend.put, key, bytes(buffer), content_type)
+            else:
+                if buffer:
+                    await flush(bytes(buffer))
+                    buffer = bytearray()
+                await asyncio.gather(*tasks)
+                parts.sort(key=lambda p: p["PartNumber"])
+                etag = await asyncio.to_thread(self.backend.complete_multipart, key, upload_id, parts)
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            if upload_id is not None:
+                try:
+                    await asyncio.to_thread(self.backend.abort_multipart, key, upload_id)
+                except Exception as abort_error:
+                    logger.warning(f"⚠️ Failed to abort multipart upload {key}: {abort_error}")
+            raise
+
+        logger.info(f"✅ Streamed {size} bytes to storage: {key} ({len(parts) or 1} part(s))")
+        return StoredObject(key, self.backend.url(key), size, etag, digest.hexdigest())
+
+    async def head(self, key: str) -> Dict[str, Any]:
+        """Return {"size", "etag"} for an object."""
+        return await asyncio.to_thread(self.backend.head, key)
+
+    async def read_range(self, key: str, start: int, end: int) -> bytes:
+        """Read bytes start..end (inclusive)."""
+        return await asyncio.to_thread(self.backend.read_range, key, start, end)
+
+    async def iter_chunks(self, key: str, chunk_size: Optional[int] = None) -> AsyncIterator[bytes]:
+        """Stream an object as ranged reads, fetching the next range while the caller consumes one."""
+        chunk_size = chunk_size or self.part_size
+        size = (await self.head(key))["size"]
+        if size == 0:
+            return
+        next_read = asyncio.create_task(self.read_range(key, 0, min(chunk_size, size) - 1))
+        try:
+            for start in range(0, size, chunk_size):
+                data = await next_read
+                following = start + chunk_size
+                if following < size:
+                    next_read = asyncio.create_task(
+                        self.read_range(key, following, min(following + chunk_size, size) - 1)
+                    )
+                yield data
+        finally:
+            if not next_read.done():
+                next_read.cancel()
+
+    async def download(self, key: str) -> bytes:
+        """Read a whole object (for consumers that need it in memory, e.g. OCR upload)."""
+        return b"".join([chunk async for chunk in self.iter_chunks(key)])
+
+    async def delete(self, key: str):
+        await asyncio.to_thread(self.backend.delete, key)
+
+
+def _build_object_store() -> AsyncObjectStore:
+    if settings.STORAGE_BACKEND == "local":
+        backend = LocalStorageBackend(settings.LOCAL_STORAGE_DIR)
+        logger.info(f"✅ Object storage: local files under {backend.root}")
+    else:
+        from app.services.s3_service import s3_service
+        backend = S3StorageBackend(lambda: s3_service.s3_client, settings.S3_BUCKET_NAME)
+    return AsyncObjectStore(
+        backend,
+        part_size=settings.STORAGE_PART_SIZE_MB * 1024 * 1024,
+        max_concurrency=settings.STORAGE_MAX_CONCURRENCY,
+    )
+
+
+# Singleton instance
+object_store = _build_object_store()
@@ -5,7 +5,8 @@ import logging
 import asyncio
 import tempfile
 import os
-from typing import Optional
+from collections import deque
+from typing import AsyncIterator, List, Optional
 from mistralai import Mistral
 from mistralai import DocumentURLChunk
 from app.config import settings
@@ -19,6 +20,24 @@ except ImportError:
     docx = None
     logger.warning("python-docx not installed, DOCX support disabled")
 
+try:
+    from pypdf import PdfReader
+except ImportError:
+    PdfReader = None
+    logger.warning("pypdf not installed, PDFs will be OCR'd in a single request")
+
+
+def pdf_page_count(pdf_bytes: bytes) -> Optional[int]:
+    """Number of pages in a PDF, or None if it can't be read here."""
+    if PdfReader is None:
+        return None
+    try:
+        return len(PdfReader(io.BytesIO(pdf_bytes)).pages)
+    except Exception as e:
+        logger.warning(f"⚠️ Couldn't count PDF pages ({e}), OCR'ing it in a single request")
+        return None
+
+
 class OCRService:
     """Service for OCR using Mistral OCR API and text extraction for other formats"""
     
@@ -74,98 +93,162 @@ class OCRService:
             logger.warning(f"⚠️ Unsupported file type for text extraction: {filename}")
             return ""
 
+    async def iter_pages(self, file_bytes: bytes, filename: str) -> AsyncIterator[str]:
+        """
+        Yield a document's text a page at a time, in order.
+
+        PDFs are OCR'd in windows of pages run concurrently; other formats
+        are extracted whole and yielded as a single page.
+        """
+        if filename.lower().endswith('.pdf'):
+            async for page in self.iter_pdf_pages(file_bytes, filename):
+                yield page
+        else:
+            text = await self.extract_text(file_bytes, filename)
+            if text:
+                yield text
+
+    @staticmethod
+    def _page_block(page, position: int) -> str:
+        """Format one OCR page as "--- Page N ---\n<text>" ("" when it has no text)."""
+        # Try to get page number with fallbacks
+        try:
+            page_num = page.page_number
+        except AttributeError:
+            if hasattr(page, 'page_index'):
+                page_num = page.page_index + 1
+            elif hasattr(page, 'index'):
+                page_num = page.index + 1
+            else:
+                page_num = position + 1
+
+        # Extract text content from markdown
+        try:
+            text_content = page.markdown
+        except AttributeError:
+            # Fallback if markdown attribute is missing
+            if hasattr(page, 'text'):
+                text_content = page.text
+            elif hasattr(page, 'content'):
+                text_content = page.content
+            else:
+                text_content = ""
+                logger.warning(f"Could not find text content for page {page_num}")
+
+        return f"--- Page {page_num} ---\n{text_content}" if text_content else ""
+
+    async def iter_pdf_pages(self, pdf_bytes: bytes, filename: Optional[str] = None) -> AsyncIterator[str]:
+        """
+        OCR a PDF with up to OCR_MAX_CONCURRENCY requests of OCR_PAGES_PER_REQUEST
+        pages in flight, yielding page blocks in order as soon as they're ready.
+
+        Windows are sized from the page count read locally, so no request
+        asks for pages past the end. If the count can't be read, or a window
+        fails, the (rest of the) document comes from a single whole-document
+        OCR call.
+        """
+        filename = filename or "document.pdf"
+        loop = asyncio.get_event_loop()
+        window_size = settings.OCR_PAGES_PER_REQUEST
+
+        logger.info(f"📄 Uploading PDF to Mistral OCR: {filename} ({len(pdf_bytes)} bytes)")
+
+        # Upload file to Mistral's OCR service
+        upload_response = await loop.run_in_executor(
+            None,
+            lambda: self.client.files.upload(
+                file={
+                    "file_name": filename,
+                    "content": pdf_bytes,
+                },
+                purpose="ocr"
+            )
+        )
+
+        logger.info(f"✅ File uploaded, ID: {upload_response.id}")
+
+        # Get signed URL for the uploaded file
+        signed_url_response = await loop.run_in_executor(
+            None,
+            lambda: self.client.files.get_signed_url(
+                file_id=upload_response.id,
+                expiry=1  # 1 hour expiry
+            )
+        )
+
+        page_count = await loop.run_in_executor(None, pdf_page_count, pdf_bytes)
+        logger.info(f"✅ Got signed URL, processing OCR ({page_count or 'unknown'} pages)...")
+
+        def process(pages: Optional[List[int]] = None):
+            kwargs = {"pages": pages} if pages is not None else {}
+            return self.client.ocr.process(
+                document=DocumentURLChunk(document_url=signed_url_response.url),
+                model=self.model,
+                include_image_base64=False,  # We only need text
+                **kwargs
+            )
+
+        windows = deque(
+            list(range(first, min(first + window_size, page_count)))
+            for first in range(0, page_count or 0, window_size)
+        )
+        in_flight = deque(
+            loop.run_in_executor(None, process, windows.popleft())
+            for _ in range(min(settings.OCR_MAX_CONCURRENCY, len(windows)))
+        )
+        whole_document = not in_flight
+        position = 0
+        try:
+            while in_flight or whole_document:
+                if whole_document:
+                    pages = ((await loop.run_in_executor(None, process)).pages or [])[position:]
+                    whole_document = False
+                else:
+                    try:
+                        pages = (await in_flight.popleft()).pages or []
+                    except Exception as e:
+                        logger.warning(f"⚠️ Windowed OCR failed after {position} pages ({e}), processing the whole document")
+                        for future in in_flight:
+                            future.cancel()
+                        in_flight.clear()
+                        windows.clear()
+                        whole_document = True
+                        continue
+
+                for page in pages:
+                    block = self._page_block(page, position)
+                    position += 1
+                    if block:
+                        yield block
+
+                if windows:
+                    in_flight.append(loop.run_in_executor(None, process, windows.popleft()))
+        finally:
+            for future in in_flight:
+                future.cancel()
+
+        if not position:
+            logger.warning("No pages found in OCR response")
+        logger.info(f"✅ OCR'd {position} pages of {filename}")
+
     async def extract_text_from_pdf(self, pdf_bytes: bytes, filename: Optional[str] = None) -> str:
         """
         Extract text from PDF using Mistral OCR API
-        
+
         Args:
             pdf_bytes: PDF file as bytes
             filename: Optional filename for the PDF
-            
+
         Returns:
             Extracted text content
         """
         try:
-            filename = filename or "document.pdf"
-            loop = asyncio.get_event_loop()
-            
-            logger.info(f"📄 Uploading PDF to Mistral OCR: {filename} ({len(pdf_bytes)} bytes)")
-            
-            # Upload file to Mistral's OCR service
-            upload_response = await loop.run_in_executor(
-                None,
-                lambda: self.client.files.upload(
-                    file={
-                        "file_name": filename,
-                        "content": pdf_bytes,
-                    },
-                    purpose="ocr"
-                )
-            )
-            
-            logger.info(f"✅ File uploaded, ID: {upload_response.id}")
-            
-            # Get signed URL for the uploaded file
-            signed_url_response = await loop.run_in_executor(
-                None,
-                lambda: self.client.files.get_signed_url(
-                    file_id=upload_response.id, 
-                    expiry=1  # 1 hour expiry
-                )
-            )
-            
-            logger.info(f"✅ Got signed URL, processing OCR...")
-            
-            # Process PDF with OCR
-            ocr_response = await loop.run_in_executor(
-                None,
-                lambda: self.client.ocr.process(
-                    document=DocumentURLChunk(document_url=signed_url_response.url),
-                    model=self.model,
-                    include_image_base64=False  # We only need text
-                )
-            )
-            
-            # Extract text from all pages
-            all_text = []
-            
-            if not ocr_response.pages:
-                logger.warning("No pages found in OCR response")
-                return ""
-            
-            for idx, page in enumerate(ocr_response.pages):
-                # Try to get page number with fallbacks
-                try:
-                    page_num = page.page_number
-                except AttributeError:
-                    if hasattr(page, 'page_index'):
-                        page_num = page.page_index + 1
-                    elif hasattr(page, 'index'):
-                        page_num = page.index + 1
-                    else:
-                        page_num = idx + 1
-                
-                # Extract text content from markdown
-                try:
-                    text_content = page.markdown
-                except AttributeError:
-                    # Fallback if markdown attribute is missing
-                    if hasattr(page, 'text'):
-                        text_content = page.text
-                    elif hasattr(page, 'content'):
-                        text_content = page.content
-                    else:
-                        text_content = ""
-                        logger.warning(f"Could not find text content for page {page_num}")
-                
-                if text_content:
-                    all_text.append(f"--- Page {page_num} ---\n{text_content}")
-            
+            all_text = [page async for page in self.iter_pdf_pages(pdf_bytes, filename)]
             full_text = "\n\n".join(all_text)
-            logger.info(f"✅ Extracted {len(full_text)} characters from PDF ({len(ocr_response.pages)} pages)")
-            
+            logger.info(f"✅ Extracted {len(full_text)} characters from PDF ({len(all_text)} pages)")
+
             return full_text
-            
+
         except Exception as e:
             logger.error(f"❌ Error extracting text from PDF: {e}")
             import traceback
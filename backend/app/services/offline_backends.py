@@ -0,0 +1,813 @@
+"""
+Offline stand-ins for external AI, vector and storage backends
+
+Swaps the network clients behind llm_service, embeddings_service,
+reranker_service, pinecone_service, s3_service and ocr_service for local
+implementations so the RAG, post-fight and PDF pipelines can be profiled
+on a laptop or in CI.
+
+Modes (SERENE_BACKENDS):
+- live:   real clients (default, nothing is patched)
+- fake:   deterministic local clients with configurable latency
+- record: real clients, every response is captured to a cassette file
+- replay: responses are served from cassettes, no network access
+
+Only the underlying clients are replaced (e.g. pinecone_service.index,
+embeddings_service.client), so service logic - retries, batching,
+filtering - runs exactly as it does in production. The on-disk caches
+those services keep are separated per mode (see isolate_local_stores()),
+so offline runs never leave fake data where live lookups would find it.
+
+Latency (SERENE_FAKE_LATENCY) is a comma-separated list of
+backend=distribution entries, e.g.
+    "llm=lognormal:900:0.4,embeddings=normal:120:30,pinecone=uniform:20:60"
+Distributions: fixed:ms, uniform:lo_ms:hi_ms, normal:mean_ms:std_ms,
+lognormal:median_ms:sigma. Backends: llm, embeddings, rerank, pinecone,
+s3, ocr. Unlisted backends answer instantly.
+"""
+import base64
+import hashlib
+import io
+import json
+import logging
+import math
+import os
+import random
+import re
+import threading
+import time
+import uuid
+from typing import Any, Dict, Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+EMBEDDING_DIMENSIONS = 1024
+BACKEND_NAMES = ("llm", "embeddings", "rerank", "pinecone", "s3", "ocr")
+_TOKEN_RE = re.compile(r"[a-z0-9']+")
+
+
+# ============================================
+# RESPONSE OBJECTS & LATENCY
+# ============================================
+
+class Record(dict):
+    """Dict with attribute access, standing in for SDK response objects."""
+
+    def __getattr__(self, name: str) -> Any:
+        try:
+            return self[name]
+        except KeyError:
+            raise AttributeError(name)
+
+    @property
+    def values(self):
+        # Vectors carry a "values" field, which would otherwise be shadowed by dict.values
+        if "values" in self:
+            return self["values"]
+        return super().values
+
+    def to_dict(self) -> dict:
+        return dict(self)
+
+
+def _record(value: Any) -> Any:
+    """Recursively wrap plain data so it supports attribute access."""
+    if isinstance(value, dict):
+        if "__bytes__" in value and len(value) == 1:
+            return base64.b64decode(value["__bytes__"])
+        if "__stream__" in value and len(value) == 1:
+            return io.BytesIO(base64.b64decode(value["__stream__"]))
+        return Record({k: _record(v) for k, v in value.items()})
+    if isinstance(value, list):
+        return [_record(v) for v in value]
+    return value
+
+
+class LatencyModel:
+    """Samples per-call latency from a configured distribution."""
+
+    def __init__(self, distribution: str = "fixed", params: Optional[List[float]] = None, seed: int = 0):
+        self.distribution = distribution
+        self.params = params or [0.0]
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    @classmethod
+    def parse(cls, spec: str, seed: int = 0) -> "LatencyModel":
+        """Parse 'lognormal:900:0.4' style specs."""
+        name, _, rest = spec.strip().partition(":")
+        params = [float(p) for p in rest.split(":") if p]
+        if name not in ("fixed", "uniform", "normal", "lognormal"):
+            raise ValueError(f"Unknown latency distribution: {name}")
+        return cls(name, params, seed)
+
+    def sample_ms(self) -> float:
+        with self._lock:
+            p = self.params
+            if self.distribution == "uniform":
+                value = self._rng.uniform(p[0], p[1])
+            elif self.distribution == "normal":
+                value = self._rng.gauss(p[0], p[1] if len(p) > 1 else 0.0)
+            elif self.distribution == "lognormal":
+                value = self._rng.lognormvariate(math.log(max(p[0], 1e-3)), p[1] if len(p) > 1 else 0.0)
+            else:
+                value = p[0]
+        return max(0.0, value)
+
+    def wait(self):
+        delay = self.sample_ms()
+        if delay:
+            time.sleep(delay / 1000.0)
+
+
+def parse_latency_config(spec: str, seed: int = 0) -> Dict[str, LatencyModel]:
+    """Parse SERENE_FAKE_LATENCY into per-backend latency models."""
+    models = {name: LatencyModel() for name in BACKEND_NAMES}
+    for entry in filter(None, (e.strip() for e in (spec or "").split(","))):
+        name, _, dist = entry.partition("=")
+        if name not in models:
+            raise ValueError(f"Unknown backend in latency config: {name}")
+        models[name] = LatencyModel.parse(dist, seed=seed + BACKEND_NAMES.index(name))
+    return models
+
+
+# ============================================
+# DETERMINISTIC HELPERS
+# ============================================
+
+def _stable_hash(text: str) -> int:
+    return int.from_bytes(hashlib.blake2b(text.encode("utf-8"), digest_size=8).digest(), "big")
+
+
+def _tokens(text: str) -> List[str]:
+    return _TOKEN_RE.findall((text or "").lower())
+
+
+def deterministic_embedding(text: str, dimensions: int = EMBEDDING_DIMENSIONS) -> List[float]:
+    """
+    Hashed bag-of-words embedding.
+
+    Texts sharing words get high cosine similarity, so retrieval and
+    reranking behave plausibly while staying fully deterministic.
+    """
+    vector = [0.0] * dimensions
+    tokens = _tokens(text) or [text or ""]
+    for token in tokens:
+        h = _stable_hash(token)
+        vector[h % dimensions] += 1.0 if (h >> 32) & 1 else -1.0
+    norm = math.sqrt(sum(v * v for v in vector)) or 1.0
+    return [v / norm for v in vector]
+
+
+def lexical_relevance(query: str, document: str) -> float:
+    """Share of query terms present in the document (0..1)."""
+    query_terms = set(_tokens(query))
+    if not query_terms:
+        return 0.0
+    doc_terms = set(_tokens(document))
+    return len(query_terms & doc_terms) / len(query_terms)
+
+
+def sample_from_schema(schema: dict, root: Optional[dict] = None) -> Any:
+    """Build the smallest value that validates against a JSON schema."""
+    root = root or schema
+    if "$ref" in schema:
+        ref = schema["$ref"].split("/")[-1]
+        return sample_from_schema(root.get("$defs", {}).get(ref, {}), root)
+    if "default" in schema:
+        return schema["default"]
+    if "enum" in schema:
+        return schema["enum"][0]
+    if "const" in schema:
+        return schema["const"]
+    for key in ("anyOf", "oneOf", "allOf"):
+        if key in schema:
+            options = [o for o in schema[key] if o.get("type") != "null"] or schema[key]
+            return sample_from_schema(options[0], root)
+
+    schema_type = schema.get("type", "object")
+    if schema_type == "object":
+        properties = schema.get("properties", {})
+        return {name: sample_from_schema(prop, root) for name, prop in properties.items()}
+    if schema_type == "array":
+        items = schema.get("items", {})
+        return [sample_from_schema(items, root) for _ in range(schema.get("minItems", 0))]
+    if schema_type in ("number", "integer"):
+        value = schema.get("minimum", schema.get("exclusiveMinimum", 0))
+        value = min(max(value, 0), schema.get("maximum", value))
+        return int(value) if schema_type == "integer" else float(value)
+    if schema_type == "boolean":
+        return False
+    if schema_type == "null":
+        return None
+    return "offline" + "." * max(0, schema.get("minLength", 0) - 7)
+
+
+# ============================================
+# FAKE CLIENTS
+# ============================================
+
+class FakeVoyageClient:
+    """Stands in for voyageai.Client (embed + rerank)."""
+
+    def __init__(self, embed_latency: Optional[LatencyModel] = None, rerank_latency: Optional[LatencyModel] = None):
+        self.embed_latency = embed_latency or LatencyModel()
+        self.rerank_latency = rerank_latency or LatencyModel()
+        self.calls = {"embed": 0, "rerank": 0}
+
+    def embed(self, texts: List[str], model: str = None, input_type: str = None, **kwargs) -> Record:
+        self.calls["embed"] += 1
+        self.embed_latency.wait()
+        return Record(
+            embeddings=[deterministic_embedding(t) for t in texts],
+            total_tokens=sum(len(_tokens(t)) for t in texts),
+        )
+
+    def rerank(self, query: str, documents: List[str], model: str = None, top_k: int = None, **kwargs) -> Record:
+        self.calls["rerank"] += 1
+        self.rerank_latency.wait()
+        scored = sorted(
+            ((lexical_relevance(query, doc), index) for index, doc in enumerate(documents)),
+            key=lambda s: (-s[0], s[1]),
+        )
+        if top_k is not None:
+            scored = scored[:top_k]
+        return Record(
+            results=[
+                Record(index=index, document=documents[index], relevance_score=score)
+                for score, index in scored
+            ],
+            total_tokens=len(_tokens(query)) * len(documents),
+        )
+
+
+class _FakeCompletions:
+    def __init__(self, owner: "FakeOpenAIClient"):
+        self._owner = owner
+
+    def create(self, model: str = None, messages: list = None, stream: bool = False,
+               response_format: Optional[dict] = None, **kwargs):
+        self._owner.calls += 1
+        self._owner.latency.wait()
+        content = self._owner.respond(messages or [], response_format)
+        if stream:
+            return self._stream(content)
+        return Record(
+            id=f"offline-{uuid.uuid4().hex[:12]}",
+            model=model,
+            choices=[Record(index=0, finish_reason="stop", message=Record(role="assistant", content=content))],
+            usage=Record(prompt_tokens=0, completion_tokens=len(_tokens(content)), total_tokens=0),
+        )
+
+    @staticmethod
+    def _stream(content: str) -> Iterator[Record]:
+        for piece in re.findall(r"\S+\s*", content):
+            yield Record(choices=[Record(index=0, delta=Record(content=piece))])
+
+
+class FakeOpenAIClient:
+    """
+    Stands in for the OpenAI-compatible OpenRouter client.
+
+    JSON-mode requests from LLMService.structured_output are answered with
+    the smallest payload matching the schema embedded in the system prompt.
+    """
+
+    _SCHEMA_RE = re.compile(r"Schema JSON:\s*(\{.*\})\s*IMPORTANT:", re.DOTALL)
+
+    def __init__(self, latency: Optional[LatencyModel] = None):
+        self.latency = latency or LatencyModel()
+        self.calls = 0
+        self.chat = Record(completions=_FakeCompletions(self))
+
+    def respond(self, messages: list, response_format: Optional[dict]) -> str:
+        if response_format and response_format.get("type") == "json_object":
+            for message in messages:
+                match = self._SCHEMA_RE.search(str(message.get("content", "")))
+                if match:
+                    try:
+                        return json.dumps(sample_from_schema(json.loads(match.group(1))))
+                    except ValueError:
+                        break
+            return "{}"
+        last_user = next(
+            (str(m.get("content", "")) for m in reversed(messages) if m.get("role") == "user"),
+            "",
+        )
+        return f"Offline response ({_stable_hash(last_user) % 10000:04d}): {last_user[:120]}"
+
+
+class FakePineconeIndex:
+    """In-memory stand-in for a Pinecone Index with metadata filtering."""
+
+    def __init__(self, latency: Optional[LatencyModel] = None):
+        self.latency = latency or LatencyModel()
+        self.namespaces: Dict[str, Dict[str, Record]] = {}
+        self._lock = threading.Lock()
+
+    def upsert(self, vectors: list, namespace: str = "", **kwargs) -> Record:
+        self.latency.wait()
+        with self._lock:
+            store = self.namespaces.setdefault(namespace, {})
+            for vector in vectors:
+                if isinstance(vector, (tuple, list)):
+                    vector = {"id": vector[0], "values": vector[1], "metadata": vector[2] if len(vector) > 2 else {}}
+                store[vector["id"]] = Record(
+                    id=vector["id"],
+                    values=list(vector["values"]),
+                    metadata=dict(vector.get("metadata") or {}),
+                )
+        return Record(upserted_count=len(vectors))
+
+    def query(self, vector: List[float] = None, top_k: int = 10, namespace: str = "",
+              filter: Optional[dict] = None, include_metadata: bool = False,
+              include_values: bool = False, **kwargs) -> Record:
+        self.latency.wait()
+        with self._lock:
+            candidates = list(self.namespaces.get(namespace, {}).values())
+        candidates = [c for c in candidates if matches_filter(c.metadata, filter)]
+        scored = [(sum(a * b for a, b in zip(vector, c.values)), c) for c in candidates]
+        scored.sort(key=lambda s: (-s[0], s[1].id))
+        matches = []
+        for score, candidate in scored[:top_k]:
+            match = Record(id=candidate.id, score=score)
+            match["metadata"] = Record(candidate.metadata) if include_metadata else None
+            match["values"] = candidate.values if include_values else []
+            matches.append(match)
+        return Record(matches=matches, namespace=namespace)
+
+    def fetch(self, ids: List[str], namespace: str = "", **kwargs) -> Record:
+        self.latency.wait()
+        with self._lock:
+            store = self.namespaces.get(namespace, {})
+            found = {i: Record(store[i]) for i in ids if i in store}
+        return Record(vectors=found, namespace=namespace)
+
+    def list_paginated(self, namespace: str = "", limit: int = 100, pagination_token: Optional[str] = None,
+                       prefix: Optional[str] = None, **kwargs) -> Record:
+        """Ids in id order; like Pinecone, the token resumes after the last id returned."""
+        self.latency.wait()
+        with self._lock:
+            ids = sorted(
+                i for i in self.namespaces.get(namespace, {})
+                if (not prefix or i.startswith(prefix)) and (pagination_token is None or i > pagination_token)
+            )
+        page = ids[:limit]
+        more = len(ids) > limit
+        return Record(
+            vectors=[Record(id=i) for i in page],
+            pagination=Record(next=page[-1]) if more else None,
+            namespace=namespace,
+        )
+
+    def delete(self, ids: Optional[List[str]] = None, delete_all: bool = False,
+               namespace: str = "", filter: Optional[dict] = None, **kwargs) -> Record:
+        self.latency.wait()
+        with self._lock:
+            store = self.namespaces.setdefault(namespace, {})
+            if delete_all:
+                store.clear()
+            elif ids:
+                for i in ids:
+                    store.pop(i, None)
+            elif filter:
+                for i in [i for i, v in store.items() if matches_filter(v.metadata, filter)]:
+                    del store[i]
+        return Record()
+
+    def describe_index_stats(self, **kwargs) -> Record:
+        with self._lock:
+            namespaces = {ns: Record(vector_count=len(v)) for ns, v in self.namespaces.items()}
+        return Record(
+            dimension=EMBEDDING_DIMENSIONS,
+            namespaces=namespaces,
+            total_vector_count=sum(n.vector_count for n in namespaces.values()),
+        )
+
+
+def matches_filter(metadata: Optional[dict], filter: Optional[dict]) -> bool:
+    """Evaluate a Pinecone metadata filter against a metadata dict."""
+    if not filter:
+        return True
+    metadata = metadata or {}
+    for key, condition in filter.items():
+        if key == "$and":
+            if not all(matches_filter(metadata, f) for f in condition):
+                return False
+        elif key == "$or":
+            if not any(matches_filter(metadata, f) for f in condition):
+                return False
+        else:
+            value = metadata.get(key)
+            if not isinstance(condition, dict):
+                condition = {"$eq": condition}
+            for op, expected in condition.items():
+                if not _compare(op, value, expected, key in metadata):
+                    return False
+    return True
+
+
+def _compare(op: str, value: Any, expected: Any, present: bool) -> bool:
+    if op == "$eq":
+        return present and (expected in value if isinstance(value, list) else value == expected)
+    if op == "$ne":
+        return not present or value != expected
+    if op == "$in":
+        return present and (bool(set(value) & set(expected)) if isinstance(value, list) else value in expected)
+    if op == "$nin":
+        return not present or (not set(value) & set(expected) if isinstance(value, list) else value not in expected)
+    if op == "$exists":
+        return present == bool(expected)
+    if not present or value is None:
+        return False
+    try:
+        if op == "$gt":
+            return value > expected
+        if op == "$gte":
+            return value >= expected
+        if op == "$lt":
+            return value < expected
+        if op == "$lte":
+            return value <= expected
+    except TypeError:
+        return False
+    raise ValueError(f"Unsupported filter operator: {op}")
+
+
+class FakeS3Client:
+    """In-memory stand-in for the boto3 S3 client."""
+
+    def __init__(self, latency: Optional[LatencyModel] = None):
+        self.latency = latency or LatencyModel()
+        self.objects: Dict[tuple, Dict[str, Any]] = {}
+        self.uploads: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _missing(operation: str, code: str):
+        from botocore.exceptions import ClientError
+        return ClientError({"Error": {"Code": code, "Message": "Not Found"}}, operation)
+
+    def put_object(self, Bucket: str, Key: str, Body: Any = b"", ContentType: str = None, **kwargs) -> Record:
+        self.latency.wait()
+        data = Body.read() if hasattr(Body, "read") else Body
+        if isinstance(data, str):
+            data = data.encode("utf-8")
+        etag = hashlib.md5(data).hexdigest()
+        with self._lock:
+            self.objects[(Bucket, Key)] = {"Body": data, "ContentType": ContentType, "ETag": f'"{etag}"'}
+        return Record(ETag=f'"{etag}"')
+
+    def get_object(self, Bucket: str, Key: str, Range: str = None, **kwargs) -> Record:
+        self.latency.wait()
+        with self._lock:
+            obj = self.objects.get((Bucket, Key))
+        if obj is None:
+            raise self._missing("GetObject", "NoSuchKey")
+        body = obj["Body"]
+        if Range:
+            start, _, end = Range[len("bytes="):].partition("-")
+            body = body[int(start):int(end) + 1 if end else None]
+        return Record(
+            Body=io.BytesIO(body),
+            ContentLength=len(body),
+            ContentType=obj["ContentType"],
+            ETag=obj["ETag"],
+        )
+
+    def create_multipart_upload(self, Bucket: str, Key: str, ContentType: str = None, **kwargs) -> Record:
+        self.latency.wait()
+        upload_id = uuid.uuid4().hex
+        with self._lock:
+            self.uploads[upload_id] = {"Key": (Bucket, Key), "ContentType": ContentType, "Parts": {}}
+        return Record(UploadId=upload_id, Bucket=Bucket, Key=Key)
+
+    def upload_part(self, Bucket: str, Key: str, UploadId: str, PartNumber: int, Body: Any = b"", **kwargs) -> Record:
+        self.latency.wait()
+        data = Body.read() if hasattr(Body, "read") else Body
+        with self._lock:
+            if UploadId not in self.uploads:
+                raise self._missing("UploadPart", "NoSuchUpload")
+            self.uploads[UploadId]["Parts"][PartNumber] = data
+        return Record(ETag=f'"{hashlib.md5(data).hexdigest()}"')
+
+    def complete_multipart_upload(self, Bucket: str, Key: str, UploadId: str, MultipartUpload: dict = None, **kwargs) -> Record:
+        self.latency.wait()
+        with self._lock:
+            upload = self.uploads.pop(UploadId, None)
+            if upload is None:
+                raise self._missing("CompleteMultipartUpload", "NoSuchUpload")
+            numbers = [part["PartNumber"] for part in (MultipartUpload or {}).get("Parts", [])]
+            data = b"".join(upload["Parts"][n] for n in numbers)
+            etag = f'"{hashlib.md5(data).hexdigest()}-{len(numbers)}"'
+            self.objects[(Bucket, Key)] = {"Body": data, "ContentType": upload["ContentType"], "ETag": etag}
+        return Record(ETag=etag, Bucket=Bucket, Key=Key)
+
+    def abort_multipart_upload(self, Bucket: str, Key: str, UploadId: str, **kwargs) -> Record:
+        with self._lock:
+            self.uploads.pop(UploadId, None)
+        return Record()
+
+    def head_object(self, Bucket: str, Key: str, **kwargs) -> Record:
+        self.latency.wait()
+        with self._lock:
+            obj = self.objects.get((Bucket, Key))
+        if obj is None:
+            raise self._missing("HeadObject", "404")
+        return Record(ContentLength=len(obj["Body"]), ContentType=obj["ContentType"], ETag=obj["ETag"])
+
+    def delete_object(self, Bucket: str, Key: str, **kwargs) -> Record:
+        self.latency.wait()
+        with self._lock:
+            self.objects.pop((Bucket, Key), None)
+        return Record()
+
+    def generate_presigned_url(self, ClientMethod: str, Params: dict = None, ExpiresIn: int = 3600, **kwargs) -> str:
+        params = Params or {}
+        return f"offline://{params.get('Bucket', '')}/{params.get('Key', '')}?expires={ExpiresIn}"
+
+
+class _FakeMistralFiles:
+    def __init__(self, owner: "FakeMistralClient"):
+        self._owner = owner
+
+    def upload(self, file: dict, purpose: str = None, **kwargs) -> Record:
+        self._owner.latency.wait()
+        content = file.get("content", b"")
+        file_id = hashlib.sha256(content).hexdigest()[:24]
+        self._owner.files_by_id[file_id] = content
+        return Record(id=file_id, filename=file.get("file_name"), purpose=purpose)
+
+    def get_signed_url(self, file_id: str, expiry: int = 1, **kwargs) -> Record:
+        return Record(url=f"offline://mistral/{file_id}")
+
+
+class _FakeMistralOCR:
+    def __init__(self, owner: "FakeMistralClient"):
+        self._owner = owner
+
+    def process(self, document: Any = None, model: str = None, pages: Optional[List[int]] = None, **kwargs) -> Record:
+        self._owner.latency.wait()
+        url = getattr(document, "document_url", None) or (document or {}).get("document_url", "")
+        all_pages = self._owner.pages(url.rsplit("/", 1)[-1])
+        if pages is not None and any(not 0 <= i < len(all_pages) for i in pages):
+            # Don't count on the real API clipping out-of-range pages
+            raise ValueError(f"Requested pages {pages} outside a {len(all_pages)}-page document")
+        wanted = range(len(all_pages)) if pages is None else pages
+        return Record(
+            model=model,
+            pages=[Record(index=i, markdown=all_pages[i]) for i in wanted],
+        )
+
+
+class FakeMistralClient:
+    """
+    Stands in for the Mistral OCR client.
+
+    The uploaded bytes are decoded as text and split into fixed-size
+    pages, so text fixtures saved as .pdf flow through the real pipeline.
+    """
+
+    def __init__(self, latency: Optional[LatencyModel] = None, page_chars: int = 3000):
+        self.latency = latency or LatencyModel()
+        self.page_chars = page_chars
+        self.files_by_id: Dict[str, bytes] = {}
+        self._pages_by_id: Dict[str, List[str]] = {}
+        self.files = _FakeMistralFiles(self)
+        self.ocr = _FakeMistralOCR(self)
+
+    def pages(self, file_id: str) -> List[str]:
+        """Split an uploaded file into pages once; windowed requests reuse the split."""
+        if file_id not in self._pages_by_id:
+            text = self.files_by_id.get(file_id, b"").decode("utf-8", errors="ignore")
+            text = "".join(ch for ch in text if ch.isprintable() or ch in "\n\t")
+            size = self.page_chars
+            self._pages_by_id[file_id] = [text[i:i + size] for i in range(0, len(text), size)] or [""]
+        return self._pages_by_id[file_id]
+
+
+# ============================================
+# RECORD / REPLAY
+# ============================================
+
+class CassetteMiss(KeyError):
+    """Raised in replay mode when a request was never recorded."""
+
+
+def _to_plain(value: Any) -> Any:
+    """Convert SDK response objects into JSON-serializable data."""
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return value
+    if isinstance(value, (bytes, bytearray)):
+        return {"__bytes__": base64.b64encode(bytes(value)).decode("ascii")}
+    if hasattr(value, "read") and callable(value.read):
+        return {"__stream__": base64.b64encode(value.read()).decode("ascii")}
+    if isinstance(value, dict):
+        return {str(k): _to_plain(v) for k, v in value.items()}
+    if hasattr(value, "_asdict"):
+        return _to_plain(value._asdict())
+    if isinstance(value, (list, tuple)):
+        return [_to_plain(v) for v in value]
+    if hasattr(value, "model_dump"):
+        return _to_plain(value.model_dump())
+    if hasattr(value, "to_dict"):
+        return _to_plain(value.to_dict())
+    if hasattr(value, "__dict__"):
+        return {k: _to_plain(v) for k, v in vars(value).items() if not k.startswith("_")}
+    return str(value)
+
+
+def _key_default(value: Any) -> Any:
+    """JSON fallback for request arguments when building cassette keys."""
+    if isinstance(value, (bytes, bytearray)):
+        return "sha256:" + hashlib.sha256(bytes(value)).hexdigest()
+    if hasattr(value, "read"):
+        return f"stream:{id(value)}"
+    return _to_plain(value)
+
+
+class Cassette:
+    """JSON file of recorded responses keyed by request hash."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._entries: Optional[Dict[str, Any]] = None
+
+    def _load(self) -> Dict[str, Any]:
+        if self._entries is None:
+            try:
+                with open(self.path) as f:
+                    self._entries = json.load(f)
+            except FileNotFoundError:
+                self._entries = {}
+        return self._entries
+
+    @staticmethod
+    def key(path: str, args: tuple, kwargs: dict) -> str:
+        payload = json.dumps([path, list(args), kwargs], sort_keys=True, default=_key_default)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Any:
+        with self._lock:
+            entries = self._load()
+            if key not in entries:
+                raise CassetteMiss(key)
+            return entries[key]
+
+    def put(self, key: str, value: Any):
+        with self._lock:
+            self._load()[key] = value
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(self._entries, f)
+            os.replace(tmp_path, self.path)
+
+
+class RecordReplayProxy:
+    """
+    Wraps a client so every method call is recorded to or replayed from a cassette.
+
+    Attribute chains are followed (client.chat.completions.create), and the
+    dotted path plus the call arguments form the cassette key.
+    """
+
+    def __init__(self, target: Any, cassette: Cassette, mode: str, path: str = ""):
+        self._target = target
+        self._cassette = cassette
+        self._mode = mode
+        self._path = path
+
+    def __getattr__(self, name: str) -> "RecordReplayProxy":
+        path = f"{self._path}.{name}" if self._path else name
+        target = getattr(self._target, name) if self._target is not None else None
+        return RecordReplayProxy(target, self._cassette, self._mode, path)
+
+    def __call__(self, *args, **kwargs) -> Any:
+        key = Cassette.key(self._path, args, kwargs)
+        if self._mode == "replay":
+            return _record(self._cassette.get(key))
+        result = self._target(*args, **kwargs)
+        if isinstance(result, Iterator) and not hasattr(result, "read"):
+            result = list(result)  # Materialize streams so they can be stored
+        plain = _to_plain(result)
+        self._cassette.put(key, plain)
+        return _record(plain)
+
+
+# ============================================
+# INSTALLATION
+# ============================================
+
+_installed_mode = "live"
+
+
+def mode_path(path: str, mode: str) -> str:
+    """Per-mode location next to a live cache path (.cache/x -> .cache/<mode>/x)."""
+    return os.path.join(os.path.dirname(path), mode, os.path.basename(path))
+
+
+def isolate_local_stores(mode: str):
+    """
+    Keep a non-live mode out of the live on-disk caches.
+
+    Embeddings are cached under the mode as their backend; the document
+    registry, vector payloads and debrief cache move to per-mode paths.
+    """
+    from app.services.debrief_repository import DebriefCache, debrief_repository
+    from app.services.document_registry import document_registry
+    from app.services.embedding_cache import EmbeddingCache
+    from app.services.embeddings_service import embeddings_service
+    from app.services.payload_store import PayloadStore
+    from app.services.pinecone_service import pinecone_service
+
+    cache = embeddings_service.cache
+    if cache is not None:
+        embeddings_service.cache = EmbeddingCache(cache.path, cache.max_entries, cache.dtype, backend=mode)
+    document_registry.store = PayloadStore(mode_path(document_registry.store.path, mode))
+    pinecone_service.payloads = PayloadStore(mode_path(pinecone_service.payloads.path, mode))
+    debriefs = debrief_repository.cache
+    if debriefs.directory:
+        debrief_repository.cache = DebriefCache(mode_path(debriefs.directory, mode), debriefs.max_entries)
+
+
+def install_offline_backends(
+    mode: str,
+    cassette_dir: str = "cassettes",
+    latency_spec: str = "",
+    seed: int = 0,
+) -> Dict[str, Any]:
+    """
+    Replace the clients behind the service singletons.
+
+    Args:
+        mode: live, fake, record or replay
+        cassette_dir: Directory for record/replay cassette files
+        latency_spec: SERENE_FAKE_LATENCY-style latency config (fake mode)
+        seed: Seed for latency sampling
+
+    Returns:
+        Map of backend name -> installed client (empty in live mode)
+    """
+    global _installed_mode
+    if mode == "live":
+        return {}
+    if mode not in ("fake", "record", "replay"):
+        raise ValueError(f"Unknown backend mode: {mode}")
+
+    from app.services.llm_service import llm_service
+    from app.services.embeddings_service import embeddings_service
+    from app.services.reranker_service import reranker_service
+    from app.services.pinecone_service import pinecone_service
+    from app.services.s3_service import s3_service
+    from app.services.ocr_service import ocr_service
+
+    targets = {
+        "llm": (llm_service, "client"),
+        "embeddings": (embeddings_service, "client"),
+        "rerank": (reranker_service, "client"),
+        "pinecone": (pinecone_service, "index"),
+        "s3": (s3_service, "s3_client"),
+        "ocr": (ocr_service, "client"),
+    }
+
+    if mode == "fake":
+        latency = parse_latency_config(latency_spec, seed=seed)
+        clients = {
+            "llm": FakeOpenAIClient(latency["llm"]),
+            "embeddings": FakeVoyageClient(latency["embeddings"], latency["rerank"]),
+            "rerank": FakeVoyageClient(latency["embeddings"], latency["rerank"]),
+            "pinecone": FakePineconeIndex(latency["pinecone"]),
+            "s3": FakeS3Client(latency["s3"]),
+            "ocr": FakeMistralClient(latency["ocr"]),
+        }
+    else:
+        clients = {
+            name: RecordReplayProxy(
+                getattr(service, attr) if mode == "record" else None,
+                Cassette(os.path.join(cassette_dir, f"{name}.json")),
+                mode,
+            )
+            for name, (service, attr) in targets.items()
+        }
+
+    for name, (service, attr) in targets.items():
+        setattr(service, attr, clients[name])
+    isolate_local_stores(mode)
+
+    _installed_mode = mode
+    logger.warning(f"⚠️ External backends replaced with offline stand-ins (mode={mode})")
+    return clients
+
+
+def install_from_settings() -> Dict[str, Any]:
+    """Install stand-ins according to SERENE_BACKENDS and related settings."""
+    from app.config import settings
+    if settings.SERENE_BACKENDS == "live" or _installed_mode != "live":
+        return {}
+    return install_offline_backends(
+        settings.SERENE_BACKENDS,
+        cassette_dir=settings.SERENE_CASSETTE_DIR,
+        latency_spec=settings.SERENE_FAKE_LATENCY,
+    )
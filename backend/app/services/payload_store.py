@@ -0,0 +1,111 @@
+"""
+Local blob store for large vector payloads
+
+Transcripts, analyses and repair plans used to ride along as up to 35 KB of
+Pinecone metadata, so every include_metadata=True query (including the
+zero-vector filter scans) shipped them over the wire. Vectors now carry a
+compact payload_ref plus filter fields, and the bodies live here: zlib
+compressed in a local SQLite file, fetched for a whole result page with a
+single get_many().
+
+SQLite runs in WAL mode so API workers and Celery processes on the same
+host share one file. The store is a host-local cache, not the record: it
+is empty after a redeploy and on other hosts, so a miss is filled from the
+durable copy (Postgres transcripts, analysis/repair plan JSON in S3) - see
+PineconeService.hydrate().
+"""
+import logging
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from typing import Dict, Iterable, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+_SQLITE_MAX_PARAMS = 900  # Stay under SQLite's bound-parameter limit
+
+
+def payload_ref(namespace: str, vector_id: str) -> str:
+    """Pointer stored in vector metadata in place of the payload."""
+    return f"{namespace}/{vector_id}"
+
+
+class PayloadStore:
+    """SQLite-backed, zlib-compressed text store keyed by payload_ref."""
+
+    def __init__(self, path: str, compress_level: int = 6):
+        self.path = path
+        self.compress_level = compress_level
+        self._local = threading.local()
+        self._write_lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=10)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS payloads (
+                    ref TEXT PRIMARY KEY,
+                    body BLOB NOT NULL,
+                    updated_at REAL NOT NULL
+                )
+            """)
+            conn.commit()
+            self._local.conn = conn
+        return conn
+
+    def put_many(self, items: Iterable[Tuple[str, str]]):
+        """Store (ref, text) pairs, replacing existing bodies."""
+        now = time.time()
+        rows = [(ref, zlib.compress(text.encode("utf-8"), self.compress_level), now) for ref, text in items]
+        if not rows:
+            return
+        conn = self._conn()
+        with self._write_lock:
+            conn.executemany("INSERT OR REPLACE INTO payloads (ref, body, updated_at) VALUES (?, ?, ?)", rows)
+            conn.commit()
+
+    def put(self, ref: str, text: str):
+        self.put_many([(ref, text)])
+
+    def get_many(self, refs: Sequence[str]) -> Dict[str, str]:
+        """
+        Batch lookup.
+
+        Returns:
+            {ref: text} for the refs that were found
+        """
+        found: Dict[str, str] = {}
+        unique_refs = list(dict.fromkeys(r for r in refs if r))
+        conn = self._conn()
+        for i in range(0, len(unique_refs), _SQLITE_MAX_PARAMS):
+            batch = unique_refs[i:i + _SQLITE_MAX_PARAMS]
+            placeholders = ",".join("?" * len(batch))
+            rows = conn.execute(f"SELECT ref, body FROM payloads WHERE ref IN ({placeholders})", batch).fetchall()
+            for ref, body in rows:
+                found[ref] = zlib.decompress(body).decode("utf-8")
+        self.hits += len(found)
+        self.misses += len(unique_refs) - len(found)
+        return found
+
+    def get(self, ref: str) -> Optional[str]:
+        return self.get_many([ref]).get(ref)
+
+    def delete_many(self, refs: Sequence[str]):
+        if not refs:
+            return
+        conn = self._conn()
+        with self._write_lock:
+            conn.executemany("DELETE FROM payloads WHERE ref = ?", [(ref,) for ref in refs])
+            conn.commit()
+
+    def __len__(self) -> int:
+        (count,) = self._conn().execute("SELECT COUNT(*) FROM payloads").fetchone()
+        return count
@@ -1,26 +1,74 @@
 """
 Pinecone vector database service for storing transcripts and analysis
+
+Transcript, analysis and repair plan vectors carry only ids and filter
+fields in their metadata. The full text/JSON is kept in a local payload
+store (see payload_store.py) and hydrated in one batched lookup; payloads
+the local store doesn't have are read from Postgres/S3.
 """
 import logging
 from pinecone import Pinecone, ServerlessSpec
 from typing import List, Dict, Any, Optional
 from app.config import settings
+from app.services.db_service import db_service
+from app.services.lexical_index import lexical_index_service
+from app.services.local_vector_index import LocalVectorIndex
+from app.services.namespace_router import NamespaceRouter, shard_namespace
+from app.services.payload_store import PayloadStore, payload_ref
+from app.services.semantic_query_cache import semantic_query_cache
+from app.services.vector_writer import VectorWriter
 
 logger = logging.getLogger(__name__)
 
+# Metadata field each namespace's full payload is hydrated into
+PAYLOAD_FIELDS = {
+    "transcripts": "transcript_text",
+    "analysis": "full_analysis_json",
+    "repair_plans": "full_repair_plan_json",
+}
+
 class PineconeService:
     """Service for interacting with Pinecone vector database"""
     
     def __init__(self):
+        self.namespace_layout = settings.PINECONE_NAMESPACE_LAYOUT
+        self._index = None
+        self.payloads = PayloadStore(settings.PAYLOAD_STORE_PATH)
+        # Resolves self.index lazily so offline backends can swap the client
+        self.writer = VectorWriter(lambda: self.index)
+        self.index_name = "serene"
+        if settings.VECTOR_BACKEND == "local":
+            self.pc = None
+            self.index = LocalVectorIndex(
+                settings.LOCAL_VECTOR_INDEX_DIR,
+                ann_threshold=settings.LOCAL_VECTOR_ANN_THRESHOLD,
+            )
+            return
         try:
             self.pc = Pinecone(api_key=settings.PINECONE_API_KEY)
-            self.index_name = "serene"
             self.index = self.pc.Index(self.index_name)
             logger.info(f"✅ Connected to Pinecone index: {self.index_name}")
         except Exception as e:
             logger.error(f"❌ Failed to connect to Pinecone: {e}")
             self.pc = None
             self.index = None
+
+    @property
+    def index(self):
+        """The Pinecone index - routed onto per-relationship namespaces when that layout is enabled"""
+        if self._index is not None and self.namespace_layout == "per_relationship":
+            return NamespaceRouter(self._index)
+        return self._index
+
+    @index.setter
+    def index(self, value):
+        self._index = value
+
+    def namespace_for(self, namespace: str, relationship_id: Optional[str]) -> str:
+        """Physical namespace for a relationship's vectors, for id-based fetch/delete."""
+        if self.namespace_layout == "per_relationship":
+            return shard_namespace(namespace, relationship_id)
+        return namespace
     
     def upsert_transcript(
         self,
@@ -29,15 +77,16 @@ class PineconeService:
         transcript_data: Dict[str, Any],
         namespace: str = "transcripts"
     ):
-        """Store transcript in Pinecone with full text"""
+        """Store transcript in Pinecone; the full text goes to the payload store"""
         if not self.index:
             logger.warning("⚠️ Pinecone index not initialized, skipping transcript storage")
             return
             
         try:
             full_transcript = transcript_data["transcript_text"]
-            # Store full transcript (up to 35KB to leave room for other metadata)
-            transcript_for_metadata = full_transcript[:35000] if len(full_transcript) <= 35000 else full_transcript[:35000]
+            vector_id = f"transcript_{conflict_id}"
+            ref = payload_ref(namespace, vector_id)
+            self.payloads.put(ref, full_transcript)
             
             metadata = {
                 "conflict_id": transcript_data["conflict_id"],
@@ -46,7 +95,7 @@ class PineconeService:
                 "duration": transcript_data["duration"],
                 "partner_a_id": transcript_data["partner_a_id"],
                 "partner_b_id": transcript_data["partner_b_id"],
-                "transcript_text": transcript_for_metadata,  # Full transcript (up to 35KB)
+                "payload_ref": ref,
                 "transcript_length": len(full_transcript),
             }
             
@@ -59,13 +108,13 @@ class PineconeService:
                 # Convert dict to string for metadata
                 metadata["speaker_labels"] = str(transcript_data["speaker_labels"])
             
-            self.index.upsert(
-                vectors=[{
-                    "id": f"transcript_{conflict_id}",
+            self.writer.upsert(
+                [{
+                    "id": vector_id,
                     "values": embedding,
                     "metadata": metadata
                 }],
-                namespace=namespace
+                namespace
             )
             logger.info(f"✅ Stored transcript for conflict {conflict_id} in namespace {namespace}")
         except Exception as e:
@@ -79,31 +128,33 @@ class PineconeService:
         analysis_data: Dict[str, Any],
         namespace: str = "analysis"
     ):
-        """Store analysis results in Pinecone with full JSON"""
+        """Store analysis results in Pinecone; the full JSON goes to the payload store"""
         if not self.index:
             logger.warning("⚠️ Pinecone index not initialized, skipping analysis storage")
             return
 
         try:
             import json
-            # Store full analysis as JSON string (Pinecone metadata can handle up to ~40KB)
             analysis_json = json.dumps(analysis_data, default=str)
+            vector_id = f"analysis_{conflict_id}"
+            ref = payload_ref(namespace, vector_id)
+            self.payloads.put(ref, analysis_json)
             
             metadata = {
                 "conflict_id": analysis_data["conflict_id"],
                 "fight_summary": analysis_data.get("fight_summary", "")[:500],
                 "root_causes": str(analysis_data.get("root_causes", [])),
                 "analyzed_at": analysis_data.get("analyzed_at", "").isoformat() if hasattr(analysis_data.get("analyzed_at"), "isoformat") else str(analysis_data.get("analyzed_at", "")),
-                "full_analysis_json": analysis_json[:35000] if len(analysis_json) <= 35000 else analysis_json[:35000]  # Store full JSON if fits
+                "payload_ref": ref,
             }
             
-            self.index.upsert(
-                vectors=[{
-                    "id": f"analysis_{conflict_id}",
+            self.writer.upsert(
+                [{
+                    "id": vector_id,
                     "values": embedding,
                     "metadata": metadata
                 }],
-                namespace=namespace
+                namespace
             )
             logger.info(f"✅ Stored analysis for conflict {conflict_id} in namespace {namespace}")
         except Exception as e:
@@ -142,14 +193,13 @@ class PineconeService:
         repair_plan_data: Dict[str, Any],
         namespace: str = "repair_plans"
     ):
-        """Store repair plan in Pinecone with full JSON"""
+        """Store repair plan in Pinecone; the full JSON goes to the payload store"""
         if not self.index:
             logger.warning("⚠️ Pinecone index not initialized, skipping repair plan storage")
             return
 
         try:
             import json
-            # Store full repair plan as JSON string
             repair_plan_json = json.dumps(repair_plan_data, default=str)
             
             metadata = {
@@ -159,20 +209,21 @@ class PineconeService:
                 "apology_script": repair_plan_data.get("apology_script", "")[:500],
                 "timing_suggestion": repair_plan_data.get("timing_suggestion", "")[:200],
                 "generated_at": repair_plan_data.get("generated_at", "").isoformat() if hasattr(repair_plan_data.get("generated_at"), "isoformat") else str(repair_plan_data.get("generated_at", "")),
-                "full_repair_plan_json": repair_plan_json[:35000] if len(repair_plan_json) <= 35000 else repair_plan_json[:35000]  # Store full JSON if fits
             }
             
             # Use conflict_id + partner_requesting for unique ID (allows multiple repair plans per conflict)
             partner = repair_plan_data.get("partner_requesting", "unknown")
             vector_id = f"repair_plan_{conflict_id}_{partner}"
+            metadata["payload_ref"] = payload_ref(namespace, vector_id)
+            self.payloads.put(metadata["payload_ref"], repair_plan_json)
             
-            self.index.upsert(
-                vectors=[{
+            self.writer.upsert(
+                [{
                     "id": vector_id,
                     "values": embedding,
                     "metadata": metadata
                 }],
-                namespace=namespace
+                namespace
             )
             logger.info(f"✅ Stored repair plan for conflict {conflict_id} in namespace {namespace}")
         except Exception as e:
@@ -200,6 +251,7 @@ class PineconeService:
             )
             if results.matches:
                 logger.info(f"✅ Found conflict {conflict_id} in namespace {namespace}")
+                self.hydrate(results.matches[:1], namespace)
                 return results.matches[0]
             else:
                 logger.warning(f"⚠️ No conflict found with conflict_id={conflict_id} in namespace {namespace}")
@@ -219,7 +271,9 @@ class PineconeService:
                             def __init__(self, metadata):
                                 self.metadata = metadata
                         logger.info(f"✅ Found conflict {conflict_id} via direct ID fetch")
-                        return MatchResult(vector_data.get('metadata', {}))
+                        match = MatchResult(dict(vector_data.get('metadata') or {}))
+                        self.hydrate([match], namespace)
+                        return match
                 except Exception as fetch_error:
                     logger.error(f"❌ Error fetching by direct ID: {fetch_error}")
             return None
@@ -229,6 +283,72 @@ class PineconeService:
             logger.error(traceback.format_exc())
             return None
 
+    def hydrate(self, matches: List[Any], namespace: str) -> List[Any]:
+        """
+        Fill each match's metadata with its full payload, in one batched lookup.
+
+        Legacy vectors that still carry the payload inline are left as they are.
+        Payloads missing from the local store (new host, redeploy) are read
+        from their durable copy and written back to the store.
+
+        Returns:
+            The same matches, with metadata[PAYLOAD_FIELDS[namespace]] set where found
+        """
+        field = PAYLOAD_FIELDS.get(namespace)
+        if field is None:
+            return matches
+        pending = [m for m in matches if m.metadata is not None and not m.metadata.get(field)]
+        if not pending:
+            return matches
+
+        try:
+            bodies = self.payloads.get_many([m.metadata.get("payload_ref") for m in pending])
+        except Exception as e:
+            logger.error(f"❌ Payload store lookup failed: {e}")
+            bodies = {}
+
+        recovered = []
+        for match in pending:
+            ref = match.metadata.get("payload_ref")
+            body = bodies.get(ref)
+            if body is None and match.metadata.get("conflict_id"):
+                try:
+                    body = self._durable_payload(namespace, match.metadata)
+                except Exception as e:
+                    logger.warning(f"⚠️ Could not load {namespace} payload for {match.metadata['conflict_id']}: {e}")
+                if body is not None and ref:
+                    recovered.append((ref, body))
+            if body is not None:
+                match.metadata[field] = body
+        if recovered:
+            try:
+                self.payloads.put_many(recovered)
+            except Exception as e:
+                logger.warning(f"⚠️ Failed to re-warm payload store: {e}")
+        return matches
+
+    def _durable_payload(self, namespace: str, metadata: Dict[str, Any]) -> Optional[str]:
+        """A payload's durable copy: the Postgres transcript, or the analysis/repair plan JSON in S3."""
+        conflict_id = metadata["conflict_id"]
+        if namespace == "transcripts":
+            transcript = db_service.get_conflict_transcript(conflict_id)
+            return (transcript or {}).get("transcript_text") or None
+        if namespace == "analysis":
+            row = db_service.get_conflict_analysis(conflict_id)
+            path = row.get("analysis_path") if row else None
+        else:
+            partner = metadata.get("partner_requesting")
+            path = next(
+                (plan["plan_path"] for plan in db_service.get_repair_plans(conflict_id)
+                 if not partner or plan["partner_requesting"] == partner),
+                None,
+            )
+        if not path:
+            return None
+        from app.services.s3_service import s3_key, s3_service
+        content = s3_service.download_file(s3_key(path))
+        return content.decode("utf-8") if content else None
+
     def upsert_transcript_chunks(
         self,
         chunks: List[Dict[str, Any]],
@@ -256,7 +376,8 @@ class PineconeService:
             for idx, (chunk, embedding) in enumerate(zip(chunks, embeddings)):
                 conflict_id = chunk.get("conflict_id", "unknown")
                 chunk_index = chunk.get("chunk_index", idx)
-                chunk_id = f"chunk_{conflict_id}_{chunk_index}"
+                # Content-hash ids from TranscriptChunker; positional ids for older callers
+                chunk_id = chunk.get("id") or f"chunk_{conflict_id}_{chunk_index}"
                 
                 metadata = chunk.get("metadata", {})
                 # Ensure all required fields are present
@@ -277,14 +398,11 @@ class PineconeService:
                     "metadata": metadata
                 })
             
-            # Upsert in batches if needed (Pinecone supports up to 100 vectors per upsert)
-            batch_size = 100
-            for i in range(0, len(vectors), batch_size):
-                batch = vectors[i:i + batch_size]
-                self.index.upsert(
-                    vectors=batch,
-                    namespace=namespace
-                )
+            # Parallel batches; also feeds the lexical index
+            self.writer.upsert(vectors, namespace)
+            
+            for relationship_id in {chunk.get("relationship_id") for chunk in chunks}:
+                semantic_query_cache.invalidate(relationship_id)
             
             logger.info(f"✅ Stored {len(chunks)} transcript chunks in namespace {namespace}")
         except Exception as e:
@@ -293,6 +411,73 @@ class PineconeService:
             logger.error(traceback.format_exc())
             raise
     
+    def list_ids(self, namespace: str, prefix: str, relationship_id: Optional[str] = None) -> Optional[List[str]]:
+        """
+        All vector ids in a namespace starting with prefix (e.g. one conflict's chunks).
+
+        Returns None when the index can't list ids (listing is serverless-only),
+        so callers can tell "unknown" apart from "nothing stored yet".
+        """
+        if not self.index:
+            return []
+        namespace = self.namespace_for(namespace, relationship_id)
+        ids, token = [], None
+        try:
+            while True:
+                page = self.index.list_paginated(namespace=namespace, prefix=prefix, limit=100, pagination_token=token)
+                ids.extend(v.id for v in (page.vectors or []))
+                token = page.pagination.next if page.pagination else None
+                if not token:
+                    return ids
+        except Exception as e:
+            logger.warning(f"⚠️ Could not list ids in {namespace} with prefix {prefix}: {e}")
+            return None
+
+    def delete_transcript_chunks(
+        self,
+        ids: List[str],
+        relationship_id: Optional[str] = None,
+        namespace: str = "transcript_chunks"
+    ):
+        """Delete transcript chunks by id (e.g. chunks superseded by a re-chunk)."""
+        if not self.index or not ids:
+            return
+        try:
+            for i in range(0, len(ids), 1000):
+                self.index.delete(ids=ids[i:i + 1000], namespace=self.namespace_for(namespace, relationship_id))
+            lexical_index_service.remove(namespace, ids, relationship_id)
+            semantic_query_cache.invalidate(relationship_id)
+            logger.info(f"🗑️ Deleted {len(ids)} stale transcript chunks from namespace {namespace}")
+        except Exception as e:
+            logger.error(f"❌ Error deleting transcript chunks: {e}")
+            raise
+
+    def delete_conflict_chunks(
+        self,
+        conflict_id: str,
+        relationship_id: Optional[str] = None,
+        namespace: str = "transcript_chunks"
+    ):
+        """Delete every transcript chunk of a conflict by metadata filter (for indexes that can't list ids)."""
+        if not self.index:
+            return
+        try:
+            self.index.delete(
+                filter={"conflict_id": {"$eq": conflict_id}},
+                namespace=self.namespace_for(namespace, relationship_id)
+            )
+            lexical = lexical_index_service.get_index(namespace, relationship_id)
+            if lexical is not None:
+                lexical_index_service.remove(namespace, [
+                    doc_id for doc_id, metadata in list(lexical.metadata.items())
+                    if metadata.get("conflict_id") == conflict_id
+                ], relationship_id)
+            semantic_query_cache.invalidate(relationship_id)
+            logger.info(f"🗑️ Deleted transcript chunks of conflict {conflict_id} from namespace {namespace}")
+        except Exception as e:
+            logger.error(f"❌ Error deleting transcript chunks of conflict {conflict_id}: {e}")
+            raise
+
     def query_transcript_chunks(
         self,
         query_embedding: List[float],
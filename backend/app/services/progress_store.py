@@ -0,0 +1,96 @@
+"""
+Bounded, shared progress events for background jobs
+
+Upload processing used to append log lines to a module-level dict that
+was never trimmed or evicted, and only the worker process that ran the
+job could see it. ProgressStore keeps each job's events in cache_service
+(a Redis list when Redis is up, the in-memory fallback otherwise):
+
+- Each job keeps its last max_events events and expires ttl seconds
+  after its last update, so memory stays bounded however many jobs run.
+- Events carry a per-job sequence number, so readers (the SSE endpoint,
+  or clients reconnecting with Last-Event-ID) resume where they left off
+  even after older events were trimmed.
+- A job ends with status "done" or "failed"; stream() stops there.
+
+Key namespace: serene:progress:{job_id}
+"""
+import asyncio
+import logging
+import time
+from datetime import datetime
+from typing import Any, AsyncIterator, Dict, List
+
+from app.config import settings
+from app.services.cache_service import cache_service
+
+logger = logging.getLogger(__name__)
+
+TERMINAL_STATUSES = {"done", "failed"}
+
+
+class ProgressStore:
+    """Capped, expiring per-job event lists on the shared cache."""
+
+    def __init__(self, cache, max_events: int = 200, ttl: int = 3600, prefix: str = "serene:progress"):
+        self.cache = cache
+        self.max_events = max_events
+        self.ttl = ttl
+        self.prefix = prefix
+
+    def _key(self, job_id: str) -> str:
+        return f"{self.prefix}:{job_id}"
+
+    def append(self, job_id: str, message: str, stage: str = None, status: str = "processing", **fields) -> Dict[str, Any]:
+        """
+        Record an event for a job.
+
+        Args:
+            job_id: e.g. the pdf_id
+            message: Human-readable log line
+            stage: Pipeline stage the event belongs to (ocr, embed, ...)
+            status: "processing", or "done"/"failed" for the last event
+            **fields: Counters such as pages or chunks
+
+        Returns:
+            The stored event
+        """
+        event = {
+            "seq": self.cache.incr(f"{self._key(job_id)}:seq", ttl=self.ttl),
+            "time": datetime.now().strftime('%H:%M:%S'),
+            "ts": time.time(),
+            "stage": stage,
+            "status": status,
+            "message": message,
+            **fields,
+        }
+        self.cache.list_append(self._key(job_id), event, self.max_events, ttl=self.ttl)
+        return event
+
+    def events(self, job_id: str, after: int = 0) -> List[Dict[str, Any]]:
+        """Return a job's retained events with seq > after."""
+        return [e for e in self.cache.list_range(self._key(job_id)) if e.get("seq", 0) > after]
+
+    def messages(self, job_id: str) -> List[str]:
+        """Retained events as "HH:MM:SS - message" lines."""
+        return [f"{e['time']} - {e['message']}" for e in self.events(job_id)]
+
+    async def stream(self, job_id: str, after: int = 0, poll_interval: float = 0.5, timeout: float = 1800) -> AsyncIterator[Dict[str, Any]]:
+        """Yield a job's events as they arrive until it finishes (or timeout seconds pass)."""
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            events = await asyncio.to_thread(self.events, job_id, after)
+            for event in events:
+                after = event["seq"]
+                yield event
+                if event.get("status") in TERMINAL_STATUSES:
+                    return
+            await asyncio.sleep(poll_interval)
+
+
+# Singleton instance
+progress_store = ProgressStore(
+    cache_service,
+    max_events=settings.PROGRESS_MAX_EVENTS,
+    ttl=settings.PROGRESS_TTL_SECONDS,
+)
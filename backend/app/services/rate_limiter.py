@@ -0,0 +1,303 @@
+"""
+Shared token-bucket rate limiting for external providers
+
+Every API worker and Celery process draws from the same Redis-backed
+buckets (e.g. Voyage requests/minute and tokens/minute), so the fleet as
+a whole stays under the provider limit instead of each process
+discovering it via 429s. When Redis is unavailable the limiter falls back
+to in-process buckets, mirroring RedisCache.
+
+Priorities: "interactive" callers (Luna queries, partner messages) may
+drain the buckets completely; "bulk" callers (book ingestion, backfills)
+must leave reserve_fraction of each bucket untouched, so bulk work can
+never starve the voice path.
+
+When the provider still answers 429, penalize() blocks the whole fleet
+until Retry-After has passed.
+"""
+import asyncio
+import logging
+import random
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+PRIORITIES = ("interactive", "bulk")
+REDIS_RETRY_SECONDS = 30.0
+
+# KEYS: blocked_until key, bucket keys...
+# ARGV: now, then (capacity, refill_per_sec, cost, floor) per bucket
+# Returns {1, 0} when all buckets had room (tokens taken), else {0, wait_ms}
+_ACQUIRE_SCRIPT = """
+local now = tonumber(ARGV[1])
+local blocked_until = tonumber(redis.call('GET', KEYS[1]) or '0')
+if blocked_until > now then
+    return {0, math.ceil((blocked_until - now) * 1000)}
+end
+local levels = {}
+local wait = 0
+for i = 2, #KEYS do
+    local base = 2 + (i - 2) * 4
+    local capacity = tonumber(ARGV[base])
+    local rate = tonumber(ARGV[base + 1])
+    local cost = tonumber(ARGV[base + 2])
+    local floor = tonumber(ARGV[base + 3])
+    local state = redis.call('HMGET', KEYS[i], 'tokens', 'ts')
+    local tokens = tonumber(state[1]) or capacity
+    local ts = tonumber(state[2]) or now
+    tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+    levels[i] = tokens
+    if tokens - cost < floor then
+        wait = math.max(wait, (cost + floor - tokens) / rate)
+    end
+end
+for i = 2, #KEYS do
+    local base = 2 + (i - 2) * 4
+    local capacity = tonumber(ARGV[base])
+    local rate = tonumber(ARGV[base + 1])
+    local tokens = levels[i]
+    if wait == 0 then
+        tokens = tokens - tonumber(ARGV[base + 2])
+    end
+    redis.call('HSET', KEYS[i], 'tokens', tokens, 'ts', now)
+    redis.call('EXPIRE', KEYS[i], math.ceil(capacity / rate) + 60)
+end
+if wait == 0 then
+    return {1, 0}
+end
+return {0, math.ceil(wait * 1000)}
+"""
+
+
+class RateLimitMetrics:
+    """Per-process queue-depth and wait-time counters."""
+
+    def __init__(self):
+        self.waiting = {p: 0 for p in PRIORITIES}
+        self.peak_waiting = {p: 0 for p in PRIORITIES}
+        self.acquired = {p: 0 for p in PRIORITIES}
+        self.throttled = {p: 0 for p in PRIORITIES}
+        self.wait_seconds = {p: 0.0 for p in PRIORITIES}
+        self.max_wait_seconds = {p: 0.0 for p in PRIORITIES}
+        self.provider_rate_limits = 0
+        self.last_retry_after: Optional[float] = None
+
+    def to_dict(self) -> dict:
+        return {
+            "queue_depth": dict(self.waiting),
+            "peak_queue_depth": dict(self.peak_waiting),
+            "acquired": dict(self.acquired),
+            "throttled": dict(self.throttled),
+            "avg_wait_seconds": {
+                p: (self.wait_seconds[p] / self.acquired[p]) if self.acquired[p] else 0.0
+                for p in PRIORITIES
+            },
+            "max_wait_seconds": dict(self.max_wait_seconds),
+            "provider_rate_limits": self.provider_rate_limits,
+            "last_retry_after": self.last_retry_after,
+        }
+
+
+class SharedRateLimiter:
+    """
+    Multi-bucket token limiter shared across processes via Redis.
+
+    Args:
+        name: Provider name, used in Redis keys (serene:ratelimit:{name}:...)
+        buckets: {bucket_name: (capacity, refill_per_second)}
+        redis_url: Redis URL, or None for in-process buckets only
+        reserve_fraction: Share of each bucket bulk callers must leave free
+    """
+
+    def __init__(
+        self,
+        name: str,
+        buckets: Dict[str, Tuple[float, float]],
+        redis_url: Optional[str] = None,
+        reserve_fraction: float = 0.3,
+    ):
+        self.name = name
+        self.buckets = buckets
+        self.redis_url = redis_url
+        self.reserve_fraction = reserve_fraction
+        self.metrics = RateLimitMetrics()
+        self._blocked_key = f"serene:ratelimit:{name}:blocked_until"
+        self._bucket_keys = [f"serene:ratelimit:{name}:{bucket}" for bucket in buckets]
+        self._redis_disabled = redis_url is None
+        self._redis_retry_at = 0.0
+        self._sync_redis = None
+        self._async_redis = None
+        self._async_loop = None
+        # In-process fallback state
+        self._lock = threading.Lock()
+        self._local_levels = {b: (capacity, None) for b, (capacity, _) in buckets.items()}
+        self._local_blocked_until = 0.0
+
+    # --- Cost/argument helpers ---
+
+    def _args(self, costs: Dict[str, float], priority: str, now: float) -> List[float]:
+        args = [now]
+        for bucket, (capacity, rate) in self.buckets.items():
+            floor = capacity * self.reserve_fraction if priority == "bulk" else 0.0
+            # Oversized requests could never fit - clamp so they drain the bucket instead
+            cost = min(costs.get(bucket, 0.0), capacity - floor)
+            args.extend([capacity, rate, cost, floor])
+        return args
+
+    def _try_local(self, args: List[float]) -> float:
+        """In-process equivalent of _ACQUIRE_SCRIPT. Returns seconds to wait (0 = acquired)."""
+        now = args[0]
+        with self._lock:
+            if self._local_blocked_until > now:
+                return self._local_blocked_until - now
+            levels, wait = {}, 0.0
+            for i, bucket in enumerate(self.buckets):
+                capacity, rate, cost, floor = args[1 + i * 4:5 + i * 4]
+                tokens, ts = self._local_levels[bucket]
+                tokens = min(capacity, tokens + max(0.0, now - (ts if ts is not None else now)) * rate)
+                levels[bucket] = (tokens, cost)
+                if tokens - cost < floor:
+                    wait = max(wait, (cost + floor - tokens) / rate)
+            for bucket, (tokens, cost) in levels.items():
+                self._local_levels[bucket] = (tokens - cost if wait == 0 else tokens, now)
+            return wait
+
+    def _on_redis_error(self, e: Exception):
+        logger.warning(f"⚠️ Rate limiter Redis unavailable ({e}), using in-process buckets for {self.name}")
+        self._redis_disabled = True
+        self._redis_retry_at = time.monotonic() + REDIS_RETRY_SECONDS
+
+    def _redis_available(self) -> bool:
+        if self._redis_disabled and self.redis_url and time.monotonic() >= self._redis_retry_at:
+            # Periodically try Redis again so a restart doesn't leave us local forever
+            self._redis_disabled = False
+            self._sync_redis = None
+            self._async_redis = None
+        return not self._redis_disabled
+
+    def _try_sync(self, args: List[float]) -> float:
+        if self._redis_available():
+            try:
+                if self._sync_redis is None:
+                    import redis
+                    self._sync_redis = redis.Redis.from_url(self.redis_url, socket_connect_timeout=2, socket_timeout=2)
+                allowed, wait_ms = self._sync_redis.eval(
+                    _ACQUIRE_SCRIPT, 1 + len(self._bucket_keys), self._blocked_key, *self._bucket_keys, *args
+                )
+                return 0.0 if allowed else wait_ms / 1000.0
+            except Exception as e:
+                self._on_redis_error(e)
+        return self._try_local(args)
+
+    async def _try_async(self, args: List[float]) -> float:
+        if self._redis_available():
+            try:
+                loop = asyncio.get_running_loop()
+                if self._async_redis is None or self._async_loop is not loop:
+                    # redis.asyncio pools are bound to the loop that created them
+                    import redis.asyncio as aioredis
+                    self._async_redis = aioredis.Redis.from_url(self.redis_url, socket_connect_timeout=2, socket_timeout=2)
+                    self._async_loop = loop
+                allowed, wait_ms = await self._async_redis.eval(
+                    _ACQUIRE_SCRIPT, 1 + len(self._bucket_keys), self._blocked_key, *self._bucket_keys, *args
+                )
+                return 0.0 if allowed else wait_ms / 1000.0
+            except Exception as e:
+                self._on_redis_error(e)
+        return self._try_local(args)
+
+    # --- Public API ---
+
+    @staticmethod
+    def _jitter(wait: float) -> float:
+        # Spread waiters out so they don't all retry on the same tick
+        return wait + random.uniform(0, min(1.0, wait * 0.25) + 0.005)
+
+    def _start_wait(self, priority: str):
+        self.metrics.waiting[priority] += 1
+        self.metrics.peak_waiting[priority] = max(self.metrics.peak_waiting[priority], self.metrics.waiting[priority])
+
+    def _finish_wait(self, priority: str, waited: float, throttled: bool):
+        self.metrics.waiting[priority] -= 1
+        self.metrics.acquired[priority] += 1
+        self.metrics.wait_seconds[priority] += waited
+        self.metrics.max_wait_seconds[priority] = max(self.metrics.max_wait_seconds[priority], waited)
+        if throttled:
+            self.metrics.throttled[priority] += 1
+
+    async def acquire(self, costs: Dict[str, float], priority: str = "interactive") -> float:
+        """
+        Wait (without blocking the event loop) until all buckets have room.
+
+        Returns:
+            Seconds spent waiting
+        """
+        start = time.monotonic()
+        throttled = False
+        self._start_wait(priority)
+        try:
+            while True:
+                wait = await self._try_async(self._args(costs, priority, time.time()))
+                if wait <= 0:
+                    break
+                throttled = True
+                await asyncio.sleep(self._jitter(wait))
+        finally:
+            waited = time.monotonic() - start
+            self._finish_wait(priority, waited, throttled)
+        if throttled:
+            logger.info(f"⏳ {self.name} {priority} request waited {waited:.2f}s for rate limit")
+        return waited
+
+    def acquire_blocking(self, costs: Dict[str, float], priority: str = "interactive") -> float:
+        """Synchronous acquire for callers already running in a worker thread."""
+        start = time.monotonic()
+        throttled = False
+        self._start_wait(priority)
+        try:
+            while True:
+                wait = self._try_sync(self._args(costs, priority, time.time()))
+                if wait <= 0:
+                    break
+                throttled = True
+                time.sleep(self._jitter(wait))
+        finally:
+            waited = time.monotonic() - start
+            self._finish_wait(priority, waited, throttled)
+        return waited
+
+    def _record_penalty(self, retry_after: float) -> float:
+        self.metrics.provider_rate_limits += 1
+        self.metrics.last_retry_after = retry_after
+        until = time.time() + retry_after
+        with self._lock:
+            self._local_blocked_until = max(self._local_blocked_until, until)
+        return until
+
+    def penalize(self, retry_after: float):
+        """Block every process until retry_after seconds from now (provider returned 429)."""
+        until = self._record_penalty(retry_after)
+        if self._redis_available():
+            try:
+                if self._sync_redis is None:
+                    import redis
+                    self._sync_redis = redis.Redis.from_url(self.redis_url, socket_connect_timeout=2, socket_timeout=2)
+                self._sync_redis.set(self._blocked_key, until, ex=max(1, int(retry_after) + 1))
+            except Exception as e:
+                self._on_redis_error(e)
+
+    async def apenalize(self, retry_after: float):
+        """Async version of penalize()."""
+        until = self._record_penalty(retry_after)
+        if self._redis_available() and self._async_redis is not None:
+            try:
+                await self._async_redis.set(self._blocked_key, until, ex=max(1, int(retry_after) + 1))
+            except Exception as e:
+                self._on_redis_error(e)
+
+    def get_metrics(self) -> dict:
+        metrics = self.metrics.to_dict()
+        metrics["backend"] = "local" if self._redis_disabled else "redis"
+        return metrics
@@ -1,76 +1,127 @@
 """
 Voyage Reranker service for retrieving relevant information from documents
+
+Results are cached by hash(model, query, top_k, document hashes), so the
+RAG path and the post-fight profile fallbacks don't pay Voyage twice for
+the same candidate set. When Voyage errors or exceeds the latency budget,
+a CPU-only local scorer (BM25 blended with the retrieval order) ranks the
+documents instead - reranking never blocks for long or fails silently.
 """
+import hashlib
 import logging
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
 from voyageai import Client as VoyageClient
-from typing import List, Dict, Any, Tuple
+from typing import List, Dict, Any, Optional, Tuple
 from app.config import settings
+from app.services.cache_service import cache_service
+from app.services.lexical_index import BM25Index
 
 logger = logging.getLogger(__name__)
 
+RERANK_CACHE_TTL = 3600
+# Local scorer: weight of BM25 vs. the candidates' incoming (retrieval) order
+LOCAL_BM25_WEIGHT = 0.7
+
+
 class RerankerService:
     """Service for reranking search results using Voyage Rerank-2"""
-    
+
     def __init__(self):
         self.client = VoyageClient(api_key=settings.VOYAGE_API_KEY)
         self.model = "rerank-2"
+        self.timeout = settings.RERANK_TIMEOUT_SECONDS
+        # Voyage calls run here so a timeout can return while the call finishes
+        self._executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="rerank")
+        self.stats = {"cache_hits": 0, "voyage": 0, "local_timeout": 0, "local_error": 0}
         logger.info("✅ Initialized Voyage Reranker service")
-    
+
+    def _cache_key(self, query: str, documents: List[str], top_k: int) -> str:
+        digest = hashlib.sha256()
+        for part in [self.model, str(top_k), query] + [hashlib.sha256(d.encode("utf-8")).hexdigest() for d in documents]:
+            digest.update(part.encode("utf-8"))
+            digest.update(b"\0")
+        return f"serene:rerank:{digest.hexdigest()}"
+
+    def local_rerank(self, query: str, documents: List[str], top_k: int = 3) -> List[Tuple[str, float]]:
+        """
+        CPU-only fallback ranking: BM25 over the candidate set blended with
+        the order the candidates arrived in (their retrieval rank).
+
+        Scores are in [0, 1] but are not comparable to Voyage relevance scores.
+        """
+        if not documents:
+            return []
+        index = BM25Index()
+        for i, doc in enumerate(documents):
+            index.add(str(i), doc)
+        bm25 = {int(doc_id): score for doc_id, score in index.search(query, top_k=len(documents))}
+        best = max(bm25.values(), default=0.0) or 1.0
+        n = len(documents)
+        scored = [
+            (i, LOCAL_BM25_WEIGHT * bm25.get(i, 0.0) / best + (1 - LOCAL_BM25_WEIGHT) * (1 - i / n))
+            for i in range(n)
+        ]
+        scored.sort(key=lambda item: item[1], reverse=True)
+        return [(documents[i], score) for i, score in scored[:top_k]]
+
+    def _voyage_rerank(self, query: str, documents: List[str], top_k: int, cache_key: str) -> List[Tuple[int, float]]:
+        result = self.client.rerank(
+            query=query,
+            documents=documents,
+            model=self.model,
+            top_k=min(top_k, len(documents))
+        )
+        ranked = [(item.index, item.relevance_score) for item in result.results]
+        # Cached even if the caller already gave up waiting, so the next call hits
+        cache_service.set(cache_key, ranked, ttl=RERANK_CACHE_TTL)
+        return ranked
+
     def rerank(
         self,
         query: str,
         documents: List[str],
-        top_k: int = 3
+        top_k: int = 3,
+        timeout: Optional[float] = None,
     ) -> List[Tuple[str, float]]:
         """
         Rerank documents based on relevance to query
-        
+
         Args:
             query: The search query
             documents: List of document texts to rerank
             top_k: Number of top results to return
-            
+            timeout: Seconds to wait for Voyage before using the local scorer
+                (default RERANK_TIMEOUT_SECONDS)
+
         Returns:
             List of tuples (document_text, relevance_score) sorted by relevance
         """
+        if not documents:
+            return []
+
+        cache_key = self._cache_key(query, documents, top_k)
+        cached = cache_service.get(cache_key)
+        if cached is not None:
+            self.stats["cache_hits"] += 1
+            return [(documents[index], score) for index, score in cached]
+
+        timeout = self.timeout if timeout is None else timeout
         try:
-            if not documents:
-                return []
-            
-            result = self.client.rerank(
-                query=query,
-                documents=documents,
-                model=self.model,
-                top_k=min(top_k, len(documents))
-            )
-            
-            # Extract results with scores
-            reranked = [
-                (documents[item.index], item.relevance_score)
-                for item in result.results
-            ]
-            
+            if timeout <= 0:
+                raise FutureTimeoutError
+            future = self._executor.submit(self._voyage_rerank, query, documents, top_k, cache_key)
+            ranked = future.result(timeout=timeout)
+            self.stats["voyage"] += 1
+            reranked = [(documents[index], score) for index, score in ranked]
             logger.info(f"✅ Reranked {len(documents)} documents, returning top {len(reranked)}")
             return reranked
-            
+        except FutureTimeoutError:
+            self.stats["local_timeout"] += 1
+            logger.warning(f"⚠️ Voyage rerank exceeded {timeout:.2f}s budget, using local reranker")
         except Exception as e:
-            logger.error(f"❌ Error reranking documents: {e}")
-            # Fallback: return documents as-is
-            return [(doc, 0.0) for doc in documents]
+            self.stats["local_error"] += 1
+            logger.error(f"❌ Error reranking documents, using local reranker: {e}")
+        return self.local_rerank(query, documents, top_k)
 
 # Singleton instance
 reranker_service = RerankerService()
-
-
-
-
-
-
-
-
-
-
-
-
-
-
@@ -0,0 +1,206 @@
+"""
+Deadline-aware fan-out for RAG retrieval sources
+
+A voice turn can't wait for the slowest of five retrieval sources. The
+scheduler starts every source at once and gives each a deadline inside a
+per-turn latency budget. When a source misses its deadline the turn goes
+ahead without it, using the last result that source produced for the same
+session (if still fresh) instead. The late call keeps running in the
+background, and its result warms that cache for the next turn.
+
+Per-source latency histograms, deadline misses and cache fallbacks are
+kept for GET /api/health/retrieval.
+"""
+import asyncio
+import bisect
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Histogram bucket upper bounds, in milliseconds
+BUCKETS_MS = (25, 50, 100, 200, 400, 800, 1600, 3200)
+
+
+class LatencyHistogram:
+    """Fixed-bucket latency histogram with approximate percentiles."""
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS_MS) + 1)
+        self.total = 0
+        self.sum_ms = 0.0
+        self.max_ms = 0.0
+
+    def observe(self, seconds: float):
+        ms = seconds * 1000
+        self.counts[bisect.bisect_left(BUCKETS_MS, ms)] += 1
+        self.total += 1
+        self.sum_ms += ms
+        self.max_ms = max(self.max_ms, ms)
+
+    def percentile(self, p: float) -> Optional[float]:
+        """Upper bound (ms) of the bucket holding the p-th percentile."""
+        if not self.total:
+            return None
+        target = p / 100 * self.total
+        seen = 0
+        for i, count in enumerate(self.counts):
+            seen += count
+            if seen >= target:
+                return float(BUCKETS_MS[i]) if i < len(BUCKETS_MS) else self.max_ms
+        return self.max_ms
+
+    def to_dict(self) -> dict:
+        labels = [f"<={b}ms" for b in BUCKETS_MS] + [f">{BUCKETS_MS[-1]}ms"]
+        return {
+            "count": self.total,
+            "avg_ms": round(self.sum_ms / self.total, 1) if self.total else None,
+            "p50_ms": self.percentile(50),
+            "p95_ms": self.percentile(95),
+            "max_ms": round(self.max_ms, 1),
+            "buckets": dict(zip(labels, self.counts)),
+        }
+
+
+def _limit(deadline: Optional[float], budget: Optional[float]) -> Optional[float]:
+    """A source's effective deadline: its own, capped by the turn budget."""
+    limits = [x for x in (deadline, budget) if x is not None]
+    return min(limits) if limits else None
+
+
+class RetrievalScheduler:
+    """Runs retrieval sources concurrently under a per-turn latency budget."""
+
+    def __init__(self, cache_ttl_seconds: float = 300.0, max_cache_entries: int = 2048):
+        self.cache_ttl_seconds = cache_ttl_seconds
+        self.max_cache_entries = max_cache_entries
+        self._warm: "OrderedDict[Tuple[str, Hashable], Tuple[Any, float]]" = OrderedDict()
+        self._late_tasks = set()
+        self.histograms: Dict[str, LatencyHistogram] = {}
+        self.deadline_misses: Dict[str, int] = {}
+        self.cache_fallbacks: Dict[str, int] = {}
+        self.turns = 0
+        self.budget_exhausted = 0
+
+    # --- Warm cache ---
+
+    def _remember(self, name: str, scope: Hashable, value: Any):
+        key = (name, scope)
+        self._warm[key] = (value, time.monotonic())
+        self._warm.move_to_end(key)
+        while len(self._warm) > self.max_cache_entries:
+            self._warm.popitem(last=False)
+
+    def _recall(self, name: str, scope: Hashable) -> Tuple[bool, Any]:
+        entry = self._warm.get((name, scope))
+        if entry is None or time.monotonic() - entry[1] > self.cache_ttl_seconds:
+            return False, None
+        return True, entry[0]
+
+    # --- Fan-out ---
+
+    def observe(self, name: str, seconds: float):
+        """Record a timing for a stage outside the fan-out (e.g. embedding, rerank)."""
+        self.histograms.setdefault(name, LatencyHistogram()).observe(seconds)
+
+    def _observe(self, name: str, started: float):
+        self.observe(name, time.perf_counter() - started)
+
+    def _finish_late(self, name: str, scope: Hashable, started: float, task: asyncio.Task):
+        self._late_tasks.discard(task)
+        self._observe(name, started)
+        if not task.cancelled() and task.exception() is None:
+            self._remember(name, scope, task.result())
+            logger.debug(f"Late {name} result warmed the retrieval cache")
+
+    async def run(
+        self,
+        sources: Dict[str, Tuple[Callable[[], Awaitable[Any]], Optional[float], Any]],
+        budget: Optional[float] = None,
+        scope: Hashable = None,
+        missed: Optional[List[str]] = None,
+    ) -> Dict[str, Any]:
+        """
+        Run sources concurrently and return what's ready by each deadline.
+
+        Args:
+            sources: {name: (coroutine factory, deadline seconds or None, default value)}
+            budget: Per-turn latency budget in seconds (None = wait for every source)
+            scope: Session key for the warm cache (e.g. conflict and relationship id)
+            missed: If given, names of sources that missed their deadline are appended
+
+        Returns:
+            {name: result}. A source that failed, or missed its deadline with
+            nothing cached, gets its default.
+        """
+        self.turns += 1
+        started = time.perf_counter()
+        tasks = {name: asyncio.ensure_future(factory()) for name, (factory, _, _) in sources.items()}
+        limits = {name: _limit(deadline, budget) for name, (_, deadline, _) in sources.items()}
+        results: Dict[str, Any] = {}
+        exhausted = False
+
+        pending = dict(tasks)
+        try:
+            while pending:
+                now = time.perf_counter() - started
+                open_limits = [limits[name] for name in pending]
+                timeout = None if None in open_limits else max(0.0, min(open_limits) - now)
+                done, _ = await asyncio.wait(list(pending.values()), timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+
+                now = time.perf_counter() - started
+                for name in [n for n, t in pending.items() if t in done]:
+                    task = pending.pop(name)
+                    self._observe(name, started)
+                    if task.exception() is None:
+                        results[name] = task.result()
+                        self._remember(name, scope, results[name])
+                    else:
+                        logger.warning(f"   ⚠️ Retrieval source {name} failed: {task.exception()}")
+                        results[name] = sources[name][2]
+
+                # Anything past its deadline is left to finish in the background
+                for name in [n for n in pending if limits[n] is not None and now >= limits[n]]:
+                    task = pending.pop(name)
+                    self.deadline_misses[name] = self.deadline_misses.get(name, 0) + 1
+                    if missed is not None:
+                        missed.append(name)
+                    exhausted = exhausted or (budget is not None and now >= budget)
+                    self._late_tasks.add(task)
+                    task.add_done_callback(lambda t, name=name: self._finish_late(name, scope, started, t))
+                    hit, value = self._recall(name, scope)
+                    if hit:
+                        self.cache_fallbacks[name] = self.cache_fallbacks.get(name, 0) + 1
+                    results[name] = value if hit else sources[name][2]
+                    logger.info(f"   ⏰ {name} missed its deadline ({now:.3f}s) - {'using cached result' if hit else 'skipped'}")
+        except asyncio.CancelledError:
+            # The caller stopped waiting (e.g. a semantic cache hit): stop the sources too
+            for task in pending.values():
+                task.cancel()
+            raise
+
+        if exhausted:
+            self.budget_exhausted += 1
+        return results
+
+    def get_metrics(self) -> dict:
+        return {
+            "turns": self.turns,
+            "budget_exhausted": self.budget_exhausted,
+            "in_flight_late_sources": len(self._late_tasks),
+            "warm_cache_entries": len(self._warm),
+            "sources": {
+                name: {
+                    **histogram.to_dict(),
+                    "deadline_misses": self.deadline_misses.get(name, 0),
+                    "cache_fallbacks": self.cache_fallbacks.get(name, 0),
+                }
+                for name, histogram in self.histograms.items()
+            },
+        }
+
+
+# Singleton instance
+retrieval_scheduler = RetrievalScheduler()
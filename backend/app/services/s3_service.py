@@ -3,12 +3,22 @@ AWS S3 service for storing files
 """
 import logging
 import boto3
+from botocore.config import Config
 from botocore.exceptions import ClientError
-from typing import Optional
+from typing import Optional, Tuple
 from app.config import settings
 
 logger = logging.getLogger(__name__)
 
+
+def s3_key(path: str) -> str:
+    """Object key from a stored path, which may be an s3://bucket/key URL."""
+    if path.startswith("s3://"):
+        parts = path[len("s3://"):].split("/", 1)
+        return parts[1] if len(parts) > 1 else ""
+    return path
+
+
 class S3Service:
     """Service for interacting with AWS S3"""
     
@@ -17,7 +27,11 @@ class S3Service:
             's3',
             aws_access_key_id=settings.AWS_ACCESS_KEY_ID,
             aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY,
-            region_name=settings.AWS_REGION
+            region_name=settings.AWS_REGION,
+            config=Config(
+                max_pool_connections=settings.S3_MAX_POOL_CONNECTIONS,
+                retries={"max_attempts": 5, "mode": "adaptive"}
+            )
         )
         self.bucket_name = settings.S3_BUCKET_NAME
         logger.info(f"✅ Initialized S3 client for bucket: {self.bucket_name}")
@@ -39,8 +53,18 @@ class S3Service:
         Returns:
             S3 URL if successful, None otherwise
         """
+        uploaded = self.upload_file_with_etag(file_path, file_content, content_type)
+        return uploaded[0] if uploaded else None
+
+    def upload_file_with_etag(
+        self,
+        file_path: str,
+        file_content: bytes,
+        content_type: str = "application/json"
+    ) -> Optional[Tuple[str, str]]:
+        """Upload file to S3 and return (S3 URL, ETag), or None on failure"""
         try:
-            self.s3_client.put_object(
+            response = self.s3_client.put_object(
                 Bucket=self.bucket_name,
                 Key=file_path,
                 Body=file_content,
@@ -50,7 +74,7 @@ class S3Service:
             # Generate S3 URL
             s3_url = f"s3://{self.bucket_name}/{file_path}"
             logger.info(f"✅ Uploaded file to S3: {file_path}")
-            return s3_url
+            return s3_url, response.get("ETag", "")
         except ClientError as e:
             logger.error(f"❌ Error uploading file to S3: {e}")
             return None
@@ -86,6 +110,40 @@ class S3Service:
             logger.error(f"❌ Unexpected error downloading from S3: {e}", exc_info=True)
             return None
     
+    def download_file_with_etag(self, file_path: str) -> Optional[Tuple[bytes, str]]:
+        """Download file from S3 and return (content, ETag), or None if missing"""
+        try:
+            response = self.s3_client.get_object(
+                Bucket=self.bucket_name,
+                Key=file_path
+            )
+            return response['Body'].read(), response.get('ETag', '')
+        except ClientError as e:
+            if e.response['Error']['Code'] == 'NoSuchKey':
+                logger.warning(f"⚠️ File not found in S3: {file_path}")
+            else:
+                logger.error(f"❌ Error downloading file from S3: {e}")
+            return None
+        except Exception as e:
+            logger.error(f"❌ Unexpected error downloading from S3: {e}", exc_info=True)
+            return None
+
+    def get_etag(self, file_path: str) -> Optional[str]:
+        """Return the object's ETag via a HEAD request, or None if missing"""
+        try:
+            response = self.s3_client.head_object(
+                Bucket=self.bucket_name,
+                Key=file_path
+            )
+            return response.get('ETag', '')
+        except ClientError as e:
+            if e.response['Error']['Code'] not in ('404', 'NoSuchKey'):
+                logger.error(f"❌ Error reading ETag from S3: {e}")
+            return None
+        except Exception as e:
+            logger.error(f"❌ Unexpected error reading ETag from S3: {e}")
+            return None
+
     def file_exists(self, file_path: str) -> bool:
         """Check if file exists in S3"""
         try:
@@ -0,0 +1,103 @@
+"""
+Semantic cache of assembled RAG context
+
+Within a mediator session users rephrase the same question ("why do we
+keep fighting about chores" / "what's going on with the chores thing").
+Every turn still paid for five retrieval sources and a rerank. This cache
+stores (query embedding -> assembled context) per session and relationship,
+and serves a cached context when a new query's cosine similarity to a
+stored one passes the threshold.
+
+Invalidation is per relationship. Writers of transcript chunks or profile
+data call invalidate(relationship_id), which bumps a version stored via
+cache_service (Redis, so the Luna worker sees writes made by the API).
+Entries recorded under an older version are ignored.
+"""
+import logging
+import math
+import threading
+import time
+from collections import OrderedDict
+from typing import Hashable, List, Optional, Tuple
+
+from app.services.cache_service import cache_service
+
+logger = logging.getLogger(__name__)
+
+_VERSION_KEY = "serene:ragcache:{relationship_id}:version"
+_VERSION_TTL = 7 * 24 * 3600
+
+
+def _cosine(a: List[float], b: List[float]) -> float:
+    dot = sum(x * y for x, y in zip(a, b))
+    norm = math.sqrt(sum(x * x for x in a)) * math.sqrt(sum(y * y for y in b))
+    return dot / norm if norm else 0.0
+
+
+class SemanticQueryCache:
+    """Session-scoped (embedding -> context) cache with per-relationship invalidation."""
+
+    def __init__(
+        self,
+        threshold: float = 0.95,
+        ttl_seconds: float = 900.0,
+        max_entries_per_scope: int = 32,
+        max_scopes: int = 1024,
+    ):
+        self.threshold = threshold
+        self.ttl_seconds = ttl_seconds
+        self.max_entries_per_scope = max_entries_per_scope
+        self.max_scopes = max_scopes
+        self._scopes: "OrderedDict[Hashable, List[Tuple[List[float], str, str, float]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def scope(relationship_id: str, conflict_id: Optional[str], session_id: Optional[str]) -> Hashable:
+        return (relationship_id, conflict_id, session_id)
+
+    def current_version(self, relationship_id: str) -> str:
+        return str(cache_service.get(_VERSION_KEY.format(relationship_id=relationship_id)) or "0")
+
+    def invalidate(self, relationship_id: Optional[str]):
+        """Drop every cached context for a relationship (all sessions, all processes)."""
+        if not relationship_id:
+            return
+        cache_service.set(_VERSION_KEY.format(relationship_id=relationship_id), str(time.time_ns()), ttl=_VERSION_TTL)
+        with self._lock:
+            for key in [k for k in self._scopes if k[0] == relationship_id]:
+                del self._scopes[key]
+        logger.debug(f"Semantic RAG cache invalidated for relationship {relationship_id}")
+
+    def get(self, scope: Hashable, embedding: List[float], version: str, threshold: Optional[float] = None) -> Optional[str]:
+        """Cached context for the most similar stored query above the threshold, or None."""
+        threshold = self.threshold if threshold is None else threshold
+        now = time.monotonic()
+        best, best_score = None, threshold
+        with self._lock:
+            entries = self._scopes.get(scope, [])
+            entries[:] = [e for e in entries if e[2] == version and now - e[3] <= self.ttl_seconds]
+            for vector, context, _, _ in entries:
+                score = _cosine(embedding, vector)
+                if score >= best_score:
+                    best, best_score = context, score
+        if best is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+            logger.info(f"   ♻️ Semantic cache hit (cosine {best_score:.3f})")
+        return best
+
+    def put(self, scope: Hashable, embedding: List[float], context: str, version: str):
+        with self._lock:
+            entries = self._scopes.setdefault(scope, [])
+            entries.append((list(embedding), context, version, time.monotonic()))
+            del entries[:-self.max_entries_per_scope]
+            self._scopes.move_to_end(scope)
+            while len(self._scopes) > self.max_scopes:
+                self._scopes.popitem(last=False)
+
+
+# Singleton instance
+semantic_query_cache = SemanticQueryCache()
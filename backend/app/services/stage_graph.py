@@ -0,0 +1,355 @@
+"""
+Dependency-graph runner for multi-stage background pipelines
+
+Post-fight processing ran its phases one after another even though most
+of them only need the transcript, and each phase re-fetched the context
+it needed. A StageGraph declares every stage with the values it reads;
+run() starts each stage as soon as those values exist, so independent
+stages overlap and a run takes about as long as its longest dependency
+chain instead of the sum of its stages.
+
+- Inputs passed to run() and stage outputs (a stage's return value,
+  published under its name) are shared by every stage that requires
+  them, so context fetched once is reused.
+- `after` orders a stage behind others without passing their values.
+- Stages are declared after everything they depend on, so a graph can't
+  have cycles.
+- A stage with a `fallback` is non-blocking: if it raises, the error is
+  logged and dependents get the fallback value. Any other failure fails
+  the run: stages that haven't started are cancelled, checkpointed stages
+  already running get up to drain_seconds to finish and save their output
+  (so a retry doesn't pay for them again), and the failure is raised.
+- Every run logs per-stage start offset and duration; per-stage latency
+  histograms and failure counts are kept for GET /api/health/pipelines.
+
+Checkpoints make re-runs (Celery retries, manual re-runs) resume instead
+of starting over. A stage declared with a `checkpoint` codec has its
+output saved under the run's checkpoint scope (e.g. conflict id +
+transcript hash) together with a fingerprint of the values it was
+computed from. A later run in the same scope reuses the saved output
+when the fingerprint still matches, so only failed, missing or affected
+stages run again. Graph-level `unkeyed` names (run timestamps, context
+that a stage itself updates) are left out of fingerprints.
+"""
+import asyncio
+import hashlib
+import json
+import logging
+import time
+import traceback
+from typing import Any, Awaitable, Callable, Dict, Iterable, NamedTuple, Optional, Tuple
+
+from app.services.retrieval_scheduler import LatencyHistogram
+
+logger = logging.getLogger(__name__)
+
+REQUIRED = object()  # Marks a stage without a fallback: its failure fails the run
+
+
+class Checkpoint(NamedTuple):
+    """How a stage output is saved: dump() to JSON-compatible data, load() back."""
+    dump: Callable[[Any], Any]
+    load: Callable[[Any], Any]
+
+
+JSON_CHECKPOINT = Checkpoint(lambda value: value, lambda data: data)
+
+
+def model_checkpoint(model) -> Checkpoint:
+    """Checkpoint codec for a stage returning a Pydantic model (or None)."""
+    return Checkpoint(
+        lambda value: value.model_dump(mode="json") if value is not None else None,
+        lambda data: model.model_validate(data) if data is not None else None,
+    )
+
+
+def _jsonable(value: Any) -> Any:
+    if hasattr(value, "model_dump"):
+        return value.model_dump(mode="json")
+    return str(value)
+
+
+def fingerprint(name: str, values: Dict[str, Any]) -> str:
+    """Digest of a stage name and the values it's computed from."""
+    body = json.dumps({"stage": name, "inputs": values}, sort_keys=True, default=_jsonable)
+    return hashlib.sha256(body.encode("utf-8")).hexdigest()
+
+
+class StageCheckpoints:
+    """Stage outputs on the shared cache: serene:checkpoint:{pipeline}:{scope}:{stage}."""
+
+    def __init__(self, cache, ttl: int = 7 * 24 * 3600, prefix: str = "serene:checkpoint"):
+        self.cache = cache
+        self.ttl = ttl
+        self.prefix = prefix
+
+    def _key(self, pipeline: str, scope: str, stage: str) -> str:
+        return f"{self.prefix}:{pipeline}:{scope}:{stage}"
+
+    def get(self, pipeline: str, scope: str, stage: str) -> Optional[Dict[str, Any]]:
+        """Return {"fingerprint", "value"} for a saved stage, or None."""
+        return self.cache.get(self._key(pipeline, scope, stage))
+
+    def put(self, pipeline: str, scope: str, stage: str, digest: str, value: Any):
+        self.cache.set(self._key(pipeline, scope, stage), {"fingerprint": digest, "value": value}, ttl=self.ttl)
+
+    def clear(self, pipeline: str, scope: str) -> int:
+        return self.cache.invalidate_pattern(f"{self.prefix}:{pipeline}:{scope}:*")
+
+
+class Stage(NamedTuple):
+    name: str
+    func: Callable[..., Awaitable[Any]]
+    requires: Tuple[str, ...]
+    after: Tuple[str, ...]
+    fallback: Any
+    checkpoint: Optional[Checkpoint]
+
+
+class StageRun(NamedTuple):
+    """Outcome of a run: stage outputs, per-stage timings (and status) and total seconds."""
+    results: Dict[str, Any]
+    timings: Dict[str, Dict[str, Any]]
+    seconds: float
+
+
+class StageGraph:
+    """Async stages wired by the values they require."""
+
+    def __init__(
+        self,
+        name: str,
+        inputs: Iterable[str] = (),
+        checkpoints: Optional[StageCheckpoints] = None,
+        unkeyed: Iterable[str] = (),
+        drain_seconds: float = 60.0,
+    ):
+        """
+        Initialize the graph.
+
+        Args:
+            name: Pipeline name for logs and metrics
+            inputs: Names of the values every run() must be given
+            checkpoints: Where checkpointed stage outputs are saved
+            unkeyed: Inputs/stages whose values don't count toward checkpoint fingerprints
+            drain_seconds: How long running checkpointed stages may finish after a required failure
+        """
+        self.name = name
+        self.inputs = tuple(inputs)
+        self.checkpoints = checkpoints
+        self.unkeyed = set(unkeyed)
+        self.drain_seconds = drain_seconds
+        self.stages: Dict[str, Stage] = {}
+        self.runs = 0
+        self.failed_runs = 0
+        self.last_run: Dict[str, Dict[str, Any]] = {}
+        self._histograms: Dict[str, LatencyHistogram] = {}
+        self._failures: Dict[str, int] = {}
+        self._reused: Dict[str, int] = {}
+
+    def add(
+        self,
+        name: str,
+        func: Callable[..., Awaitable[Any]],
+        requires: Iterable[str] = (),
+        after: Iterable[str] = (),
+        fallback: Any = REQUIRED,
+        checkpoint: Optional[Checkpoint] = None,
+    ) -> Stage:
+        """
+        Declare a stage.
+
+        Args:
+            name: Stage name, also the name its output is published under
+            func: Coroutine function called with the required values as keyword arguments
+            requires: Inputs or earlier stages whose values func takes
+            after: Earlier stages to wait for without taking their values
+            fallback: Output to use if func raises (omit to make failures fatal)
+            checkpoint: Codec to save the output with, so re-runs can reuse it
+        """
+        if name in self.stages or name in self.inputs:
+            raise ValueError(f"Duplicate stage name in {self.name}: {name}")
+        requires, after = tuple(requires), tuple(after)
+        for dependency in requires + after:
+            if dependency not in self.stages and (dependency in after or dependency not in self.inputs):
+                raise ValueError(f"Stage {name} depends on {dependency}, which isn't declared before it")
+        stage = Stage(name, func, requires, after, fallback, checkpoint)
+        self.stages[name] = stage
+        self._histograms[name] = LatencyHistogram()
+        self._failures[name] = 0
+        self._reused[name] = 0
+        return stage
+
+    def stage(
+        self,
+        name: str,
+        requires: Iterable[str] = (),
+        after: Iterable[str] = (),
+        fallback: Any = REQUIRED,
+        checkpoint: Optional[Checkpoint] = None,
+    ):
+        """Decorator form of add()."""
+        def register(func):
+            self.add(name, func, requires=requires, after=after, fallback=fallback, checkpoint=checkpoint)
+            return func
+        return register
+
+    def _load_checkpoint(self, scope: str, stage: Stage, digest: str) -> Tuple[bool, Any]:
+        try:
+            saved = self.checkpoints.get(self.name, scope, stage.name)
+            if saved and saved.get("fingerprint") == digest:
+                return True, stage.checkpoint.load(saved["value"])
+        except Exception as e:
+            logger.warning(f"⚠️ Ignoring unreadable checkpoint {self.name}.{stage.name}: {e}")
+        return False, None
+
+    def _save_checkpoint(self, scope: str, stage: Stage, digest: str, value: Any):
+        try:
+            self.checkpoints.put(self.name, scope, stage.name, digest, stage.checkpoint.dump(value))
+        except Exception as e:
+            logger.warning(f"⚠️ Failed to checkpoint {self.name}.{stage.name}: {e}")
+
+    async def run(
+        self,
+        checkpoint_scope: Optional[str] = None,
+        on_progress: Optional[Callable[[Dict[str, Dict[str, Any]]], None]] = None,
+        **inputs,
+    ) -> StageRun:
+        """
+        Run every stage, each as soon as its dependencies are done.
+
+        Args:
+            checkpoint_scope: Key under which stage outputs are saved and reused
+                (no checkpointing without one)
+            on_progress: Called with every stage's status ({name: {"status", ...}})
+                whenever a stage starts or finishes
+            **inputs: Values for the declared inputs
+
+        Raises:
+            ValueError: if inputs don't match the declared inputs
+            Exception: the first failure of a stage without a fallback
+        """
+        missing = set(self.inputs) - set(inputs)
+        if missing:
+            raise ValueError(f"{self.name} run is missing inputs: {sorted(missing)}")
+
+        started = time.perf_counter()
+        tasks: Dict[str, asyncio.Task] = {}
+        timings: Dict[str, Dict[str, Any]] = {}
+        running = set()  # Stages whose func is executing
+        checkpointing = self.checkpoints is not None and checkpoint_scope is not None
+
+        def report(name: str, status: str):
+            timings.setdefault(name, {})["status"] = status
+            if on_progress:
+                try:
+                    on_progress({n: dict(timings.get(n) or {"status": "pending"}) for n in self.stages})
+                except Exception as e:
+                    logger.warning(f"⚠️ {self.name} progress callback failed: {e}")
+
+        async def value_of(dependency: str):
+            if dependency in tasks:
+                # Shielded so a cancelled dependent doesn't cancel the shared stage
+                return await asyncio.shield(tasks[dependency])
+            return inputs[dependency]
+
+        async def run_stage(stage: Stage):
+            kwargs = {dependency: await value_of(dependency) for dependency in stage.requires}
+            for dependency in stage.after:
+                await value_of(dependency)
+            stage_started = time.perf_counter()
+
+            digest = None
+            if checkpointing and stage.checkpoint:
+                digest = fingerprint(stage.name, {k: v for k, v in kwargs.items() if k not in self.unkeyed})
+                found, value = await asyncio.to_thread(self._load_checkpoint, checkpoint_scope, stage, digest)
+                if found:
+                    self._reused[stage.name] += 1
+                    timings[stage.name] = {"start_ms": round((stage_started - started) * 1000, 1), "ms": 0.0}
+                    report(stage.name, "cached")
+                    return value
+
+            report(stage.name, "running")
+            status = "cancelled"
+            running.add(stage.name)
+            try:
+                value = await stage.func(**kwargs)
+                status = "ok"
+                if digest:
+                    await asyncio.to_thread(self._save_checkpoint, checkpoint_scope, stage, digest, value)
+                return value
+            except Exception as e:
+                status = "failed"
+                self._failures[stage.name] += 1
+                if stage.fallback is REQUIRED:
+                    raise
+                status = "fallback"
+                logger.warning(f"⚠️ {self.name}.{stage.name} failed (non-blocking): {e}")
+                logger.error(traceback.format_exc())
+                return stage.fallback
+            finally:
+                running.discard(stage.name)
+                seconds = time.perf_counter() - stage_started
+                self._histograms[stage.name].observe(seconds)
+                timings[stage.name] = {
+                    "start_ms": round((stage_started - started) * 1000, 1),
+                    "ms": round(seconds * 1000, 1),
+                }
+                report(stage.name, status)
+
+        for stage in self.stages.values():
+            tasks[stage.name] = asyncio.create_task(run_stage(stage), name=f"{self.name}.{stage.name}")
+
+        self.runs += 1
+        try:
+            await asyncio.gather(*tasks.values())
+        except Exception:
+            # A required stage failed: don't start anything new, but let running
+            # checkpointed stages finish so their output survives for the retry
+            self.failed_runs += 1
+            draining = [
+                tasks[name] for name in running
+                if checkpointing and self.stages[name].checkpoint and not tasks[name].done()
+            ]
+            for task in tasks.values():
+                if task not in draining:
+                    task.cancel()
+            if draining:
+                logger.info(f"⏳ {self.name} failed, letting {len(draining)} running stages checkpoint first")
+                _, unfinished = await asyncio.wait(draining, timeout=self.drain_seconds)
+                for task in unfinished:
+                    task.cancel()
+            await asyncio.gather(*tasks.values(), return_exceptions=True)
+            raise
+        except BaseException:
+            self.failed_runs += 1
+            for task in tasks.values():
+                task.cancel()
+            await asyncio.gather(*tasks.values(), return_exceptions=True)
+            raise
+        finally:
+            self.last_run = timings
+            seconds = time.perf_counter() - started
+            summary = ", ".join(
+                f"{name} +{t['start_ms']:.0f}ms/{t['ms']:.0f}ms" + ("" if t["status"] == "ok" else f" ({t['status']})")
+                for name, t in sorted(timings.items(), key=lambda item: item[1]["start_ms"])
+                if "ms" in t
+            )
+            logger.info(f"⏱️ {self.name} stages in {seconds:.2f}s: {summary}")
+
+        return StageRun({name: task.result() for name, task in tasks.items()}, timings, seconds)
+
+    def get_metrics(self) -> dict:
+        return {
+            "runs": self.runs,
+            "failed_runs": self.failed_runs,
+            "stages": {
+                name: {
+                    **self._histograms[name].to_dict(),
+                    "failures": self._failures[name],
+                    "checkpoint_hits": self._reused[name],
+                }
+                for name in self.stages
+            },
+            "last_run": self.last_run,
+        }
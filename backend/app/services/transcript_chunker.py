@@ -1,33 +1,134 @@
-"""Transcript chunking module for splitting conversation transcripts into chunks."""
+"""
+Transcript chunking module for splitting conversation transcripts into chunks.
+
+Chunks are packed from whole speaker turns up to a token budget, so a
+chunk never starts mid-sentence or loses track of who is talking. The
+last overlap_turns turns of a chunk are repeated at the start of the
+next one for context. A single turn longer than the budget is split at
+sentence boundaries, and each piece keeps its speaker label.
+
+Chunk ids are derived from the conflict, position and content
+(chunk_<conflict_id>_<hash>), so re-chunking an unchanged transcript
+yields the same ids. delta() compares a new chunk set against the ids
+already stored and returns only what needs embedding plus the ids to
+delete. An appended transcript re-embeds just its tail.
+"""
+import hashlib
 import logging
-from typing import List, Dict, Any
-from langchain_text_splitters import RecursiveCharacterTextSplitter
+import re
+from typing import Any, Dict, Iterable, List, Tuple
 
 logger = logging.getLogger(__name__)
 
+_SPEAKER_RE = re.compile(r"^\s*([^:\n]{1,60}?)\s*:\s*(.*)$")
+_SENTENCE_RE = re.compile(r"(?<=[.!?])\s+")
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (~4 chars/token), matching EmbeddingsService.estimate_tokens."""
+    return len(text) // 4 + 1
+
+
+def chunk_id_prefix(conflict_id: str) -> str:
+    return f"chunk_{conflict_id}_"
+
 
 class TranscriptChunker:
     """Process conversation transcripts and split into chunks."""
-    
+
     def __init__(
         self,
-        chunk_size: int = 1000,
-        chunk_overlap: int = 200,
+        max_tokens: int = 250,
+        overlap_turns: int = 1,
     ):
         """
         Initialize transcript chunker.
-        
+
         Args:
-            chunk_size: Maximum size of text chunks
-            chunk_overlap: Overlap between chunks for context preservation
+            max_tokens: Token budget per chunk
+            overlap_turns: Turns repeated from the end of one chunk at the start of the next
         """
-        self.text_splitter = RecursiveCharacterTextSplitter(
-            chunk_size=chunk_size,
-            chunk_overlap=chunk_overlap,
-            length_function=len,
-            separators=["\n\n", "\n", " ", ""],
-        )
-    
+        self.max_tokens = max_tokens
+        self.overlap_turns = overlap_turns
+
+    @staticmethod
+    def parse_turns(transcript_text: str) -> List[Tuple[str, str]]:
+        """
+        Split "Speaker: text" lines into (speaker, text) turns.
+
+        Consecutive lines from the same speaker are merged, and lines without
+        a speaker prefix continue the previous turn.
+        """
+        turns: List[Tuple[str, str]] = []
+        for line in transcript_text.splitlines():
+            line = line.strip()
+            if not line:
+                continue
+            match = _SPEAKER_RE.match(line)
+            if match and match.group(2):
+                speaker, text = match.group(1), match.group(2).strip()
+            elif turns:
+                speaker, text = turns[-1][0], line
+            else:
+                speaker, text = "Unknown", line
+            if turns and turns[-1][0] == speaker:
+                turns[-1] = (speaker, f"{turns[-1][1]} {text}")
+            else:
+                turns.append((speaker, text))
+        return turns
+
+    def _split_long_turn(self, speaker: str, text: str) -> List[Tuple[str, str]]:
+        """Break a turn over the budget into sentence-aligned pieces."""
+        budget = self.max_tokens - estimate_tokens(f"{speaker}: ")
+        pieces, current = [], ""
+        for sentence in _SENTENCE_RE.split(text):
+            # Sentences longer than the whole budget are hard-wrapped
+            while estimate_tokens(sentence) > budget:
+                head, sentence = sentence[:budget * 4], sentence[budget * 4:]
+                if current:
+                    pieces.append(current)
+                    current = ""
+                pieces.append(head)
+            candidate = f"{current} {sentence}".strip()
+            if current and estimate_tokens(candidate) > budget:
+                pieces.append(current)
+                candidate = sentence
+            current = candidate
+        if current:
+            pieces.append(current)
+        return [(speaker, piece) for piece in pieces]
+
+    def pack_turns(self, turns: List[Tuple[str, str]]) -> List[List[Tuple[str, str]]]:
+        """Greedily pack whole turns into chunks of at most max_tokens, with turn overlap."""
+        units: List[Tuple[str, str]] = []
+        for speaker, text in turns:
+            if estimate_tokens(f"{speaker}: {text}") > self.max_tokens:
+                units.extend(self._split_long_turn(speaker, text))
+            else:
+                units.append((speaker, text))
+
+        chunks: List[List[Tuple[str, str]]] = []
+        current: List[Tuple[str, str]] = []
+        size = 0
+        fresh = 0  # Units in `current` that aren't overlap from the previous chunk
+        for unit in units:
+            unit_tokens = estimate_tokens(f"{unit[0]}: {unit[1]}")
+            if fresh and size + unit_tokens > self.max_tokens:
+                chunks.append(current)
+                current = current[-self.overlap_turns:] if self.overlap_turns else []
+                size = sum(estimate_tokens(f"{s}: {t}") for s, t in current)
+                # Drop overlap that would leave no room for the new turn
+                while current and size + unit_tokens > self.max_tokens:
+                    size -= estimate_tokens(f"{current[0][0]}: {current[0][1]}")
+                    current = current[1:]
+                fresh = 0
+            current.append(unit)
+            size += unit_tokens
+            fresh += 1
+        if fresh:
+            chunks.append(current)
+        return chunks
+
     def chunk_transcript(
         self,
         transcript_text: str,
@@ -37,61 +138,64 @@ class TranscriptChunker:
     ) -> List[Dict[str, Any]]:
         """
         Split transcript text into chunks with metadata.
-        
+
         Args:
             transcript_text: Full transcript text (format: "Speaker: text\nSpeaker: text")
             conflict_id: Conflict ID for this transcript
             relationship_id: Relationship ID
             timestamp: Timestamp of the transcript
-            
+
         Returns:
-            List of chunk dictionaries with content and metadata
+            List of chunk dictionaries with id, content and metadata
         """
         if not transcript_text or not transcript_text.strip():
             logger.warning("Empty transcript text provided")
             return []
-        
-        # Split transcript into chunks
-        chunks = self.text_splitter.split_text(transcript_text)
-        
+
         chunk_list = []
-        for idx, chunk in enumerate(chunks):
-            # Extract speaker information from chunk if present
-            speaker = None
-            chunk_lines = chunk.split('\n')
-            if chunk_lines:
-                first_line = chunk_lines[0]
-                if ':' in first_line:
-                    speaker = first_line.split(':', 1)[0].strip()
-            
+        for idx, turns in enumerate(self.pack_turns(self.parse_turns(transcript_text))):
+            chunk = "\n".join(f"{speaker}: {text}" for speaker, text in turns)
+            speakers = list(dict.fromkeys(speaker for speaker, _ in turns))
+            speaker = speakers[0] if len(speakers) == 1 else "Both"
+            digest = hashlib.sha256(f"{idx}\0{chunk}".encode("utf-8")).hexdigest()[:16]
+
             chunk_dict = {
+                "id": f"{chunk_id_prefix(conflict_id)}{digest}",
                 "content": chunk,
                 "conflict_id": conflict_id,
                 "relationship_id": relationship_id,
                 "chunk_index": idx,
-                "speaker": speaker or "Unknown",
+                "speaker": speaker,
                 "metadata": {
                     "conflict_id": conflict_id,
                     "relationship_id": relationship_id,
                     "chunk_index": idx,
-                    "speaker": speaker or "Unknown",
+                    "speaker": speaker,
+                    "speakers": speakers,
+                    "turn_count": len(turns),
                     "text": chunk,
                 }
             }
-            
+
             if timestamp:
                 chunk_dict["timestamp"] = timestamp
                 chunk_dict["metadata"]["timestamp"] = timestamp
-            
+
             chunk_list.append(chunk_dict)
-        
+
         logger.info(f"Created {len(chunk_list)} chunks from transcript for conflict {conflict_id}")
         return chunk_list
 
+    @staticmethod
+    def delta(chunks: List[Dict[str, Any]], existing_ids: Iterable[str]) -> Tuple[List[Dict[str, Any]], List[str]]:
+        """
+        Compare a new chunk set against the chunk ids already stored.
 
-
-
-
-
-
-
+        Returns:
+            (chunks that need embedding and upserting, stored ids that no longer exist)
+        """
+        existing = set(existing_ids)
+        current = {chunk["id"] for chunk in chunks}
+        added = [chunk for chunk in chunks if chunk["id"] not in existing]
+        stale = sorted(existing - current)
+        return added, stale
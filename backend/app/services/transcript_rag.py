@@ -3,9 +3,15 @@ import logging
 import asyncio
 import time
 from typing import Optional, List, Dict, Any
+from app.services.db_service import db_service
 from app.services.pinecone_service import pinecone_service
 from app.services.embeddings_service import embeddings_service
+from app.services.embedding_dispatcher import embedding_dispatcher
 from app.services.reranker_service import reranker_service
+from app.services.conflict_transcript_store import conflict_transcript_store
+from app.services.lexical_index import lexical_index_service, reciprocal_rank_fusion
+from app.services.retrieval_scheduler import retrieval_scheduler
+from app.services.semantic_query_cache import semantic_query_cache
 
 logger = logging.getLogger(__name__)
 
@@ -17,6 +23,89 @@ except ImportError:
     logger.warning("Calendar service not available - calendar insights will be disabled")
 
 
+# Per-source deadlines (seconds) used when a latency budget is set
+DEFAULT_SOURCE_DEADLINES = {
+    "primary": None,  # Capped by the turn budget only - it's the main context
+    "profiles": 0.8,
+    "past_conflicts": 0.8,
+    "books": 0.8,
+    "calendar": 1.5,
+}
+
+# Pinecone returns at most 1000 matches with metadata per query
+LEXICAL_BOOTSTRAP_TOP_K = 1000
+
+
+def _profile_chunk(doc_id: str, metadata: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    text = metadata.get("extracted_text", "")
+    if not text:
+        return None
+    pdf_type = metadata.get("pdf_type", "")
+    # Try to get speaker from name metadata first, then fall back to pdf_type logic
+    name = metadata.get("name")
+    if name:
+        speaker = name
+    else:
+        # Use gender-neutral labels for partner profiles
+        speaker = "Partner A" if "boyfriend" in pdf_type or "partner_a" in pdf_type else "Partner B"
+    return {
+        'id': doc_id,
+        'text': text,
+        'type': 'profile',
+        'is_current_conflict': False,
+        'profile_type': pdf_type,
+        'speaker': speaker,
+    }
+
+
+def _past_transcript_chunk(doc_id: str, metadata: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    text = metadata.get("text", "")
+    if not text:
+        return None
+    return {
+        'id': doc_id,
+        'text': text,
+        'type': 'past_transcript',
+        'is_current_conflict': False,
+        'conflict_id': metadata.get("conflict_id", "unknown"),
+        'speaker': metadata.get("speaker", "Unknown"),
+        'chunk_index': metadata.get("chunk_index", 0),
+    }
+
+
+def _book_chunk(doc_id: str, metadata: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    text = metadata.get("text", "")
+    if not text:
+        return None
+    return {
+        'id': doc_id,
+        'text': text,
+        'type': 'book_reference',
+        'is_current_conflict': False,
+        'book_title': metadata.get("book_title", "Unknown Book"),
+        'chapter_number': metadata.get("chapter_number", 0),
+        'chapter_title': metadata.get("chapter_title", "Unknown Chapter"),
+    }
+
+
+def _conflict_relationship(conflict_id: str, relationship_id: Optional[str]) -> Optional[str]:
+    """Relationship whose namespace holds a conflict's chunks (looked up only when sharded and not given)."""
+    if relationship_id or pinecone_service.namespace_layout != "per_relationship":
+        return relationship_id
+    try:
+        return (db_service.get_conflict_by_id(conflict_id) or {}).get("relationship_id")
+    except Exception as e:
+        logger.warning(f"⚠️ Could not resolve relationship for conflict {conflict_id}: {e}")
+        return None
+
+
+_CHUNK_BUILDERS = {
+    "profiles": _profile_chunk,
+    "transcript_chunks": _past_transcript_chunk,
+    "books": _book_chunk,
+}
+
+
 class TranscriptRAGSystem:
     """Retrieval-Augmented Generation system for conversation transcripts and profile PDFs.
     
@@ -34,6 +123,12 @@ class TranscriptRAGSystem:
         include_profiles: bool = True,
         include_calendar: bool = True,
         include_books: bool = True,  # NEW: Include reference books for relationship advice
+        include_lexical: bool = True,
+        skip_rerank_when_confident: bool = True,
+        fusion_confidence: float = 0.6,
+        latency_budget: Optional[float] = None,
+        source_deadlines: Optional[Dict[str, Optional[float]]] = None,
+        semantic_cache: bool = True,
     ):
         """
         Initialize transcript RAG system.
@@ -43,12 +138,27 @@ class TranscriptRAGSystem:
             include_profiles: Whether to also query profile PDFs (Adrian/Elara profiles)
             include_calendar: Whether to include calendar insights (cycle phase, upcoming events)
             include_books: Whether to query reference books (romance/relationship books) for advice
+            include_lexical: Whether to fuse BM25 results with the vector results (RRF)
+            skip_rerank_when_confident: Skip the Voyage reranker when fusion is confident
+            fusion_confidence: Share of the top-k fused results both retrievers must agree on
+                to count as confident
+            latency_budget: Per-turn retrieval budget in seconds (None = wait for every source)
+            source_deadlines: Per-source deadlines applied when latency_budget is set
+            semantic_cache: Reuse context assembled for semantically similar queries
+                in the same session (invalidated when relationship data changes)
         """
         self.k = k
         self.include_profiles = include_profiles
         self.include_calendar = include_calendar
         self.include_books = include_books
+        self.include_lexical = include_lexical
+        self.skip_rerank_when_confident = skip_rerank_when_confident
+        self.fusion_confidence = fusion_confidence
+        self.latency_budget = latency_budget
+        self.source_deadlines = {**DEFAULT_SOURCE_DEADLINES, **(source_deadlines or {})}
+        self.semantic_cache = semantic_cache
         self._profile_cache = {}  # Cache for profile chunks
+        self._bootstrap_tasks = set()
         logger.info(f"Initialized TranscriptRAGSystem with k={k}, include_profiles={include_profiles}, include_calendar={include_calendar}, include_books={include_books}")
     
     async def rag_lookup(
@@ -56,14 +166,15 @@ class TranscriptRAGSystem:
         query: str,
         conflict_id: Optional[str] = None,
         relationship_id: Optional[str] = None,
+        session_id: Optional[str] = None,
     ) -> str:
         """
         Perform RAG lookup with CURRENT CONFLICT as PRIMARY context.
         
         Strategy:
-        1. FIRST: Fetch ALL chunks from the current conflict (using filter) - PRIMARY CONTEXT
+        1. FIRST: Fetch ALL chunks from the current conflict (in-process transcript store) - PRIMARY CONTEXT
         2. THEN: Optionally fetch relevant chunks from profiles and past conflicts - SECONDARY CONTEXT
-        3. Rerank secondary context to get most relevant supplementary info
+        3. Fuse vector and BM25 results (RRF); rerank secondary context unless the fusion is confident
         
         This ensures that when the user asks about "this conversation" or "summarize",
         the current conflict's full transcript is always the primary source.
@@ -72,6 +183,7 @@ class TranscriptRAGSystem:
             query: User query string
             conflict_id: Current conflict ID (REQUIRED for primary context)
             relationship_id: Relationship ID (for profile filtering)
+            session_id: Mediator session ID (scopes the semantic query cache)
             
         Returns:
             Formatted context string for LLM injection
@@ -80,30 +192,39 @@ class TranscriptRAGSystem:
             start_time = time.perf_counter()
             logger.info(f"🔍 Starting RAG lookup for query: '{query[:30]}...'")
             
-            # Generate query embedding
-            embedding_start = time.perf_counter()
-            query_embedding = await asyncio.to_thread(embeddings_service.embed_query, query)
-            embedding_time = time.perf_counter() - embedding_start
-            logger.info(f"   ⏱️ Embedding generation: {embedding_time:.3f}s")
-            
             primary_chunks = []  # Chunks from CURRENT conflict (always included)
             secondary_candidates = []  # Chunks from profiles and past conflicts (reranked)
             
+            # Generate query embedding (coalesced with concurrent lookups).
+            # Primary context doesn't need it, so it starts loading in parallel.
+            embedding_start = time.perf_counter()
+            embedding_task = asyncio.ensure_future(embedding_dispatcher.embed_query(query))
+            
             # Define async tasks for parallel execution
             
             async def fetch_primary_context():
-                """Fetch chunks from CURRENT conflict"""
+                """Fetch the CURRENT conflict's full transcript, in order"""
                 if not conflict_id:
                     return []
                 
                 t_start = time.perf_counter()
                 try:
-                    # Query with filter to get ONLY current conflict's chunks
+                    # Served from rant_messages, kept warm in-process for the session
+                    chunks = await conflict_transcript_store.get_chunks(conflict_id)
+                    if chunks:
+                        logger.info(f"   ✅ Primary context: {len(chunks)} chunks from transcript store ({time.perf_counter() - t_start:.3f}s)")
+                        return chunks
+                except Exception as e:
+                    logger.warning(f"   ⚠️ Transcript store unavailable, falling back to Pinecone: {e}")
+                
+                try:
+                    # Fallback: conflicts whose transcript only exists in Pinecone
+                    owner = await asyncio.to_thread(_conflict_relationship, conflict_id, relationship_id)
                     results = await asyncio.to_thread(
                         pinecone_service.index.query,
-                        vector=query_embedding,
+                        vector=await embedding_task,
                         top_k=20,  # Get up to 20 chunks from current conflict
-                        namespace="transcript_chunks",
+                        namespace=pinecone_service.namespace_for("transcript_chunks", owner),
                         filter={"conflict_id": {"$eq": conflict_id}},  # FILTER by conflict_id
                         include_metadata=True,
                     )
@@ -127,12 +248,19 @@ class TranscriptRAGSystem:
                         # Sort by chunk_index to maintain conversation order
                         chunks.sort(key=lambda c: c.get('chunk_index', 0))
                     
-                    logger.info(f"   ✅ Primary context: {len(chunks)} chunks ({time.perf_counter() - t_start:.3f}s)")
+                    logger.info(f"   ✅ Primary context: {len(chunks)} chunks from Pinecone ({time.perf_counter() - t_start:.3f}s)")
                     return chunks
                 except Exception as e:
                     logger.error(f"   ❌ Error fetching primary context: {e}")
                     return []
 
+            def on_embedded(task):
+                if not task.cancelled() and task.exception() is None:
+                    retrieval_scheduler.observe("embedding", time.perf_counter() - embedding_start)
+                    logger.info(f"   ⏱️ Embedding generation: {time.perf_counter() - embedding_start:.3f}s")
+
+            embedding_task.add_done_callback(on_embedded)
+
             async def fetch_profiles():
                 """Fetch profile chunks"""
                 if not self.include_profiles or not relationship_id:
@@ -142,7 +270,7 @@ class TranscriptRAGSystem:
                 try:
                     results = await asyncio.to_thread(
                         pinecone_service.index.query,
-                        vector=query_embedding,
+                        vector=await embedding_task,
                         top_k=10,  # Increased from 3 to 10 to capture more profile details
                         namespace="profiles",
                         filter={"relationship_id": {"$eq": relationship_id}},
@@ -153,25 +281,10 @@ class TranscriptRAGSystem:
                     if results and hasattr(results, 'matches') and results.matches:
                         for match in results.matches:
                             metadata = match.metadata if hasattr(match, 'metadata') else {}
-                            text = metadata.get("extracted_text", "")
-                            pdf_type = metadata.get("pdf_type", "")
-                            if text:
-                                # Try to get speaker from name metadata first, then fall back to pdf_type logic
-                                name = metadata.get("name")
-                                if name:
-                                    speaker = name
-                                else:
-                                    # Use gender-neutral labels for partner profiles
-                                    speaker = "Partner A" if "boyfriend" in pdf_type or "partner_a" in pdf_type else "Partner B"
-                                
-                                chunks.append({
-                                    'text': text,
-                                    'match': match,
-                                    'type': 'profile',
-                                    'is_current_conflict': False,
-                                    'profile_type': pdf_type,
-                                    'speaker': speaker,
-                                })
+                            chunk = _profile_chunk(match.id, metadata)
+                            if chunk:
+                                chunk['match'] = match
+                                chunks.append(chunk)
                     
                     logger.info(f"   ✅ Profiles: {len(chunks)} chunks ({time.perf_counter() - t_start:.3f}s)")
                     return chunks
@@ -194,7 +307,7 @@ class TranscriptRAGSystem:
                     # SECURITY: Filter by relationship_id AND exclude current conflict
                     results = await asyncio.to_thread(
                         pinecone_service.index.query,
-                        vector=query_embedding,
+                        vector=await embedding_task,
                         top_k=5,  # Get top 5 from past conflicts
                         namespace="transcript_chunks",
                         filter={
@@ -210,17 +323,10 @@ class TranscriptRAGSystem:
                     if results and hasattr(results, 'matches') and results.matches:
                         for match in results.matches:
                             metadata = match.metadata if hasattr(match, 'metadata') else {}
-                            text = metadata.get("text", "")
-                            if text:
-                                chunks.append({
-                                    'text': text,
-                                    'match': match,
-                                    'type': 'past_transcript',
-                                    'is_current_conflict': False,
-                                    'conflict_id': metadata.get("conflict_id", "unknown"),
-                                    'speaker': metadata.get("speaker", "Unknown"),
-                                    'chunk_index': metadata.get("chunk_index", 0),
-                                })
+                            chunk = _past_transcript_chunk(match.id, metadata)
+                            if chunk:
+                                chunk['match'] = match
+                                chunks.append(chunk)
                     
                     logger.info(f"   ✅ Past conflicts: {len(chunks)} chunks ({time.perf_counter() - t_start:.3f}s)")
                     return chunks
@@ -237,7 +343,7 @@ class TranscriptRAGSystem:
                 try:
                     results = await asyncio.to_thread(
                         pinecone_service.index.query,
-                        vector=query_embedding,
+                        vector=await embedding_task,
                         top_k=5,  # Get top 5 book chunks
                         namespace="books",
                         include_metadata=True,
@@ -247,17 +353,10 @@ class TranscriptRAGSystem:
                     if results and hasattr(results, 'matches') and results.matches:
                         for match in results.matches:
                             metadata = match.metadata if hasattr(match, 'metadata') else {}
-                            text = metadata.get("text", "")
-                            if text:
-                                chunks.append({
-                                    'text': text,
-                                    'match': match,
-                                    'type': 'book_reference',
-                                    'is_current_conflict': False,
-                                    'book_title': metadata.get("book_title", "Unknown Book"),
-                                    'chapter_number': metadata.get("chapter_number", 0),
-                                    'chapter_title': metadata.get("chapter_title", "Unknown Chapter"),
-                                })
+                            chunk = _book_chunk(match.id, metadata)
+                            if chunk:
+                                chunk['match'] = match
+                                chunks.append(chunk)
                     
                     logger.info(f"   ✅ Book references: {len(chunks)} chunks ({time.perf_counter() - t_start:.3f}s)")
                     return chunks
@@ -289,47 +388,99 @@ class TranscriptRAGSystem:
                     logger.warning(f"   ⚠️ Error fetching calendar insights: {e}")
                     return ""
 
-            # Execute all fetches in parallel
+            # Fan out to every source; with a latency budget, slow sources are
+            # dropped (or served from the previous turn) instead of stalling the turn
             parallel_start = time.perf_counter()
-            results = await asyncio.gather(
-                fetch_primary_context(),
-                fetch_profiles(),
-                fetch_past_conflicts(),
-                fetch_book_references(),  # NEW: Fetch book references
-                fetch_calendar_insights(),
-                return_exceptions=True
-            )
+            deadlines = self.source_deadlines if self.latency_budget else {}
+            missed_sources: List[str] = []
+            fanout = asyncio.ensure_future(retrieval_scheduler.run(
+                {
+                    "primary": (fetch_primary_context, deadlines.get("primary"), []),
+                    "profiles": (fetch_profiles, deadlines.get("profiles"), []),
+                    "past_conflicts": (fetch_past_conflicts, deadlines.get("past_conflicts"), []),
+                    "books": (fetch_book_references, deadlines.get("books"), []),
+                    "calendar": (fetch_calendar_insights, deadlines.get("calendar"), ""),
+                },
+                budget=self.latency_budget,
+                scope=(conflict_id, relationship_id),
+                missed=missed_sources,
+            ))
+
+            # Semantic cache: a rephrasing of an earlier question in this session
+            # gets the context assembled for it, skipping rerank. It's checked
+            # while the fan-out runs, which is cancelled on a hit.
+            cache_scope = cache_version = query_embedding = None
+            if self.semantic_cache and relationship_id:
+                try:
+                    cache_scope = semantic_query_cache.scope(relationship_id, conflict_id, session_id)
+                    cache_version, query_embedding = await asyncio.gather(
+                        asyncio.to_thread(semantic_query_cache.current_version, relationship_id),
+                        asyncio.shield(embedding_task),
+                    )
+                    cached_context = semantic_query_cache.get(cache_scope, query_embedding, cache_version)
+                    if cached_context is not None:
+                        fanout.cancel()
+                        logger.info(f"⏱️ RAG TOTAL: {time.perf_counter() - start_time:.3f}s (semantic cache)")
+                        return cached_context
+                except Exception as e:
+                    logger.warning(f"   ⚠️ Semantic cache lookup failed: {e}")
+                    cache_scope = None
+
+            results = await fanout
             parallel_time = time.perf_counter() - parallel_start
             logger.info(f"⚡ Parallel fetch completed in {parallel_time:.3f}s")
             
             # Unpack results
-            primary_chunks = results[0] if isinstance(results[0], list) else []
-            profile_chunks = results[1] if isinstance(results[1], list) else []
-            past_conflict_chunks = results[2] if isinstance(results[2], list) else []
-            book_chunks = results[3] if isinstance(results[3], list) else []  # NEW: Book chunks
-            calendar_context = results[4] if isinstance(results[4], str) else ""
-            
-            # Combine secondary candidates
-            secondary_candidates = profile_chunks + past_conflict_chunks + book_chunks
+            primary_chunks = results["primary"]
+            profile_chunks = results["profiles"]
+            past_conflict_chunks = results["past_conflicts"]
+            book_chunks = results["books"]
+            calendar_context = results["calendar"]
             
             # =====================================================================
-            # STEP 3: RERANK SECONDARY CONTEXT (if any)
+            # STEP 3: FUSE VECTOR + LEXICAL RESULTS, RERANK IF NOT CONFIDENT
             # =====================================================================
+            fusion_start = time.perf_counter()
+            secondary_candidates, confident = self._fuse_secondary(
+                query,
+                conflict_id,
+                relationship_id,
+                {
+                    "profiles": profile_chunks,
+                    "transcript_chunks": past_conflict_chunks,
+                    "books": book_chunks,
+                },
+            )
+            fusion_time = time.perf_counter() - fusion_start
+            if self.include_lexical and embedding_task.done() and not embedding_task.cancelled() and embedding_task.exception() is None:
+                self._schedule_lexical_bootstrap(relationship_id, embedding_task.result())
+            
             reranked_secondary = []
             rerank_time = 0.0
             
-            if secondary_candidates:
+            if secondary_candidates and confident:
+                reranked_secondary = secondary_candidates[:self.k]
+                logger.info(f"   ⏱️ Fusion: {fusion_time:.3f}s (confident - skipped rerank, selected {len(reranked_secondary)}/{len(secondary_candidates)})")
+            elif secondary_candidates:
                 rerank_start = time.perf_counter()
                 
                 candidate_texts = [c['text'] for c in secondary_candidates]
                 
+                # Rerank gets whatever is left of the turn budget; past it the
+                # reranker falls back to its local scorer
+                remaining = None
+                if self.latency_budget:
+                    remaining = max(0.0, self.latency_budget - (time.perf_counter() - start_time))
+                
                 # Run rerank in thread
                 reranked_results = await asyncio.to_thread(
                     reranker_service.rerank,
                     query=query,
                     documents=candidate_texts,
-                    top_k=self.k
+                    top_k=self.k,
+                    timeout=remaining,
                 )
+                retrieval_scheduler.observe("rerank", time.perf_counter() - rerank_start)
                 
                 # Map reranked results back to original chunks
                 for doc_text, score in reranked_results:
@@ -427,10 +578,15 @@ class TranscriptRAGSystem:
             rag_timing_msg = (
                 f"⏱️ RAG TOTAL: {total_time:.3f}s | "
                 f"Parallel Fetch: {parallel_time:.3f}s | "
+                f"Fusion: {fusion_time:.3f}s | "
                 f"Rerank: {rerank_time:.3f}s"
             )
             logger.info(rag_timing_msg)
             
+            # Degraded turns (a source missed its deadline) aren't worth repeating
+            if cache_scope is not None and query_embedding is not None and not missed_sources:
+                semantic_query_cache.put(cache_scope, query_embedding, context, cache_version)
+            
             return context
             
         except Exception as e:
@@ -439,13 +595,104 @@ class TranscriptRAGSystem:
             logger.error(traceback.format_exc())
             return "Error retrieving information from the conversation transcript."
     
-    def get_current_conflict_transcript(self, conflict_id: str) -> str:
+    def _fuse_secondary(
+        self,
+        query: str,
+        conflict_id: Optional[str],
+        relationship_id: Optional[str],
+        vector_chunks: Dict[str, List[Dict[str, Any]]],
+    ):
+        """
+        Fuse vector and BM25 results per namespace with reciprocal rank fusion.
+
+        Args:
+            vector_chunks: {namespace: chunks in vector-rank order}
+
+        Returns:
+            (candidates best first, whether the fusion is confident enough to skip reranking)
+        """
+        if not self.include_lexical:
+            return [c for chunks in vector_chunks.values() for c in chunks], False
+
+        # Same scoping and security rules as the vector queries
+        lexical_queries = {}
+        if self.include_profiles and relationship_id:
+            lexical_queries["profiles"] = None
+        if conflict_id and relationship_id:
+            lexical_queries["transcript_chunks"] = lambda m: m.get("conflict_id") != conflict_id
+        if self.include_books:
+            lexical_queries["books"] = None
+
+        by_id: Dict[str, Dict[str, Any]] = {}
+        fused = []
+        for namespace, chunks in vector_chunks.items():
+            for chunk in chunks:
+                by_id.setdefault(chunk['id'], chunk)
+            ranked_lists = [[c['id'] for c in chunks]]
+            if namespace in lexical_queries:
+                lexical_ids = []
+                for doc_id, _, metadata in lexical_index_service.search(
+                    namespace, query, relationship_id, top_k=10, predicate=lexical_queries[namespace]
+                ):
+                    chunk = by_id.get(doc_id) or _CHUNK_BUILDERS[namespace](doc_id, metadata)
+                    if chunk:
+                        by_id[doc_id] = chunk
+                        lexical_ids.append(doc_id)
+                ranked_lists.append(lexical_ids)
+            fused.extend(reciprocal_rank_fusion(ranked_lists))
+
+        fused.sort(key=lambda item: item[1], reverse=True)
+        candidates = []
+        for doc_id, score, _ in fused:
+            by_id[doc_id]['rrf_score'] = score
+            candidates.append(by_id[doc_id])
+
+        top = fused[:self.k]
+        agreement = sum(1 for _, _, votes in top if votes > 1) / len(top) if top else 0.0
+        confident = self.skip_rerank_when_confident and agreement >= self.fusion_confidence
+        logger.info(f"   🔀 Fused {len(candidates)} candidates (top-{self.k} agreement {agreement:.0%})")
+        return candidates, confident
+
+    def _schedule_lexical_bootstrap(self, relationship_id: Optional[str], query_embedding: List[float]):
+        """Load a relationship's chunks into the BM25 index in the background (once per process)."""
+        targets = []
+        if relationship_id:
+            targets += [("transcript_chunks", relationship_id), ("profiles", relationship_id)]
+        if self.include_books:
+            targets.append(("books", None))
+        for namespace, rel_id in targets:
+            if lexical_index_service.needs_bootstrap(namespace, rel_id):
+                lexical_index_service.mark_bootstrapped(namespace, rel_id)
+                task = asyncio.ensure_future(self._bootstrap_lexical(namespace, rel_id, query_embedding))
+                self._bootstrap_tasks.add(task)
+                task.add_done_callback(self._bootstrap_tasks.discard)
+
+    async def _bootstrap_lexical(self, namespace: str, relationship_id: Optional[str], query_embedding: List[float]):
+        try:
+            results = await asyncio.to_thread(
+                pinecone_service.index.query,
+                vector=query_embedding,
+                top_k=LEXICAL_BOOTSTRAP_TOP_K,
+                namespace=namespace,
+                filter={"relationship_id": {"$eq": relationship_id}} if relationship_id else None,
+                include_metadata=True,
+            )
+            matches = results.matches if results and hasattr(results, 'matches') else []
+            count = lexical_index_service.index_vectors(
+                namespace, [{"id": m.id, "metadata": m.metadata or {}} for m in matches]
+            )
+            logger.info(f"   📇 Lexical index bootstrapped: {count} {namespace} chunks")
+        except Exception as e:
+            logger.warning(f"   ⚠️ Lexical bootstrap failed for {namespace}: {e}")
+
+    def get_current_conflict_transcript(self, conflict_id: str, relationship_id: Optional[str] = None) -> str:
         """
         Fetch the FULL transcript for a specific conflict.
         Used when the user explicitly asks about "this conversation" or wants a summary.
         
         Args:
             conflict_id: The conflict ID to fetch
+            relationship_id: The conflict's relationship (looked up if omitted)
             
         Returns:
             Full transcript text or error message
@@ -454,8 +701,6 @@ class TranscriptRAGSystem:
             logger.info(f"📌 Fetching FULL transcript for conflict {conflict_id}...")
             
             # First try to get all chunks from Pinecone
-            from app.services.embeddings_service import embeddings_service
-            
             # Use a generic embedding to query all chunks
             generic_query = "conversation discussion"
             query_embedding = embeddings_service.embed_query(generic_query)
@@ -463,7 +708,9 @@ class TranscriptRAGSystem:
             results = pinecone_service.index.query(
                 vector=query_embedding,
                 top_k=50,  # Get up to 50 chunks
-                namespace="transcript_chunks",
+                namespace=pinecone_service.namespace_for(
+                    "transcript_chunks", _conflict_relationship(conflict_id, relationship_id)
+                ),
                 filter={"conflict_id": {"$eq": conflict_id}},
                 include_metadata=True,
             )
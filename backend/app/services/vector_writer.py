@@ -0,0 +1,342 @@
+"""
+Batched, parallel Pinecone upserts
+
+Vector writes used to be one index.upsert per call site: single vectors
+for messages and analyses, sequential 100-vector batches for books. Book
+ingestion and backfills spent most of their time waiting on round trips.
+
+VectorWriter sends upserts in batches sized by vector count and request
+bytes, runs up to max_workers batches concurrently, and retries failed
+batches with backoff. Vector ids are deterministic (callers build them
+from stable keys, or one is derived from the content), so a retried or
+repeated batch overwrites rather than duplicates. Three entry points:
+
+- upsert() / aupsert(): write a list of vectors now and wait.
+- buffer(): a context manager that accepts vectors as they are produced
+  (e.g. per embedding batch), ships each full batch immediately and
+  waits for the rest on exit, so embedding and upload overlap.
+- enqueue(): async, for single vectors from concurrent requests.
+  Vectors are held for a few milliseconds and coalesced per namespace.
+
+Every successful batch is also fed to the lexical index. Throughput and
+retry counters are kept for GET /api/health/vector-writes.
+"""
+import asyncio
+import hashlib
+import json
+import logging
+import random
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from app.services.lexical_index import lexical_index_service
+
+logger = logging.getLogger(__name__)
+
+# Pinecone limits: 1000 vectors / 2 MB per upsert request. 100 vectors of
+# 1024 dims with ~10 KB metadata lands well under both.
+MAX_BATCH_VECTORS = 100
+MAX_BATCH_BYTES = 1_800_000
+
+
+class VectorWriteError(Exception):
+    """Raised when some batches still failed after every retry."""
+
+    def __init__(self, namespace: str, failed: int, total: int, cause: Exception):
+        super().__init__(f"{failed}/{total} vectors failed to upsert to {namespace}: {cause}")
+        self.namespace = namespace
+        self.failed = failed
+        self.cause = cause
+
+
+def content_vector_id(namespace: str, vector: Dict[str, Any]) -> str:
+    """Deterministic id for a vector that doesn't have one: hash of its metadata."""
+    metadata = json.dumps(vector.get("metadata") or {}, sort_keys=True, default=str)
+    return f"{namespace}_{hashlib.sha256(metadata.encode('utf-8')).hexdigest()[:32]}"
+
+
+def _vector_bytes(vector: Dict[str, Any]) -> int:
+    # ~10 bytes per float in the JSON/gRPC request, plus metadata
+    return 10 * len(vector.get("values") or []) + len(json.dumps(vector.get("metadata") or {}, default=str)) + 64
+
+
+def _is_retryable(error: Exception) -> bool:
+    status = getattr(error, "status", None) or getattr(error, "status_code", None)
+    # 4xx other than rate limiting means the request itself is bad
+    return not (isinstance(status, int) and 400 <= status < 500 and status != 429)
+
+
+class VectorWriter:
+    """Batches, parallelises and retries Pinecone upserts."""
+
+    def __init__(
+        self,
+        index_getter: Callable[[], Any],
+        max_batch_vectors: int = MAX_BATCH_VECTORS,
+        max_batch_bytes: int = MAX_BATCH_BYTES,
+        max_workers: int = 4,
+        max_retries: int = 3,
+        backoff_seconds: float = 0.5,
+        window_ms: float = 20.0,
+    ):
+        self._index_getter = index_getter
+        self.max_batch_vectors = max_batch_vectors
+        self.max_batch_bytes = max_batch_bytes
+        self.max_workers = max_workers
+        self.max_retries = max_retries
+        self.backoff_seconds = backoff_seconds
+        self.window = window_ms / 1000.0
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="vector-writer")
+        self._stats_lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._reset_queue()
+        # Stats
+        self.vectors = 0
+        self.batches = 0
+        self.retries = 0
+        self.failed_vectors = 0
+        self.bytes_sent = 0
+        self.busy_seconds = 0.0
+        self.by_namespace: Dict[str, int] = {}
+
+    @property
+    def index(self):
+        return self._index_getter()
+
+    # --- Batching ---
+
+    def make_batches(self, vectors: Iterable[Dict[str, Any]], namespace: str) -> List[List[Dict[str, Any]]]:
+        """
+        Split vectors into request-sized batches.
+
+        Vectors without an id get a content-derived one. Within one call the
+        last vector for an id wins, as it would on the server.
+        """
+        unique: Dict[str, Dict[str, Any]] = {}
+        for vector in vectors:
+            if not vector.get("id"):
+                vector = {**vector, "id": content_vector_id(namespace, vector)}
+            unique[vector["id"]] = vector
+
+        batches: List[List[Dict[str, Any]]] = []
+        batch: List[Dict[str, Any]] = []
+        size = 0
+        for vector in unique.values():
+            vector_size = _vector_bytes(vector)
+            if batch and (len(batch) >= self.max_batch_vectors or size + vector_size > self.max_batch_bytes):
+                batches.append(batch)
+                batch, size = [], 0
+            batch.append(vector)
+            size += vector_size
+        if batch:
+            batches.append(batch)
+        return batches
+
+    def _send(self, batch: List[Dict[str, Any]], namespace: str) -> int:
+        """Upsert one batch, retrying with jittered exponential backoff. Returns bytes sent."""
+        index = self.index
+        if index is None:
+            raise RuntimeError("Pinecone index not initialized")
+        size = sum(_vector_bytes(v) for v in batch)
+        attempt = 0
+        while True:
+            try:
+                index.upsert(vectors=batch, namespace=namespace)
+                break
+            except Exception as e:
+                if attempt >= self.max_retries or not _is_retryable(e):
+                    raise
+                delay = self.backoff_seconds * (2 ** attempt) * (0.5 + random.random())
+                attempt += 1
+                with self._stats_lock:
+                    self.retries += 1
+                logger.warning(f"⚠️ Upsert of {len(batch)} vectors to {namespace} failed ({e}), retry {attempt} in {delay:.2f}s")
+                time.sleep(delay)
+        lexical_index_service.index_vectors(namespace, batch)
+        return size
+
+    def _record(self, namespace: str, vectors: int, batches: int, size: int, failed: int, seconds: float):
+        with self._stats_lock:
+            self.vectors += vectors
+            self.batches += batches
+            self.bytes_sent += size
+            self.failed_vectors += failed
+            self.busy_seconds += seconds
+            self.by_namespace[namespace] = self.by_namespace.get(namespace, 0) + vectors
+
+    def _collect(self, namespace: str, submitted: List[Tuple[List[Dict[str, Any]], Future]], started: float) -> int:
+        """Wait for submitted batches; record stats; raise VectorWriteError if any failed."""
+        written, size, failed, error = 0, 0, 0, None
+        for batch, future in submitted:
+            try:
+                size += future.result()
+                written += len(batch)
+            except Exception as e:
+                failed += len(batch)
+                error = error or e
+        seconds = time.perf_counter() - started
+        self._record(namespace, written, len(submitted), size, failed, seconds)
+        if written:
+            logger.info(
+                f"📤 Upserted {written} vectors to {namespace} in {len(submitted)} batches "
+                f"({seconds:.2f}s, {written / seconds if seconds else 0:.0f} vectors/s)"
+            )
+        if error is not None:
+            logger.error(f"❌ {failed} vectors failed to upsert to {namespace}: {error}")
+            raise VectorWriteError(namespace, failed, written + failed, error)
+        return written
+
+    # --- Entry points ---
+
+    def upsert(self, vectors: List[Dict[str, Any]], namespace: str) -> int:
+        """
+        Upsert vectors in parallel batches and wait for all of them.
+
+        Returns:
+            Number of vectors written
+
+        Raises:
+            VectorWriteError: if any batch failed after retries (the others are still written)
+        """
+        started = time.perf_counter()
+        batches = self.make_batches(vectors, namespace)
+        if len(batches) == 1:
+            # No point hopping threads for a single request
+            future: Future = Future()
+            try:
+                future.set_result(self._send(batches[0], namespace))
+            except Exception as e:
+                future.set_exception(e)
+            return self._collect(namespace, [(batches[0], future)], started)
+        submitted = [(batch, self._executor.submit(self._send, batch, namespace)) for batch in batches]
+        return self._collect(namespace, submitted, started)
+
+    async def aupsert(self, vectors: List[Dict[str, Any]], namespace: str) -> int:
+        return await asyncio.to_thread(self.upsert, vectors, namespace)
+
+    def buffer(self) -> "VectorWriteBuffer":
+        return VectorWriteBuffer(self)
+
+    # --- Async coalescing of single writes ---
+
+    def _reset_queue(self):
+        """(Re)create loop-bound state - used from more than one event loop (API, Celery worker loop, tests)."""
+        self._pending: Dict[str, List[Tuple[Dict[str, Any], asyncio.Future]]] = {}
+        self._timers: Dict[str, asyncio.TimerHandle] = {}
+
+    async def enqueue(self, namespace: str, vector: Dict[str, Any]):
+        """Write one vector, coalesced with other vectors queued for the same namespace."""
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            self._loop = loop
+            self._reset_queue()
+        future = loop.create_future()
+        self._pending.setdefault(namespace, []).append((vector, future))
+        if len(self._pending[namespace]) >= self.max_batch_vectors:
+            self._flush_queue(namespace)
+        elif namespace not in self._timers:
+            self._timers[namespace] = loop.call_later(self.window, self._flush_queue, namespace)
+        await future
+
+    def _flush_queue(self, namespace: str):
+        timer = self._timers.pop(namespace, None)
+        if timer:
+            timer.cancel()
+        queued = self._pending.pop(namespace, [])
+        if queued:
+            asyncio.get_running_loop().create_task(self._run_queued(namespace, queued))
+
+    async def _run_queued(self, namespace: str, queued: List[Tuple[Dict[str, Any], asyncio.Future]]):
+        try:
+            await self.aupsert([vector for vector, _ in queued], namespace)
+        except Exception as e:
+            for _, future in queued:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for _, future in queued:
+            if not future.done():
+                future.set_result(None)
+
+    def get_metrics(self) -> dict:
+        with self._stats_lock:
+            return {
+                "vectors": self.vectors,
+                "batches": self.batches,
+                "retries": self.retries,
+                "failed_vectors": self.failed_vectors,
+                "megabytes_sent": round(self.bytes_sent / 1_000_000, 2),
+                "vectors_per_second": round(self.vectors / self.busy_seconds, 1) if self.busy_seconds else None,
+                "avg_batch_size": round(self.vectors / self.batches, 1) if self.batches else None,
+                "by_namespace": dict(self.by_namespace),
+            }
+
+
+class VectorWriteBuffer:
+    """
+    Per-namespace write buffer for producers that generate vectors in steps.
+
+    Full batches are submitted to the writer's pool as soon as they fill;
+    close() (or leaving the with block) sends the remainder and waits.
+    """
+
+    def __init__(self, writer: VectorWriter):
+        self.writer = writer
+        self._pending: Dict[str, List[Dict[str, Any]]] = {}
+        self._submitted: Dict[str, List[Tuple[List[Dict[str, Any]], Future]]] = {}
+        self._started = time.perf_counter()
+
+    def add(self, namespace: str, vectors: Iterable[Dict[str, Any]]):
+        pending = self._pending.setdefault(namespace, [])
+        pending.extend(vectors)
+        if len(pending) >= self.writer.max_batch_vectors:
+            batches = self.writer.make_batches(pending, namespace)
+            # Keep a partial tail buffered; it may fill up with the next add()
+            tail = batches.pop() if len(batches[-1]) < self.writer.max_batch_vectors else []
+            self._pending[namespace] = tail
+            for batch in batches:
+                future = self.writer._executor.submit(self.writer._send, batch, namespace)
+                self._submitted.setdefault(namespace, []).append((batch, future))
+
+    def close(self) -> Dict[str, int]:
+        """
+        Flush and wait for every namespace.
+
+        Returns:
+            {namespace: vectors written}
+
+        Raises:
+            VectorWriteError: for the first namespace with failed batches
+        """
+        for namespace, pending in list(self._pending.items()):
+            for batch in self.writer.make_batches(pending, namespace):
+                future = self.writer._executor.submit(self.writer._send, batch, namespace)
+                self._submitted.setdefault(namespace, []).append((batch, future))
+        self._pending.clear()
+        written: Dict[str, int] = {}
+        error: Optional[VectorWriteError] = None
+        for namespace, submitted in self._submitted.items():
+            try:
+                written[namespace] = self.writer._collect(namespace, submitted, self._started)
+            except VectorWriteError as e:
+                error = error or e
+        self._submitted.clear()
+        if error is not None:
+            raise error
+        return written
+
+    def __enter__(self) -> "VectorWriteBuffer":
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            # Don't mask the producer's exception; still wait for what was sent
+            try:
+                self.close()
+            except VectorWriteError as e:
+                logger.error(f"❌ {e}")
+        return False
@@ -1,19 +1,32 @@
 """
 Celery tasks for post-fight analysis.
 
-Wraps the existing generate_analysis_and_repair_plan_background() logic
-so it runs in a Celery worker instead of asyncio background tasks.
+Runs post_fight_pipeline in a Celery worker instead of asyncio background
+tasks. Stage outputs are checkpointed per conflict and transcript, so a
+retry resumes from the first unfinished stage, and every stage transition
+is reported as task progress (Celery PROGRESS state and the task_status row).
+
+The pipeline runs on the worker's persistent event loop (see worker_loop.py);
+the task body stays synchronous because Celery's request context is
+thread-local.
 """
 import logging
-import asyncio
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 
 from app.celery_app import celery_app
+from app.tasks.worker_loop import worker_loop
 
 logger = logging.getLogger(__name__)
 
 
-@celery_app.task(bind=True, name="app.tasks.analysis_tasks.run_post_fight_analysis")
+@celery_app.task(
+    bind=True,
+    name="app.tasks.analysis_tasks.run_post_fight_analysis",
+    autoretry_for=(Exception,),
+    retry_backoff=True,
+    max_retries=2,
+)
 def run_post_fight_analysis(
     self,
     conflict_id: str,
@@ -26,34 +39,49 @@ def run_post_fight_analysis(
 ):
     """
     Main Celery task for post-fight analysis.
-    Delegates to the existing async background function.
+    Runs the checkpointed post-fight pipeline; failures are raised so Celery
+    retries, and a retry reuses every stage that already finished.
     """
     from app.services.db_service import db_service
 
     celery_task_id = self.request.id
-    logger.info(f"Celery task {celery_task_id}: Starting analysis for conflict {conflict_id}")
+    attempt = self.request.retries + 1
+    logger.info(f"Celery task {celery_task_id}: Starting analysis for conflict {conflict_id} (attempt {attempt})")
 
-    # Create/update task status in DB
-    try:
-        db_service.create_task_status(
-            task_type="post_fight_analysis",
-            reference_id=conflict_id,
-            relationship_id=relationship_id,
-            celery_task_id=celery_task_id,
-            status="processing",
-        )
-    except Exception as e:
-        logger.warning(f"Failed to create task_status row: {e}")
+    # Create task status in DB (retries keep the same task id and row)
+    if not self.request.retries:
+        try:
+            db_service.create_task_status(
+                task_type="post_fight_analysis",
+                reference_id=conflict_id,
+                relationship_id=relationship_id,
+                celery_task_id=celery_task_id,
+                status="processing",
+            )
+        except Exception as e:
+            logger.warning(f"Failed to create task_status row: {e}")
+
+    # Progress writes go through one thread so they stay ordered and off the shared event loop
+    progress_writer = ThreadPoolExecutor(max_workers=1)
+    progress = {"attempt": attempt, "stages": {}}
+
+    def publish_progress(snapshot: dict):
+        try:
+            self.update_state(task_id=celery_task_id, state="PROGRESS", meta=snapshot)
+        except Exception as e:
+            logger.warning(f"Failed to publish task progress: {e}")
+        db_service.update_task_status(celery_task_id, "processing", snapshot)
+
+    def report_progress(stages: dict):
+        progress["stages"] = stages
+        progress_writer.submit(publish_progress, dict(progress))
 
     try:
-        # Import the async function and run it in a new event loop
-        from app.routes.post_fight import generate_analysis_and_repair_plan_background
+        from app.routes.post_fight import run_post_fight_pipeline
 
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
         try:
-            loop.run_until_complete(
-                generate_analysis_and_repair_plan_background(
+            run = worker_loop.run(
+                run_post_fight_pipeline(
                     conflict_id=conflict_id,
                     transcript_text=transcript_text,
                     relationship_id=relationship_id,
@@ -62,17 +90,22 @@ def run_post_fight_analysis(
                     speaker_labels=speaker_labels or {},
                     duration=duration,
                     timestamp=datetime.now(),
+                    on_progress=report_progress,
                 )
             )
         finally:
-            loop.close()
+            progress_writer.shutdown(wait=True)
 
         # Mark completed
         try:
             db_service.update_task_status(
                 celery_task_id=celery_task_id,
                 status="completed",
-                result={"message": "Analysis and repair plans generated successfully"},
+                result={
+                    "message": "Analysis and repair plans generated successfully",
+                    "attempt": attempt,
+                    "stages": run.timings,
+                },
             )
         except Exception as e:
             logger.warning(f"Failed to update task_status to completed: {e}")
@@ -81,12 +114,14 @@ def run_post_fight_analysis(
         return {"status": "completed", "conflict_id": conflict_id}
 
     except Exception as e:
-        logger.error(f"Celery task {celery_task_id}: Failed for conflict {conflict_id}: {e}")
+        logger.error(f"Celery task {celery_task_id}: Failed for conflict {conflict_id} (attempt {attempt}): {e}")
 
+        # "processing" while a retry is coming, so pollers keep waiting
         try:
             db_service.update_task_status(
                 celery_task_id=celery_task_id,
-                status="failed",
+                status="failed" if self.request.retries >= self.max_retries else "processing",
+                result=progress,
                 error_message=str(e),
             )
         except Exception:
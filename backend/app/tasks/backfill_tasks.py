@@ -0,0 +1,22 @@
+"""
+Celery tasks for Gottman/enrichment backfills.
+
+A backfill is submitted as one job per conflict on the backfill lane (see
+app/tasks/lanes.py), so a relationship with hundreds of conflicts only ever
+holds a few worker slots and other relationships' jobs interleave with it.
+"""
+import logging
+
+from app.tasks.worker_loop import async_task
+
+logger = logging.getLogger(__name__)
+
+
+@async_task(name="app.tasks.backfill_tasks.backfill_conflict")
+async def backfill_conflict(relationship_id: str, conflict_id: str, include_enrichment: bool = True):
+    """Run Gottman analysis (and enrichment) for one conflict."""
+    from app.services.gottman_analysis_service import gottman_service
+
+    result = await gottman_service.backfill_conflict(relationship_id, conflict_id, include_enrichment)
+    logger.info(f"Backfill {conflict_id}: {result.get('status')}")
+    return result
@@ -3,9 +3,10 @@ Celery tasks for weekly relationship digest generation.
 Scheduled via Celery Beat (Monday 9 AM UTC).
 """
 import logging
-import asyncio
 
 from app.celery_app import celery_app
+from app.tasks.lanes import submit
+from app.tasks.worker_loop import async_task
 
 logger = logging.getLogger(__name__)
 
@@ -21,31 +22,31 @@ def generate_all_digests():
     results = []
     for rel in relationships:
         try:
-            result = generate_digest_for_relationship.delay(rel["relationship_id"])
-            results.append({"relationship_id": rel["relationship_id"], "task_id": result.id})
+            # Scheduled lane: one digest per relationship at a time, fair across relationships
+            task_id = submit(
+                "app.tasks.digest_tasks.generate_digest_for_relationship",
+                "scheduled",
+                rel["relationship_id"],
+                {"relationship_id": rel["relationship_id"]},
+            )
+            results.append({"relationship_id": rel["relationship_id"], "task_id": task_id})
         except Exception as e:
             logger.error(f"Failed to dispatch digest for {rel['relationship_id']}: {e}")
 
     return {"dispatched": len(results), "results": results}
 
 
-@celery_app.task(name="app.tasks.digest_tasks.generate_digest_for_relationship")
-def generate_digest_for_relationship(relationship_id: str):
+@async_task(name="app.tasks.digest_tasks.generate_digest_for_relationship")
+async def generate_digest_for_relationship(relationship_id: str):
     """Generate a weekly digest for a single relationship."""
     from app.services.digest_service import digest_service
 
     logger.info(f"Generating digest for relationship {relationship_id}")
 
-    loop = asyncio.new_event_loop()
-    asyncio.set_event_loop(loop)
     try:
-        result = loop.run_until_complete(
-            digest_service.generate_weekly_digest(relationship_id)
-        )
+        result = await digest_service.generate_weekly_digest(relationship_id)
         logger.info(f"Digest generated for {relationship_id}: {result.get('id')}")
         return result
     except Exception as e:
         logger.error(f"Failed to generate digest for {relationship_id}: {e}")
         raise
-    finally:
-        loop.close()
@@ -0,0 +1,101 @@
+"""
+Submitting Celery tasks through the fair scheduler's priority lanes.
+
+submit() queues a job in fair_scheduler and dispatches whatever may run
+now. A job is sent to Celery (on its lane's queue, with the job id as the
+task id) only once its relationship and lane have a free slot. The
+task_prerun/task_postrun signals in celery_app record queue wait and free
+the slot, and each freed slot dispatches the next job. dispatch_lanes runs on
+Celery Beat to pick up slots freed by expired leases.
+
+If the scheduler's Redis is down, submit() sends the job straight to its
+lane's Celery queue: it skips the fairness caps, but it isn't lost or stuck
+in one process's memory.
+"""
+import logging
+import uuid
+from typing import Any, Dict, Optional
+
+from app.celery_app import celery_app
+from app.services.fair_scheduler import LANES, SchedulerUnavailable, fair_scheduler
+
+logger = logging.getLogger(__name__)
+
+
+def dispatch(lane: str) -> int:
+    """Send every job that may run now in a lane to Celery. Returns how many were sent."""
+    sent = 0
+    while True:
+        try:
+            job = fair_scheduler.claim(lane)
+        except SchedulerUnavailable:
+            # Queued jobs stay in Redis for the next dispatch
+            return sent
+        if job is None:
+            return sent
+        try:
+            celery_app.send_task(job["task"], kwargs=job["kwargs"], queue=lane, task_id=job["id"])
+            sent += 1
+        except Exception as e:
+            # Put it back at the end of its relationship's queue and retry on the next dispatch
+            logger.error(f"❌ Failed to send {job['task']} ({job['id']}) to the {lane} lane: {e}")
+            try:
+                fair_scheduler.finish(job["id"])
+                fair_scheduler.enqueue(lane, job["tenant"], job["task"], job["kwargs"], job["weight"], job_id=job["id"])
+            except SchedulerUnavailable:
+                logger.error(f"❌ Couldn't requeue {job['id']}: scheduler Redis unavailable")
+            return sent
+
+
+def submit(
+    task: str,
+    lane: str,
+    relationship_id: str,
+    kwargs: Dict[str, Any],
+    weight: float = 1.0,
+    job_id: Optional[str] = None,
+) -> str:
+    """
+    Queue a Celery task for a relationship in a priority lane.
+
+    Args:
+        task: Celery task name
+        lane: "interactive", "scheduled" or "backfill"
+        relationship_id: Tenant the job counts against (caps and fairness)
+        kwargs: Task keyword arguments
+        weight: Relative share of the lane (default 1)
+        job_id: Task id to use, generated if omitted
+
+    Returns:
+        The job id, which is also the Celery task id once dispatched
+    """
+    job_id = job_id or str(uuid.uuid4())
+    try:
+        fair_scheduler.enqueue(lane, relationship_id, task, kwargs, weight=weight, job_id=job_id)
+    except SchedulerUnavailable as e:
+        logger.warning(f"⚠️ {e}, sending {task} ({job_id}) to the {lane} lane unscheduled")
+        celery_app.send_task(task, kwargs=kwargs, queue=lane, task_id=job_id)
+        return job_id
+    dispatch(lane)
+    return job_id
+
+
+def on_task_start(task_id: str):
+    waited = fair_scheduler.started(task_id)
+    if waited is not None and waited > 60:
+        logger.info(f"⏱️ Task {task_id} waited {waited:.0f}s in its lane")
+
+
+def on_task_finish(task_id: str, state: Optional[str]):
+    # A retry is the same job continuing, so it keeps its slot
+    if state == "RETRY":
+        return
+    lane = fair_scheduler.finish(task_id)
+    if lane:
+        dispatch(lane)
+
+
+@celery_app.task(name="app.tasks.lanes.dispatch_lanes")
+def dispatch_lanes():
+    """Dispatch jobs whose slots were freed by expired leases (Celery Beat)."""
+    return {lane: dispatch(lane) for lane in LANES}
@@ -0,0 +1,173 @@
+"""
+Persistent per-worker event loop for async Celery tasks.
+
+Tasks used to create and close a fresh event loop on every run, so loop-bound
+state (async Redis clients, the vector writer and embedding dispatcher queues,
+rate limiter connections) was rebuilt each time and a task could only await
+one thing at a time. WorkerLoop keeps one long-lived loop per worker process
+on a background thread:
+
+- run() submits a coroutine to that loop and blocks the calling (Celery)
+  thread until it finishes, so pools and loop-bound clients stay warm
+  across tasks. If the caller is interrupted (e.g. a soft time limit), the
+  coroutine is cancelled.
+- With a threads/gevent pool several tasks share the loop concurrently;
+  inside a task, gather_bounded() fans work out without overwhelming the
+  database or LLM providers.
+- The loop is created lazily and re-created in a forked child (the parent's
+  loop thread doesn't survive fork). shutdown() lets in-flight background
+  tasks (e.g. queued vector writes) finish before closing it.
+
+async_task() registers an async function as a Celery task that runs on the
+worker loop. Celery's request context is thread-local and the coroutine runs
+on the loop thread, so tasks that need self.request stay synchronous and
+call worker_loop.run() themselves (see analysis_tasks.py).
+"""
+import asyncio
+import functools
+import logging
+import os
+import threading
+from typing import Any, Awaitable, Iterable, List, Optional
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class WorkerLoop:
+    """One event loop per process, running on a daemon thread."""
+
+    def __init__(self, name: str = "worker-loop"):
+        self.name = name
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._pid: Optional[int] = None
+        # Stats
+        self.runs = 0
+        self.in_flight = 0
+
+    @property
+    def loop(self) -> asyncio.AbstractEventLoop:
+        """The running loop for this process, started on first use."""
+        with self._lock:
+            if self._loop is None or self._pid != os.getpid() or not self._thread.is_alive():
+                self._start()
+            return self._loop
+
+    def _start(self):
+        loop = asyncio.new_event_loop()
+        ready = threading.Event()
+
+        def serve():
+            asyncio.set_event_loop(loop)
+            loop.call_soon(ready.set)
+            loop.run_forever()
+
+        self._thread = threading.Thread(target=serve, name=self.name, daemon=True)
+        self._thread.start()
+        ready.wait()
+        self._loop = loop
+        self._pid = os.getpid()
+        logger.info(f"✅ Started {self.name} event loop in process {self._pid}")
+
+    def run(self, coro: Awaitable[Any], timeout: Optional[float] = None) -> Any:
+        """
+        Run a coroutine on the worker loop and return its result.
+
+        Raises:
+            Exception: whatever the coroutine raised
+            concurrent.futures.TimeoutError: if timeout passes (the coroutine is cancelled)
+        """
+        loop = self.loop
+        if threading.current_thread() is self._thread:
+            coro.close()
+            raise RuntimeError("WorkerLoop.run() called from the worker loop; await the coroutine instead")
+
+        future = asyncio.run_coroutine_threadsafe(coro, loop)
+        self.runs += 1
+        self.in_flight += 1
+        try:
+            return future.result(timeout)
+        except BaseException:
+            future.cancel()
+            raise
+        finally:
+            self.in_flight -= 1
+
+    def shutdown(self, timeout: float = 10.0):
+        """Give pending loop tasks up to timeout seconds, then stop and close the loop."""
+        with self._lock:
+            loop, thread = self._loop, self._thread
+            self._loop = self._thread = None
+        if loop is None or self._pid != os.getpid() or not thread.is_alive():
+            return
+
+        async def drain():
+            pending = [t for t in asyncio.all_tasks() if t is not asyncio.current_task()]
+            if not pending:
+                return
+            _, unfinished = await asyncio.wait(pending, timeout=timeout)
+            for task in unfinished:
+                task.cancel()
+            if unfinished:
+                logger.warning(f"⚠️ Cancelled {len(unfinished)} unfinished tasks on {self.name} shutdown")
+                await asyncio.gather(*unfinished, return_exceptions=True)
+
+        try:
+            asyncio.run_coroutine_threadsafe(drain(), loop).result(timeout + 5)
+            asyncio.run_coroutine_threadsafe(loop.shutdown_default_executor(), loop).result(timeout)
+        except Exception as e:
+            logger.warning(f"⚠️ {self.name} shutdown incomplete: {e}")
+        finally:
+            loop.call_soon_threadsafe(loop.stop)
+            thread.join(timeout)
+            loop.close()
+
+    def get_metrics(self) -> dict:
+        return {
+            "pid": self._pid,
+            "running": self._loop is not None and self._thread is not None and self._thread.is_alive(),
+            "runs": self.runs,
+            "in_flight": self.in_flight,
+        }
+
+
+async def gather_bounded(coros: Iterable[Awaitable[Any]], limit: Optional[int] = None) -> List[Any]:
+    """
+    Await coroutines concurrently, at most limit at a time.
+
+    Returns results in order; a coroutine that raised leaves its exception
+    in its slot instead of failing the rest.
+    """
+    semaphore = asyncio.Semaphore(limit or settings.WORKER_FANOUT_CONCURRENCY)
+
+    async def bounded(coro):
+        async with semaphore:
+            return await coro
+
+    return await asyncio.gather(*(bounded(c) for c in coros), return_exceptions=True)
+
+
+def async_task(**options):
+    """
+    Register an async function as a Celery task that runs on the worker loop.
+
+    Takes the same options as celery_app.task, except bind (see module docstring).
+    """
+    from app.celery_app import celery_app
+
+    if options.get("bind"):
+        raise ValueError("async_task doesn't support bind=True; call worker_loop.run() from a sync task")
+
+    def register(func):
+        @functools.wraps(func)
+        def run(*args, **kwargs):
+            return worker_loop.run(func(*args, **kwargs))
+        return celery_app.task(**options)(run)
+    return register
+
+
+# Singleton instance
+worker_loop = WorkerLoop()
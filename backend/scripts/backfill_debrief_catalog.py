@@ -0,0 +1,51 @@
+"""
+Back-fill the fight_debriefs catalog with debriefs saved before it existed.
+
+Debriefs written before migration 013 are only listed by the Pinecone
+scan. For every relationship not yet marked in fight_debrief_backfills
+(migration 014), this catalogues each debrief the scan finds and marks the
+relationship, so cross-fight analysis stops merging in the vector listing.
+Safe to re-run: catalogued relationships are skipped.
+
+Usage:
+    python scripts/backfill_debrief_catalog.py
+    python scripts/backfill_debrief_catalog.py --relationship <relationship_id>
+"""
+import argparse
+import asyncio
+import logging
+import os
+import sys
+
+# Add backend directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.db_service import db_service
+from app.services.debrief_repository import debrief_repository
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger("backfill-debrief-catalog")
+
+
+async def backfill(relationship_ids):
+    total = 0
+    for relationship_id in relationship_ids:
+        catalogued = await debrief_repository.backfill(relationship_id)
+        total += catalogued
+        logger.info(f"✅ {relationship_id}: {catalogued} debriefs catalogued")
+    return total
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--relationship", action="append", help="Relationship to back-fill (repeatable; default: all pending)")
+    args = parser.parse_args()
+
+    relationship_ids = args.relationship or db_service.list_debrief_backfill_pending()
+    logger.info(f"📚 Back-filling debriefs for {len(relationship_ids)} relationships")
+    total = asyncio.run(backfill(relationship_ids))
+    logger.info(f"✅ Done: {total} debriefs catalogued")
+
+
+if __name__ == "__main__":
+    main()
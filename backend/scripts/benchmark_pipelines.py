@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+Benchmark RAG and document-ingestion throughput against offline backends.
+
+Usage:
+    cd backend && python scripts/benchmark_pipelines.py --mode fake \\
+        --latency "llm=lognormal:900:0.4,embeddings=normal:120:30,rerank=normal:150:40,pinecone=normal:40:10" \\
+        --requests 50 --concurrency 8
+
+Modes:
+    fake    deterministic local stand-ins (no network)
+    record  hit the real services once and save responses to --cassettes
+    replay  serve the recorded responses (no network)
+
+rag_lookup and process_pdf_task run without Postgres. The post-fight
+pipeline (generate_analysis_and_repair_plan_background) also needs a
+reachable DATABASE_URL, so it is only run with --post-fight.
+"""
+import argparse
+import asyncio
+import statistics
+import sys
+import time
+import uuid
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from dotenv import load_dotenv
+
+load_dotenv(Path(__file__).resolve().parents[2] / ".env")
+
+SAMPLE_TRANSCRIPT = "\n".join(
+    f"{'Adrian' if i % 2 == 0 else 'Elara'}: "
+    + [
+        "You said you would do the dishes and they are still in the sink.",
+        "I was exhausted after work, I just needed a minute to breathe.",
+        "It always feels like I'm the only one keeping the house together.",
+        "That's not fair, I cooked dinner three times this week.",
+        "I don't want to keep score, I just want to feel like a team.",
+    ][i % 5]
+    for i in range(60)
+)
+
+SAMPLE_QUERIES = [
+    "What happened with the dishes?",
+    "Why does Elara feel like she is doing everything?",
+    "Summarize this conversation",
+    "How can Adrian show he is part of the team?",
+    "What does the book say about keeping score?",
+]
+
+
+def _report(name: str, durations: list, wall: float):
+    durations = sorted(durations)
+    p95 = durations[max(0, int(len(durations) * 0.95) - 1)]
+    print(
+        f"{name:<22} n={len(durations):<4} "
+        f"throughput={len(durations) / wall:7.2f}/s  "
+        f"p50={statistics.median(durations) * 1000:8.1f}ms  "
+        f"p95={p95 * 1000:8.1f}ms"
+    )
+
+
+async def _run(name: str, make_call, requests: int, concurrency: int):
+    semaphore = asyncio.Semaphore(concurrency)
+    durations = []
+
+    async def one(i: int):
+        async with semaphore:
+            start = time.perf_counter()
+            await make_call(i)
+            durations.append(time.perf_counter() - start)
+
+    wall_start = time.perf_counter()
+    await asyncio.gather(*[one(i) for i in range(requests)])
+    _report(name, durations, time.perf_counter() - wall_start)
+
+
+async def seed_transcript(relationship_id: str, conflict_id: str):
+    from app.services.embeddings_service import embeddings_service
+    from app.services.pinecone_service import pinecone_service
+    from app.services.transcript_chunker import TranscriptChunker
+
+    chunks = TranscriptChunker().chunk_transcript(SAMPLE_TRANSCRIPT, conflict_id, relationship_id)
+    embeddings = await asyncio.to_thread(embeddings_service.embed_batch, [c["content"] for c in chunks])
+    await asyncio.to_thread(pinecone_service.upsert_transcript_chunks, chunks, embeddings)
+
+
+async def main(args):
+    from app.services.offline_backends import install_offline_backends
+
+    install_offline_backends(args.mode, cassette_dir=args.cassettes, latency_spec=args.latency, seed=args.seed)
+
+    from app.services.transcript_rag import TranscriptRAGSystem
+    from app.routes.pdf_upload import process_pdf_task
+
+    relationship_id = str(uuid.uuid4())
+    conflict_id = str(uuid.uuid4())
+    await seed_transcript(relationship_id, conflict_id)
+
+    rag = TranscriptRAGSystem(include_calendar=False)
+    await _run(
+        "rag_lookup",
+        lambda i: rag.rag_lookup(SAMPLE_QUERIES[i % len(SAMPLE_QUERIES)], conflict_id, relationship_id),
+        args.requests,
+        args.concurrency,
+    )
+
+    book = ("Chapter 1: Keeping Score\n" + SAMPLE_TRANSCRIPT * 20 + "\nChapter 2: Teamwork\n" + SAMPLE_TRANSCRIPT * 20).encode()
+    await _run(
+        "process_pdf_task",
+        # Unique content per run, so the document registry doesn't short-circuit the pipeline
+        lambda i: process_pdf_task(book + f"\n{uuid.uuid4()}".encode(), f"book_{i}.pdf", relationship_id, "reference_book", None, str(uuid.uuid4()), None),
+        max(1, args.requests // 10),
+        args.concurrency,
+    )
+
+    if args.post_fight:
+        from datetime import datetime
+        from app.routes.post_fight import generate_analysis_and_repair_plan_background
+
+        await _run(
+            "post_fight_analysis",
+            lambda i: generate_analysis_and_repair_plan_background(
+                conflict_id=str(uuid.uuid4()),
+                transcript_text=SAMPLE_TRANSCRIPT,
+                relationship_id=relationship_id,
+                partner_a_id="partner_a",
+                partner_b_id="partner_b",
+                speaker_labels={},
+                duration=600.0,
+                timestamp=datetime.now(),
+            ),
+            max(1, args.requests // 10),
+            args.concurrency,
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mode", choices=["fake", "record", "replay"], default="fake")
+    parser.add_argument("--latency", default="", help="SERENE_FAKE_LATENCY-style latency config")
+    parser.add_argument("--cassettes", default="cassettes", help="Cassette directory for record/replay")
+    parser.add_argument("--requests", type=int, default=50)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--post-fight", action="store_true", help="Also benchmark the post-fight pipeline (needs Postgres)")
+    asyncio.run(main(parser.parse_args()))
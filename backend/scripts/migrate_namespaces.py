@@ -0,0 +1,60 @@
+"""
+Re-home tenant vectors into per-relationship Pinecone namespaces.
+
+Copies every vector in the shared transcript_chunks / profiles / debriefs /
+partner_messages namespaces into "<namespace>__<relationship_id>".
+Progress is checkpointed after each page, so the script can be stopped and
+re-run at any time.
+
+Rollout:
+    1. python scripts/migrate_namespaces.py
+    2. set PINECONE_NAMESPACE_LAYOUT=per_relationship and restart API + workers
+    3. python scripts/migrate_namespaces.py --restart --delete-source
+       (picks up anything written to the shared namespaces in between,
+       then removes the originals)
+"""
+import argparse
+import logging
+import os
+import sys
+
+# Add backend directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.namespace_router import SHARDED_NAMESPACES, NamespaceMigrator
+from app.services.pinecone_service import pinecone_service
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger("migrate-namespaces")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--namespace", action="append", choices=SHARDED_NAMESPACES,
+                        help="Namespace to migrate (repeatable; default: all)")
+    parser.add_argument("--batch-size", type=int, default=100, help="Vectors per page")
+    parser.add_argument("--max-pages", type=int, default=None, help="Stop after N pages per namespace")
+    parser.add_argument("--delete-source", action="store_true", help="Delete originals after copying")
+    parser.add_argument("--state", default=".cache/namespace_migration.json", help="Checkpoint file")
+    parser.add_argument("--restart", action="store_true", help="Ignore the checkpoint and start from the beginning")
+    args = parser.parse_args()
+
+    # Always read and write the physical namespaces, whatever layout is configured
+    index = pinecone_service._index
+    if index is None:
+        logger.error("❌ Pinecone index not initialized")
+        sys.exit(1)
+
+    os.makedirs(os.path.dirname(args.state) or ".", exist_ok=True)
+    if args.restart and os.path.exists(args.state):
+        os.remove(args.state)
+
+    migrator = NamespaceMigrator(index, args.state, batch_size=args.batch_size, delete_source=args.delete_source)
+    for namespace in args.namespace or SHARDED_NAMESPACES:
+        progress = migrator.migrate(namespace, max_pages=args.max_pages)
+        status = "✅ done" if progress["done"] else "⏸️ paused (re-run to resume)"
+        logger.info(f"{status}: {namespace} - {progress['copied']} copied, {progress['skipped']} skipped")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+Unit tests for the single-pass book structure parser
+"""
+import time
+
+from app.services.book_parser import BookParser
+
+PARAGRAPH = "We kept score of every chore for months. Then we tried a shared chart, and the fights got shorter. "
+
+
+def book(chapters=3, paragraphs=12):
+    parts = [
+        "Copyright 2020 Example Press. All rights reserved. ISBN 978-0-00-000000-0\n\n",
+        "# Contents\nChapter 1: Keeping Score ........ 3\nChapter 2: Teamwork 17\n\n",
+    ]
+    for n in range(1, chapters + 1):
+        parts.append(f"# Chapter {n}: Title {n}\n\n")
+        for p in range(paragraphs):
+            if p == paragraphs // 2:
+                parts.append(f"## Practice {n}\n\n")
+            parts.append(f"[c{n}p{p}] " + PARAGRAPH * 2 + "\n\n")
+    parts.append("## Acknowledgments\nThank you to everyone at the press.\n")
+    return "".join(parts)
+
+
+class TestStructure:
+
+    def test_detects_chapters_sections_and_skips_front_matter(self):
+        text = book()
+        parser = BookParser()
+        chunks = list(parser.parse(text))
+
+        assert parser.chapters == 3
+        assert {c.chapter_number for c in chunks} == {1, 2, 3}
+        assert all(c.chapter_title == f"Title {c.chapter_number}" for c in chunks)
+        assert not any("Copyright" in c.text or "........" in c.text or "Thank you" in c.text for c in chunks)
+        assert any(c.section_title == "Practice 2" for c in chunks)
+        assert [c.chunk_index for c in chunks] == list(range(len(chunks)))
+
+    def test_chunks_are_exact_slices_within_budget_and_chapters(self):
+        text = book()
+        chunks = list(BookParser(chunk_size=500, chunk_overlap=100).parse(text))
+
+        for chunk in chunks:
+            assert text[chunk.start:chunk.end] == chunk.text
+            assert len(chunk.text) <= 500
+            heading = len("# Chapter")
+            assert text.rfind("# Chapter", 0, chunk.start + heading) == text.rfind("# Chapter", 0, chunk.end)
+        # Consecutive chunks in a chapter overlap
+        same_chapter = [(a, b) for a, b in zip(chunks, chunks[1:]) if a.chapter_number == b.chapter_number]
+        assert same_chapter and all(b.start < a.end for a, b in same_chapter)
+
+    def test_feeding_pages_matches_whole_document(self):
+        text = book()
+        pages = [text[i:i + 777] for i in range(0, len(text), 777)]
+
+        parser = BookParser()
+        streamed = [c for page in pages for c in parser.feed(page)] + list(parser.close())
+
+        assert streamed == list(BookParser().parse(text))
+
+    def test_numbered_list_items_are_not_chapters(self):
+        parser = BookParser()
+        list(parser.parse("1. Introduction\n\nSome text here.\n\n2. Say what you need, gently.\n3. Listen.\n"))
+
+        assert parser.chapters == 1
+
+
+class TestScaling:
+
+    def test_linear_time_on_large_books(self):
+        small = book(chapters=20)
+        large = book(chapters=200)
+
+        start = time.perf_counter()
+        list(BookParser().parse(small))
+        small_time = time.perf_counter() - start
+        start = time.perf_counter()
+        chunks = list(BookParser().parse(large))
+        large_time = time.perf_counter() - start
+
+        assert len(chunks) > 700
+        # 10x the text should cost roughly 10x, not 100x
+        assert large_time < small_time * 30 + 0.05
@@ -0,0 +1,75 @@
+"""
+Unit tests for the in-process conflict transcript store
+"""
+import asyncio
+import pytest
+
+from app.services import conflict_transcript_store as store_module
+from app.services.conflict_transcript_store import ConflictTranscriptStore
+
+
+def make_transcript(n):
+    return {
+        "conflict_id": "c1",
+        "messages": [
+            {"speaker": "Adrian" if i % 2 == 0 else "Elara", "content": f"message number {i}"}
+            for i in range(n)
+        ],
+    }
+
+
+@pytest.fixture
+def db_calls(monkeypatch):
+    calls = []
+
+    def get_conflict_transcript(conflict_id):
+        calls.append(conflict_id)
+        return make_transcript(60)
+
+    monkeypatch.setattr(store_module.db_service, "get_conflict_transcript", get_conflict_transcript)
+    return calls
+
+
+class TestConflictTranscriptStore:
+
+    def test_chunks_keep_order_and_never_split_messages(self):
+        store = ConflictTranscriptStore(max_chunk_chars=60)
+
+        chunks = store.build_chunks("c1", make_transcript(10)["messages"])
+
+        assert [c["chunk_index"] for c in chunks] == list(range(len(chunks)))
+        lines = [line for c in chunks for line in c["text"].split("\n")]
+        assert lines == [f"{'Adrian' if i % 2 == 0 else 'Elara'}: message number {i}" for i in range(10)]
+
+    @pytest.mark.asyncio
+    async def test_long_transcripts_are_not_truncated(self, db_calls):
+        store = ConflictTranscriptStore(max_chunk_chars=50)
+
+        chunks = await store.get_chunks("c1")
+
+        assert len(chunks) > 20
+        assert "message number 59" in chunks[-1]["text"]
+
+    @pytest.mark.asyncio
+    async def test_concurrent_cold_reads_share_one_load(self, db_calls):
+        store = ConflictTranscriptStore()
+
+        results = await asyncio.gather(*[store.get_chunks("c1") for _ in range(5)])
+        await store.get_chunks("c1")
+
+        assert db_calls == ["c1"]
+        assert all(r == results[0] for r in results)
+        assert store.hits == 1
+
+    @pytest.mark.asyncio
+    async def test_invalidate_and_ttl_force_reload(self, db_calls):
+        store = ConflictTranscriptStore(ttl_seconds=0)
+
+        await store.get_chunks("c1")
+        await store.get_chunks("c1")  # Expired immediately
+        assert len(db_calls) == 2
+
+        store.ttl_seconds = 600
+        store.invalidate("c1")
+        await store.get_chunks("c1")
+        assert len(db_calls) == 3
@@ -0,0 +1,235 @@
+"""
+Unit tests for the catalogued, concurrent, ETag-cached debrief repository
+"""
+import time
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.models.schemas import FightDebrief
+from app.services.debrief_repository import DebriefRepository, debrief_path
+from app.services.offline_backends import FakePineconeIndex, FakeS3Client, LatencyModel
+from app.services.s3_service import S3Service
+
+
+class CountingS3Client(FakeS3Client):
+    def __init__(self, latency=None):
+        super().__init__(latency)
+        self.gets = 0
+        self.heads = 0
+
+    def get_object(self, **kwargs):
+        self.gets += 1
+        return super().get_object(**kwargs)
+
+    def head_object(self, **kwargs):
+        self.heads += 1
+        return super().head_object(**kwargs)
+
+
+class FakeCatalog:
+    """In-memory stand-in for the fight_debriefs methods of DatabaseService."""
+
+    def __init__(self, fail=False):
+        self.rows = {}
+        self.backfilled = set()
+        self.fail = fail
+
+    def _check(self):
+        if self.fail:
+            raise ConnectionError("database unavailable")
+
+    def upsert_fight_debrief(self, conflict_id, relationship_id, s3_path, etag, analyzed_at, **kwargs):
+        self._check()
+        self.rows[conflict_id] = {"conflict_id": conflict_id, "relationship_id": relationship_id,
+                                  "s3_path": s3_path, "etag": etag, "analyzed_at": analyzed_at}
+        return True
+
+    def update_fight_debrief_etag(self, conflict_id, etag):
+        self._check()
+        self.rows[conflict_id]["etag"] = etag
+        return True
+
+    def list_fight_debriefs(self, relationship_id, since=None, limit=100):
+        self._check()
+        rows = [dict(r) for r in self.rows.values()
+                if r["relationship_id"] == relationship_id and (since is None or r["analyzed_at"] >= since)]
+        return sorted(rows, key=lambda r: r["analyzed_at"], reverse=True)[:limit]
+
+    def is_debrief_catalog_backfilled(self, relationship_id):
+        self._check()
+        return relationship_id in self.backfilled
+
+    def mark_debrief_catalog_backfilled(self, relationship_id):
+        self._check()
+        self.backfilled.add(relationship_id)
+        return True
+
+
+def make_debrief(conflict_id, relationship_id="r1", days_ago=1, helped="I hear you"):
+    return FightDebrief(
+        conflict_id=conflict_id,
+        relationship_id=relationship_id,
+        analyzed_at=datetime.now() - timedelta(days=days_ago),
+        topic="dishes",
+        summary="Argued about chores.",
+        duration_estimate="10 minutes",
+        intensity_peak="medium",
+        who_initiated_repairs="partner_a",
+        resolution_status="resolved",
+        phrases_that_helped=[helped],
+    )
+
+
+def make_s3(client):
+    s3 = S3Service()
+    s3.s3_client = client
+    return s3
+
+
+def make_repo(client, db, tmp_path=None, index=None, **kwargs):
+    return DebriefRepository(
+        s3=make_s3(client),
+        db=db,
+        index_getter=lambda: index,
+        cache_dir=str(tmp_path / "debriefs") if tmp_path else None,
+        **kwargs,
+    )
+
+
+class TestCatalogReads:
+
+    @pytest.mark.asyncio
+    async def test_saved_debriefs_list_from_catalog_and_cache(self):
+        client, db = CountingS3Client(), FakeCatalog()
+        repo = make_repo(client, db)
+        repo.save(make_debrief("c1", days_ago=1))
+        repo.save(make_debrief("c2", days_ago=3))
+        repo.save(make_debrief("old", days_ago=200))
+
+        debriefs = await repo.list_debriefs("r1", days_back=90)
+
+        assert [d.conflict_id for d in debriefs] == ["c1", "c2"]
+        assert db.rows["c1"]["s3_path"] == debrief_path("r1", "c1")
+        # Catalog ETags matched the warm cache, so S3 was never read
+        assert client.gets == 0 and client.heads == 0
+        assert repo.get_metrics()["cache_hits"] == 2
+
+    @pytest.mark.asyncio
+    async def test_changed_object_is_refetched_and_catalog_refreshed(self):
+        client, db = CountingS3Client(), FakeCatalog()
+        repo = make_repo(client, db)
+        repo.save(make_debrief("c1"))
+        stale_etag = db.rows["c1"]["etag"]
+
+        # Rewritten out of band: the catalog still has the old ETag
+        updated = make_debrief("c1", helped="Let's take a break")
+        client.put_object(Bucket=repo.s3.bucket_name, Key=debrief_path("r1", "c1"),
+                          Body=updated.model_dump_json().encode("utf-8"))
+        fresh = await repo.get_many([{"conflict_id": "c1", "s3_path": debrief_path("r1", "c1"), "etag": "\"bogus\""}])
+
+        assert fresh["c1"].phrases_that_helped == ["Let's take a break"]
+        assert client.gets == 1
+        assert db.rows["c1"]["etag"] not in (stale_etag, "\"bogus\"")
+
+    @pytest.mark.asyncio
+    async def test_fetches_run_concurrently_with_a_bound(self):
+        client = CountingS3Client(LatencyModel("fixed", [50]))
+        writer = make_repo(client, None)
+        entries = []
+        for i in range(16):
+            debrief = make_debrief(f"c{i}")
+            client.put_object(Bucket=writer.s3.bucket_name, Key=debrief_path("r1", debrief.conflict_id),
+                              Body=debrief.model_dump_json().encode("utf-8"))
+            entries.append({"conflict_id": debrief.conflict_id, "s3_path": debrief_path("r1", debrief.conflict_id)})
+        repo = make_repo(client, None, max_concurrency=8)
+
+        start = time.perf_counter()
+        loaded = await repo.get_many(entries)
+        elapsed = time.perf_counter() - start
+
+        assert len(loaded) == 16
+        # Two waves of 8 parallel GETs instead of 16 sequential ones
+        assert elapsed < 0.5
+
+
+class TestFallbackAndDiskCache:
+
+    @pytest.mark.asyncio
+    async def test_vector_listing_backfills_an_empty_catalog(self, tmp_path):
+        client, db = CountingS3Client(), FakeCatalog()
+        index = FakePineconeIndex()
+        writer = make_repo(client, None)
+        for cid in ("c1", "c2"):
+            debrief = make_debrief(cid)
+            client.put_object(Bucket=writer.s3.bucket_name, Key=debrief_path("r1", cid),
+                              Body=debrief.model_dump_json().encode("utf-8"))
+            index.upsert(vectors=[{"id": f"debrief_{cid}", "values": [1.0, 0.0],
+                                   "metadata": {"relationship_id": "r1", "conflict_id": cid}}], namespace="debriefs")
+        repo = make_repo(client, db, tmp_path, index)
+
+        debriefs = await repo.list_debriefs("r1")
+
+        assert {d.conflict_id for d in debriefs} == {"c1", "c2"}
+        assert repo.get_metrics()["catalog_fallbacks"] == 1
+        assert set(db.rows) == {"c1", "c2"} and all(row["etag"] for row in db.rows.values())
+
+        # A new process reuses the on-disk cache and the back-filled catalog
+        client.gets = 0
+        reopened = make_repo(client, db, tmp_path, index)
+        assert len(await reopened.list_debriefs("r1")) == 2
+        assert client.gets == 0 and reopened.get_metrics()["catalog_fallbacks"] == 0
+
+    @pytest.mark.asyncio
+    async def test_pre_catalog_debriefs_are_merged_until_backfilled(self, tmp_path):
+        client, db = CountingS3Client(), FakeCatalog()
+        index = FakePineconeIndex()
+        legacy = make_repo(client, None, index=index)
+        for days_ago, cid in enumerate(("old1", "old2"), start=10):
+            debrief = make_debrief(cid, days_ago=days_ago)
+            client.put_object(Bucket=legacy.s3.bucket_name, Key=debrief_path("r1", cid),
+                              Body=debrief.model_dump_json().encode("utf-8"))
+            index.upsert(vectors=[{"id": f"debrief_{cid}", "values": [1.0, 0.0],
+                                   "metadata": {"relationship_id": "r1", "conflict_id": cid}}], namespace="debriefs")
+        repo = make_repo(client, db, tmp_path, index)
+        # The first debrief saved after the catalog shipped
+        repo.save(make_debrief("new", days_ago=1))
+
+        debriefs = await repo.list_debriefs("r1")
+
+        assert [d.conflict_id for d in debriefs] == ["new", "old1", "old2"]
+        assert set(db.rows) == {"new", "old1", "old2"} and db.backfilled == {"r1"}
+        assert len(await repo.list_debriefs("r1")) == 3
+        assert repo.get_metrics()["catalog_fallbacks"] == 1
+
+    @pytest.mark.asyncio
+    async def test_backfill_catalogs_a_relationship_up_front(self):
+        client, db = CountingS3Client(), FakeCatalog()
+        index = FakePineconeIndex()
+        repo = make_repo(client, db, index=index)
+        for cid in ("c1", "c2", "c3"):
+            debrief = make_debrief(cid, days_ago=200)
+            client.put_object(Bucket=repo.s3.bucket_name, Key=debrief_path("r1", cid),
+                              Body=debrief.model_dump_json().encode("utf-8"))
+            index.upsert(vectors=[{"id": f"debrief_{cid}", "values": [1.0, 0.0],
+                                   "metadata": {"relationship_id": "r1", "conflict_id": cid}}], namespace="debriefs")
+
+        assert await repo.backfill("r1") == 3
+        assert set(db.rows) == {"c1", "c2", "c3"} and db.backfilled == {"r1"}
+        # A truncated scan doesn't mark the relationship done
+        db.backfilled.clear()
+        await repo.backfill("r1", limit=2)
+        assert db.backfilled == set()
+
+    @pytest.mark.asyncio
+    async def test_unreachable_catalog_revalidates_cache_with_head(self, tmp_path):
+        client, db = CountingS3Client(), FakeCatalog(fail=True)
+        repo = make_repo(client, db, tmp_path)
+        assert repo.save(make_debrief("c1")).endswith(debrief_path("r1", "c1"))
+
+        entry = {"conflict_id": "c1", "s3_path": debrief_path("r1", "c1")}
+        loaded = await make_repo(client, db, tmp_path).get_many([entry, {"conflict_id": "gone", "s3_path": "debriefs/r1/gone"}])
+
+        assert list(loaded) == ["c1"]
+        # The cached debrief costs a HEAD; the unknown one a (failed) GET
+        assert client.heads == 1 and client.gets == 1
@@ -0,0 +1,91 @@
+"""
+Unit tests for content-addressed document dedup
+"""
+import pytest
+
+from app.routes import pdf_upload
+from app.services.document_registry import DocumentRegistry
+from app.services.object_storage import AsyncObjectStore, LocalStorageBackend
+from app.services.offline_backends import FakePineconeIndex, Record, deterministic_embedding
+from app.services.payload_store import PayloadStore
+from app.services.vector_writer import VectorWriter
+
+BOOK = ("Chapter 1: Keeping Score\n" + "We keep arguing about whose turn it is. " * 80 +
+        "\nChapter 2: Teamwork\n" + "Try a shared chore chart and weekly check-ins. " * 80).encode()
+
+
+@pytest.fixture
+def registry(tmp_path):
+    return DocumentRegistry(PayloadStore(str(tmp_path / "registry.sqlite3")))
+
+
+class TestRegistry:
+
+    def test_round_trips_text_and_chunks(self, registry):
+        registry.put_document("abc", "full text", storage_key="books/r1/x.pdf", storage_url="s3://b/books/r1/x.pdf")
+        registry.put_chunks("abc", "reference_book", [{"suffix": "_chunk_0", "text": "t", "metadata": {"i": 0}}], [[0.5, 0.25]])
+
+        assert registry.get_document("abc")["storage_key"] == "books/r1/x.pdf"
+        chunks, embeddings = registry.get_chunks("abc", "reference_book")
+        assert chunks[0]["metadata"] == {"i": 0} and embeddings == [[0.5, 0.25]]
+        assert registry.get_chunks("abc", "handbook") is None
+        assert registry.get_document("missing") is None
+
+    def test_rejects_mismatched_embeddings(self, registry):
+        with pytest.raises(ValueError):
+            registry.put_chunks("abc", "handbook", [{"suffix": "", "text": "t", "metadata": {}}], [])
+
+
+class TestProcessPdfDedup:
+
+    @pytest.fixture
+    def pipeline(self, tmp_path, registry, monkeypatch):
+        index = FakePineconeIndex()
+        calls = {"ocr": 0, "embedded": 0}
+
+        async def iter_pages(file_bytes, filename):
+            calls["ocr"] += 1
+            yield file_bytes.decode()
+
+        def embed_batch(texts, input_type="document", priority="interactive"):
+            calls["embedded"] += len(texts)
+            return [deterministic_embedding(t) for t in texts]
+
+        store = AsyncObjectStore(LocalStorageBackend(str(tmp_path / "objects")), part_size=1024)
+        monkeypatch.setattr(pdf_upload, "document_registry", registry)
+        monkeypatch.setattr(pdf_upload, "object_store", store)
+        monkeypatch.setattr(pdf_upload, "db_service", None)
+        monkeypatch.setattr(pdf_upload, "pinecone_service", Record(writer=VectorWriter(lambda: index)))
+        monkeypatch.setattr(pdf_upload.ocr_service, "iter_pages", iter_pages)
+        monkeypatch.setattr(pdf_upload.embeddings_service, "embed_batch", embed_batch)
+        return index, store, calls
+
+    async def upload(self, store, relationship_id, pdf_id):
+        async def body():
+            yield BOOK
+
+        key, content_type = pdf_upload.storage_location("reference_book", relationship_id, pdf_id, "book.pdf")
+        stored = await store.upload_stream(key, body(), content_type)
+        await pdf_upload.process_pdf_task(None, "book.pdf", relationship_id, "reference_book", None, pdf_id, None, stored)
+        return key
+
+    @pytest.mark.asyncio
+    async def test_repeat_upload_reuses_text_chunks_and_embeddings(self, pipeline, tmp_path):
+        index, store, calls = pipeline
+
+        first_key = await self.upload(store, "r1", "p1")
+        first = dict(calls)
+        second_key = await self.upload(store, "r2", "p2")
+
+        # No second OCR or embedding pass
+        assert first["ocr"] == 1 and first["embedded"] > 0
+        assert calls == first
+        books = index.namespaces["books"]
+        p1 = sorted(v for v in books if v.startswith("book_p1"))
+        p2 = sorted(v for v in books if v.startswith("book_p2"))
+        assert len(p1) == len(p2) > 0
+        assert books[p2[0]]["metadata"]["relationship_id"] == "r2"
+        assert books[p2[0]]["values"] == pytest.approx(books[p1[0]]["values"], abs=1e-6)
+        # The duplicate object was dropped in favour of the first copy
+        assert (tmp_path / "objects" / first_key).exists()
+        assert not (tmp_path / "objects" / second_key).exists()
@@ -0,0 +1,61 @@
+"""
+Unit tests for the persistent embedding cache
+"""
+import pytest
+
+from app.services.embedding_cache import EmbeddingCache
+from app.services.embeddings_service import EmbeddingsService
+from app.services.offline_backends import FakeVoyageClient
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return EmbeddingCache(str(tmp_path / "embeddings.sqlite3"), max_entries=100)
+
+
+class TestEmbeddingCache:
+
+    def test_roundtrip_and_batch_lookup(self, cache):
+        cache.put_many("voyage-3", "document", ["a", "b"], [[0.5, -0.25], [1.0, 2.0]])
+
+        assert cache.get_many("voyage-3", "document", ["b", "missing", "a"]) == [[1.0, 2.0], None, [0.5, -0.25]]
+        assert cache.hits == 2 and cache.misses == 1
+
+    def test_key_includes_model_and_input_type(self, cache):
+        cache.put_many("voyage-3", "document", ["a"], [[1.0]])
+
+        assert cache.get_many("voyage-3", "query", ["a"]) == [None]
+        assert cache.get_many("voyage-3-lite", "document", ["a"]) == [None]
+
+    def test_float16_storage(self, tmp_path):
+        cache = EmbeddingCache(str(tmp_path / "half.sqlite3"), dtype="float16")
+        cache.put_many("voyage-3", "document", ["a"], [[0.1234567, -0.5]])
+
+        [vector] = cache.get_many("voyage-3", "document", ["a"])
+        assert vector[0] == pytest.approx(0.1234567, abs=1e-3)
+        assert vector[1] == -0.5
+
+    def test_lru_eviction(self, tmp_path):
+        cache = EmbeddingCache(str(tmp_path / "small.sqlite3"), max_entries=2)
+        cache.put_many("m", "document", ["old"], [[1.0]])
+        cache.put_many("m", "document", ["recent"], [[2.0]])
+        cache.get_many("m", "document", ["old"])  # Touch "old" so "recent" is now LRU
+        cache.put_many("m", "document", ["new"], [[3.0]])
+
+        assert cache.get_many("m", "document", ["old", "recent", "new"]) == [[1.0], None, [3.0]]
+
+
+class TestEmbeddingsServiceCaching:
+
+    def test_cache_hits_skip_the_network(self, cache):
+        service = EmbeddingsService()
+        service.client = FakeVoyageClient()
+        service.cache = cache
+
+        first = service.embed_batch(["dishes", "laundry", "dishes"])
+        second = service.embed_batch(["laundry", "dishes"])
+
+        assert service.client.calls["embed"] == 1
+        assert second == [first[1], first[0]]
+        assert service.embed_query("dishes") is not None
+        assert service.client.calls["embed"] == 2  # Queries are cached separately
@@ -0,0 +1,66 @@
+"""
+Unit tests for cross-request embedding micro-batching
+"""
+import asyncio
+import pytest
+
+from app.services.embedding_dispatcher import EmbeddingDispatcher
+
+
+class StubEmbeddings:
+    """Records each aembed_batch call and returns the text length as a vector."""
+
+    def __init__(self, fail=False):
+        self.calls = []
+        self.fail = fail
+
+    async def aembed_batch(self, texts, input_type="document"):
+        self.calls.append((list(texts), input_type))
+        if self.fail:
+            raise RuntimeError("voyage down")
+        return [[float(len(t))] for t in texts]
+
+
+class TestEmbeddingDispatcher:
+
+    @pytest.mark.asyncio
+    async def test_concurrent_calls_are_coalesced(self):
+        stub = StubEmbeddings()
+        dispatcher = EmbeddingDispatcher(service=stub, window_ms=5)
+
+        vectors = await asyncio.gather(*[dispatcher.embed_text("x" * i) for i in range(1, 6)])
+
+        assert vectors == [[1.0], [2.0], [3.0], [4.0], [5.0]]
+        assert len(stub.calls) == 1
+
+    @pytest.mark.asyncio
+    async def test_queries_and_documents_are_batched_separately(self):
+        stub = StubEmbeddings()
+        dispatcher = EmbeddingDispatcher(service=stub, window_ms=5)
+
+        await asyncio.gather(
+            dispatcher.embed_text("doc"),
+            dispatcher.embed_query("query one"),
+            dispatcher.embed_query("query two"),
+        )
+
+        assert sorted((len(texts), input_type) for texts, input_type in stub.calls) == [(1, "document"), (2, "query")]
+
+    @pytest.mark.asyncio
+    async def test_batch_limits_split_requests(self):
+        stub = StubEmbeddings()
+        dispatcher = EmbeddingDispatcher(service=stub, window_ms=5, max_batch_texts=2, max_batch_chars=1000)
+
+        await asyncio.gather(*[dispatcher.embed_text("abc") for _ in range(5)])
+
+        assert [len(texts) for texts, _ in stub.calls] == [2, 2, 1]
+
+    @pytest.mark.asyncio
+    async def test_errors_reach_every_caller(self):
+        dispatcher = EmbeddingDispatcher(service=StubEmbeddings(fail=True), window_ms=5)
+
+        results = await asyncio.gather(
+            dispatcher.embed_text("a"), dispatcher.embed_text("b"), return_exceptions=True
+        )
+
+        assert all(isinstance(r, RuntimeError) for r in results)
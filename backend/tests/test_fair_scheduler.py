@@ -0,0 +1,144 @@
+"""
+Unit tests for priority lanes, per-relationship caps and fair dispatch
+"""
+import pytest
+
+from app.services.fair_scheduler import FairScheduler, LaneLimits
+from app.tasks import lanes
+
+TASK = "app.tasks.backfill_tasks.backfill_conflict"
+
+
+@pytest.fixture
+def scheduler():
+    # No redis_url: in-process state, same semantics as the Redis scripts
+    return FairScheduler(
+        lanes={"interactive": LaneLimits(2), "scheduled": LaneLimits(1), "backfill": LaneLimits(2, max_in_flight=4)},
+        lease_seconds=60,
+    )
+
+
+def tenants(jobs):
+    return [job["tenant"] for job in jobs]
+
+
+class TestFairScheduler:
+
+    def test_big_backlog_is_capped_and_interleaved_with_other_relationships(self, scheduler):
+        for i in range(200):
+            scheduler.enqueue("backfill", "busy", TASK, {"n": i})
+        scheduler.enqueue("backfill", "quiet", TASK, {"n": 0})
+
+        claimed = scheduler.claim_all("backfill")
+
+        # "busy" can't take more than its 2 slots, so "quiet" runs right away
+        assert tenants(claimed) == ["busy", "quiet", "busy"]
+        assert [job["kwargs"]["n"] for job in claimed if job["tenant"] == "busy"] == [0, 1]
+
+        scheduler.finish(claimed[0]["id"])
+        assert [job["kwargs"]["n"] for job in scheduler.claim_all("backfill")] == [2]
+
+    def test_lane_cap_and_weights(self, scheduler):
+        for tenant in ("a", "b", "c"):
+            for i in range(4):
+                scheduler.enqueue("backfill", tenant, TASK, {})
+        # Lane cap of 4 across relationships, 2 each
+        assert len(scheduler.claim_all("backfill")) == 4
+
+        weighted = FairScheduler(lanes={"scheduled": LaneLimits(100)})
+        for i in range(6):
+            weighted.enqueue("scheduled", "light", TASK, {}, weight=1)
+            weighted.enqueue("scheduled", "heavy", TASK, {}, weight=2)
+        order = tenants(weighted.claim_all("scheduled"))[:6]
+        assert order.count("heavy") == 4 and order.count("light") == 2
+
+    def test_idle_relationship_gets_no_credit(self):
+        scheduler = FairScheduler(lanes={"scheduled": LaneLimits(100)})
+        for i in range(10):
+            scheduler.enqueue("scheduled", "steady", TASK, {})
+        first = tenants(scheduler.claim_all("scheduled")[:5])
+        for i in range(3):
+            scheduler.enqueue("scheduled", "late", TASK, {})
+            scheduler.enqueue("scheduled", "steady", TASK, {})
+
+        # The late arrival alternates with "steady" instead of draining its queue first
+        order = tenants(scheduler.claim_all("scheduled"))
+        assert first == ["steady"] * 5
+        assert order[:2] != ["late", "late"]
+
+    def test_leases_expire_and_waits_are_recorded(self, scheduler, monkeypatch):
+        clock = [1000.0]
+        monkeypatch.setattr("app.services.fair_scheduler.time.time", lambda: clock[0])
+        for i in range(3):
+            scheduler.enqueue("scheduled", "r1", TASK, {})
+
+        first = scheduler.claim("scheduled")
+        assert scheduler.claim("scheduled") is None
+
+        clock[0] += 30
+        assert scheduler.started(first["id"]) == 30
+        assert scheduler.started(first["id"]) is None  # A retry isn't counted twice
+
+        # The worker died: its slot frees once the lease runs out
+        clock[0] += 61
+        assert scheduler.claim("scheduled") is not None
+
+        metrics = scheduler.get_metrics()["lanes"]["scheduled"]
+        assert metrics["queued"] == 1 and metrics["in_flight"] == 1
+        assert metrics["queue_wait"]["count"] == 1 and metrics["queue_wait"]["buckets"]["<=60s"] == 1
+
+    def test_unknown_lane_is_rejected(self, scheduler):
+        with pytest.raises(ValueError):
+            scheduler.enqueue("urgent", "r1", TASK, {})
+
+
+class TestLaneDispatch:
+
+    def test_finished_tasks_dispatch_the_next_job(self, scheduler, monkeypatch):
+        sent = []
+        monkeypatch.setattr(lanes, "fair_scheduler", scheduler)
+        monkeypatch.setattr(
+            lanes.celery_app, "send_task",
+            lambda name, kwargs, queue, task_id: sent.append((name, kwargs["n"], queue, task_id)),
+        )
+
+        ids = [lanes.submit(TASK, "backfill", "r1", {"n": i}) for i in range(3)]
+
+        assert [(n, queue) for _, n, queue, _ in sent] == [(0, "backfill"), (1, "backfill")]
+        assert [task_id for *_, task_id in sent] == ids[:2]
+
+        lanes.on_task_start(ids[0])
+        lanes.on_task_finish(ids[0], "RETRY")
+        assert len(sent) == 2  # A retrying task keeps its slot
+        lanes.on_task_finish(ids[0], "SUCCESS")
+        assert sent[-1][1] == 2
+
+    def test_failed_send_puts_the_job_back(self, scheduler, monkeypatch):
+        monkeypatch.setattr(lanes, "fair_scheduler", scheduler)
+
+        def broker_down(*args, **kwargs):
+            raise ConnectionError("broker down")
+
+        monkeypatch.setattr(lanes.celery_app, "send_task", broker_down)
+        job_id = lanes.submit(TASK, "interactive", "r1", {"n": 0})
+
+        metrics = scheduler.get_metrics()["lanes"]["interactive"]
+        assert metrics["queued"] == 1 and metrics["in_flight"] == 0
+        assert scheduler.job(job_id)["tenant"] == "r1"
+
+    def test_unreachable_redis_sends_straight_to_celery(self, monkeypatch):
+        down = FairScheduler(lanes={"interactive": LaneLimits(2)}, redis_url="redis://localhost:1/0")
+        sent = []
+        monkeypatch.setattr(lanes, "fair_scheduler", down)
+        monkeypatch.setattr(
+            lanes.celery_app, "send_task",
+            lambda name, kwargs, queue, task_id: sent.append((name, queue, task_id)),
+        )
+
+        job_id = lanes.submit(TASK, "interactive", "r1", {"n": 0})
+
+        # Nothing is parked in this process's memory where workers can't see it
+        assert sent == [(TASK, "interactive", job_id)]
+        assert down._local_jobs == {}
+        assert lanes.dispatch("interactive") == 0
+        assert down.get_metrics()["backend"] == "unavailable"
@@ -0,0 +1,96 @@
+"""
+Unit tests for BM25 retrieval and rank fusion in the RAG system
+"""
+from app.services.lexical_index import BM25Index, LexicalIndexService, reciprocal_rank_fusion, tokenize
+from app.services import transcript_rag as rag_module
+from app.services.transcript_rag import TranscriptRAGSystem
+
+
+def transcript_vector(doc_id, text, conflict_id="past-1", relationship_id="rel-1"):
+    return {
+        "id": doc_id,
+        "metadata": {"text": text, "conflict_id": conflict_id, "relationship_id": relationship_id, "speaker": "Adrian"},
+    }
+
+
+class TestBM25Index:
+
+    def test_exact_terms_rank_first(self):
+        index = BM25Index()
+        index.add("a", "We argued about the dishes piling up in the sink again")
+        index.add("b", "Talking about weekend plans with friends")
+        index.add("c", "Feeling unheard when plans change at the last minute")
+
+        results = index.search("who does the dishes", top_k=3)
+
+        assert results[0][0] == "a"
+        assert "b" not in [doc_id for doc_id, _ in results]
+
+    def test_re_adding_replaces_and_remove_forgets(self):
+        index = BM25Index()
+        index.add("a", "dishes")
+        index.add("a", "laundry")
+
+        assert index.search("dishes") == []
+        assert index.search("laundry")[0][0] == "a"
+        index.remove("a")
+        assert len(index) == 0 and index.search("laundry") == []
+
+    def test_tokenizer_drops_stopwords_and_plurals(self):
+        assert tokenize("The dishes and the Dish!") == ["dish", "dish"]
+        assert tokenize("Jordan's parties") == ["jordan", "party"]
+
+
+class TestLexicalIndexService:
+
+    def test_indexes_are_scoped_per_relationship(self):
+        service = LexicalIndexService()
+        service.index_vectors("transcript_chunks", [
+            transcript_vector("x", "the dishes again", relationship_id="rel-1"),
+            transcript_vector("y", "the dishes again", relationship_id="rel-2"),
+        ])
+
+        assert [doc_id for doc_id, _, _ in service.search("transcript_chunks", "dishes", "rel-1")] == ["x"]
+
+    def test_books_share_one_index(self):
+        service = LexicalIndexService()
+        service.index_vectors("books", [{"id": "b1", "metadata": {"text": "bids for connection", "relationship_id": "rel-1"}}])
+
+        assert service.search("books", "connection", "rel-2")[0][0] == "b1"
+
+
+class TestRankFusion:
+
+    def test_items_found_by_both_lists_win(self):
+        fused = reciprocal_rank_fusion([["a", "b", "c"], ["c", "d"]])
+
+        assert fused[0][0] == "c"
+        assert dict((item, votes) for item, _, votes in fused) == {"a": 1, "b": 1, "c": 2, "d": 1}
+
+    def test_confident_fusion_skips_rerank(self, monkeypatch):
+        service = LexicalIndexService()
+        service.index_vectors("transcript_chunks", [
+            transcript_vector("p1", "we fought about the dishes"),
+            transcript_vector("p2", "dishes left in the sink all week"),
+            transcript_vector("cur", "the dishes tonight", conflict_id="current"),
+        ])
+        monkeypatch.setattr(rag_module, "lexical_index_service", service)
+        rag = TranscriptRAGSystem(k=2, include_profiles=False, include_books=False)
+        vector_chunks = [
+            rag_module._past_transcript_chunk("p2", {"text": "dishes left in the sink all week"}),
+            rag_module._past_transcript_chunk("p1", {"text": "we fought about the dishes"}),
+        ]
+
+        candidates, confident = rag._fuse_secondary("the dishes", "current", "rel-1", {"transcript_chunks": vector_chunks})
+
+        assert confident
+        assert {c["id"] for c in candidates} == {"p1", "p2"}  # Current conflict excluded
+
+    def test_disagreement_falls_back_to_rerank(self, monkeypatch):
+        monkeypatch.setattr(rag_module, "lexical_index_service", LexicalIndexService())
+        rag = TranscriptRAGSystem(k=2, include_profiles=False, include_books=False)
+        vector_chunks = [rag_module._past_transcript_chunk("p1", {"text": "something else"})]
+
+        _, confident = rag._fuse_secondary("the dishes", "current", "rel-1", {"transcript_chunks": vector_chunks})
+
+        assert not confident
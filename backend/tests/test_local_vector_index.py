@@ -0,0 +1,120 @@
+"""
+Unit tests for the embedded local vector index backend
+"""
+import numpy as np
+import pytest
+
+from app.services.local_vector_index import LocalVectorIndex
+
+
+def unit(i, dim=8):
+    v = [0.0] * dim
+    v[i % dim] = 1.0
+    return v
+
+
+@pytest.fixture
+def index(tmp_path):
+    return LocalVectorIndex(str(tmp_path / "vectors"))
+
+
+class TestLocalVectorIndex:
+
+    def test_query_ranks_by_cosine_and_filters(self, index):
+        index.upsert(vectors=[
+            {"id": "a", "values": [1.0, 0.0, 0.0], "metadata": {"relationship_id": "r1", "conflict_id": "c1"}},
+            {"id": "b", "values": [0.9, 0.1, 0.0], "metadata": {"relationship_id": "r1", "conflict_id": "c2"}},
+            {"id": "c", "values": [0.0, 1.0, 0.0], "metadata": {"relationship_id": "r2", "conflict_id": "c3"}},
+        ], namespace="transcript_chunks")
+
+        result = index.query(vector=[2.0, 0.0, 0.0], top_k=3, namespace="transcript_chunks", include_metadata=True,
+                             filter={"$and": [{"relationship_id": {"$eq": "r1"}}, {"conflict_id": {"$ne": "c1"}}]})
+
+        assert [m.id for m in result.matches] == ["b"]
+        assert result.matches[0].metadata["conflict_id"] == "c2"
+        assert result.matches[0].score == pytest.approx(0.9 / np.sqrt(0.82), rel=1e-5)
+
+        unfiltered = index.query(vector=[1.0, 0.0, 0.0], top_k=2, namespace="transcript_chunks")
+        assert [m.id for m in unfiltered.matches] == ["a", "b"]
+        assert unfiltered.matches[0].metadata is None
+
+    def test_upsert_overwrites_fetch_and_delete(self, index):
+        index.upsert(vectors=[{"id": "a", "values": [1.0, 0.0], "metadata": {"v": 1}}], namespace="ns")
+        index.upsert(vectors=[{"id": "a", "values": [0.0, 3.0], "metadata": {"v": 2}}], namespace="ns")
+
+        fetched = index.fetch(ids=["a", "missing"], namespace="ns").vectors
+        assert list(fetched) == ["a"]
+        assert fetched["a"].metadata == {"v": 2} and fetched["a"].values == [0.0, 1.0]
+
+        index.delete(filter={"v": {"$eq": 2}}, namespace="ns")
+        assert index.query(vector=[0.0, 1.0], top_k=5, namespace="ns").matches == []
+        assert index.describe_index_stats().total_vector_count == 0
+
+    def test_persists_across_reopen_and_compaction(self, tmp_path):
+        path = str(tmp_path / "vectors")
+        index = LocalVectorIndex(path)
+        index.upsert(vectors=[{"id": f"v{i}", "values": unit(i), "metadata": {"i": i}} for i in range(1500)], namespace="books")
+        index.delete(ids=[f"v{i}" for i in range(1000)], namespace="books")
+
+        reopened = LocalVectorIndex(path)
+        assert reopened.describe_index_stats().namespaces["books"].vector_count == 500
+        result = reopened.query(vector=unit(3), top_k=1, namespace="books", include_metadata=True,
+                                filter={"i": {"$gte": 1000}})
+        assert result.matches[0].metadata["i"] % 8 == 3
+
+        # The log was compacted to the surviving vectors
+        ns = reopened._namespace("books")
+        assert len(ns.ids) == 500
+
+    def test_two_processes_share_a_namespace(self, tmp_path):
+        # Each LocalVectorIndex stands in for a process (API, Celery worker) on the same directory
+        path = str(tmp_path / "vectors")
+        api, worker = LocalVectorIndex(path), LocalVectorIndex(path)
+        for i in range(0, 20, 2):
+            api.upsert(vectors=[{"id": f"v{i}", "values": unit(i), "metadata": {"i": i}}], namespace="ns")
+            worker.upsert(vectors=[{"id": f"v{i + 1}", "values": unit(i + 1), "metadata": {"i": i + 1}}], namespace="ns")
+
+        # No row was handed out twice, so every vector kept its own values
+        for index in (api, worker):
+            fetched = index.fetch(ids=[f"v{i}" for i in range(20)], namespace="ns").vectors
+            assert len(fetched) == 20
+            assert all(fetched[f"v{i}"].values == unit(i) for i in range(20))
+
+        # The worker compacts; the API reloads from the new generation
+        worker.upsert(vectors=[{"id": f"w{i}", "values": unit(i), "metadata": {"i": i}} for i in range(1200)], namespace="other")
+        worker.delete(ids=[f"v{i}" for i in range(10)], namespace="ns")
+        worker.upsert(vectors=[{"id": "v10", "values": unit(3), "metadata": {"i": 10}}] * 1000, namespace="ns")
+        assert len(worker._namespace("ns").ids) == 10
+
+        fetched = api.fetch(ids=[f"v{i}" for i in range(20)], namespace="ns").vectors
+        assert sorted(fetched) == sorted(f"v{i}" for i in range(10, 20))
+        assert fetched["v10"].values == unit(3) and fetched["v11"].values == unit(11)
+        assert api.describe_index_stats().namespaces["other"].vector_count == 1200
+
+    def test_ann_matches_brute_force_on_clustered_data(self, tmp_path):
+        rng = np.random.default_rng(1)
+        centers = rng.normal(size=(16, 32))
+        points = centers[rng.integers(0, 16, size=3000)] + 0.05 * rng.normal(size=(3000, 32))
+        vectors = [{"id": f"p{i}", "values": p.tolist(), "metadata": {}} for i, p in enumerate(points)]
+        exact = LocalVectorIndex(str(tmp_path / "exact"), ann_threshold=10**9)
+        ann = LocalVectorIndex(str(tmp_path / "ann"), ann_threshold=1000, nprobe=4)
+        exact.upsert(vectors=vectors, namespace="ns")
+        ann.upsert(vectors=vectors, namespace="ns")
+
+        recall = []
+        for q in points[:20]:
+            truth = {m.id for m in exact.query(vector=q.tolist(), top_k=10, namespace="ns").matches}
+            found = {m.id for m in ann.query(vector=q.tolist(), top_k=10, namespace="ns").matches}
+            recall.append(len(truth & found) / 10)
+
+        assert ann._namespace("ns")._ivf is not None
+        assert np.mean(recall) >= 0.9
+
+    def test_list_paginated(self, index):
+        index.upsert(vectors=[{"id": f"v{i}", "values": unit(i), "metadata": {}} for i in range(5)], namespace="ns")
+
+        first = index.list_paginated(namespace="ns", limit=3)
+        second = index.list_paginated(namespace="ns", limit=3, pagination_token=first.pagination.next)
+
+        assert [v.id for v in first.vectors + second.vectors] == [f"v{i}" for i in range(5)]
+        assert second.pagination is None
@@ -0,0 +1,97 @@
+"""
+Unit tests for speculative RAG prefetch on interim speech (Luna)
+"""
+import asyncio
+import pytest
+
+from app.agents.luna import rag as rag_module
+from app.agents.luna.rag import RAGHandler
+
+
+class FakeRAGSystem:
+    def __init__(self, delay=0.05):
+        self.queries = []
+        self.delay = delay
+
+    async def rag_lookup(self, query, conflict_id=None, relationship_id=None, session_id=None):
+        self.queries.append(query)
+        await asyncio.sleep(self.delay)
+        return f"context for: {query}"
+
+    def format_context_for_llm(self, context):
+        return context
+
+
+class FakeChatContext:
+    def __init__(self):
+        self.messages = []
+
+    def add_message(self, role, content):
+        self.messages.append(content)
+
+
+class FakeMessage:
+    def __init__(self, text):
+        self.content = text
+
+
+def make_handler(rag_system):
+    return RAGHandler(rag_system, conflict_id="c1", relationship_id="r1", session_id=None)
+
+
+class TestSpeculativePrefetch:
+
+    @pytest.mark.asyncio
+    async def test_final_segment_starts_lookup_and_turn_reuses_it(self):
+        rag = FakeRAGSystem()
+        handler = make_handler(rag)
+
+        handler.on_transcript("why do we always fight about the dishes", is_final=True)
+        ctx = FakeChatContext()
+        await handler.handle_user_turn(ctx, FakeMessage("Why do we always fight about the dishes?"))
+
+        assert rag.queries == ["why do we always fight about the dishes"]
+        assert ctx.messages == ["context for: why do we always fight about the dishes"]
+        assert handler.speculation_stats["reused"] == 1
+
+    @pytest.mark.asyncio
+    async def test_stable_interim_text_triggers_prefetch_once(self):
+        rag = FakeRAGSystem()
+        handler = make_handler(rag)
+
+        handler.on_transcript("I felt ignored", is_final=False)
+        handler.on_transcript("I felt ignored when you", is_final=False)
+        handler.on_transcript("I felt ignored when you were on your phone", is_final=False)
+        await asyncio.sleep(rag_module.SPECULATION_STABLE_SECONDS + 0.05)
+
+        assert rag.queries == ["I felt ignored when you were on your phone"]
+
+    @pytest.mark.asyncio
+    async def test_different_final_query_runs_a_fresh_lookup(self):
+        rag = FakeRAGSystem(delay=0)
+        handler = make_handler(rag)
+
+        handler.on_transcript("tell me about my partner's family", is_final=True)
+        ctx = FakeChatContext()
+        await handler.handle_user_turn(ctx, FakeMessage("what book chapter helps with apologies"))
+
+        assert "what book chapter helps with apologies" in rag.queries
+        assert ctx.messages == ["context for: what book chapter helps with apologies"]
+        assert handler.speculation_stats["discarded"] == 1
+        assert handler._speculation is None
+
+    @pytest.mark.asyncio
+    async def test_partial_overlap_is_refined_by_embedding_similarity(self, monkeypatch):
+        rag = FakeRAGSystem(delay=0)
+        handler = make_handler(rag)
+
+        async def embed_query(text):
+            return [1.0, 0.0]  # Semantically identical
+
+        monkeypatch.setattr(rag_module.embedding_dispatcher, "embed_query", embed_query)
+        handler.on_transcript("we argued about money and the budget", is_final=True)
+        ctx = FakeChatContext()
+        await handler.handle_user_turn(ctx, FakeMessage("we argued about money, rent, savings"))
+
+        assert len(rag.queries) == 1
+        assert handler.speculation_stats["refined"] == 1
@@ -0,0 +1,108 @@
+"""
+Unit tests for per-relationship namespace routing and the migration tool
+"""
+from app.services.namespace_router import (
+    NamespaceMigrator,
+    NamespaceRouter,
+    shard_namespace,
+    split_relationship_filter,
+)
+from app.services.offline_backends import FakePineconeIndex
+
+
+def vector(id, relationship_id, **metadata):
+    return {"id": id, "values": [1.0, 0.0], "metadata": {"relationship_id": relationship_id, **metadata}}
+
+
+class TestFilterSplitting:
+
+    def test_plain_and_eq_forms(self):
+        assert split_relationship_filter({"relationship_id": "r1"}) == ("r1", None)
+        assert split_relationship_filter({"relationship_id": {"$eq": "r1"}, "role": "a"}) == ("r1", {"role": "a"})
+
+    def test_and_clause(self):
+        relationship_id, rest = split_relationship_filter({
+            "$and": [{"conflict_id": {"$ne": "c1"}}, {"relationship_id": {"$eq": "r1"}}]
+        })
+        assert relationship_id == "r1"
+        assert rest == {"conflict_id": {"$ne": "c1"}}
+
+    def test_non_exact_filters_are_left_alone(self):
+        f = {"relationship_id": {"$in": ["r1", "r2"]}}
+        assert split_relationship_filter(f) == (None, f)
+        assert split_relationship_filter(None) == (None, None)
+
+
+class TestRouter:
+
+    def test_upsert_and_query_use_relationship_namespaces(self):
+        index = FakePineconeIndex()
+        router = NamespaceRouter(index)
+
+        router.upsert(vectors=[vector("a", "r1", role="x"), vector("b", "r2", role="x"), vector("c", None)], namespace="profiles")
+
+        assert set(index.namespaces) == {"profiles__r1", "profiles__r2", "profiles"}
+        result = router.query(vector=[1.0, 0.0], top_k=10, namespace="profiles", include_metadata=True,
+                              filter={"$and": [{"relationship_id": {"$eq": "r1"}}, {"role": {"$eq": "x"}}]})
+        assert [m.id for m in result.matches] == ["a"]
+
+    def test_unsharded_namespaces_pass_through(self):
+        index = FakePineconeIndex()
+        router = NamespaceRouter(index)
+
+        router.upsert(vectors=[vector("b1", "r1")], namespace="books")
+        result = router.query(vector=[1.0, 0.0], top_k=5, namespace="books", filter={"relationship_id": "r1"})
+
+        assert list(index.namespaces) == ["books"]
+        assert [m.id for m in result.matches] == ["b1"]
+
+    def test_delete_by_relationship_filter(self):
+        index = FakePineconeIndex()
+        router = NamespaceRouter(index)
+        router.upsert(vectors=[vector("a", "r1", partner_id="p1"), vector("b", "r1", partner_id="p2")], namespace="profiles")
+
+        router.delete(namespace="profiles", filter={"relationship_id": "r1", "partner_id": {"$eq": "p1"}})
+
+        assert list(index.namespaces["profiles__r1"]) == ["b"]
+
+
+class TestConflictTranscriptLookup:
+
+    def test_current_conflict_chunks_are_read_from_the_relationship_namespace(self, monkeypatch):
+        from app.services import transcript_rag as rag_module
+
+        index = FakePineconeIndex()
+        monkeypatch.setattr(rag_module.pinecone_service, "namespace_layout", "per_relationship")
+        monkeypatch.setattr(rag_module.pinecone_service, "_index", index)
+        monkeypatch.setattr(rag_module.embeddings_service, "embed_query", lambda text: [1.0, 0.0])
+        monkeypatch.setattr(rag_module.db_service, "get_conflict_by_id", lambda conflict_id: {"relationship_id": "r1"})
+        rag_module.pinecone_service.index.upsert(vectors=[
+            vector("chunk_c1_0", "r1", conflict_id="c1", chunk_index=0, speaker="Adrian", text="You never listen."),
+        ], namespace="transcript_chunks")
+
+        transcript = rag_module.TranscriptRAGSystem().get_current_conflict_transcript("c1")
+
+        assert list(index.namespaces) == ["transcript_chunks__r1"]
+        assert "You never listen." in transcript
+
+
+class TestMigrator:
+
+    def test_resumable_migration(self, tmp_path):
+        index = FakePineconeIndex()
+        index.upsert(vectors=[vector(f"v{i}", f"r{i % 2}") for i in range(5)] + [vector("z_orphan", None)],
+                     namespace="transcript_chunks")
+        state = str(tmp_path / "state.json")
+
+        first = NamespaceMigrator(index, state, batch_size=2).migrate("transcript_chunks", max_pages=1)
+        assert not first["done"] and first["copied"] == 2
+
+        # A fresh migrator resumes from the checkpoint
+        progress = NamespaceMigrator(index, state, batch_size=2, delete_source=True).migrate("transcript_chunks")
+
+        assert progress["done"]
+        assert progress["copied"] == 5 and progress["skipped"] == 1
+        assert set(index.namespaces[shard_namespace("transcript_chunks", "r0")]) == {"v0", "v2", "v4"}
+        assert set(index.namespaces[shard_namespace("transcript_chunks", "r1")]) == {"v1", "v3"}
+        # Pages copied with delete_source were removed; vectors without a relationship stay
+        assert set(index.namespaces["transcript_chunks"]) == {"v0", "v1", "z_orphan"}
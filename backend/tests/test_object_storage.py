@@ -0,0 +1,108 @@
+"""
+Unit tests for the async streaming object store
+"""
+import hashlib
+import os
+import threading
+import time
+
+import pytest
+
+from app.services.object_storage import AsyncObjectStore, LocalStorageBackend, S3StorageBackend
+from app.services.offline_backends import FakeS3Client
+
+PART = 1024
+BODY = os.urandom(PART * 5 + 321)
+
+
+async def chunked(data, size=300):
+    for i in range(0, len(data), size):
+        yield data[i:i + size]
+
+
+def s3_store(client=None, **kwargs):
+    client = client or FakeS3Client()
+    return AsyncObjectStore(S3StorageBackend(lambda: client, "bucket"), part_size=PART, **kwargs), client
+
+
+class TestUploads:
+
+    @pytest.mark.asyncio
+    async def test_stream_becomes_multipart_upload(self):
+        store, client = s3_store()
+
+        stored = await store.upload_stream("books/r1/b.pdf", chunked(BODY), "application/pdf")
+
+        assert stored.size == len(BODY) and stored.sha256 == hashlib.sha256(BODY).hexdigest()
+        assert stored.url == "s3://bucket/books/r1/b.pdf"
+        assert stored.etag.endswith('-6"')  # 5 full parts + the remainder
+        assert client.objects[("bucket", "books/r1/b.pdf")]["Body"] == BODY
+        assert client.uploads == {}
+
+    @pytest.mark.asyncio
+    async def test_small_stream_uses_single_put(self, tmp_path):
+        store = AsyncObjectStore(LocalStorageBackend(str(tmp_path)), part_size=PART)
+
+        stored = await store.upload_stream("notes/a.txt", chunked(b"hello world", 4), "text/plain")
+
+        assert stored.url == "local://notes/a.txt"
+        assert (tmp_path / "notes" / "a.txt").read_bytes() == b"hello world"
+
+    @pytest.mark.asyncio
+    async def test_parts_in_flight_are_bounded(self):
+        class SlowParts(FakeS3Client):
+            in_flight = peak = 0
+            lock = threading.Lock()
+
+            def upload_part(self, **kwargs):
+                with self.lock:
+                    self.in_flight += 1
+                    self.peak = max(self.peak, self.in_flight)
+                time.sleep(0.02)
+                with self.lock:
+                    self.in_flight -= 1
+                return super().upload_part(**kwargs)
+
+        store, client = s3_store(SlowParts(), max_concurrency=2)
+
+        await store.upload_stream("big.bin", chunked(BODY * 4), "application/octet-stream")
+
+        assert client.peak == 2
+        assert client.objects[("bucket", "big.bin")]["Body"] == BODY * 4
+
+    @pytest.mark.asyncio
+    async def test_failed_stream_aborts_the_upload(self, tmp_path):
+        async def broken():
+            yield BODY[:PART * 2]
+            raise ConnectionError("client went away")
+
+        store = AsyncObjectStore(LocalStorageBackend(str(tmp_path)), part_size=PART)
+
+        with pytest.raises(ConnectionError):
+            await store.upload_stream("books/x.pdf", broken())
+
+        assert not (tmp_path / "books" / "x.pdf").exists()
+        assert os.listdir(tmp_path / ".multipart") == []
+
+
+class TestReads:
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("backend", ["s3", "local"])
+    async def test_range_and_streaming_reads(self, backend, tmp_path):
+        if backend == "s3":
+            store, _ = s3_store()
+        else:
+            store = AsyncObjectStore(LocalStorageBackend(str(tmp_path)), part_size=PART)
+        await store.upload_stream("doc.pdf", chunked(BODY))
+
+        assert await store.read_range("doc.pdf", 10, 19) == BODY[10:20]
+        chunks = [chunk async for chunk in store.iter_chunks("doc.pdf", chunk_size=1000)]
+        assert [len(c) for c in chunks[:-1]] == [1000] * (len(chunks) - 1)
+        assert b"".join(chunks) == BODY == await store.download("doc.pdf")
+        assert (await store.head("doc.pdf"))["size"] == len(BODY)
+
+    def test_local_keys_cannot_escape_the_root(self, tmp_path):
+        backend = LocalStorageBackend(str(tmp_path / "root"))
+        with pytest.raises(ValueError):
+            backend.put("../outside.txt", b"x", "text/plain")
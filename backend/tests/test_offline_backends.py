@@ -0,0 +1,121 @@
+"""
+Unit tests for offline backend stand-ins and record/replay cassettes
+"""
+import pytest
+
+from app.services.offline_backends import (
+    Cassette,
+    CassetteMiss,
+    FakeOpenAIClient,
+    FakePineconeIndex,
+    FakeVoyageClient,
+    LatencyModel,
+    RecordReplayProxy,
+    deterministic_embedding,
+    isolate_local_stores,
+    matches_filter,
+    parse_latency_config,
+)
+from app.services.llm_service import LLMService
+from app.services.message_analysis_service import MessageAnalysisResult
+
+
+class TestFakeClients:
+
+    def test_embeddings_are_deterministic_and_normalized(self):
+        a = deterministic_embedding("the dishes are still in the sink")
+        b = deterministic_embedding("the dishes are still in the sink")
+        assert a == b
+        assert len(a) == 1024
+        assert abs(sum(v * v for v in a) - 1.0) < 1e-9
+
+    def test_rerank_prefers_overlapping_documents(self):
+        client = FakeVoyageClient()
+        result = client.rerank("dishes in the sink", ["a walk in the park", "the dishes sink"], top_k=1)
+        assert result.results[0].index == 1
+
+    def test_pinecone_query_filters_and_ranks(self):
+        index = FakePineconeIndex()
+        index.upsert(vectors=[
+            {"id": "a", "values": deterministic_embedding("dishes"), "metadata": {"relationship_id": "r1", "chunk_index": 0}},
+            {"id": "b", "values": deterministic_embedding("dishes"), "metadata": {"relationship_id": "r2", "chunk_index": 1}},
+            {"id": "c", "values": deterministic_embedding("vacation"), "metadata": {"relationship_id": "r1", "chunk_index": 2}},
+        ], namespace="ns")
+
+        results = index.query(
+            vector=deterministic_embedding("dishes"),
+            top_k=5,
+            namespace="ns",
+            filter={"relationship_id": {"$eq": "r1"}},
+            include_metadata=True,
+        )
+
+        assert [m.id for m in results.matches] == ["a", "c"]
+        assert results.matches[0].metadata.get("chunk_index") == 0
+
+    def test_filter_operators(self):
+        metadata = {"conflict_id": "c1", "relationship_id": "r1", "chunk_index": 3}
+        assert matches_filter(metadata, {"$and": [{"conflict_id": {"$ne": "c2"}}, {"relationship_id": "r1"}]})
+        assert matches_filter(metadata, {"chunk_index": {"$gte": 3, "$lt": 4}})
+        assert not matches_filter(metadata, {"conflict_id": {"$in": ["c2", "c3"]}})
+        assert matches_filter(metadata, {"$or": [{"conflict_id": "c9"}, {"chunk_index": {"$gt": 1}}]})
+
+    def test_structured_output_through_fake_llm(self):
+        service = LLMService()
+        service.client = FakeOpenAIClient()
+        result = service.structured_output(
+            [{"role": "user", "content": "Analyze 'ok'"}],
+            MessageAnalysisResult,
+        )
+        assert isinstance(result, MessageAnalysisResult)
+        assert -1.0 <= result.sentiment_score <= 1.0
+
+    def test_latency_config(self):
+        models = parse_latency_config("llm=fixed:5,pinecone=uniform:1:2")
+        assert models["llm"].sample_ms() == 5
+        assert 1 <= models["pinecone"].sample_ms() <= 2
+        assert models["s3"].sample_ms() == 0
+        with pytest.raises(ValueError):
+            LatencyModel.parse("gamma:1")
+
+
+class TestRecordReplay:
+
+    def test_recorded_responses_replay_without_target(self, tmp_path):
+        path = str(tmp_path / "embeddings.json")
+        recorder = RecordReplayProxy(FakeVoyageClient(), Cassette(path), "record")
+        recorded = recorder.embed(texts=["hello"], model="voyage-3", input_type="query")
+
+        replayer = RecordReplayProxy(None, Cassette(path), "replay")
+        replayed = replayer.embed(texts=["hello"], model="voyage-3", input_type="query")
+
+        assert replayed.embeddings == recorded.embeddings
+
+        with pytest.raises(CassetteMiss):
+            replayer.embed(texts=["never recorded"], model="voyage-3", input_type="query")
+
+
+class TestLocalStoreIsolation:
+
+    def test_offline_modes_never_share_live_caches(self, tmp_path, monkeypatch):
+        from app.services.debrief_repository import DebriefCache, debrief_repository
+        from app.services.document_registry import document_registry
+        from app.services.embedding_cache import EmbeddingCache
+        from app.services.embeddings_service import embeddings_service
+        from app.services.payload_store import PayloadStore
+        from app.services.pinecone_service import pinecone_service
+
+        live = EmbeddingCache(str(tmp_path / "embedding_cache.sqlite3"))
+        monkeypatch.setattr(embeddings_service, "cache", live)
+        monkeypatch.setattr(document_registry, "store", PayloadStore(str(tmp_path / "document_registry.sqlite3")))
+        monkeypatch.setattr(pinecone_service, "payloads", PayloadStore(str(tmp_path / "vector_payloads.sqlite3")))
+        monkeypatch.setattr(debrief_repository, "cache", DebriefCache(str(tmp_path / "debriefs")))
+
+        isolate_local_stores("fake")
+        embeddings_service.cache.put_many("voyage-3", "document", ["hello"], [deterministic_embedding("hello")])
+
+        # Same file, but fake vectors are keyed apart from live ones
+        assert live.get_many("voyage-3", "document", ["hello"]) == [None]
+        assert document_registry.store.path == str(tmp_path / "fake" / "document_registry.sqlite3")
+        assert pinecone_service.payloads.path == str(tmp_path / "fake" / "vector_payloads.sqlite3")
+        assert debrief_repository.cache.directory == str(tmp_path / "fake" / "debriefs")
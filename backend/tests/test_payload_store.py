@@ -0,0 +1,160 @@
+"""
+Unit tests for slim Pinecone metadata and payload hydration
+"""
+import json
+import pytest
+
+from app.services import pinecone_service as pinecone_module
+from app.services.payload_store import PayloadStore
+from app.services.pinecone_service import PineconeService
+
+
+class FakeMatch:
+    def __init__(self, id, metadata):
+        self.id = id
+        self.metadata = metadata
+
+
+class FakeResults:
+    def __init__(self, matches):
+        self.matches = matches
+
+
+class FakeIndex:
+    """Keeps upserted vectors; query() returns filter matches like a zero-vector scan."""
+
+    def __init__(self):
+        self.vectors = {}
+
+    def upsert(self, vectors, namespace):
+        for vector in vectors:
+            self.vectors[(namespace, vector["id"])] = vector
+
+    def query(self, vector, top_k, namespace, include_metadata=False, filter=None):
+        wanted = (filter or {}).get("conflict_id", {}).get("$eq")
+        matches = [
+            FakeMatch(v["id"], dict(v["metadata"]) if include_metadata else None)
+            for (ns, _), v in self.vectors.items()
+            if ns == namespace and (wanted is None or v["metadata"].get("conflict_id") == wanted)
+        ]
+        return FakeResults(matches[:top_k])
+
+
+@pytest.fixture
+def store(tmp_path):
+    return PayloadStore(str(tmp_path / "payloads.sqlite3"))
+
+
+@pytest.fixture
+def service(store):
+    service = PineconeService()
+    service.index = FakeIndex()
+    service.payloads = store
+    return service
+
+
+class TestPayloadStore:
+
+    def test_roundtrip_and_batch_lookup(self, store):
+        store.put_many([("transcripts/a", "hello " * 1000), ("analysis/b", "{}")])
+
+        found = store.get_many(["analysis/b", "missing", "transcripts/a", None])
+        assert found == {"analysis/b": "{}", "transcripts/a": "hello " * 1000}
+        assert store.hits == 2 and store.misses == 1
+
+    def test_put_replaces_and_delete(self, store):
+        store.put("r", "old")
+        store.put("r", "new")
+        assert store.get("r") == "new"
+
+        store.delete_many(["r"])
+        assert store.get("r") is None
+        assert len(store) == 0
+
+
+class TestSlimMetadata:
+
+    def test_transcript_metadata_carries_pointer_not_text(self, service):
+        text = "Alex: you never listen\nSam: that's not fair\n" * 500
+        service.upsert_transcript("c1", [0.1] * 4, {
+            "conflict_id": "c1", "relationship_id": "r1", "timestamp": "2024-01-01",
+            "duration": 60.0, "partner_a_id": "a", "partner_b_id": "b", "transcript_text": text,
+        })
+
+        metadata = service.index.vectors[("transcripts", "transcript_c1")]["metadata"]
+        assert "transcript_text" not in metadata
+        assert metadata["payload_ref"] == "transcripts/transcript_c1"
+        assert metadata["transcript_length"] == len(text)
+        assert len(json.dumps(metadata)) < 1000
+
+        match = service.get_by_conflict_id("c1", namespace="transcripts")
+        assert match.metadata["transcript_text"] == text
+
+    def test_analysis_and_repair_plan_roundtrip(self, service):
+        service.upsert_analysis("c2", [0.1] * 4, {"conflict_id": "c2", "fight_summary": "Chores", "root_causes": ["x"] * 50})
+        service.upsert_repair_plan("c2", [0.1] * 4, {"conflict_id": "c2", "partner_requesting": "partner_a", "steps": ["talk"]})
+
+        analysis = service.get_by_conflict_id("c2", namespace="analysis")
+        assert analysis.metadata["fight_summary"] == "Chores"
+        assert json.loads(analysis.metadata["full_analysis_json"])["root_causes"] == ["x"] * 50
+
+        plan = service.get_by_conflict_id("c2", namespace="repair_plans")
+        assert json.loads(plan.metadata["full_repair_plan_json"])["steps"] == ["talk"]
+
+    def test_hydrate_is_batched_and_keeps_legacy_metadata(self, service, store, monkeypatch):
+        store.put_many([("analysis/analysis_a", '{"a": 1}'), ("analysis/analysis_b", '{"b": 2}')])
+        calls = []
+        original = store.get_many
+        monkeypatch.setattr(store, "get_many", lambda refs: calls.append(list(refs)) or original(refs))
+        matches = [
+            FakeMatch("analysis_a", {"payload_ref": "analysis/analysis_a"}),
+            FakeMatch("analysis_b", {"payload_ref": "analysis/analysis_b"}),
+            FakeMatch("analysis_legacy", {"full_analysis_json": '{"legacy": true}'}),
+        ]
+
+        service.hydrate(matches, "analysis")
+
+        assert len(calls) == 1
+        assert [m.metadata["full_analysis_json"] for m in matches] == ['{"a": 1}', '{"b": 2}', '{"legacy": true}']
+
+    def test_transcript_falls_back_to_postgres(self, service, monkeypatch):
+        monkeypatch.setattr(
+            pinecone_module.db_service, "get_conflict_transcript",
+            lambda conflict_id: {"transcript_text": f"from postgres {conflict_id}"},
+        )
+        match = FakeMatch("transcript_c9", {"conflict_id": "c9", "payload_ref": "transcripts/transcript_c9"})
+
+        service.hydrate([match], "transcripts")
+
+        assert match.metadata["transcript_text"] == "from postgres c9"
+
+    def test_analysis_and_plan_missing_locally_are_read_from_s3(self, service, store, monkeypatch):
+        from app.services import s3_service as s3_module
+
+        objects = {
+            "analysis/r1/c3_analysis.json": b'{"fight_summary": "from s3"}',
+            "repair_plans/r1/c3_partner_b.json": b'{"steps": ["listen"]}',
+        }
+        downloads = []
+        monkeypatch.setattr(s3_module.s3_service, "download_file", lambda key: downloads.append(key) or objects.get(key))
+        monkeypatch.setattr(pinecone_module.db_service, "get_conflict_analysis",
+                            lambda conflict_id: {"analysis_path": "s3://bucket/analysis/r1/c3_analysis.json"})
+        monkeypatch.setattr(pinecone_module.db_service, "get_repair_plans", lambda conflict_id: [
+            {"partner_requesting": "partner_a", "plan_path": "s3://bucket/repair_plans/r1/c3_partner_a.json"},
+            {"partner_requesting": "partner_b", "plan_path": "s3://bucket/repair_plans/r1/c3_partner_b.json"},
+        ])
+        # Another host (or a fresh deploy) wrote these: nothing in the local store
+        analysis = FakeMatch("analysis_c3", {"conflict_id": "c3", "payload_ref": "analysis/analysis_c3"})
+        plan = FakeMatch("repair_plan_c3_partner_b", {
+            "conflict_id": "c3", "partner_requesting": "partner_b",
+            "payload_ref": "repair_plans/repair_plan_c3_partner_b",
+        })
+
+        service.hydrate([analysis], "analysis")
+        service.hydrate([plan], "repair_plans")
+
+        assert json.loads(analysis.metadata["full_analysis_json"])["fight_summary"] == "from s3"
+        assert json.loads(plan.metadata["full_repair_plan_json"])["steps"] == ["listen"]
+        assert downloads == ["analysis/r1/c3_analysis.json", "repair_plans/r1/c3_partner_b.json"]
+        # Written back, so the next lookup on this host stays local
+        assert store.get("analysis/analysis_c3") == '{"fight_summary": "from s3"}'
@@ -0,0 +1,202 @@
+"""
+Unit tests for page-parallel OCR, pipelined book ingestion and upload progress
+"""
+import asyncio
+import threading
+import time
+
+import pytest
+
+from app.config import settings
+from app.routes import pdf_upload
+from app.services.cache_service import RedisCache
+from app.services import ocr_service as ocr_module
+from app.services.ocr_service import ocr_service
+from app.services.offline_backends import FakeMistralClient, FakePineconeIndex, Record, deterministic_embedding
+from app.services.progress_store import ProgressStore
+from app.services.vector_writer import VectorWriter
+
+PAGE_CHARS = 100
+TEXT = "".join(f"Line {i:03d} of the book text.\n" for i in range(40))  # 11 pages of 100 chars
+
+
+@pytest.fixture
+def store():
+    # Nothing listens on port 1, so the cache runs on its in-memory fallback
+    return ProgressStore(RedisCache("redis://localhost:1/0"), max_events=5, ttl=60)
+
+
+class TestProgressStore:
+
+    def test_keeps_the_latest_events_with_increasing_seq(self, store):
+        for i in range(8):
+            store.append("pdf1", f"step {i}", stage="ocr", pages=i)
+
+        events = store.events("pdf1")
+        assert [e["seq"] for e in events] == [4, 5, 6, 7, 8]
+        assert events[-1]["pages"] == 7 and events[-1]["stage"] == "ocr"
+        assert [e["seq"] for e in store.events("pdf1", after=6)] == [7, 8]
+        assert store.messages("pdf1")[-1].endswith(" - step 7")
+        assert store.events("other") == []
+
+    @pytest.mark.asyncio
+    async def test_stream_resumes_and_stops_at_the_terminal_event(self, store):
+        store.append("pdf1", "started")
+        store.append("pdf1", "page 1")
+
+        async def finish():
+            await asyncio.sleep(0.05)
+            store.append("pdf1", "done", status="done")
+            store.append("pdf1", "never streamed")
+
+        asyncio.create_task(finish())
+        seen = [e async for e in store.stream("pdf1", after=1, poll_interval=0.01, timeout=5)]
+
+        assert [e["message"] for e in seen] == ["page 1", "done"]
+
+
+class TestWindowedOCR:
+
+    @pytest.fixture
+    def client(self, monkeypatch):
+        monkeypatch.setattr(settings, "OCR_PAGES_PER_REQUEST", 2)
+        monkeypatch.setattr(settings, "OCR_MAX_CONCURRENCY", 3)
+        # TEXT isn't a real PDF, so stand in for pypdf's page count
+        monkeypatch.setattr(ocr_module, "pdf_page_count", lambda pdf_bytes: 11)
+
+        class CountingClient(FakeMistralClient):
+            calls = []
+            in_flight = peak = 0
+            lock = threading.Lock()
+
+        client = CountingClient(page_chars=PAGE_CHARS)
+        process = client.ocr.process
+
+        def counted(**kwargs):
+            with client.lock:
+                client.calls.append(kwargs.get("pages"))
+                client.in_flight += 1
+                client.peak = max(client.peak, client.in_flight)
+            time.sleep(0.02)
+            try:
+                return process(**kwargs)
+            finally:
+                with client.lock:
+                    client.in_flight -= 1
+
+        client.ocr.process = counted
+        monkeypatch.setattr(ocr_service, "client", client)
+        return client
+
+    def whole_document(self):
+        pages = [TEXT[i:i + PAGE_CHARS] for i in range(0, len(TEXT), PAGE_CHARS)]
+        return "\n\n".join(f"--- Page {i + 1} ---\n{page}" for i, page in enumerate(pages))
+
+    @pytest.mark.asyncio
+    async def test_pages_come_back_in_order_from_concurrent_windows(self, client):
+        text = await ocr_service.extract_text(TEXT.encode(), "book.pdf")
+
+        assert text == self.whole_document()
+        assert client.peak == 3
+        # 11 pages in windows of 2, none past the end (the fake rejects those)
+        assert sorted(client.calls) == [[0, 1], [2, 3], [4, 5], [6, 7], [8, 9], [10]]
+
+    @pytest.mark.asyncio
+    async def test_unknown_page_count_is_one_whole_document_call(self, client, monkeypatch):
+        monkeypatch.setattr(ocr_module, "pdf_page_count", lambda pdf_bytes: None)
+
+        assert await ocr_service.extract_text(TEXT.encode(), "book.pdf") == self.whole_document()
+        assert client.calls == [None]
+
+    @pytest.mark.asyncio
+    async def test_failed_window_falls_back_to_the_whole_document(self, client):
+        process = client.ocr.process
+
+        def flaky(**kwargs):
+            if kwargs.get("pages") and kwargs["pages"][0] == 4:
+                raise ConnectionError("OCR window failed")
+            return process(**kwargs)
+
+        client.ocr.process = flaky
+
+        assert await ocr_service.extract_text(TEXT.encode(), "book.pdf") == self.whole_document()
+        assert None in client.calls
+
+
+class TestPipelinedIngestion:
+
+    @pytest.mark.asyncio
+    async def test_embedding_starts_before_ocr_finishes(self, monkeypatch):
+        index = FakePineconeIndex()
+        timeline = []
+        book = "Chapter 1: Keeping Score\n" + "We keep arguing about whose turn it is. " * 400
+        pages = [book[i:i + 3000] for i in range(0, len(book), 3000)]
+
+        async def ocr_pages():
+            for page in pages:
+                await asyncio.sleep(0.01)
+                timeline.append("page")
+                yield page
+
+        def embed_batch(texts, input_type="document", priority="interactive"):
+            timeline.append("embed")
+            return [deterministic_embedding(t) for t in texts]
+
+        monkeypatch.setattr(pdf_upload, "EMBED_BATCH_SIZE", 4)
+        monkeypatch.setattr(pdf_upload, "pinecone_service", Record(writer=VectorWriter(lambda: index)))
+        monkeypatch.setattr(pdf_upload.embeddings_service, "embed_batch", embed_batch)
+
+        text, chunks, embeddings = await pdf_upload.ingest_book_pages(
+            ocr_pages(), {"pdf_id": "p1"}, "book_p1", "books", lambda *a, **k: None
+        )
+
+        assert text == "\n\n".join(pages)
+        assert timeline.index("embed") < len(timeline) - 1 - timeline[::-1].index("page")
+        # Same chunks as parsing the whole text at once
+        whole = pdf_upload.build_book_chunks(text, lambda *a, **k: None)
+        assert [c["metadata"] for c in chunks] == [c["metadata"] for c in whole]
+        assert len(embeddings) == len(chunks)
+        assert sorted(index.namespaces["books"]) == sorted(f"book_p1{c['suffix']}" for c in chunks)
+        assert index.namespaces["books"]["book_p1_chunk_0"]["metadata"]["pdf_id"] == "p1"
+
+    @pytest.mark.asyncio
+    async def test_embedding_failure_stops_page_intake(self, monkeypatch):
+        consumed = []
+
+        async def ocr_pages():
+            for i in range(50):
+                consumed.append(i)
+                yield "Some page text that keeps going. " * 100
+
+        def embed_batch(texts, input_type="document", priority="interactive"):
+            raise RuntimeError("embedding API down")
+
+        monkeypatch.setattr(pdf_upload, "EMBED_BATCH_SIZE", 2)
+        monkeypatch.setattr(pdf_upload, "pinecone_service", Record(writer=VectorWriter(FakePineconeIndex)))
+        monkeypatch.setattr(pdf_upload.embeddings_service, "embed_batch", embed_batch)
+
+        with pytest.raises(RuntimeError):
+            await pdf_upload.ingest_book_pages(ocr_pages(), {}, "book_x", "books", lambda *a, **k: None)
+        assert len(consumed) < 50
+
+    @pytest.mark.asyncio
+    async def test_ocr_failure_still_flushes_embedded_chunks(self, monkeypatch):
+        index = FakePineconeIndex()
+
+        async def ocr_pages():
+            for i in range(6):
+                await asyncio.sleep(0.01)
+                yield "Some page text that keeps going. " * 100
+            raise RuntimeError("OCR failed on page 7")
+
+        def embed_batch(texts, input_type="document", priority="interactive"):
+            return [deterministic_embedding(t) for t in texts]
+
+        monkeypatch.setattr(pdf_upload, "EMBED_BATCH_SIZE", 2)
+        monkeypatch.setattr(pdf_upload, "pinecone_service", Record(writer=VectorWriter(lambda: index)))
+        monkeypatch.setattr(pdf_upload.embeddings_service, "embed_batch", embed_batch)
+
+        with pytest.raises(RuntimeError, match="OCR failed"):
+            await pdf_upload.ingest_book_pages(ocr_pages(), {}, "book_x", "books", lambda *a, **k: None)
+        # Batches embedded before the failure were written, not left in the buffer
+        assert index.namespaces["books"]
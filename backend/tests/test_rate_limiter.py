@@ -0,0 +1,78 @@
+"""
+Unit tests for the shared provider rate limiter (in-process fallback)
+"""
+import time
+import pytest
+
+from app.services.rate_limiter import SharedRateLimiter
+from app.services.embeddings_service import EmbeddingsService
+from app.services.offline_backends import FakeVoyageClient
+from voyageai.error import RateLimitError
+
+
+def make_limiter(capacity=10, rate=1000.0, reserve=0.3):
+    return SharedRateLimiter("test", {"requests": (capacity, rate)}, redis_url=None, reserve_fraction=reserve)
+
+
+class TestSharedRateLimiter:
+
+    def test_bulk_callers_leave_reserve_for_interactive(self):
+        limiter = make_limiter(capacity=10, rate=0.001)
+        now = time.time()
+
+        acquired = 0
+        while limiter._try_local(limiter._args({"requests": 1}, "bulk", now)) == 0:
+            acquired += 1
+
+        assert acquired == 7  # 30% reserve kept back
+        assert limiter._try_local(limiter._args({"requests": 1}, "interactive", now)) == 0
+
+    @pytest.mark.asyncio
+    async def test_acquire_waits_for_refill_and_records_metrics(self):
+        limiter = make_limiter(capacity=1, rate=50.0)
+
+        await limiter.acquire({"requests": 1})
+        waited = await limiter.acquire({"requests": 1})
+
+        metrics = limiter.get_metrics()
+        assert waited > 0
+        assert metrics["backend"] == "local"
+        assert metrics["acquired"]["interactive"] == 2
+        assert metrics["throttled"]["interactive"] == 1
+        assert metrics["queue_depth"]["interactive"] == 0
+
+    @pytest.mark.asyncio
+    async def test_penalize_blocks_until_retry_after(self):
+        limiter = make_limiter()
+
+        await limiter.apenalize(0.05)
+        waited = await limiter.acquire({"requests": 1})
+
+        assert waited >= 0.05
+        assert limiter.get_metrics()["provider_rate_limits"] == 1
+
+
+class RateLimitedOnceVoyage(FakeVoyageClient):
+    """Answers the first embed call with a 429 carrying Retry-After."""
+
+    def embed(self, texts, **kwargs):
+        if self.calls["embed"] == 0:
+            self.calls["embed"] += 1
+            raise RateLimitError("slow down", http_status=429, headers={"retry-after": "0.05"})
+        return super().embed(texts, **kwargs)
+
+
+class TestEmbeddingsServiceRateLimiting:
+
+    @pytest.mark.asyncio
+    async def test_async_embed_honours_retry_after(self):
+        service = EmbeddingsService()
+        service.client = RateLimitedOnceVoyage()
+        service.cache = None
+        service.rate_limiter = make_limiter()
+
+        vectors = await service.aembed_batch(["we keep arguing about chores"])
+
+        assert len(vectors) == 1 and len(vectors[0]) == 1024
+        assert service.rate_limiter.metrics.last_retry_after >= 0.05
+        assert service.client.calls["embed"] == 2
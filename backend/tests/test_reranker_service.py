@@ -0,0 +1,65 @@
+"""
+Unit tests for rerank caching and the local fallback reranker
+"""
+import time
+import pytest
+
+from app.services import reranker_service as reranker_module
+from app.services.cache_service import RedisCache
+from app.services.offline_backends import FakeVoyageClient, LatencyModel
+from app.services.reranker_service import RerankerService
+
+DOCS = [
+    "We planned a weekend trip to the coast",
+    "Arguments about the dishes piling up in the sink",
+    "Feeling unheard when plans change last minute",
+]
+
+
+@pytest.fixture
+def service(monkeypatch):
+    # Fresh in-memory cache per test
+    monkeypatch.setattr(reranker_module, "cache_service", RedisCache("redis://127.0.0.1:1/0"))
+    service = RerankerService()
+    service.client = FakeVoyageClient()
+    return service
+
+
+class FailingVoyage:
+    def rerank(self, **kwargs):
+        raise RuntimeError("voyage 503")
+
+
+class TestRerankerService:
+
+    def test_repeated_candidate_sets_hit_the_cache(self, service):
+        first = service.rerank("who does the dishes", DOCS, top_k=2)
+        second = service.rerank("who does the dishes", DOCS, top_k=2)
+
+        assert first == second
+        assert service.client.calls["rerank"] == 1
+        assert service.stats["cache_hits"] == 1
+
+    def test_errors_fall_back_to_local_ranking(self, service):
+        service.client = FailingVoyage()
+
+        ranked = service.rerank("who does the dishes", DOCS, top_k=2)
+
+        assert ranked[0][0] == DOCS[1]
+        assert len(ranked) == 2
+        assert service.stats["local_error"] == 1
+
+    def test_slow_voyage_is_cut_off_by_the_budget(self, service):
+        service.client = FakeVoyageClient(rerank_latency=LatencyModel("fixed", [300]))
+
+        start = time.perf_counter()
+        ranked = service.rerank("who does the dishes", DOCS, top_k=1, timeout=0.05)
+
+        assert time.perf_counter() - start < 0.25
+        assert ranked[0][0] == DOCS[1]
+        assert service.stats["local_timeout"] == 1
+
+    def test_local_rerank_keeps_retrieval_order_for_ties(self, service):
+        ranked = service.local_rerank("unrelated query words", DOCS, top_k=3)
+
+        assert [doc for doc, _ in ranked] == DOCS
@@ -0,0 +1,104 @@
+"""
+Unit tests for the deadline-aware retrieval fan-out
+"""
+import asyncio
+import pytest
+
+from app.services.retrieval_scheduler import LatencyHistogram, RetrievalScheduler
+
+
+def source(value, delay=0.0, fail=False):
+    async def fetch():
+        await asyncio.sleep(delay)
+        if fail:
+            raise RuntimeError("pinecone down")
+        return value
+    return fetch
+
+
+class TestRetrievalScheduler:
+
+    @pytest.mark.asyncio
+    async def test_slow_source_is_dropped_at_its_deadline(self):
+        scheduler = RetrievalScheduler()
+
+        results = await scheduler.run({
+            "fast": (source(["a"]), None, []),
+            "slow": (source(["b"], delay=0.5), 0.05, []),
+        }, budget=1.0)
+
+        assert results == {"fast": ["a"], "slow": []}
+        assert scheduler.deadline_misses == {"slow": 1}
+
+    @pytest.mark.asyncio
+    async def test_budget_caps_sources_without_deadlines(self):
+        scheduler = RetrievalScheduler()
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+
+        results = await scheduler.run({"slow": (source("late", delay=0.5), None, "")}, budget=0.05)
+
+        assert results == {"slow": ""}
+        assert loop.time() - start < 0.3
+        assert scheduler.budget_exhausted == 1
+
+    @pytest.mark.asyncio
+    async def test_late_results_warm_the_next_turn(self):
+        scheduler = RetrievalScheduler()
+        sources = {"books": (source(["chapter 3"], delay=0.1), 0.02, [])}
+
+        first = await scheduler.run(sources, budget=1.0, scope="session-1")
+        await asyncio.sleep(0.15)  # Late result lands in the cache
+        second = await scheduler.run(sources, budget=1.0, scope="session-1")
+        other = await scheduler.run(sources, budget=1.0, scope="session-2")
+
+        assert first["books"] == []
+        assert second["books"] == ["chapter 3"]
+        assert other["books"] == []
+        assert scheduler.cache_fallbacks == {"books": 1}
+
+    @pytest.mark.asyncio
+    async def test_failures_get_the_default_and_no_budget_waits_for_all(self):
+        scheduler = RetrievalScheduler()
+
+        results = await scheduler.run({
+            "broken": (source(None, fail=True), None, []),
+            "slow": (source("done", delay=0.05), None, ""),
+        })
+
+        assert results == {"broken": [], "slow": "done"}
+        assert scheduler.get_metrics()["sources"]["slow"]["count"] == 1
+
+
+    @pytest.mark.asyncio
+    async def test_cancelling_the_fan_out_cancels_its_sources(self):
+        scheduler = RetrievalScheduler()
+        stopped = []
+
+        async def pinecone_query():
+            try:
+                await asyncio.sleep(5)
+            except asyncio.CancelledError:
+                stopped.append("profiles")
+                raise
+
+        fanout = asyncio.ensure_future(scheduler.run({"profiles": (pinecone_query, None, [])}))
+        await asyncio.sleep(0.01)
+        fanout.cancel()
+
+        with pytest.raises(asyncio.CancelledError):
+            await fanout
+        await asyncio.sleep(0)
+        assert stopped == ["profiles"]
+
+
+class TestLatencyHistogram:
+
+    def test_percentiles_use_bucket_bounds(self):
+        histogram = LatencyHistogram()
+        for ms in [10, 20, 30, 40, 900]:
+            histogram.observe(ms / 1000)
+
+        assert histogram.percentile(50) == 50.0
+        assert histogram.percentile(95) == 1600.0
+        assert histogram.to_dict()["count"] == 5
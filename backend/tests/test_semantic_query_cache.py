@@ -0,0 +1,80 @@
+"""
+Unit tests for the session-scoped semantic RAG cache
+"""
+import asyncio
+
+import pytest
+
+from app.services import transcript_rag as rag_module
+from app.services.semantic_query_cache import SemanticQueryCache
+from app.services.transcript_rag import TranscriptRAGSystem
+
+
+@pytest.fixture
+def cache():
+    return SemanticQueryCache(threshold=0.95)
+
+
+class TestSemanticQueryCache:
+
+    def test_similar_query_hits_and_dissimilar_misses(self, cache):
+        scope = cache.scope("rel-1", "c1", "s1")
+        cache.put(scope, [1.0, 0.0], "chores context", "v1")
+
+        assert cache.get(scope, [0.99, 0.05], "v1") == "chores context"
+        assert cache.get(scope, [0.0, 1.0], "v1") is None
+
+    def test_scopes_are_isolated(self, cache):
+        cache.put(cache.scope("rel-1", "c1", "s1"), [1.0, 0.0], "rel-1 context", "v1")
+
+        assert cache.get(cache.scope("rel-2", "c1", "s1"), [1.0, 0.0], "v1") is None
+        assert cache.get(cache.scope("rel-1", "c1", "s2"), [1.0, 0.0], "v1") is None
+
+    def test_version_change_invalidates(self, cache):
+        scope = cache.scope("rel-1", "c1", "s1")
+        cache.put(scope, [1.0, 0.0], "stale", "v1")
+
+        assert cache.get(scope, [1.0, 0.0], "v2") is None
+
+    def test_invalidate_bumps_shared_version(self, cache):
+        before = cache.current_version("rel-invalidate")
+        cache.put(cache.scope("rel-invalidate", None, None), [1.0], "ctx", before)
+
+        cache.invalidate("rel-invalidate")
+
+        after = cache.current_version("rel-invalidate")
+        assert after != before
+        assert cache.get(cache.scope("rel-invalidate", None, None), [1.0], after) is None
+
+
+class TestRagLookupSemanticCache:
+
+    @pytest.mark.asyncio
+    async def test_rephrased_query_skips_retrieval(self, monkeypatch, cache):
+        runs, cancelled = [], []
+
+        async def embed_query(text):
+            return [1.0, 0.0] if "chores" in text else [0.0, 1.0]
+
+        async def run(sources, budget=None, scope=None, missed=None):
+            # The fan-out starts alongside the cache check and is cancelled on a hit
+            try:
+                await asyncio.sleep(0.05)
+            except asyncio.CancelledError:
+                cancelled.append(scope)
+                raise
+            runs.append(scope)
+            return {"primary": [{"text": "Adrian: you never do the chores", "speaker": "Adrian", "chunk_index": 0}],
+                    "profiles": [], "past_conflicts": [], "books": [], "calendar": ""}
+
+        monkeypatch.setattr(rag_module.embedding_dispatcher, "embed_query", embed_query)
+        monkeypatch.setattr(rag_module.retrieval_scheduler, "run", run)
+        monkeypatch.setattr(rag_module, "semantic_query_cache", cache)
+        rag = TranscriptRAGSystem(include_lexical=False)
+
+        first = await rag.rag_lookup("why the chores fight?", conflict_id="c1", relationship_id="rel-1", session_id="s1")
+        second = await rag.rag_lookup("what's the chores thing about", conflict_id="c1", relationship_id="rel-1", session_id="s1")
+        await rag.rag_lookup("something else entirely", conflict_id="c1", relationship_id="rel-1", session_id="s1")
+
+        assert second == first
+        assert len(runs) == 2 and len(cancelled) == 1
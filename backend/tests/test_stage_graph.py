@@ -0,0 +1,233 @@
+"""
+Unit tests for the dependency-graph stage runner and the post-fight pipeline wiring
+"""
+import asyncio
+import time
+
+import pytest
+
+from app.models.schemas import RepairPlan
+from app.routes import post_fight
+from app.services.cache_service import RedisCache
+from app.services.stage_graph import JSON_CHECKPOINT, StageCheckpoints, StageGraph, model_checkpoint
+
+
+def sleeper(seconds, result=None, log=None, name=None):
+    async def stage(**kwargs):
+        if log is not None:
+            log.append((name, "start", kwargs))
+        await asyncio.sleep(seconds)
+        if log is not None:
+            log.append((name, "end", kwargs))
+        return result
+    return stage
+
+
+class TestStageGraph:
+
+    @pytest.mark.asyncio
+    async def test_independent_stages_overlap_and_share_values(self):
+        graph = StageGraph("test", inputs=("x",))
+        graph.add("context", sleeper(0.05, "ctx"), requires=("x",))
+        graph.add("a", sleeper(0.1, "a"), requires=("context",))
+        graph.add("b", sleeper(0.1, "b"), requires=("context", "x"))
+        graph.add("c", sleeper(0.1, "c"))
+        log = []
+        graph.add("final", sleeper(0, "done", log, "final"), requires=("a",), after=("b", "c"))
+
+        started = time.perf_counter()
+        run = await graph.run(x=1)
+        elapsed = time.perf_counter() - started
+
+        # Longest chain is context -> a -> final (0.15s), not the 0.35s sum
+        assert elapsed < 0.3
+        assert run.results == {"context": "ctx", "a": "a", "b": "b", "c": "c", "final": "done"}
+        assert log[0] == ("final", "start", {"a": "a"})
+        assert run.timings["final"]["start_ms"] >= 140
+        assert run.timings["c"]["start_ms"] < 20
+        assert graph.get_metrics()["stages"]["a"]["count"] == 1
+
+    @pytest.mark.asyncio
+    async def test_fallback_stage_failure_is_non_blocking(self):
+        async def broken():
+            raise RuntimeError("LLM timeout")
+
+        graph = StageGraph("test")
+        graph.add("enrichment", broken, fallback=None)
+        graph.add("uses_it", sleeper(0, "ok"), requires=("enrichment",))
+
+        run = await graph.run()
+
+        assert run.results == {"enrichment": None, "uses_it": "ok"}
+        assert run.timings["enrichment"]["status"] == "fallback"
+        assert graph.get_metrics()["stages"]["enrichment"]["failures"] == 1
+
+    @pytest.mark.asyncio
+    async def test_required_stage_failure_cancels_the_run(self):
+        async def broken():
+            await asyncio.sleep(0.01)
+            raise RuntimeError("analysis failed")
+
+        log = []
+        graph = StageGraph("test")
+        graph.add("analysis", broken)
+        graph.add("slow", sleeper(1, log=log, name="slow"))
+        graph.add("store", sleeper(0, log=log, name="store"), requires=("analysis",))
+
+        with pytest.raises(RuntimeError, match="analysis failed"):
+            await graph.run()
+
+        assert log == [("slow", "start", {})]
+        assert graph.failed_runs == 1 and graph.last_run["slow"]["status"] == "cancelled"
+
+    def test_dependencies_must_be_declared_first(self):
+        graph = StageGraph("test", inputs=("x",))
+        graph.add("a", sleeper(0), requires=("x",))
+        with pytest.raises(ValueError):
+            graph.add("b", sleeper(0), requires=("later",))
+        with pytest.raises(ValueError):
+            graph.add("a", sleeper(0))
+
+    @pytest.mark.asyncio
+    async def test_missing_inputs_are_rejected(self):
+        graph = StageGraph("test", inputs=("x",))
+        with pytest.raises(ValueError):
+            await graph.run()
+
+
+class TestCheckpoints:
+
+    @pytest.fixture
+    def graph(self):
+        # Nothing listens on port 1, so the cache runs on its in-memory fallback
+        checkpoints = StageCheckpoints(RedisCache("redis://localhost:1/0"), ttl=60)
+        return StageGraph("test", inputs=("transcript", "timestamp"), checkpoints=checkpoints, unkeyed=("timestamp",))
+
+    def counted(self, calls, name, result):
+        async def stage(**kwargs):
+            calls.append(name)
+            if isinstance(result, Exception):
+                raise result
+            return result
+        return stage
+
+    @pytest.mark.asyncio
+    async def test_rerun_resumes_after_a_late_failure(self, graph):
+        calls = []
+        plan = RepairPlan(
+            conflict_id="c1", partner_requesting="partner_a", steps=["Listen"],
+            apology_script="I'm sorry", timing_suggestion="Tonight", risk_factors=[],
+        )
+        graph.add("analysis", self.counted(calls, "analysis", {"topic": "chores"}),
+                  requires=("transcript", "timestamp"), checkpoint=JSON_CHECKPOINT)
+        graph.add("repair_plan", self.counted(calls, "repair_plan", RuntimeError("rate limited")),
+                  requires=("transcript", "analysis"), checkpoint=model_checkpoint(RepairPlan))
+        graph.add("notify", self.counted(calls, "notify", None), requires=("repair_plan",))
+
+        progress = []
+        with pytest.raises(RuntimeError):
+            await graph.run(checkpoint_scope="c1", on_progress=progress.append, transcript="A: hi", timestamp=1)
+        assert progress[0]["notify"] == {"status": "pending"}
+        assert progress[-1]["analysis"]["status"] == "ok"
+
+        graph.stages["repair_plan"] = graph.stages["repair_plan"]._replace(func=self.counted(calls, "repair_plan", plan))
+        run = await graph.run(checkpoint_scope="c1", transcript="A: hi", timestamp=2)
+
+        assert calls == ["analysis", "repair_plan", "repair_plan", "notify"]
+        assert run.timings["analysis"]["status"] == "cached"
+        assert run.results["analysis"] == {"topic": "chores"}
+
+        # Saved models come back as models
+        run = await graph.run(checkpoint_scope="c1", transcript="A: hi", timestamp=3)
+        assert run.results["repair_plan"] == plan
+        assert calls[-1] == "notify" and calls.count("repair_plan") == 2
+        assert graph.get_metrics()["stages"]["analysis"]["checkpoint_hits"] == 2
+
+    @pytest.mark.asyncio
+    async def test_running_stages_checkpoint_before_a_required_failure_is_raised(self, graph):
+        calls = []
+
+        async def slow_llm(transcript):
+            calls.append("debrief")
+            await asyncio.sleep(0.1)
+            return {"topic": "chores"}
+
+        async def broken(transcript):
+            await asyncio.sleep(0.01)
+            raise RuntimeError("repair plan failed")
+
+        graph.add("debrief", slow_llm, requires=("transcript",), checkpoint=JSON_CHECKPOINT)
+        graph.add("repair_plan", broken, requires=("transcript",))
+        graph.add("store", self.counted(calls, "store", None), requires=("debrief",))
+
+        with pytest.raises(RuntimeError, match="repair plan failed"):
+            await graph.run(checkpoint_scope="c1", transcript="A: hi", timestamp=1)
+        # Dependents of the finished stage don't start once the run has failed
+        assert calls == ["debrief"]
+        assert graph.last_run["debrief"]["status"] == "ok"
+
+        graph.stages["repair_plan"] = graph.stages["repair_plan"]._replace(func=self.counted(calls, "repair_plan", "plan"))
+        run = await graph.run(checkpoint_scope="c1", transcript="A: hi", timestamp=2)
+
+        assert calls == ["debrief", "repair_plan", "store"]
+        assert run.timings["debrief"]["status"] == "cached"
+
+    @pytest.mark.asyncio
+    async def test_changed_inputs_rerun_only_the_affected_stages(self, graph):
+        calls = []
+        graph.add("analysis", self.counted(calls, "analysis", "a"), requires=("transcript",), checkpoint=JSON_CHECKPOINT)
+        graph.add("debrief", self.counted(calls, "debrief", "d"), requires=("analysis",), checkpoint=JSON_CHECKPOINT)
+
+        await graph.run(checkpoint_scope="c1", transcript="A: hi", timestamp=1)
+        await graph.run(checkpoint_scope="c1", transcript="A: hello", timestamp=1)
+        # analysis re-ran but produced the same output, so debrief stays cached
+        assert calls == ["analysis", "debrief", "analysis"]
+
+        await graph.run(checkpoint_scope="c2", transcript="A: hello", timestamp=1)
+        await graph.run(transcript="A: hello", timestamp=1)
+        assert calls[3:] == ["analysis", "debrief", "analysis", "debrief"]
+
+
+class TestPostFightPipeline:
+
+    @pytest.mark.asyncio
+    async def test_llm_stages_only_wait_for_profiles_and_context_is_fetched_once(self, monkeypatch):
+        calls = {"previous_conflicts": 0, "partner_names": 0}
+
+        def get_previous_conflicts(relationship_id, limit=10):
+            calls["previous_conflicts"] += 1
+            return [{"id": "c0"}]
+
+        def get_partner_names(relationship_id):
+            calls["partner_names"] += 1
+            return {"partner_a": "Adrian", "partner_b": "Elara"}
+
+        monkeypatch.setattr(post_fight.db_service, "get_previous_conflicts", get_previous_conflicts)
+        monkeypatch.setattr(post_fight.db_service, "get_partner_names", get_partner_names)
+
+        # Every other stage is replaced with a timed stand-in
+        pipeline = post_fight.post_fight_pipeline
+        durations = {"enrichment": 0.1, "gottman": 0.1, "debrief": 0.1, "profiles": 0.05,
+                     "analysis": 0.1, "repair_plan_partner_a": 0.1, "repair_plan_partner_b": 0.1}
+        log = []
+        for name, stage in pipeline.stages.items():
+            if name not in calls:
+                fake = sleeper(durations.get(name, 0), (None, None) if name == "profiles" else None, log, name)
+                monkeypatch.setitem(pipeline.stages, name, stage._replace(func=fake))
+
+        run = await pipeline.run(
+            conflict_id="c1", transcript_text="A: hi", relationship_id="r1", partner_a_id="a",
+            partner_b_id="b", speaker_labels={}, duration=1.0, timestamp=None,
+        )
+
+        assert calls == {"previous_conflicts": 1, "partner_names": 1}
+        starts = {name: t["start_ms"] for name, t in run.timings.items()}
+        # Enrichment, Gottman, debrief and profiles start together; the LLM calls follow the profiles
+        assert max(starts["enrichment"], starts["gottman"], starts["debrief"], starts["profiles"]) < 40
+        assert 40 <= starts["analysis"] < 90
+        assert starts["similar_fights"] >= 90
+        assert starts["refresh_insights"] >= max(starts["store_analysis"], starts["store_debrief"])
+        # ~0.25s instead of the ~0.65s the stages add up to
+        assert run.seconds < 0.4
+        enrichment_inputs = next(kwargs for name, event, kwargs in log if name == "enrichment")
+        assert enrichment_inputs["previous_conflicts"] == [{"id": "c0"}]
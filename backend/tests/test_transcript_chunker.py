@@ -0,0 +1,104 @@
+"""
+Unit tests for speaker-turn-aware, incremental transcript chunking
+"""
+from app.services.offline_backends import FakePineconeIndex, deterministic_embedding
+from app.services.transcript_chunker import TranscriptChunker, chunk_id_prefix, estimate_tokens
+
+TRANSCRIPT = "\n".join(
+    f"{'Alex' if i % 2 == 0 else 'Sam'}: This is turn number {i}, and it talks about the dishes again."
+    for i in range(30)
+)
+
+
+def chunk(chunker, text, conflict_id="c1"):
+    return chunker.chunk_transcript(text, conflict_id=conflict_id, relationship_id="r1")
+
+
+class TestTurnParsing:
+
+    def test_merges_same_speaker_and_continuation_lines(self):
+        turns = TranscriptChunker.parse_turns("Alex: I'm upset.\nAlex: Really upset.\nand tired\n\nSam: Okay")
+
+        assert turns == [("Alex", "I'm upset. Really upset. and tired"), ("Sam", "Okay")]
+
+
+class TestPacking:
+
+    def test_chunks_hold_whole_turns_within_budget(self):
+        chunker = TranscriptChunker(max_tokens=60, overlap_turns=1)
+        chunks = chunk(chunker, TRANSCRIPT)
+
+        assert len(chunks) > 3
+        for c in chunks:
+            assert estimate_tokens(c["content"]) <= 60 + len(c["content"].splitlines())
+            for line in c["content"].splitlines():
+                assert line.startswith(("Alex: This is turn", "Sam: This is turn"))
+        assert chunks[0]["speaker"] == "Both"
+        assert chunks[0]["metadata"]["speakers"] == ["Alex", "Sam"]
+
+    def test_overlap_repeats_last_turn(self):
+        chunker = TranscriptChunker(max_tokens=60, overlap_turns=1)
+        chunks = chunk(chunker, TRANSCRIPT)
+
+        for previous, current in zip(chunks, chunks[1:]):
+            assert current["content"].splitlines()[0] == previous["content"].splitlines()[-1]
+
+    def test_long_turn_split_at_sentences_keeps_speaker(self):
+        chunker = TranscriptChunker(max_tokens=30, overlap_turns=0)
+        long_turn = "Alex: " + " ".join(f"Sentence {i} is about feeling unheard." for i in range(20))
+        chunks = chunk(chunker, long_turn)
+
+        assert len(chunks) > 1
+        assert all(c["content"].startswith("Alex: Sentence") and c["speaker"] == "Alex" for c in chunks)
+        assert all(c["content"].endswith(".") for c in chunks)
+
+
+class TestIncremental:
+
+    def test_ids_are_stable_content_hashes(self):
+        chunker = TranscriptChunker(max_tokens=60)
+        first = chunk(chunker, TRANSCRIPT)
+        second = chunk(chunker, TRANSCRIPT)
+
+        assert [c["id"] for c in first] == [c["id"] for c in second]
+        assert all(c["id"].startswith(chunk_id_prefix("c1")) for c in first)
+        assert len({c["id"] for c in first}) == len(first)
+
+    def test_appending_turns_only_yields_the_tail(self):
+        chunker = TranscriptChunker(max_tokens=60)
+        stored = chunk(chunker, TRANSCRIPT)
+        updated = chunk(chunker, TRANSCRIPT + "\nAlex: One more thing.\nSam: Fine, let's talk tomorrow.")
+
+        added, stale = chunker.delta(updated, [c["id"] for c in stored])
+
+        assert 0 < len(added) <= 2
+        assert len(stale) <= 1
+        assert {c["id"] for c in updated} == ({c["id"] for c in stored} - set(stale)) | {c["id"] for c in added}
+
+    def test_unchanged_transcript_has_empty_delta(self):
+        chunker = TranscriptChunker()
+        chunks = chunk(chunker, TRANSCRIPT)
+
+        assert chunker.delta(chunks, [c["id"] for c in chunks]) == ([], [])
+        assert chunker.delta([], ["chunk_c1_0"]) == ([], ["chunk_c1_0"])
+
+    def test_restore_without_id_listing_leaves_no_stale_chunks(self, monkeypatch):
+        from app.routes import post_fight
+
+        class PodIndex(FakePineconeIndex):
+            def list_paginated(self, **kwargs):
+                raise Exception("Listing is not supported for pod-based indexes")
+
+        index = PodIndex()
+        monkeypatch.setattr(post_fight.pinecone_service, "namespace_layout", "per_relationship")
+        monkeypatch.setattr(post_fight.pinecone_service, "_index", index)
+        monkeypatch.setattr(post_fight.embeddings_service, "embed_batch",
+                            lambda texts, **kwargs: [deterministic_embedding(t) for t in texts])
+        chunker = TranscriptChunker(max_tokens=60)
+        stored = chunk(chunker, TRANSCRIPT)
+        edited = chunk(chunker, TRANSCRIPT.replace("turn number 3,", "turn number three,"))
+
+        post_fight._store_transcript_chunks(chunker, stored, "c1", "r1")
+        post_fight._store_transcript_chunks(chunker, edited, "c1", "r1")
+
+        assert set(index.namespaces["transcript_chunks__r1"]) == {c["id"] for c in edited}
@@ -0,0 +1,140 @@
+"""
+Unit tests for batched, parallel vector upserts
+"""
+import asyncio
+import threading
+import time
+import pytest
+
+from app.services import vector_writer as writer_module
+from app.services.lexical_index import LexicalIndexService
+from app.services.offline_backends import FakePineconeIndex, LatencyModel
+from app.services.vector_writer import VectorWriteError, VectorWriter
+
+
+def make_vectors(n, prefix="v"):
+    return [{"id": f"{prefix}{i}", "values": [float(i), 1.0], "metadata": {"text": f"chunk {i}"}} for i in range(n)]
+
+
+class FlakyIndex(FakePineconeIndex):
+    """Fails the first `failures` upserts, then behaves."""
+
+    def __init__(self, failures=1, status=None):
+        super().__init__()
+        self.failures = failures
+        self.status = status
+        self.calls = 0
+        self._calls_lock = threading.Lock()
+
+    def upsert(self, vectors, namespace="", **kwargs):
+        with self._calls_lock:
+            self.calls += 1
+            fail = self.failures > 0
+            self.failures -= 1
+        if fail:
+            error = RuntimeError("pinecone 503")
+            error.status = self.status
+            raise error
+        return super().upsert(vectors, namespace)
+
+
+class TestBatching:
+
+    def test_splits_by_count_and_bytes(self):
+        writer = VectorWriter(lambda: None, max_batch_vectors=10, max_batch_bytes=10_000)
+        assert [len(b) for b in writer.make_batches(make_vectors(25), "books")] == [10, 10, 5]
+
+        big = [{"id": str(i), "values": [0.0] * 1024, "metadata": {}} for i in range(4)]
+        assert [len(b) for b in writer.make_batches(big, "books")] == [1, 1, 1, 1]
+
+    def test_ids_are_deterministic_and_deduplicated(self):
+        writer = VectorWriter(lambda: None)
+        vectors = [
+            {"values": [1.0], "metadata": {"text": "same"}},
+            {"values": [2.0], "metadata": {"text": "same"}},
+            {"id": "a", "values": [1.0], "metadata": {}},
+            {"id": "a", "values": [3.0], "metadata": {}},
+        ]
+        [batch] = writer.make_batches(vectors, "profiles")
+
+        assert len(batch) == 2
+        assert batch[0]["id"].startswith("profiles_") and batch[0]["values"] == [2.0]
+        assert batch[1]["values"] == [3.0]
+        assert writer.make_batches(vectors[:1], "profiles")[0][0]["id"] == batch[0]["id"]
+
+
+class TestUpsert:
+
+    def test_parallel_batches_are_faster_than_sequential(self):
+        index = FakePineconeIndex(LatencyModel("fixed", [50]))
+        writer = VectorWriter(lambda: index, max_batch_vectors=10, max_workers=4)
+
+        start = time.perf_counter()
+        assert writer.upsert(make_vectors(80), "books") == 80
+        elapsed = time.perf_counter() - start
+
+        assert len(index.namespaces["books"]) == 80
+        assert elapsed < 8 * 0.05 * 0.75
+        metrics = writer.get_metrics()
+        assert metrics["batches"] == 8 and metrics["by_namespace"] == {"books": 80}
+        assert metrics["vectors_per_second"] > 0
+
+    def test_retries_transient_failures(self):
+        index = FlakyIndex(failures=2)
+        writer = VectorWriter(lambda: index, backoff_seconds=0.001)
+
+        writer.upsert(make_vectors(3), "books")
+
+        assert index.calls == 3
+        assert writer.retries == 2
+        assert len(index.namespaces["books"]) == 3
+
+    def test_client_errors_are_not_retried(self):
+        index = FlakyIndex(failures=1, status=400)
+        writer = VectorWriter(lambda: index, backoff_seconds=0.001)
+
+        with pytest.raises(VectorWriteError) as excinfo:
+            writer.upsert(make_vectors(3), "books")
+
+        assert index.calls == 1 and excinfo.value.failed == 3
+        assert writer.get_metrics()["failed_vectors"] == 3
+
+    def test_feeds_lexical_index(self, monkeypatch):
+        lexical = LexicalIndexService()
+        monkeypatch.setattr(writer_module, "lexical_index_service", lexical)
+        writer = VectorWriter(lambda: FakePineconeIndex())
+
+        writer.upsert([{"id": "b1", "values": [1.0], "metadata": {"text": "the dishes again"}}], "books")
+
+        assert lexical.search("books", "dishes")[0][0] == "b1"
+
+
+class TestBuffer:
+
+    def test_ships_full_batches_before_close(self):
+        index = FakePineconeIndex()
+        writer = VectorWriter(lambda: index, max_batch_vectors=10)
+
+        with writer.buffer() as buffer:
+            buffer.add("books", make_vectors(25))
+            time.sleep(0.05)
+            assert len(index.namespaces["books"]) == 20
+            buffer.add("profiles", make_vectors(3, "p"))
+
+        assert len(index.namespaces["books"]) == 25
+        assert len(index.namespaces["profiles"]) == 3
+
+
+class TestEnqueue:
+
+    def test_coalesces_concurrent_single_writes(self):
+        index = FlakyIndex(failures=0)
+        writer = VectorWriter(lambda: index, window_ms=10)
+
+        async def run():
+            await asyncio.gather(*(writer.enqueue("partner_messages", v) for v in make_vectors(5, "msg_")))
+
+        asyncio.run(run())
+
+        assert index.calls == 1
+        assert len(index.namespaces["partner_messages"]) == 5
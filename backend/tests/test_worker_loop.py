@@ -0,0 +1,140 @@
+"""
+Unit tests for the persistent worker event loop and async Celery tasks
+"""
+import asyncio
+import threading
+import time
+
+import pytest
+
+from app.tasks import alert_tasks
+from app.tasks.worker_loop import WorkerLoop, async_task, gather_bounded
+
+
+@pytest.fixture
+def worker():
+    loop = WorkerLoop(name="test-loop")
+    yield loop
+    loop.shutdown(timeout=1)
+
+
+class TestWorkerLoop:
+
+    def test_tasks_share_one_loop_and_its_state(self, worker):
+        async def current():
+            return asyncio.get_running_loop()
+
+        first = worker.run(current())
+        assert worker.run(current()) is first
+        assert first.is_running()
+        assert worker.get_metrics()["runs"] == 2
+
+    def test_concurrent_callers_overlap_on_the_loop(self, worker):
+        async def job():
+            await asyncio.sleep(0.1)
+            return threading.current_thread().name
+
+        results = []
+        callers = [threading.Thread(target=lambda: results.append(worker.run(job()))) for _ in range(5)]
+        started = time.perf_counter()
+        for caller in callers:
+            caller.start()
+        for caller in callers:
+            caller.join()
+
+        assert time.perf_counter() - started < 0.3
+        assert results == ["test-loop"] * 5
+
+    def test_errors_propagate_and_timeouts_cancel(self, worker):
+        async def broken():
+            raise ValueError("bad input")
+
+        with pytest.raises(ValueError, match="bad input"):
+            worker.run(broken())
+
+        cancelled = threading.Event()
+
+        async def slow():
+            try:
+                await asyncio.sleep(5)
+            except asyncio.CancelledError:
+                cancelled.set()
+                raise
+
+        with pytest.raises(TimeoutError):
+            worker.run(slow(), timeout=0.05)
+        assert cancelled.wait(1)
+        assert worker.get_metrics()["in_flight"] == 0
+
+    def test_loop_is_recreated_after_fork_and_shutdown_drains(self, worker):
+        async def current():
+            return asyncio.get_running_loop()
+
+        before = worker.run(current())
+        worker._pid = -1  # As seen from a forked child
+        assert worker.run(current()) is not before
+
+        written = []
+
+        async def background_write():
+            await asyncio.sleep(0.05)
+            written.append("vector")
+
+        worker.loop.call_soon_threadsafe(lambda: asyncio.ensure_future(background_write()))
+        worker.shutdown(timeout=1)
+        assert written == ["vector"]
+        assert not worker.get_metrics()["running"]
+
+
+class TestAsyncTasks:
+
+    @pytest.mark.asyncio
+    async def test_gather_bounded_limits_concurrency_and_keeps_failures(self):
+        active = peak = 0
+
+        async def job(i):
+            nonlocal active, peak
+            active += 1
+            peak = max(peak, active)
+            await asyncio.sleep(0.01)
+            active -= 1
+            if i == 3:
+                raise RuntimeError("db down")
+            return i
+
+        results = await gather_bounded((job(i) for i in range(10)), limit=4)
+
+        assert peak == 4
+        assert isinstance(results[3], RuntimeError)
+        assert results[:3] == [0, 1, 2] and results[9] == 9
+
+    def test_async_task_runs_on_the_worker_loop(self):
+        @async_task(name="tests.add")
+        async def add(x, y):
+            await asyncio.sleep(0)
+            return x + y
+
+        assert add.name == "tests.add"
+        assert add.apply(args=(2, 3)).get() == 5
+        with pytest.raises(ValueError):
+            async_task(bind=True)
+
+    def test_cool_down_reminders_are_created_concurrently(self, monkeypatch):
+        from app.services.alert_service import alert_service
+
+        conflicts = [{"id": f"c{i}", "relationship_id": "r1"} for i in range(8)]
+
+        async def create(relationship_id, conflict_id):
+            await asyncio.sleep(0.05)
+            if conflict_id == "c0":
+                raise RuntimeError("insert failed")
+            return {"id": conflict_id}
+
+        monkeypatch.setattr(alert_tasks, "_cool_down_candidates", lambda: conflicts)
+        monkeypatch.setattr(alert_service, "create_cool_down_reminder", create)
+
+        started = time.perf_counter()
+        result = alert_tasks.check_cool_down_reminders.apply().get()
+
+        assert result == {"checked": 8, "created": 7}
+        assert time.perf_counter() - started < 0.3